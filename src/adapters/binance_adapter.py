@@ -5,13 +5,23 @@ import httpx
 import os
 import json
 import asyncio
-import websockets
-from typing import Dict, Any, List, Optional, Callable
+from typing import Dict, Any, List, Optional, Callable, Tuple
 from datetime import datetime
 from decimal import Decimal # Importar Decimal
 
 from core.exceptions import BinanceAPIError, ExternalAPIError, CredentialError
 from shared.data_types import AssetBalance
+from adapters.binance_stream_manager import BinanceStreamManager
+from adapters.binance_rate_limiter import BinanceRateLimiter, RequestPriority
+from adapters.market_data_bus import OverflowPolicy
+from adapters.binance_codec import json_loads
+from core.domain_models.ohlcv import OHLCVFrame
+
+RequestKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _kline_open_time(event: Dict[str, Any]) -> Any:
+    return event.get("k", {}).get("t")
 
 class BinanceAdapter:
     """
@@ -20,9 +30,19 @@ class BinanceAdapter:
     BASE_URL = "https://api.binance.com"
     RETRY_ATTEMPTS = 3
     RETRY_DELAY_SECONDS = 1
+    # TTL (segundos) durante el que se reutiliza la respuesta de un GET no firmado ya resuelto.
+    COALESCED_RESPONSE_TTL_SECONDS: Dict[str, float] = {
+        "/api/v3/ticker/24hr": 1.0,
+        "/api/v3/klines": 1.0,
+    }
+    MAX_CACHED_RESPONSES = 1024
 
     def __init__(self):
         self.client = httpx.AsyncClient(base_url=self.BASE_URL, timeout=10.0)
+        self.stream_manager = BinanceStreamManager()
+        self.rate_limiter = BinanceRateLimiter()
+        self._inflight_requests: Dict[RequestKey, asyncio.Task] = {}
+        self._response_cache: Dict[RequestKey, Tuple[float, Any]] = {}
         self._explicitly_closed = False
 
     def _sign_request(self, api_key: str, api_secret: str, params: Dict[str, Any]) -> Dict[str, Any]:
@@ -34,9 +54,11 @@ class BinanceAdapter:
         params['signature'] = m.hexdigest()
         return params
 
-    async def _make_request(self, method: str, endpoint: str, api_key: str, api_secret: str, params: Optional[Dict[str, Any]] = None, signed: bool = False) -> Any:
+    async def _make_request(self, method: str, endpoint: str, api_key: str, api_secret: str, params: Optional[Dict[str, Any]] = None, signed: bool = False, priority: Optional[RequestPriority] = None) -> Any:
         """
         Realiza una solicitud a la API de Binance con reintentos y manejo de errores.
+        Cada intento reserva antes su peso en el rate limiter; las órdenes usan prioridad alta
+        por defecto y el resto prioridad normal.
         """
         if self._explicitly_closed:
             raise RuntimeError("BinanceAdapter ha sido cerrado y no puede realizar nuevas solicitudes.")
@@ -44,13 +66,74 @@ class BinanceAdapter:
         if params is None:
             params = {}
 
+        is_order = self.rate_limiter.is_order_request(method, endpoint)
+        if priority is None:
+            priority = RequestPriority.HIGH if is_order else RequestPriority.NORMAL
+        weight = self.rate_limiter.get_request_weight(method, endpoint, params)
+
         if signed:
             params['timestamp'] = int(time.time() * 1000)
             params = self._sign_request(api_key, api_secret, params)
 
         headers = {"X-MBX-APIKEY": api_key}
 
+        if method == "GET" and not signed:
+            return await self._coalesced_get(endpoint, params, headers, weight, priority)
+        return await self._send_request(method, endpoint, params, headers, weight, priority, is_order)
+
+    @staticmethod
+    def _request_key(endpoint: str, params: Dict[str, Any]) -> RequestKey:
+        return endpoint, tuple(sorted((str(k), str(v)) for k, v in params.items()))
+
+    async def _coalesced_get(self, endpoint: str, params: Dict[str, Any], headers: Dict[str, str], weight: int, priority: RequestPriority) -> Any:
+        """
+        Ejecuta un GET no firmado compartiendo la solicitud en vuelo con cualquier otro llamador
+        que pida el mismo endpoint con los mismos parámetros. Si el endpoint tiene un TTL en
+        COALESCED_RESPONSE_TTL_SECONDS, la respuesta se reutiliza durante ese tiempo.
+        Las respuestas compartidas no deben mutarse por los llamadores.
+        """
+        key = self._request_key(endpoint, params)
+        cached = self._response_cache.get(key)
+        if cached is not None:
+            expires_at, cached_data = cached
+            if expires_at > time.monotonic():
+                return cached_data
+            del self._response_cache[key]
+
+        task = self._inflight_requests.get(key)
+        if task is None:
+            task = asyncio.create_task(self._send_request("GET", endpoint, params, headers, weight, priority, False))
+            self._inflight_requests[key] = task
+            task.add_done_callback(lambda t, key=key: self._on_coalesced_request_done(key, t))
+        # shield: si un llamador se cancela, la solicitud compartida sigue para los demás.
+        return await asyncio.shield(task)
+
+    def _on_coalesced_request_done(self, key: RequestKey, task: asyncio.Task) -> None:
+        if self._inflight_requests.get(key) is task:
+            del self._inflight_requests[key]
+        if task.cancelled() or task.exception() is not None:
+            return
+        ttl = self.COALESCED_RESPONSE_TTL_SECONDS.get(key[0], 0)
+        if ttl > 0:
+            now = time.monotonic()
+            if len(self._response_cache) >= self.MAX_CACHED_RESPONSES:
+                for expired_key in [k for k, (expires_at, _) in self._response_cache.items() if expires_at <= now]:
+                    del self._response_cache[expired_key]
+            if len(self._response_cache) < self.MAX_CACHED_RESPONSES:
+                self._response_cache[key] = (now + ttl, task.result())
+
+    @staticmethod
+    def _decode_response(response: httpx.Response) -> Any:
+        """Decodifica el cuerpo directamente desde bytes con el decodificador JSON más rápido disponible."""
+        content = response.content
+        if isinstance(content, (bytes, bytearray)):
+            return json_loads(content)
+        return response.json()
+
+    async def _send_request(self, method: str, endpoint: str, params: Dict[str, Any], headers: Dict[str, str], weight: int, priority: RequestPriority, is_order: bool) -> Any:
+        """Envía la solicitud HTTP con reintentos, respetando el presupuesto del rate limiter."""
         for attempt in range(self.RETRY_ATTEMPTS):
+            await self.rate_limiter.acquire(weight, priority, is_order=is_order)
             try:
                 if method == "GET":
                     response = await self.client.get(endpoint, params=params, headers=headers)
@@ -60,50 +143,36 @@ class BinanceAdapter:
                     response = await self.client.delete(endpoint, params=params, headers=headers)
                 else:
                     raise ValueError(f"Método HTTP no soportado: {method}")
-
-                response.raise_for_status()
-                return response.json()
-
             except httpx.HTTPStatusError as e:
-                error_message = f"Error de estado HTTP de Binance API: {e.response.status_code} - {e.response.text}"
-                response_data = e.response.json() if e.response.text else {}
-                if e.response.status_code in [400, 401, 403, 404, 405, 406, 418, 429]:
-                    raise BinanceAPIError(
-                        message=error_message,
-                        status_code=e.response.status_code,
-                        response_data=response_data,
-                        original_exception=e
-                    )
-                elif e.response.status_code in [500, 502, 503, 504]:
-                    if attempt < self.RETRY_ATTEMPTS - 1:
-                        print(f"Advertencia: Error de servidor de Binance ({e.response.status_code}). Reintentando en {self.RETRY_DELAY_SECONDS}s...")
-                        await asyncio.sleep(self.RETRY_DELAY_SECONDS)
-                    else:
-                        raise BinanceAPIError(
-                            message=error_message,
-                            status_code=e.response.status_code,
-                            response_data=response_data,
-                            original_exception=e
-                        )
-                else:
-                    raise BinanceAPIError(
-                        message=error_message,
-                        status_code=e.response.status_code,
-                        response_data=response_data,
-                        original_exception=e
-                    )
+                await self._handle_status_error(e, attempt)
+                continue
             except httpx.RequestError as e:
                 error_message = f"Error de red o solicitud al interactuar con Binance API: {e}"
                 if attempt < self.RETRY_ATTEMPTS - 1:
                     print(f"Advertencia: Error de red de Binance. Reintentando en {self.RETRY_DELAY_SECONDS}s...")
                     await asyncio.sleep(self.RETRY_DELAY_SECONDS)
-                else:
-                    raise BinanceAPIError(
-                        message=error_message,
-                        status_code=None,
-                        response_data={},
-                        original_exception=e
-                    )
+                    continue
+                raise BinanceAPIError(
+                    message=error_message,
+                    status_code=None,
+                    response_data={},
+                    original_exception=e
+                ) from e
+            except Exception as e:
+                raise ExternalAPIError(
+                    message=f"Error inesperado al interactuar con Binance API: {e}",
+                    service_name="BINANCE",
+                    original_exception=e
+                ) from e
+
+            # Fuera del manejo de errores de la API: un fallo al leer las cabeceras no es un fallo de Binance.
+            self.rate_limiter.update_from_headers(response.headers)
+
+            try:
+                response.raise_for_status()
+                return self._decode_response(response)
+            except httpx.HTTPStatusError as e:
+                await self._handle_status_error(e, attempt)
             except Exception as e:
                 raise ExternalAPIError(
                     message=f"Error inesperado al interactuar con Binance API: {e}",
@@ -113,6 +182,23 @@ class BinanceAdapter:
         
         raise BinanceAPIError("Fallo desconocido al realizar la solicitud a Binance API.")
 
+    async def _handle_status_error(self, e: httpx.HTTPStatusError, attempt: int) -> None:
+        """Convierte una respuesta de error en BinanceAPIError, o espera antes de reintentar un 5xx."""
+        error_message = f"Error de estado HTTP de Binance API: {e.response.status_code} - {e.response.text}"
+        response_data = self._decode_response(e.response) if e.response.text else {}
+        if e.response.status_code in [418, 429]:
+            self.rate_limiter.register_rate_limit_response(e.response.status_code, e.response.headers)
+        if e.response.status_code in [500, 502, 503, 504] and attempt < self.RETRY_ATTEMPTS - 1:
+            print(f"Advertencia: Error de servidor de Binance ({e.response.status_code}). Reintentando en {self.RETRY_DELAY_SECONDS}s...")
+            await asyncio.sleep(self.RETRY_DELAY_SECONDS)
+            return
+        raise BinanceAPIError(
+            message=error_message,
+            status_code=e.response.status_code,
+            response_data=response_data,
+            original_exception=e
+        )
+
     async def get_account_info(self, api_key: str, api_secret: str) -> Dict[str, Any]:
         """
         Obtiene la información de la cuenta de Binance, incluyendo balances y permisos.
@@ -180,21 +266,38 @@ class BinanceAdapter:
         except Exception as e:
             raise BinanceAPIError(f"Error al obtener ticker 24hr para {symbol}: {e}", original_exception=e)
 
-    async def get_all_tickers_24hr(self) -> List[Dict[str, Any]]:
+    async def get_all_tickers_24hr(self, priority: RequestPriority = RequestPriority.LOW) -> List[Dict[str, Any]]:
         """
         Obtiene los datos de ticker de 24 horas para todos los símbolos.
         Endpoint: GET /api/v3/ticker/24hr
         """
         endpoint = "/api/v3/ticker/24hr"
         try:
-            response_data = await self._make_request("GET", endpoint, "", "", signed=False)
+            response_data = await self._make_request("GET", endpoint, "", "", signed=False, priority=priority)
             return response_data
         except BinanceAPIError as e:
             raise e
         except Exception as e:
             raise BinanceAPIError(f"Error al obtener todos los tickers 24hr: {e}", original_exception=e)
 
-    async def get_klines(self, symbol: str, interval: str, start_time: Optional[int] = None, end_time: Optional[int] = None, limit: int = 500) -> List[List[Any]]:
+    async def get_tickers_24hr(self, symbols: List[str], priority: RequestPriority = RequestPriority.LOW) -> List[Dict[str, Any]]:
+        """
+        Obtiene los datos de ticker de 24 horas para varios símbolos en una sola solicitud.
+        Endpoint: GET /api/v3/ticker/24hr?symbols=[...]
+        Nota: Binance rechaza la solicitud completa si alguno de los símbolos es inválido.
+        """
+        normalized_symbols = list(dict.fromkeys(self.normalize_symbol(s) for s in symbols))
+        endpoint = "/api/v3/ticker/24hr"
+        params = {"symbols": json.dumps(normalized_symbols, separators=(",", ":"))}
+        try:
+            response_data = await self._make_request("GET", endpoint, "", "", params=params, signed=False, priority=priority)
+            return response_data
+        except BinanceAPIError as e:
+            raise e
+        except Exception as e:
+            raise BinanceAPIError(f"Error al obtener tickers 24hr para {normalized_symbols}: {e}", original_exception=e) from e
+
+    async def get_klines(self, symbol: str, interval: str, start_time: Optional[int] = None, end_time: Optional[int] = None, limit: int = 500, priority: RequestPriority = RequestPriority.LOW) -> List[List[Any]]:
         """
         Obtiene datos históricos de velas (OHLCV) para un símbolo y temporalidad dados.
         Endpoint: GET /api/v3/klines
@@ -204,6 +307,7 @@ class BinanceAdapter:
             start_time (int, optional): Timestamp en milisegundos para el inicio del rango.
             end_time (int, optional): Timestamp en milisegundos para el fin del rango.
             limit (int): Número de velas a retornar (máximo 1000).
+            priority (RequestPriority): Prioridad frente al presupuesto de peso (baja por defecto).
         """
         symbol = self.normalize_symbol(symbol)
         endpoint = "/api/v3/klines"
@@ -218,52 +322,111 @@ class BinanceAdapter:
             params["endTime"] = end_time
 
         try:
-            response_data = await self._make_request("GET", endpoint, "", "", params=params, signed=False)
+            response_data = await self._make_request("GET", endpoint, "", "", params=params, signed=False, priority=priority)
             return response_data
         except BinanceAPIError as e:
             raise e
         except Exception as e:
             raise BinanceAPIError(f"Error al obtener klines para {symbol} con intervalo {interval}: {e}", original_exception=e)
 
-    async def _connect_websocket(self, stream_url: str, callback: Callable):
+    async def get_klines_frame(self, symbol: str, interval: str, start_time: Optional[int] = None, end_time: Optional[int] = None, limit: int = 500, priority: RequestPriority = RequestPriority.LOW) -> OHLCVFrame:
         """
-        Establece una conexión WebSocket y procesa los mensajes entrantes.
+        Igual que get_klines, pero decodifica la respuesta directamente a un OHLCVFrame columnar
+        (int64/float64) en lugar de mantener una lista de filas con los números como cadenas.
         """
+        return OHLCVFrame.from_binance_klines(
+            await self.get_klines(symbol, interval, start_time=start_time, end_time=end_time, limit=limit, priority=priority)
+        )
+
+    async def get_order_book(self, symbol: str, limit: int = 1000, priority: RequestPriority = RequestPriority.NORMAL) -> Dict[str, Any]:
+        """
+        Obtiene una instantánea del libro de órdenes.
+        Endpoint: GET /api/v3/depth
+        Parámetros:
+            symbol (str): El par de trading (ej. "BTCUSDT").
+            limit (int): Niveles por lado (máximo 5000; el peso crece con el límite).
+        """
+        symbol = self.normalize_symbol(symbol)
+        endpoint = "/api/v3/depth"
+        params = {"symbol": symbol, "limit": limit}
         try:
-            async with websockets.connect(stream_url) as ws:
-                print(f"Conectado a WebSocket: {stream_url}")
-                while True:
-                    try:
-                        message = await ws.recv()
-                        data = json.loads(message)
-                        await callback(data)
-                    except websockets.exceptions.ConnectionClosedOK:
-                        print(f"Conexión WebSocket cerrada normalmente para {stream_url}.")
-                        break
-                    except websockets.exceptions.ConnectionClosedError as e:
-                        print(f"Error de conexión WebSocket para {stream_url}: {e}")
-                        break
-                    except json.JSONDecodeError:
-                        print(f"Error al decodificar JSON del mensaje WebSocket: {message}")
-                    except Exception as e:
-                        print(f"Error inesperado al procesar mensaje WebSocket: {e}")
+            response_data = await self._make_request("GET", endpoint, "", "", params=params, signed=False, priority=priority)
+            return response_data
+        except BinanceAPIError as e:
+            raise e
+        except Exception as e:
+            raise BinanceAPIError(f"Error al obtener el libro de órdenes para {symbol}: {e}", original_exception=e) from e
+
+    async def subscribe_to_ticker_stream(self, symbol: str, callback: Callable):
+        """
+        Suscribe a un stream de ticker de 24 horas para un símbolo específico.
+        Stream: <symbol>@ticker, multiplexado sobre las conexiones combinadas del stream manager.
+        """
+        symbol = self.normalize_symbol(symbol)
+        try:
+            # Solo interesa el último ticker: un consumidor lento recibe el más reciente, no un atraso.
+            await self.stream_manager.subscribe(f"{symbol.lower()}@ticker", callback, policy=OverflowPolicy.CONFLATE)
         except Exception as e:
-            print(f"Error al conectar al WebSocket {stream_url}: {e}")
             raise ExternalAPIError(
-                message=f"Error al conectar al WebSocket de Binance: {e}",
+                message=f"Error al suscribirse al stream de ticker de Binance para {symbol}: {e}",
                 service_name="BINANCE_WEBSOCKET",
                 original_exception=e
             )
 
-    async def subscribe_to_ticker_stream(self, symbol: str, callback: Callable):
+    async def unsubscribe_from_ticker_stream(self, symbol: str, callback: Optional[Callable] = None):
         """
-        Suscribe a un stream de ticker de 24 horas para un símbolo específico.
-        Stream: <symbol>@ticker
+        Cancela la suscripción al stream de ticker de un símbolo. Si no se indica callback,
+        se eliminan todos los suscriptores del stream.
+        """
+        symbol = self.normalize_symbol(symbol)
+        await self.stream_manager.unsubscribe(f"{symbol.lower()}@ticker", callback)
+
+    async def subscribe_to_depth_stream(self, symbol: str, callback: Callable, update_speed: str = "100ms"):
         """
+        Suscribe al stream de actualizaciones diferenciales del libro de órdenes.
+        Stream: <symbol>@depth@<update_speed>.
+        """
+        symbol = self.normalize_symbol(symbol)
+        try:
+            # Nunca se bloquea el lector del socket combinado: un consumidor lento del libro
+            # detendría también los tickers. Un diff descartado deja un hueco en los update ids,
+            # que OrderBookService detecta y resuelve resincronizando con una instantánea.
+            await self.stream_manager.subscribe(f"{symbol.lower()}@depth@{update_speed}", callback, policy=OverflowPolicy.DROP_OLDEST)
+        except Exception as e:
+            raise ExternalAPIError(
+                message=f"Error al suscribirse al stream de profundidad de Binance para {symbol}: {e}",
+                service_name="BINANCE_WEBSOCKET",
+                original_exception=e
+            ) from e
+
+    async def unsubscribe_from_depth_stream(self, symbol: str, callback: Optional[Callable] = None, update_speed: str = "100ms"):
+        """Cancela la suscripción al stream de profundidad de un símbolo."""
+        symbol = self.normalize_symbol(symbol)
+        await self.stream_manager.unsubscribe(f"{symbol.lower()}@depth@{update_speed}", callback)
+
+    async def subscribe_to_kline_stream(self, symbol: str, interval: str, callback: Callable):
+        """
+        Suscribe a un stream de velas de un símbolo y temporalidad.
+        Stream: <symbol>@kline_<interval>. Cada evento incluye la vela en formación ("k") con el flag "x" al cerrarse.
+        """
+        symbol = self.normalize_symbol(symbol)
+        try:
+            # Se fusionan las actualizaciones de la misma vela; el evento de cierre de una vela no se pisa con la siguiente.
+            await self.stream_manager.subscribe(
+                f"{symbol.lower()}@kline_{interval}", callback,
+                policy=OverflowPolicy.CONFLATE, conflation_key=_kline_open_time
+            )
+        except Exception as e:
+            raise ExternalAPIError(
+                message=f"Error al suscribirse al stream de velas de Binance para {symbol}-{interval}: {e}",
+                service_name="BINANCE_WEBSOCKET",
+                original_exception=e
+            ) from e
+
+    async def unsubscribe_from_kline_stream(self, symbol: str, interval: str, callback: Optional[Callable] = None):
+        """Cancela la suscripción al stream de velas de un símbolo y temporalidad."""
         symbol = self.normalize_symbol(symbol)
-        stream_url = f"wss://stream.binance.com:9443/ws/{symbol.lower()}@ticker"
-        print(f"Intentando conectar a WebSocket para {symbol} en {stream_url}")
-        asyncio.create_task(self._connect_websocket(stream_url, callback))
+        await self.stream_manager.unsubscribe(f"{symbol.lower()}@kline_{interval}", callback)
 
     async def create_oco_order(self, api_key: str, api_secret: str, symbol: str, side: str, quantity: float, price: float, stopPrice: float, stopLimitPrice: float, stopLimitTimeInForce: str = 'GTC') -> Dict[str, Any]:
         """
@@ -355,6 +518,8 @@ class BinanceAdapter:
     async def close(self):
         """Cierra el cliente HTTP y marca el adaptador como cerrado."""
         if not self._explicitly_closed:
+            await self.stream_manager.close()
+            self._response_cache.clear()
             await self.client.aclose()
             self._explicitly_closed = True
             print("BinanceAdapter: Cliente HTTP cerrado y adaptador marcado como cerrado.")
@@ -0,0 +1,115 @@
+"""
+Decodificación rápida de respuestas REST y frames WebSocket de Binance.
+
+Usa orjson cuando está instalado (incluido en el entorno de FastAPI) y la librería estándar
+en caso contrario. Los decodificadores tipados convierten una sola vez las formas de mensaje
+más frecuentes (ticker 24hr, fila de kline y evento depthUpdate), que Binance envía con los
+números como cadenas, a tuplas con nombre de floats/ints.
+"""
+import json
+from typing import Any, Dict, List, NamedTuple, Sequence, Tuple, Union
+
+try:
+    import orjson
+
+    JSON_BACKEND = "orjson"
+
+    def json_loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+        return orjson.loads(data)
+
+except ImportError:  # pragma: no cover - depende del entorno
+    JSON_BACKEND = "json"
+
+    def json_loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return json.loads(data)
+
+
+class Ticker24hr(NamedTuple):
+    symbol: str
+    last_price: float
+    price_change: float
+    price_change_percent: float
+    high_price: float
+    low_price: float
+    volume: float
+    quote_volume: float
+
+
+class Kline(NamedTuple):
+    open_time: int
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    close_time: int
+    quote_asset_volume: float
+    number_of_trades: int
+    taker_buy_base_asset_volume: float
+    taker_buy_quote_asset_volume: float
+
+
+class DepthUpdate(NamedTuple):
+    symbol: str
+    first_update_id: int
+    final_update_id: int
+    bids: List[Tuple[float, float]]
+    asks: List[Tuple[float, float]]
+
+
+def decode_ticker_24hr(raw: Dict[str, Any]) -> Ticker24hr:
+    """Decodifica un ticker 24hr de REST (/api/v3/ticker/24hr) o del stream <symbol>@ticker."""
+    if "lastPrice" in raw:
+        return Ticker24hr(
+            raw.get("symbol", ""),
+            float(raw.get("lastPrice", 0)),
+            float(raw.get("priceChange", 0)),
+            float(raw.get("priceChangePercent", 0)),
+            float(raw.get("highPrice", 0)),
+            float(raw.get("lowPrice", 0)),
+            float(raw.get("volume", 0)),
+            float(raw.get("quoteVolume", 0)),
+        )
+    return Ticker24hr(
+        raw.get("s", ""),
+        float(raw.get("c", 0)),
+        float(raw.get("p", 0)),
+        float(raw.get("P", 0)),
+        float(raw.get("h", 0)),
+        float(raw.get("l", 0)),
+        float(raw.get("v", 0)),
+        float(raw.get("q", 0)),
+    )
+
+
+def decode_kline(row: Sequence[Any]) -> Kline:
+    """Decodifica una fila de /api/v3/klines."""
+    return Kline(
+        int(row[0]), float(row[1]), float(row[2]), float(row[3]), float(row[4]), float(row[5]),
+        int(row[6]), float(row[7]), int(row[8]), float(row[9]), float(row[10]),
+    )
+
+
+def decode_kline_event(kline: Dict[str, Any]) -> Kline:
+    """Decodifica el objeto "k" de un evento <symbol>@kline_<interval>."""
+    return Kline(
+        int(kline["t"]), float(kline["o"]), float(kline["h"]), float(kline["l"]), float(kline["c"]), float(kline["v"]),
+        int(kline["T"]), float(kline["q"]), int(kline["n"]), float(kline["V"]), float(kline["Q"]),
+    )
+
+
+def decode_price_levels(levels: Sequence[Sequence[Any]]) -> List[Tuple[float, float]]:
+    return [(float(price), float(quantity)) for price, quantity in levels]
+
+
+def decode_depth_update(raw: Dict[str, Any]) -> DepthUpdate:
+    """Decodifica un evento depthUpdate del stream <symbol>@depth."""
+    return DepthUpdate(
+        raw.get("s", ""),
+        int(raw["U"]),
+        int(raw["u"]),
+        decode_price_levels(raw.get("b", ())),
+        decode_price_levels(raw.get("a", ())),
+    )
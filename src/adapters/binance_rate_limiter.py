@@ -0,0 +1,205 @@
+import asyncio
+import json
+import logging
+import time
+from enum import IntEnum
+from typing import Any, Dict, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RequestPriority(IntEnum):
+    """Prioridad de una solicitud REST frente al presupuesto de peso de Binance."""
+    LOW = 0     # Backfill de klines, polling de tickers
+    NORMAL = 1  # Consultas puntuales (precio actual, información de cuenta)
+    HIGH = 2    # Colocación y cancelación de órdenes
+
+
+class BinanceRateLimiter:
+    """
+    Planificador de solicitudes basado en el presupuesto de peso de Binance.
+
+    Lleva la cuenta del peso usado en la ventana de un minuto (reservando el peso de cada
+    solicitud antes de enviarla y corrigiéndolo con las cabeceras X-MBX-USED-WEIGHT-*), así
+    como del número de órdenes (X-MBX-ORDER-COUNT-*). Las solicitudes de prioridad baja y
+    normal se retrasan hasta la siguiente ventana cuando superan su fracción del presupuesto;
+    las órdenes (prioridad alta) siempre pasan primero, salvo que Binance haya impuesto un
+    bloqueo explícito con Retry-After (429/418).
+    """
+    WEIGHT_LIMIT_PER_MINUTE = 6000
+    ORDER_LIMIT_PER_10_SECONDS = 100
+    # Fracción del presupuesto de peso que puede consumir cada prioridad antes de esperar.
+    PRIORITY_BUDGET_FRACTION = {
+        RequestPriority.LOW: 0.7,
+        RequestPriority.NORMAL: 0.9,
+        RequestPriority.HIGH: 1.0,
+    }
+    DEFAULT_RETRY_AFTER_SECONDS = 60
+
+    # Peso fijo por (método, endpoint). Los endpoints con peso variable se resuelven en get_request_weight.
+    ENDPOINT_WEIGHTS: Dict[tuple, int] = {
+        ("GET", "/api/v3/ping"): 1,
+        ("GET", "/api/v3/time"): 1,
+        ("GET", "/api/v3/exchangeInfo"): 20,
+        ("GET", "/api/v3/klines"): 2,
+        ("GET", "/api/v3/account"): 20,
+        ("GET", "/api/v3/openOrderList"): 6,
+        ("GET", "/api/v3/orderList"): 4,
+        ("GET", "/api/v3/order"): 4,
+        ("POST", "/api/v3/order"): 1,
+        ("POST", "/api/v3/order/oco"): 1,
+        ("DELETE", "/api/v3/order"): 1,
+    }
+    ORDER_ENDPOINTS = {"/api/v3/order", "/api/v3/order/oco"}
+
+    def __init__(self, weight_limit_per_minute: Optional[int] = None, order_limit_per_10_seconds: Optional[int] = None):
+        self.weight_limit = weight_limit_per_minute or self.WEIGHT_LIMIT_PER_MINUTE
+        self.order_limit_10s = order_limit_per_10_seconds or self.ORDER_LIMIT_PER_10_SECONDS
+        self._weight_window = self._current_window(60)
+        self._used_weight = 0
+        self._order_window = self._current_window(10)
+        self._order_count_10s = 0
+        self._blocked_until = 0.0
+        self.last_headers: Dict[str, int] = {}
+        # Una fila FIFO por prioridad limitada: al reabrirse la ventana se despierta solo la
+        # cabeza de la fila y el resto pasa por turno contra el presupuesto que quede.
+        self._waiting_lines = {RequestPriority.LOW: asyncio.Lock(), RequestPriority.NORMAL: asyncio.Lock()}
+
+    @staticmethod
+    def _current_window(seconds: int) -> int:
+        return int(time.time() // seconds)
+
+    @staticmethod
+    def _seconds_until_next_window(seconds: int) -> float:
+        return seconds - (time.time() % seconds)
+
+    @property
+    def used_weight(self) -> int:
+        self._roll_windows()
+        return self._used_weight
+
+    @property
+    def order_count_10s(self) -> int:
+        self._roll_windows()
+        return self._order_count_10s
+
+    def _roll_windows(self) -> None:
+        weight_window = self._current_window(60)
+        if weight_window != self._weight_window:
+            self._weight_window = weight_window
+            self._used_weight = 0
+        order_window = self._current_window(10)
+        if order_window != self._order_window:
+            self._order_window = order_window
+            self._order_count_10s = 0
+
+    def is_order_request(self, method: str, endpoint: str) -> bool:
+        return method in ("POST", "DELETE") and endpoint in self.ORDER_ENDPOINTS
+
+    def get_request_weight(self, method: str, endpoint: str, params: Optional[Mapping[str, Any]] = None) -> int:
+        """Devuelve el peso que Binance asigna a la solicitud."""
+        params = params or {}
+        if endpoint == "/api/v3/ticker/24hr":
+            if "symbol" in params:
+                return 2
+            if "symbols" in params:
+                try:
+                    symbol_count = len(json.loads(params["symbols"]))
+                except (TypeError, ValueError):
+                    symbol_count = 100
+                if symbol_count <= 20:
+                    return 2
+                if symbol_count <= 100:
+                    return 40
+            return 80
+        if endpoint == "/api/v3/depth":
+            limit = int(params.get("limit", 100))
+            if limit <= 100:
+                return 5
+            if limit <= 500:
+                return 25
+            if limit <= 1000:
+                return 50
+            return 250
+        return self.ENDPOINT_WEIGHTS.get((method, endpoint), 1)
+
+    async def acquire(self, weight: int, priority: RequestPriority, is_order: bool = False) -> None:
+        """
+        Reserva `weight` unidades del presupuesto, esperando si la prioridad de la solicitud
+        no permite consumirlas en la ventana actual.
+        """
+        waiting_line = self._waiting_lines.get(priority)
+        if waiting_line is None:
+            await self._acquire(weight, priority, is_order)
+            return
+        async with waiting_line:
+            await self._acquire(weight, priority, is_order)
+
+    async def _acquire(self, weight: int, priority: RequestPriority, is_order: bool) -> None:
+        while True:
+            now = time.time()
+            if now < self._blocked_until:
+                wait = self._blocked_until - now
+                logger.warning(f"Binance ha limitado las solicitudes. Esperando {wait:.1f}s antes de continuar.")
+                await asyncio.sleep(wait)
+                continue
+
+            self._roll_windows()
+            if is_order and self._order_count_10s >= self.order_limit_10s:
+                await asyncio.sleep(self._seconds_until_next_window(10))
+                continue
+
+            budget = self.weight_limit * self.PRIORITY_BUDGET_FRACTION[priority]
+            if priority == RequestPriority.HIGH or self._used_weight + weight <= budget:
+                self._used_weight += weight
+                if is_order:
+                    self._order_count_10s += 1
+                return
+
+            wait = self._seconds_until_next_window(60)
+            logger.info(
+                f"Presupuesto de peso de Binance al {self._used_weight}/{self.weight_limit}. "
+                f"Retrasando solicitud de prioridad {priority.name} {wait:.1f}s."
+            )
+            await asyncio.sleep(wait)
+
+    def update_from_headers(self, headers: Any) -> None:
+        """Sincroniza los contadores con las cabeceras X-MBX-USED-WEIGHT-* y X-MBX-ORDER-COUNT-*."""
+        try:
+            items = list(headers.items())
+        except (AttributeError, TypeError):
+            return
+        self._roll_windows()
+        for name, value in items:
+            if not isinstance(name, str):
+                continue
+            key = name.lower()
+            if not (key.startswith("x-mbx-used-weight-") or key.startswith("x-mbx-order-count-")):
+                continue
+            try:
+                count = int(value)
+            except (TypeError, ValueError):
+                continue
+            self.last_headers[key] = count
+            if key == "x-mbx-used-weight-1m":
+                self._used_weight = max(self._used_weight, count)
+            elif key == "x-mbx-order-count-10s":
+                self._order_count_10s = max(self._order_count_10s, count)
+
+    def register_rate_limit_response(self, status_code: int, headers: Any) -> float:
+        """
+        Registra una respuesta 429 (límite superado) o 418 (IP bloqueada) y devuelve los
+        segundos durante los que no deben enviarse más solicitudes.
+        """
+        retry_after: Optional[float] = None
+        try:
+            raw_retry_after = headers.get("Retry-After")
+            if raw_retry_after is not None:
+                retry_after = float(raw_retry_after)
+        except (AttributeError, TypeError, ValueError):
+            retry_after = None
+        if retry_after is None:
+            retry_after = float(self.DEFAULT_RETRY_AFTER_SECONDS)
+        self._blocked_until = max(self._blocked_until, time.time() + retry_after)
+        logger.error(f"Binance respondió {status_code}. Solicitudes bloqueadas durante {retry_after:.0f}s.")
+        return retry_after
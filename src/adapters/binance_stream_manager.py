@@ -0,0 +1,247 @@
+import asyncio
+import itertools
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+import websockets
+
+from adapters.binance_codec import json_loads
+from adapters.market_data_bus import BusSubscription, ConflationKey, MarketDataBus, OverflowPolicy
+
+logger = logging.getLogger(__name__)
+
+StreamCallback = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class _CombinedStreamConnection:
+    """
+    Una conexión WebSocket de streams combinados de Binance (/stream) que transporta
+    varios streams a la vez. Los streams se añaden y eliminan en caliente con mensajes
+    SUBSCRIBE/UNSUBSCRIBE y se vuelven a suscribir automáticamente tras una reconexión.
+    """
+
+    def __init__(self, manager: "BinanceStreamManager", connection_id: int):
+        self._manager = manager
+        self.connection_id = connection_id
+        self.streams: Set[str] = set()
+        self._ws: Optional[Any] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        self._request_ids = itertools.count(1)
+        self._send_lock = asyncio.Lock()
+        self._last_send_at = 0.0
+
+    @property
+    def is_connected(self) -> bool:
+        return self._ws is not None
+
+    def start(self) -> None:
+        """Arranca la tarea lectora de la conexión si aún no está en marcha."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def add_streams(self, streams: List[str]) -> None:
+        new_streams = [s for s in streams if s not in self.streams]
+        if not new_streams:
+            return
+        self.streams.update(new_streams)
+        if self.is_connected:
+            await self._send("SUBSCRIBE", new_streams)
+        else:
+            self.start()
+
+    async def remove_streams(self, streams: List[str]) -> None:
+        removed = [s for s in streams if s in self.streams]
+        if not removed:
+            return
+        self.streams.difference_update(removed)
+        if self.is_connected:
+            await self._send("UNSUBSCRIBE", removed)
+
+    async def _send(self, method: str, params: List[str]) -> None:
+        """
+        Envía un mensaje de control respetando el límite de Binance de mensajes entrantes
+        por segundo y por conexión.
+        """
+        async with self._send_lock:
+            loop = asyncio.get_running_loop()
+            wait = self._manager.CONTROL_MESSAGE_INTERVAL_SECONDS - (loop.time() - self._last_send_at)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            if self._ws is None:
+                return
+            try:
+                await self._ws.send(json.dumps({"method": method, "params": params, "id": next(self._request_ids)}))
+            except websockets.exceptions.ConnectionClosed as e:
+                logger.warning(f"Conexión de streams #{self.connection_id} cerrada al enviar {method}: {e}")
+            self._last_send_at = loop.time()
+
+    async def _run(self) -> None:
+        backoff = self._manager.RECONNECT_DELAY_SECONDS
+        while not self._closed and self.streams:
+            try:
+                async with websockets.connect(self._manager.base_url, ping_interval=20) as ws:
+                    self._ws = ws
+                    backoff = self._manager.RECONNECT_DELAY_SECONDS
+                    logger.info(f"Conexión de streams #{self.connection_id} establecida con {len(self.streams)} streams.")
+                    if self.streams:
+                        await self._send("SUBSCRIBE", sorted(self.streams))
+                    async for message in ws:
+                        await self._handle_message(message)
+            except asyncio.CancelledError:
+                raise
+            except websockets.exceptions.ConnectionClosedOK:
+                logger.info(f"Conexión de streams #{self.connection_id} cerrada normalmente.")
+            except Exception as e:
+                logger.error(f"Error en la conexión de streams #{self.connection_id}: {e}")
+            finally:
+                self._ws = None
+
+            if self._closed or not self.streams:
+                break
+            logger.info(f"Reconectando conexión de streams #{self.connection_id} en {backoff}s...")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, self._manager.MAX_RECONNECT_DELAY_SECONDS)
+
+    async def _handle_message(self, message: Any) -> None:
+        try:
+            payload = json_loads(message)
+        except ValueError:
+            logger.error(f"Error al decodificar JSON del mensaje WebSocket: {message}")
+            return
+
+        if "stream" in payload and "data" in payload:
+            await self._manager._dispatch(payload["stream"], payload["data"])
+        elif payload.get("error"):
+            logger.error(f"Binance rechazó un mensaje de control en la conexión #{self.connection_id}: {payload['error']}")
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._ws is not None:
+            try:
+                await self._ws.close()
+            except Exception as e:
+                logger.debug(f"Error al cerrar la conexión de streams #{self.connection_id}: {e}")
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                logger.error(f"Error al detener la conexión de streams #{self.connection_id}: {e}")
+            self._task = None
+
+
+class BinanceStreamManager:
+    """
+    Gestiona un pool reducido de conexiones de streams combinados de Binance.
+
+    Cada conexión transporta hasta `max_streams_per_connection` streams. Los frames se publican
+    por nombre de stream (ej. "btcusdt@ticker") en un MarketDataBus, donde cada suscriptor
+    consume desde su propia cola acotada; así vigilar cientos de símbolos requiere solo unos
+    pocos sockets y un consumidor lento nunca detiene la lectura del socket.
+    """
+    BASE_URL = "wss://stream.binance.com:9443/stream"
+    MAX_STREAMS_PER_CONNECTION = 200
+    CONTROL_MESSAGE_INTERVAL_SECONDS = 0.25 # Binance admite 5 mensajes entrantes por segundo
+    RECONNECT_DELAY_SECONDS = 1
+    MAX_RECONNECT_DELAY_SECONDS = 30
+
+    def __init__(self, base_url: Optional[str] = None, max_streams_per_connection: Optional[int] = None):
+        self.base_url = base_url or self.BASE_URL
+        self.max_streams_per_connection = max_streams_per_connection or self.MAX_STREAMS_PER_CONNECTION
+        self._connections: List[_CombinedStreamConnection] = []
+        self._stream_connections: Dict[str, _CombinedStreamConnection] = {}
+        self._subscribers: Dict[str, List[BusSubscription]] = {}
+        self.bus = MarketDataBus()
+        self._connection_ids = itertools.count(1)
+        self._lock = asyncio.Lock()
+
+    @property
+    def connection_count(self) -> int:
+        return len(self._connections)
+
+    @property
+    def active_streams(self) -> List[str]:
+        return list(self._subscribers.keys())
+
+    async def subscribe(self, stream: str, callback: StreamCallback,
+                        policy: OverflowPolicy = OverflowPolicy.CONFLATE,
+                        maxsize: int = MarketDataBus.DEFAULT_MAXSIZE,
+                        conflation_key: Optional[ConflationKey] = None) -> None:
+        """
+        Suscribe `callback` al stream indicado, abriendo conexión solo si no hay hueco en el pool.
+        `policy`, `maxsize` y `conflation_key` configuran la cola del suscriptor en el bus.
+        """
+        stream = self._normalize_stream(stream)
+        async with self._lock:
+            subscriptions = self._subscribers.setdefault(stream, [])
+            if not any(s.callback == callback for s in subscriptions):
+                subscriptions.append(self.bus.subscribe(stream, callback, policy=policy, maxsize=maxsize, conflation_key=conflation_key))
+            if stream in self._stream_connections:
+                return
+            connection = self._find_connection_with_capacity()
+            self._stream_connections[stream] = connection
+            await connection.add_streams([stream])
+        logger.info(f"Stream {stream} asignado a la conexión #{connection.connection_id}.")
+
+    async def unsubscribe(self, stream: str, callback: Optional[StreamCallback] = None) -> None:
+        """
+        Elimina `callback` (o todos los suscriptores si es None) del stream. Cuando un stream
+        se queda sin suscriptores se envía UNSUBSCRIBE, y las conexiones vacías se cierran.
+        """
+        stream = self._normalize_stream(stream)
+        async with self._lock:
+            subscriptions = self._subscribers.get(stream)
+            if subscriptions is None:
+                return
+            removed = [s for s in subscriptions if callback is None or s.callback == callback]
+            for subscription in removed:
+                subscriptions.remove(subscription)
+                await self.bus.unsubscribe(subscription)
+            if subscriptions:
+                return
+            del self._subscribers[stream]
+
+            connection = self._stream_connections.pop(stream, None)
+            if connection is None:
+                return
+            await connection.remove_streams([stream])
+            if not connection.streams:
+                self._connections.remove(connection)
+                await connection.close()
+                logger.info(f"Conexión de streams #{connection.connection_id} cerrada por no tener streams.")
+
+    @staticmethod
+    def _normalize_stream(stream: str) -> str:
+        # Binance exige el símbolo en minúsculas, pero el sufijo distingue mayúsculas (kline_1M es mensual, kline_1m por minuto).
+        symbol, separator, suffix = stream.partition("@")
+        return f"{symbol.lower()}{separator}{suffix}"
+
+    def _find_connection_with_capacity(self) -> _CombinedStreamConnection:
+        for connection in self._connections:
+            if len(connection.streams) < self.max_streams_per_connection:
+                return connection
+        connection = _CombinedStreamConnection(self, next(self._connection_ids))
+        self._connections.append(connection)
+        return connection
+
+    async def _dispatch(self, stream: str, data: Dict[str, Any]) -> None:
+        await self.bus.publish(stream, data)
+
+    def get_subscriber_metrics(self) -> List[Dict[str, Any]]:
+        """Retraso, tamaño de cola y descartes de cada suscriptor de streams."""
+        return self.bus.get_metrics()
+
+    async def close(self) -> None:
+        """Cierra todas las conexiones del pool y descarta las suscripciones."""
+        async with self._lock:
+            connections = list(self._connections)
+            self._connections.clear()
+            self._stream_connections.clear()
+            self._subscribers.clear()
+        for connection in connections:
+            await connection.close()
+        await self.bus.close()
@@ -0,0 +1,161 @@
+"""
+Archivo columnar de velas en ficheros Arrow IPC mapeados en memoria.
+
+Cada (símbolo, temporalidad, mes) se guarda en un fichero Arrow IPC sin comprimir:
+
+    <raíz>/BTCUSDT/1min/2024-01.arrow
+
+Al leer, el fichero se abre con `pyarrow.memory_map` y las columnas se exponen como arrays
+NumPy que apuntan directamente al mapa de memoria: no se copian al heap, el sistema operativo
+carga las páginas a medida que se recorren y las libera bajo presión de memoria. Así, escanear
+varios años y símbolos mes a mes (`iter_frames`) avanza al ritmo del disco sin cargar todo el
+conjunto en memoria. Se usa Arrow IPC y no Parquet porque Parquet codifica y comprime las
+columnas y no se puede leer sin decodificarlas en memoria.
+
+Requiere pyarrow; pandas solo es necesario para `iter_dataframes`.
+"""
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Union
+
+import numpy as np
+
+from adapters.market_data_partitions import interval_slug, month_start, months_between, next_month
+from core.domain_models.ohlcv import INT_COLUMNS, KLINE_COLUMNS, OHLCVFrame
+from core.exceptions import MarketDataError
+from core.ports.candle_source import ICandleSource
+
+try:
+    import pyarrow as pa
+
+    ARROW_AVAILABLE = True
+except ImportError:  # pragma: no cover - depende del entorno
+    pa = None
+    ARROW_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FILE_SUFFIX = ".arrow"
+
+
+def _to_ms(moment: datetime) -> int:
+    return int(moment.timestamp() * 1000)
+
+
+def _from_ms(value: int) -> datetime:
+    return datetime.fromtimestamp(value / 1000, tz=timezone.utc)
+
+
+class CandleArchive(ICandleSource):
+    """Lectura y escritura del archivo de velas por (símbolo, temporalidad, mes)."""
+
+    def __init__(self, root: Union[str, Path]):
+        if not ARROW_AVAILABLE:
+            raise MarketDataError("El archivo de velas requiere pyarrow.", code="ARROW_UNAVAILABLE")
+        self.root = Path(root)
+        self._schema = pa.schema([
+            (name, pa.int64() if name in INT_COLUMNS else pa.float64()) for name in KLINE_COLUMNS
+        ])
+
+    def month_path(self, symbol: str, interval: str, month: datetime) -> Path:
+        month = month_start(month)
+        return self.root / symbol / interval_slug(interval) / f"{month:%Y-%m}{ARCHIVE_FILE_SUFFIX}"
+
+    def months(self, symbol: str, interval: str) -> List[datetime]:
+        """Meses archivados de la serie, ordenados."""
+        directory = self.root / symbol / interval_slug(interval)
+        if not directory.is_dir():
+            return []
+        months = []
+        for path in directory.glob(f"*{ARCHIVE_FILE_SUFFIX}"):
+            try:
+                months.append(datetime.strptime(path.stem, "%Y-%m").replace(tzinfo=timezone.utc))
+            except ValueError:
+                continue
+        return sorted(months)
+
+    def write_month(self, symbol: str, interval: str, month: datetime, frame: OHLCVFrame) -> Optional[Path]:
+        """
+        Escribe (sustituyendo el fichero anterior) las velas de `frame` que caen en `month`.
+        El fichero se escribe aparte y se renombra al final, de modo que los lectores nunca ven
+        un fichero a medias. Devuelve la ruta, o None si el mes no tiene velas.
+        """
+        month = month_start(month)
+        frame = frame.between(_to_ms(month), _to_ms(next_month(month)) - 1)
+        if not len(frame):
+            return None
+        path = self.month_path(symbol, interval, month)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_arrays(
+            [pa.array(np.ascontiguousarray(getattr(frame, name))) for name in KLINE_COLUMNS],
+            schema=self._schema
+        )
+        temporary_path = path.with_suffix(f"{ARCHIVE_FILE_SUFFIX}.tmp")
+        with pa.OSFile(str(temporary_path), "wb") as sink:
+            with pa.ipc.new_file(sink, self._schema) as writer:
+                writer.write_table(table)
+        os.replace(temporary_path, path)
+        return path
+
+    def write_frame(self, symbol: str, interval: str, frame: OHLCVFrame) -> List[Path]:
+        """Reparte una serie ordenada por tiempo en sus meses y los escribe con write_month."""
+        if not len(frame):
+            return []
+        months = months_between(_from_ms(int(frame.open_time[0])), _from_ms(int(frame.open_time[-1])))
+        return [path for month in months if (path := self.write_month(symbol, interval, month, frame)) is not None]
+
+    def open_month(self, symbol: str, interval: str, month: datetime) -> Optional[OHLCVFrame]:
+        """
+        Mapea en memoria el fichero del mes y devuelve sus columnas como vistas de solo lectura
+        sobre el mapa, o None si el mes no está archivado.
+        """
+        table = self._open_table(self.month_path(symbol, interval, month))
+        if table is None:
+            return None
+        return OHLCVFrame(**{name: self._column_view(table, name) for name in KLINE_COLUMNS})
+
+    def _open_table(self, path: Path) -> Optional[Any]:
+        if not path.is_file():
+            return None
+        # Los buffers de la tabla referencian el mapa de memoria, que sigue abierto mientras existan vistas.
+        source = pa.memory_map(str(path), "r")
+        return pa.ipc.open_file(source).read_all()
+
+    @staticmethod
+    def _column_view(table: Any, name: str) -> np.ndarray:
+        column = table.column(name)
+        if column.num_chunks == 1:
+            return column.chunk(0).to_numpy(zero_copy_only=True)
+        return column.to_numpy()
+
+    def iter_frames(self, symbol: str, interval: str, start_time: int, end_time: int) -> Iterator[OHLCVFrame]:
+        """
+        Recorre mes a mes las velas con open_time en [start_time, end_time]. Cada elemento es una
+        vista sin copia sobre el fichero del mes; los meses sin archivar se omiten.
+        """
+        for month in months_between(_from_ms(start_time), _from_ms(end_time)):
+            frame = self.open_month(symbol, interval, month)
+            if frame is not None:
+                window = frame.between(start_time, end_time)
+                if len(window):
+                    yield window
+
+    def iter_dataframes(self, symbol: str, interval: str, start_time: int, end_time: int) -> Iterator[Any]:
+        """Igual que iter_frames, pero como DataFrames de pandas construidos sobre las mismas vistas."""
+        import pandas as pd
+
+        for frame in self.iter_frames(symbol, interval, start_time, end_time):
+            yield pd.DataFrame(frame.columns(), copy=False)
+
+    def read(self, symbol: str, interval: str, start_time: int, end_time: int) -> OHLCVFrame:
+        """
+        Velas con open_time en [start_time, end_time] en un único OHLCVFrame. Dentro de un mes
+        es una vista sin copia; si el rango abarca varios meses, las columnas se concatenan.
+        """
+        frames = list(self.iter_frames(symbol, interval, start_time, end_time))
+        return frames[0] if len(frames) == 1 else OHLCVFrame.concat(frames)
+
+    async def get_candles(self, symbol: str, interval: str, start_time: int, end_time: int) -> OHLCVFrame:
+        return self.read(symbol, interval, start_time, end_time)
@@ -0,0 +1,260 @@
+"""
+Configuración del pool de conexiones y métricas de la base de datos.
+
+Los parámetros del pool se leen de variables de entorno (con los mismos valores por defecto en
+todos los despliegues) para poder ajustarlos sin tocar código:
+
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING,
+    DB_STATEMENT_CACHE_SIZE, DB_PGBOUNCER, DB_POOL_WAIT_WARNING_SECONDS
+
+Con DB_PGBOUNCER=true se desactivan las cachés de sentencias preparadas de asyncpg y de
+SQLAlchemy y se usan nombres únicos para las sentencias, ya que un pooler en modo transacción
+puede entregar cada transacción a una conexión de servidor distinta.
+
+`database_metrics` acumula el tiempo de espera al obtener una conexión del pool y la latencia
+de cada método del servicio de persistencia; se expone en GET /metrics/database.
+"""
+import functools
+import inspect
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, TypeVar
+from uuid import uuid4
+
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    return float(value) if value not in (None, "") else default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class DatabasePoolSettings:
+    """Parámetros del pool de conexiones y de la caché de sentencias."""
+    pool_size: int = 10
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+    statement_cache_size: int = 100
+    pgbouncer: bool = False
+    wait_warning_seconds: float = 0.5
+
+    @classmethod
+    def from_env(cls) -> "DatabasePoolSettings":
+        defaults = cls()
+        return cls(
+            pool_size=_env_int("DB_POOL_SIZE", defaults.pool_size),
+            max_overflow=_env_int("DB_MAX_OVERFLOW", defaults.max_overflow),
+            pool_timeout=_env_float("DB_POOL_TIMEOUT", defaults.pool_timeout),
+            pool_recycle=_env_int("DB_POOL_RECYCLE", defaults.pool_recycle),
+            pool_pre_ping=_env_bool("DB_POOL_PRE_PING", defaults.pool_pre_ping),
+            statement_cache_size=_env_int("DB_STATEMENT_CACHE_SIZE", defaults.statement_cache_size),
+            pgbouncer=_env_bool("DB_PGBOUNCER", defaults.pgbouncer),
+            wait_warning_seconds=_env_float("DB_POOL_WAIT_WARNING_SECONDS", defaults.wait_warning_seconds),
+        )
+
+
+class _LatencyStats:
+    __slots__ = ("calls", "errors", "total_seconds", "max_seconds")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def record(self, seconds: float, failed: bool = False) -> None:
+        self.calls += 1
+        self.total_seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+        if failed:
+            self.errors += 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_ms": round(self.total_seconds / self.calls * 1000, 3) if self.calls else 0.0,
+            "max_ms": round(self.max_seconds * 1000, 3),
+            "total_ms": round(self.total_seconds * 1000, 3),
+        }
+
+
+class DatabaseMetrics:
+    """Métricas en memoria del pool de conexiones y de la latencia de las consultas."""
+
+    def __init__(self, wait_warning_seconds: float = DatabasePoolSettings.wait_warning_seconds):
+        self.wait_warning_seconds = wait_warning_seconds
+        self.checkout_wait = _LatencyStats()
+        self.slow_checkouts = 0
+        self.checkout_timeouts = 0
+        self.queries: Dict[str, _LatencyStats] = {}
+        self._pool: Any = None
+
+    def bind_pool(self, pool: Any) -> None:
+        self._pool = pool
+
+    def record_checkout_wait(self, seconds: float, pool: Any, timed_out: bool = False) -> None:
+        self._pool = pool
+        self.checkout_wait.record(seconds, failed=timed_out)
+        if timed_out:
+            self.checkout_timeouts += 1
+            logger.error(f"Tiempo de espera agotado al obtener una conexión del pool tras {seconds:.2f}s ({self._pool_status()}).")
+        elif seconds >= self.wait_warning_seconds:
+            self.slow_checkouts += 1
+            logger.warning(f"Espera de {seconds:.2f}s para obtener una conexión del pool ({self._pool_status()}).")
+
+    def record_query(self, name: str, seconds: float, failed: bool = False) -> None:
+        stats = self.queries.get(name)
+        if stats is None:
+            stats = self.queries[name] = _LatencyStats()
+        stats.record(seconds, failed)
+
+    def _pool_status(self) -> str:
+        return self._pool.status() if self._pool is not None and hasattr(self._pool, "status") else "sin pool"
+
+    def pool_snapshot(self) -> Dict[str, Any]:
+        pool = self._pool
+        if pool is None:
+            return {"class": None}
+        snapshot: Dict[str, Any] = {"class": type(pool).__name__}
+        for name in ("size", "checkedout", "checkedin", "overflow"):
+            method = getattr(pool, name, None)
+            if callable(method):
+                snapshot[name] = method()
+        max_overflow = getattr(pool, "_max_overflow", None)
+        if "size" in snapshot and max_overflow is not None:
+            snapshot["capacity"] = snapshot["size"] + max(max_overflow, 0)
+        return snapshot
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "pool": self.pool_snapshot(),
+            "checkout_wait": {
+                **self.checkout_wait.as_dict(),
+                "slow": self.slow_checkouts,
+                "timeouts": self.checkout_timeouts,
+            },
+            "queries": {name: stats.as_dict() for name, stats in sorted(self.queries.items())},
+        }
+
+    def reset(self) -> None:
+        self.checkout_wait = _LatencyStats()
+        self.slow_checkouts = 0
+        self.checkout_timeouts = 0
+        self.queries = {}
+
+
+database_metrics = DatabaseMetrics()
+
+
+class MeteredAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool que registra cuánto se espera para obtener cada conexión."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except sa_exc.TimeoutError:
+            database_metrics.record_checkout_wait(time.perf_counter() - started, self, timed_out=True)
+            raise
+        database_metrics.record_checkout_wait(time.perf_counter() - started, self)
+        return connection
+
+
+def engine_options(database_url: str, settings: Optional[DatabasePoolSettings] = None) -> Dict[str, Any]:
+    """Argumentos de create_async_engine para `database_url` según la configuración del pool."""
+    settings = settings or DatabasePoolSettings.from_env()
+    database_metrics.wait_warning_seconds = settings.wait_warning_seconds
+    if "sqlite" in database_url:
+        return {"poolclass": NullPool}
+
+    options: Dict[str, Any] = {
+        "poolclass": MeteredAsyncAdaptedQueuePool,
+        "pool_size": settings.pool_size,
+        "max_overflow": settings.max_overflow,
+        "pool_timeout": settings.pool_timeout,
+        "pool_recycle": settings.pool_recycle,
+        "pool_pre_ping": settings.pool_pre_ping,
+    }
+    if "asyncpg" in database_url:
+        if settings.pgbouncer:
+            options["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+            }
+        else:
+            options["connect_args"] = {
+                "statement_cache_size": settings.statement_cache_size,
+                "prepared_statement_cache_size": settings.statement_cache_size,
+            }
+    return options
+
+
+def _timed_coroutine(name: str, method: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(method)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        failed = False
+        try:
+            return await method(*args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            database_metrics.record_query(name, time.perf_counter() - started, failed)
+    return wrapper
+
+
+def _timed_async_generator(name: str, method: Callable[..., Any]) -> Callable[..., Any]:
+    @functools.wraps(method)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        failed = False
+        try:
+            async for item in method(*args, **kwargs):
+                yield item
+        except Exception:
+            failed = True
+            raise
+        finally:
+            database_metrics.record_query(name, time.perf_counter() - started, failed)
+    return wrapper
+
+
+def instrument_persistence_methods(cls: T) -> T:
+    """
+    Decorador de clase: registra en `database_metrics` la latencia de cada método público
+    asíncrono (corutinas y generadores asíncronos), con el nombre del método como clave.
+    """
+    for name, member in list(vars(cls).items()):
+        if name.startswith("_"):
+            continue
+        if inspect.iscoroutinefunction(member):
+            setattr(cls, name, _timed_coroutine(name, member))
+        elif inspect.isasyncgenfunction(member):
+            setattr(cls, name, _timed_async_generator(name, member))
+    return cls
@@ -0,0 +1,207 @@
+import asyncio
+import collections
+import itertools
+import logging
+import time
+from enum import Enum
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MessageCallback = Callable[[Any], Awaitable[None]]
+ConflationKey = Callable[[Any], Hashable]
+
+
+class OverflowPolicy(str, Enum):
+    """Qué hacer cuando la cola de un suscriptor está llena."""
+    CONFLATE = "conflate"        # Conservar solo el último mensaje por clave (p. ej. el último ticker del símbolo)
+    DROP_OLDEST = "drop_oldest"  # Descartar el mensaje más antiguo en cola
+    BLOCK = "block"              # Esperar a que haya hueco (el publicador se detiene)
+
+
+class BusSubscription:
+    """
+    Un suscriptor del bus con su propia cola acotada y su tarea consumidora. El publicador
+    nunca ejecuta el callback: solo encola, de modo que un consumidor lento no retrasa al resto.
+    """
+
+    def __init__(self, subscription_id: int, topic: str, callback: MessageCallback, policy: OverflowPolicy,
+                 maxsize: int, conflation_key: Optional[ConflationKey], name: Optional[str]):
+        self.subscription_id = subscription_id
+        self.topic = topic
+        self.callback = callback
+        self.policy = policy
+        self.maxsize = maxsize
+        self.name = name or getattr(callback, "__qualname__", None) or f"subscriber-{subscription_id}"
+        self._conflation_key = conflation_key
+        # Cola FIFO de (clave, instante de publicación, mensaje). En modo CONFLATE la clave
+        # identifica la entrada que se reemplaza; en el resto de modos es None.
+        self._queue: Deque[Tuple[Optional[Hashable], float, Any]] = collections.deque()
+        self._conflated: Dict[Hashable, Tuple[float, Any]] = {}
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._task: Optional[asyncio.Task] = None
+
+        self.delivered = 0
+        self.dropped = 0
+        self.conflated = 0
+        self.errors = 0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+
+    @property
+    def queue_size(self) -> int:
+        return len(self._queue)
+
+    @property
+    def oldest_pending_age_ms(self) -> float:
+        if not self._queue:
+            return 0.0
+        key, published_at, _ = self._queue[0]
+        if key is not None:
+            published_at = self._conflated[key][0]
+        return (time.monotonic() - published_at) * 1000
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def put(self, message: Any) -> None:
+        now = time.monotonic()
+        if self.policy == OverflowPolicy.CONFLATE:
+            key = self._conflation_key(message) if self._conflation_key is not None else None
+            if key is None:
+                key = self.topic
+            if key in self._conflated:
+                # La entrada conserva su posición en la cola y su instante original para medir el retraso real.
+                published_at, _ = self._conflated[key]
+                self._conflated[key] = (published_at, message)
+                self.conflated += 1
+                return
+            if len(self._queue) >= self.maxsize:
+                old_key, _, _ = self._queue.popleft()
+                self._conflated.pop(old_key, None)
+                self.dropped += 1
+            self._conflated[key] = (now, message)
+            self._queue.append((key, now, None))
+        elif self.policy == OverflowPolicy.DROP_OLDEST:
+            if len(self._queue) >= self.maxsize:
+                self._queue.popleft()
+                self.dropped += 1
+            self._queue.append((None, now, message))
+        else:
+            while len(self._queue) >= self.maxsize:
+                self._not_full.clear()
+                await self._not_full.wait()
+            self._queue.append((None, time.monotonic(), message))
+        self._not_empty.set()
+
+    def _pop(self) -> Tuple[float, Any]:
+        key, published_at, message = self._queue.popleft()
+        if key is not None:
+            published_at, message = self._conflated.pop(key)
+        if len(self._queue) < self.maxsize:
+            self._not_full.set()
+        return published_at, message
+
+    async def _run(self) -> None:
+        while True:
+            if not self._queue:
+                self._not_empty.clear()
+                await self._not_empty.wait()
+                continue
+            published_at, message = self._pop()
+            lag_ms = (time.monotonic() - published_at) * 1000
+            self.last_lag_ms = lag_ms
+            if lag_ms > self.max_lag_ms:
+                self.max_lag_ms = lag_ms
+            try:
+                await self.callback(message)
+                self.delivered += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Error en el suscriptor '{self.name}' del topic {self.topic}: {e}", exc_info=True)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            if self._task is asyncio.current_task():
+                # Baja solicitada desde el propio callback: la cancelación se aplica al volver.
+                self._task = None
+                return
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._queue.clear()
+        self._conflated.clear()
+        self._not_full.set()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "topic": self.topic,
+            "policy": self.policy.value,
+            "queue_size": self.queue_size,
+            "max_queue_size": self.maxsize,
+            "oldest_pending_age_ms": round(self.oldest_pending_age_ms, 3),
+            "last_lag_ms": round(self.last_lag_ms, 3),
+            "max_lag_ms": round(self.max_lag_ms, 3),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "conflated": self.conflated,
+            "errors": self.errors,
+        }
+
+
+class MarketDataBus:
+    """
+    Bus pub/sub en proceso para datos de mercado.
+
+    Cada suscriptor tiene su propia cola acotada y su propia tarea, con una política de
+    desbordamiento configurable (conflación por clave, descarte del más antiguo o bloqueo).
+    Publicar es O(número de suscriptores del topic) y solo bloquea si algún suscriptor del
+    topic usa OverflowPolicy.BLOCK y tiene la cola llena.
+    """
+    DEFAULT_MAXSIZE = 1000
+
+    def __init__(self):
+        self._subscriptions: Dict[str, List[BusSubscription]] = {}
+        self._ids = itertools.count(1)
+
+    def subscribe(self, topic: str, callback: MessageCallback, policy: OverflowPolicy = OverflowPolicy.CONFLATE,
+                  maxsize: int = DEFAULT_MAXSIZE, conflation_key: Optional[ConflationKey] = None,
+                  name: Optional[str] = None) -> BusSubscription:
+        subscription = BusSubscription(next(self._ids), topic, callback, OverflowPolicy(policy), max(1, maxsize), conflation_key, name)
+        self._subscriptions.setdefault(topic, []).append(subscription)
+        subscription.start()
+        return subscription
+
+    async def unsubscribe(self, subscription: BusSubscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.topic)
+        if subscriptions and subscription in subscriptions:
+            subscriptions.remove(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.topic]
+        await subscription.close()
+
+    def has_subscribers(self, topic: str) -> bool:
+        return bool(self._subscriptions.get(topic))
+
+    async def publish(self, topic: str, message: Any) -> None:
+        for subscription in list(self._subscriptions.get(topic, ())):
+            await subscription.put(message)
+
+    def get_metrics(self) -> List[Dict[str, Any]]:
+        """Métricas de retraso y descarte por suscriptor."""
+        return [s.metrics() for subscriptions in self._subscriptions.values() for s in subscriptions]
+
+    async def close(self) -> None:
+        subscriptions = [s for subs in self._subscriptions.values() for s in subs]
+        self._subscriptions.clear()
+        for subscription in subscriptions:
+            await subscription.close()
@@ -0,0 +1,172 @@
+"""
+Particionado de la tabla market_data en PostgreSQL.
+
+En PostgreSQL market_data se crea como tabla particionada por temporalidad (LIST sobre
+"interval") y cada temporalidad se subdivide por meses (RANGE sobre "timestamp"):
+
+    market_data
+      ├─ market_data_1min                  FOR VALUES IN ('1m')
+      │    ├─ market_data_1min_2024_01     FOR VALUES FROM ('2024-01-01') TO ('2024-02-01')
+      │    └─ ...
+      └─ market_data_1h                    FOR VALUES IN ('1h')
+           └─ ...
+
+Las consultas por temporalidad y rango de fechas solo leen las particiones de esos meses, y la
+retención elimina un mes completo de una temporalidad con DETACH + DROP, sin borrar fila a fila
+ni afectar a las velas agregadas de otras temporalidades. Las particiones se crean bajo demanda
+antes de cada escritura; no hay partición DEFAULT para que crear un mes nuevo nunca tenga que
+revisar filas ya guardadas.
+
+En otros motores (SQLite en local) la tabla no se particiona y la retención recurre a DELETE.
+"""
+import logging
+import re
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+logger = logging.getLogger(__name__)
+
+MARKET_DATA_TABLE = "market_data"
+
+_INTERVAL_PATTERN = re.compile(r"^(\d+)([smhdwM])$")
+# Los nombres de tabla (y de fichero en algunos sistemas) no distinguen mayúsculas: "1m" (minuto) y "1M" (mes) necesitan sufijos distintos.
+_UNIT_SUFFIXES = {"s": "s", "m": "min", "h": "h", "d": "d", "w": "w", "M": "mo"}
+
+
+def interval_slug(interval: str) -> str:
+    """Nombre de una temporalidad apto para tablas y ficheros (p. ej. "1m" -> "1min", "1M" -> "1mo")."""
+    match = _INTERVAL_PATTERN.match(interval)
+    if match is None:
+        raise ValueError(f"Temporalidad no válida para market_data: '{interval}'")
+    return f"{match.group(1)}{_UNIT_SUFFIXES[match.group(2)]}"
+
+
+def interval_partition_name(interval: str) -> str:
+    """Nombre de la partición de una temporalidad (p. ej. "1m" -> "market_data_1min")."""
+    return f"{MARKET_DATA_TABLE}_{interval_slug(interval)}"
+
+
+def month_start(moment: datetime) -> datetime:
+    """Primer instante (UTC) del mes de `moment`."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    moment = moment.astimezone(timezone.utc)
+    return datetime(moment.year, moment.month, 1, tzinfo=timezone.utc)
+
+
+def next_month(month: datetime) -> datetime:
+    return datetime(month.year + month.month // 12, month.month % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def months_between(start: datetime, end: datetime) -> List[datetime]:
+    """Meses (como primer instante de cada uno) que se solapan con [start, end]."""
+    months: List[datetime] = []
+    month = month_start(start)
+    while month <= end:
+        months.append(month)
+        month = next_month(month)
+    return months
+
+
+def month_partition_name(interval: str, month: datetime) -> str:
+    """Nombre de la partición mensual (p. ej. "market_data_1min_2024_01")."""
+    return f"{interval_partition_name(interval)}_{month.year:04d}_{month.month:02d}"
+
+
+def _parse_month_suffix(name: str) -> Optional[datetime]:
+    match = re.search(r"_(\d{4})_(\d{2})$", name)
+    if match is None:
+        return None
+    return datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc)
+
+
+class MarketDataPartitionManager:
+    """
+    Crea y elimina particiones de market_data. Recuerda las particiones ya creadas para que
+    asegurar los meses de cada lote no cueste una sentencia DDL por escritura.
+
+    Los métodos reciben la AsyncConnection de la sesión del llamante, de modo que el DDL se
+    ejecuta dentro de su transacción.
+    """
+
+    def __init__(self) -> None:
+        self._partitioned: Optional[bool] = None
+        self._known_partitions: Set[str] = set()
+
+    def reset(self) -> None:
+        """Olvida lo aprendido (p. ej. tras deshacer una transacción que creaba particiones)."""
+        self._partitioned = None
+        self._known_partitions.clear()
+
+    async def is_partitioned(self, connection: AsyncConnection) -> bool:
+        """Indica si market_data es una tabla particionada (solo posible en PostgreSQL)."""
+        if self._partitioned is None:
+            if connection.dialect.name != "postgresql":
+                self._partitioned = False
+            else:
+                result = await connection.execute(text(
+                    "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+                    "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :table)"
+                ), {"table": MARKET_DATA_TABLE})
+                self._partitioned = bool(result.scalar_one())
+        return self._partitioned
+
+    async def ensure_partitions(self, connection: AsyncConnection, interval: str, timestamps: Iterable[datetime]) -> List[str]:
+        """Crea, si faltan, la partición de la temporalidad y las mensuales que cubren `timestamps`."""
+        if not await self.is_partitioned(connection):
+            return []
+        months = {month_start(timestamp) for timestamp in timestamps}
+        created: List[str] = []
+        parent = interval_partition_name(interval)
+        if parent not in self._known_partitions:
+            await connection.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {parent} PARTITION OF {MARKET_DATA_TABLE} "
+                f"FOR VALUES IN ('{interval}') PARTITION BY RANGE (\"timestamp\")"
+            ))
+            self._known_partitions.add(parent)
+            created.append(parent)
+        for month in sorted(months):
+            name = month_partition_name(interval, month)
+            if name in self._known_partitions:
+                continue
+            await connection.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {parent} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month(month).isoformat()}')"
+            ))
+            self._known_partitions.add(name)
+            created.append(name)
+        if created:
+            logger.info(f"Particiones de market_data creadas: {', '.join(created)}")
+        return created
+
+    async def list_month_partitions(self, connection: AsyncConnection, interval: str) -> List[Tuple[datetime, str]]:
+        """Meses con partición de la temporalidad, ordenados, como (primer instante del mes, nombre)."""
+        if not await self.is_partitioned(connection):
+            return []
+        result = await connection.execute(text(
+            "SELECT child.relname FROM pg_inherits i "
+            "JOIN pg_class parent ON parent.oid = i.inhparent "
+            "JOIN pg_class child ON child.oid = i.inhrelid "
+            "WHERE parent.relname = :parent"
+        ), {"parent": interval_partition_name(interval)})
+        partitions = []
+        for (name,) in result.all():
+            month = _parse_month_suffix(name)
+            if month is not None:
+                partitions.append((month, name))
+        return sorted(partitions)
+
+    async def drop_month_partition(self, connection: AsyncConnection, interval: str, month: datetime) -> bool:
+        """Desacopla y elimina la partición de un mes. Devuelve False si no existía."""
+        name = month_partition_name(interval, month_start(month))
+        existing = {partition_name for _, partition_name in await self.list_month_partitions(connection, interval)}
+        if name not in existing:
+            return False
+        await connection.execute(text(f"ALTER TABLE {interval_partition_name(interval)} DETACH PARTITION {name}"))
+        await connection.execute(text(f"DROP TABLE {name}"))
+        self._known_partitions.discard(name)
+        logger.info(f"Partición {name} eliminada.")
+        return True
@@ -1,37 +1,124 @@
 import logging
+from contextlib import asynccontextmanager
 from sqlalchemy.ext.asyncio import AsyncSession, AsyncEngine, async_sessionmaker
-from sqlalchemy.sql import text, select, update, delete
+from sqlalchemy.sql import text, select, update, delete, func, tuple_
 from sqlalchemy.dialects import postgresql
-from typing import Any, Dict, List, Optional, Tuple, Union, cast
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple, Union, cast
 from typing_extensions import LiteralString
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from uuid import UUID, uuid4
 from decimal import Decimal
+from enum import Enum
 import json
-from pydantic import BaseModel
 
 logger = logging.getLogger(__name__)
 
 from shared.data_types import MarketData
 from core.ports.persistence_service import IPersistenceService
-from core.domain_models.trade_models import Trade, PositionStatus, TradeMode
-from core.domain_models.user_configuration_models import UserConfiguration, NotificationPreference, RiskProfile, Theme, AIStrategyConfiguration, MCPServerPreference, DashboardLayoutProfile, CloudSyncPreferences, ConfidenceThresholds
+from adapters.unit_of_work import PersistenceUnitOfWork
+from adapters.database_pool import instrument_persistence_methods
+from adapters.market_data_partitions import MarketDataPartitionManager, month_start, months_between, next_month
+from core.domain_models.trade_models import Trade, TradeOrderDetails, PositionStatus, TradeMode
+from core.domain_models.user_configuration_models import UserConfiguration, NotificationPreference, MCPServerPreference, DashboardLayoutProfile, CloudSyncPreferences
 from core.domain_models.opportunity_models import OpportunityStatus, Opportunity, InitialSignal, AIAnalysis, SourceType
 from core.domain_models.trading_strategy_models import TradingStrategyConfig, BaseStrategyType
 from core.domain_models.orm_models import TradeORM, UserConfigurationORM, PortfolioSnapshotORM, OpportunityORM, StrategyConfigORM, MarketDataORM
 import asyncpg
 
+# (symbol, timestamp, open, high, low, close, volume); la temporalidad se indica por llamada.
+MarketDataRecord = Tuple[str, datetime, float, float, float, float, float]
+MARKET_DATA_COLUMNS = ("symbol", "timestamp", "open", "high", "low", "close", "volume")
+MARKET_DATA_STAGING_TABLE = "market_data_staging"
+DEFAULT_MARKET_DATA_INTERVAL = "1m"
+MARKET_DATA_INSERT_PARAMS = ("id", "symbol", "interval", "timestamp", "open", "high", "low", "close", "volume")
+# Límite de parámetros por sentencia de SQLite (SQLITE_MAX_VARIABLE_NUMBER desde la 3.32).
+MAX_BIND_PARAMETERS = 32766
+
+
+def _as_utc_datetime(value: Union[str, datetime]) -> datetime:
+    # SQLite devuelve como texto los timestamps guardados con consultas text().
+    moment = datetime.fromisoformat(value) if isinstance(value, str) else value
+    return moment if moment.tzinfo is not None else moment.replace(tzinfo=timezone.utc)
+
+# Columnas de UserConfigurationORM con el mismo nombre que el campo de UserConfiguration.
+USER_CONFIGURATION_SCALAR_FIELDS = (
+    "telegram_chat_id", "enable_telegram_notifications", "default_paper_trading_capital", "paper_trading_active",
+    "risk_profile", "selected_theme", "active_dashboard_layout_profile_id",
+)
+USER_CONFIGURATION_DOCUMENT_FIELDS = (
+    "notification_preferences", "paper_trading_assets", "watchlists", "favorite_pairs", "risk_profile_settings",
+    "real_trading_settings", "ai_strategy_configurations", "ai_analysis_confidence_thresholds",
+    "mcp_server_preferences", "dashboard_layout_profiles", "dashboard_layout_config", "cloud_sync_preferences",
+)
+_USER_CONFIGURATION_DEFAULTS: Dict[str, Any] = {
+    "enable_telegram_notifications": False,
+    "default_paper_trading_capital": Decimal("10000.0"),
+    "paper_trading_active": False,
+}
+
+
+def user_configuration_columns(user_config: UserConfiguration, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Valores de columna de UserConfigurationORM para `fields` (por defecto, todos): los
+    subdocumentos como JSON nativo y los enums por su valor.
+    """
+    selected = set(USER_CONFIGURATION_SCALAR_FIELDS + USER_CONFIGURATION_DOCUMENT_FIELDS) if fields is None else set(fields)
+    unknown = selected.difference(USER_CONFIGURATION_SCALAR_FIELDS, USER_CONFIGURATION_DOCUMENT_FIELDS)
+    if unknown:
+        raise ValueError(f"Campos de configuración no persistibles: {', '.join(sorted(unknown))}")
+
+    documents = user_config.model_dump(mode="json", include=selected.intersection(USER_CONFIGURATION_DOCUMENT_FIELDS))
+    columns: Dict[str, Any] = {name: documents.get(name) for name in USER_CONFIGURATION_DOCUMENT_FIELDS if name in selected}
+    for name in USER_CONFIGURATION_SCALAR_FIELDS:
+        if name in selected:
+            value = getattr(user_config, name)
+            if value is None:
+                value = _USER_CONFIGURATION_DEFAULTS.get(name)
+            columns[name] = value.value if isinstance(value, Enum) else value
+    return columns
+
+
+def _order_notional(order: TradeOrderDetails) -> Decimal:
+    if order.cumulativeQuoteQty is not None:
+        return order.cumulativeQuoteQty
+    return order.executedQuantity * order.executedPrice
+
+
+def trade_analytics_columns(trade: Trade) -> Dict[str, Any]:
+    """
+    Valores de las columnas desnormalizadas de TradeORM (PnL, estrategia, oportunidad y nocionales
+    de entrada/salida) derivados del Trade, para que las agregaciones se resuelvan en SQL.
+    """
+    exit_orders = [order for order in trade.exitOrders if order.executedQuantity > 0]
+    return {
+        "pnl_usd": trade.pnl_usd,
+        "pnl_percentage": trade.pnl_percentage,
+        "strategy_id": trade.strategyId,
+        "opportunity_id": trade.opportunityId,
+        "entry_notional": _order_notional(trade.entryOrder),
+        "exit_notional": sum((_order_notional(order) for order in exit_orders), Decimal("0")) if exit_orders else None,
+    }
+
+
+@instrument_persistence_methods
 class SupabasePersistenceService(IPersistenceService):
     """
     A SQLAlchemy-based persistence service.
     Can be initialized with an AsyncSession (for tests) or an AsyncEngine/asyncpg.Pool (for app).
     """
 
-    def __init__(self, session: Optional[AsyncSession] = None, engine: Optional[AsyncEngine] = None, pool: Optional[asyncpg.Pool] = None, session_factory: Optional[async_sessionmaker[AsyncSession]] = None):
+    DEFAULT_BULK_BATCH_SIZE = 5000
+
+    def __init__(self, session: Optional[AsyncSession] = None, engine: Optional[AsyncEngine] = None, pool: Optional[asyncpg.Pool] = None, session_factory: Optional[async_sessionmaker[AsyncSession]] = None,
+                 bulk_batch_size: int = DEFAULT_BULK_BATCH_SIZE):
         self._session = session
+        self._bulk_batch_size = bulk_batch_size
         self._engine = engine
         self._pool = pool
         self._async_session_factory = session_factory
+        self._market_data_partitions = MarketDataPartitionManager()
+        # user_id -> (updated_at, configuración decodificada); ver get_user_configuration.
+        self._user_configuration_cache: Dict[str, Tuple[datetime, UserConfiguration]] = {}
 
         if not (session or engine or pool or session_factory):
             raise ValueError("SupabasePersistenceService must be initialized with either a session, an engine, a pool, or a session_factory.")
@@ -41,17 +128,6 @@ class SupabasePersistenceService(IPersistenceService):
         elif self._session:
             self._async_session_factory = None
 
-    def _pydantic_to_json_string(self, obj: Any) -> Optional[str]:
-        if obj is None:
-            return None
-        if isinstance(obj, BaseModel):
-            return obj.model_dump_json()
-        if isinstance(obj, list) and all(isinstance(item, BaseModel) for item in obj):
-            return json.dumps([item.model_dump() for item in obj])
-        if isinstance(obj, (list, dict)):
-            return json.dumps(obj)
-        return str(obj)
-
     def _get_session(self):
         """Get a session context manager."""
         if self._async_session_factory:
@@ -71,6 +147,28 @@ class SupabasePersistenceService(IPersistenceService):
 
         raise RuntimeError("No async_session_factory or session provided.")
 
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator["SupabasePersistenceService"]:
+        """
+        Servicio ligado a una única sesión: sus escrituras no se confirman una a una, sino todas
+        juntas al salir del bloque (o se deshacen si se produce una excepción).
+        """
+        async with self._get_session() as session:
+            transactional_service = SupabasePersistenceService(session=session, bulk_batch_size=self._bulk_batch_size)
+            transactional_service._market_data_partitions = self._market_data_partitions
+            try:
+                yield transactional_service
+                if self._async_session_factory:
+                    await session.commit()
+            except Exception:
+                if self._async_session_factory:
+                    await session.rollback()
+                raise
+
+    def unit_of_work(self) -> PersistenceUnitOfWork:
+        """Crea una unidad de trabajo que acumula escrituras y las confirma en una transacción."""
+        return PersistenceUnitOfWork(self)
+
     async def initialize(self):
         pass
 
@@ -132,69 +230,297 @@ class SupabasePersistenceService(IPersistenceService):
             if self._async_session_factory:
                 await session.commit()
 
-    async def upsert_all(self, items: List[BaseModel]) -> None:
+    async def upsert_all(self, items: List[Any], batch_size: Optional[int] = None) -> Dict[str, int]:
+        """
+        Inserta o actualiza en bloque. Solo se admiten velas (MarketData / MarketDataORM), que se
+        agrupan por temporalidad y se delegan en bulk_upsert_market_data. Devuelve el número de
+        filas insertadas y actualizadas.
+        """
         if not items:
-            return
+            return {"inserted": 0, "updated": 0}
 
         model_type = type(items[0])
-        
-        MODEL_TO_TABLE_MAP = {
-            MarketData: ("market_data", ["symbol", "timestamp"]),
-            MarketDataORM: ("market_data", ["symbol", "timestamp"]),
-        }
-
-        if model_type not in MODEL_TO_TABLE_MAP:
+        if model_type not in (MarketData, MarketDataORM):
             logger.error(f"Tipo de modelo no soportado para upsert_all: {model_type}")
-            return
+            return {"inserted": 0, "updated": 0}
 
-        table_name, on_conflict = MODEL_TO_TABLE_MAP[model_type]
-
-        data_list = []
+        records_by_interval: Dict[str, List[MarketDataRecord]] = {}
         for item in items:
-            if isinstance(item, BaseModel):
-                item_data = item.model_dump(mode='json')
-            elif isinstance(item, MarketDataORM):
-                # Convertir MarketDataORM a un diccionario manualmente
-                item_data = {
-                    "id": str(item.id) if item.id is not None else str(uuid4()), # Asegurar UUID
-                    "symbol": item.symbol,
-                    "timestamp": item.timestamp.isoformat(),
-                    "open": str(item.open),
-                    "high": str(item.high),
-                    "low": str(item.low),
-                    "close": str(item.close),
-                    "volume": str(item.volume),
-                }
+            interval = getattr(item, "interval", None) or DEFAULT_MARKET_DATA_INTERVAL
+            records_by_interval.setdefault(interval, []).append(
+                (item.symbol, item.timestamp, float(item.open), float(item.high), float(item.low), float(item.close), float(item.volume))
+            )
+        totals = {"inserted": 0, "updated": 0}
+        for interval, records in records_by_interval.items():
+            counts = await self.bulk_upsert_market_data(records, batch_size=batch_size, interval=interval)
+            totals["inserted"] += counts["inserted"]
+            totals["updated"] += counts["updated"]
+        return totals
+
+    async def bulk_upsert_market_data(self, records: Sequence[MarketDataRecord], batch_size: Optional[int] = None,
+                                      interval: str = DEFAULT_MARKET_DATA_INTERVAL) -> Dict[str, int]:
+        """
+        Ingesta masiva de velas de una temporalidad en market_data con semántica de upsert sobre
+        (symbol, interval, timestamp).
+
+        En PostgreSQL se crean antes las particiones de los meses afectados; cada lote se copia con
+        COPY (asyncpg) a una tabla temporal y se fusiona con un único INSERT ... SELECT ... ON CONFLICT.
+        En el resto de motores se usa un INSERT multi-fila con RETURNING por lote. Si una misma
+        vela aparece varias veces gana la última. Todo se confirma en una transacción.
+        """
+        if not records:
+            return {"inserted": 0, "updated": 0}
+        batch_size = max(1, batch_size or self._bulk_batch_size)
+        unique_records = list({(r[0], r[1]): r for r in records}.values())
+
+        inserted = updated = 0
+        async with self._get_session() as session:
+            connection = await session.connection()
+            try:
+                await self._market_data_partitions.ensure_partitions(connection, interval, (r[1] for r in unique_records))
+                if connection.dialect.name == "postgresql":
+                    inserted, updated = await self._copy_merge_market_data(session, connection, unique_records, batch_size, interval)
+                else:
+                    inserted, updated = await self._multirow_upsert_market_data(session, unique_records, batch_size, interval)
+                if self._async_session_factory:
+                    await session.commit()
+            except Exception:
+                # Las particiones creadas en la transacción fallida ya no existen.
+                self._market_data_partitions.reset()
+                raise
+
+        logger.debug(f"bulk_upsert_market_data {interval}: {inserted} insertadas, {updated} actualizadas ({len(unique_records)} filas).")
+        return {"inserted": inserted, "updated": updated}
+
+    async def _copy_merge_market_data(self, session: AsyncSession, connection: Any,
+                                      records: List[MarketDataRecord], batch_size: int, interval: str) -> Tuple[int, int]:
+        # La tabla temporal se crea a través de la sesión para que la transacción ya esté abierta
+        # cuando se usa la conexión asyncpg subyacente; ON COMMIT DROP la hace segura con pgbouncer.
+        await session.execute(text(
+            f"CREATE TEMP TABLE IF NOT EXISTS {MARKET_DATA_STAGING_TABLE} ("
+            "symbol text, timestamp timestamptz, open float8, high float8, low float8, close float8, volume float8"
+            ") ON COMMIT DROP"
+        ))
+        raw_connection = await connection.get_raw_connection()
+        driver_connection = raw_connection.driver_connection
+
+        inserted = updated = 0
+        for offset in range(0, len(records), batch_size):
+            batch = records[offset:offset + batch_size]
+            await driver_connection.copy_records_to_table(
+                MARKET_DATA_STAGING_TABLE, records=batch, columns=list(MARKET_DATA_COLUMNS)
+            )
+            row = await driver_connection.fetchrow(f"""
+                WITH merged AS (
+                    INSERT INTO market_data (id, symbol, "interval", timestamp, open, high, low, close, volume)
+                    SELECT gen_random_uuid(), symbol, $1::varchar, timestamp, open, high, low, close, volume
+                    FROM {MARKET_DATA_STAGING_TABLE}
+                    ON CONFLICT (symbol, "interval", timestamp) DO UPDATE
+                    SET open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low,
+                        close = EXCLUDED.close, volume = EXCLUDED.volume
+                    RETURNING (xmax = 0) AS inserted
+                )
+                SELECT COUNT(*) FILTER (WHERE inserted) AS inserted, COUNT(*) FILTER (WHERE NOT inserted) AS updated
+                FROM merged
+            """, interval)
+            await driver_connection.execute(f"TRUNCATE {MARKET_DATA_STAGING_TABLE}")
+            inserted += row["inserted"]
+            updated += row["updated"]
+        return inserted, updated
+
+    async def _multirow_upsert_market_data(self, session: AsyncSession, records: List[MarketDataRecord],
+                                       batch_size: int, interval: str) -> Tuple[int, int]:
+        # Un INSERT multi-fila por lote. ON CONFLICT DO UPDATE conserva el id de la fila existente,
+        # así que las filas cuyo id devuelto coincide con el generado son las insertadas.
+        rows_per_statement = max(1, min(batch_size, MAX_BIND_PARAMETERS // len(MARKET_DATA_INSERT_PARAMS)))
+        inserted = 0
+        for offset in range(0, len(records), rows_per_statement):
+            batch = records[offset:offset + rows_per_statement]
+            values = ", ".join(
+                "(" + ", ".join(f":{name}_{i}" for name in MARKET_DATA_INSERT_PARAMS) + ")" for i in range(len(batch))
+            )
+            params: Dict[str, Any] = {}
+            new_ids = set()
+            for i, (symbol, timestamp, open_, high, low, close, volume) in enumerate(batch):
+                row_id = str(uuid4())
+                new_ids.add(row_id)
+                params.update({
+                    f"id_{i}": row_id, f"symbol_{i}": symbol, f"interval_{i}": interval, f"timestamp_{i}": timestamp.isoformat(),
+                    f"open_{i}": open_, f"high_{i}": high, f"low_{i}": low, f"close_{i}": close, f"volume_{i}": volume,
+                })
+            result = await session.execute(text(f"""
+                INSERT INTO market_data (id, symbol, "interval", timestamp, open, high, low, close, volume)
+                VALUES {values}
+                ON CONFLICT (symbol, "interval", timestamp) DO UPDATE
+                SET open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low,
+                    close = EXCLUDED.close, volume = EXCLUDED.volume
+                RETURNING id
+            """), params)
+            inserted += sum(1 for row_id in result.scalars() if str(row_id) in new_ids)
+        return inserted, len(records) - inserted
+
+    @staticmethod
+    def _market_data_time_param(connection: Any, moment: datetime) -> Union[str, datetime]:
+        # Fuera de PostgreSQL los timestamps se guardan como texto ISO (ver _multirow_upsert_market_data)
+        # y se comparan con el mismo formato.
+        if connection.dialect.name == "postgresql":
+            return moment
+        return moment.astimezone(timezone.utc).isoformat() if moment.tzinfo else moment.replace(tzinfo=timezone.utc).isoformat()
+
+    async def get_market_data_range(self, symbol: str, interval: str, start: datetime, end: datetime) -> List[MarketDataRecord]:
+        """
+        Velas guardadas de (symbol, interval) con timestamp en [start, end], ordenadas por tiempo.
+        En PostgreSQL el filtro por temporalidad y fechas limita la lectura a las particiones de
+        esos meses.
+        """
+        async with self._get_session() as session:
+            connection = await session.connection()
+            result = await session.execute(text(
+                'SELECT symbol, timestamp, open, high, low, close, volume FROM market_data '
+                'WHERE symbol = :symbol AND "interval" = :interval AND timestamp >= :start AND timestamp <= :end '
+                'ORDER BY timestamp'
+            ), {
+                "symbol": symbol, "interval": interval,
+                "start": self._market_data_time_param(connection, start),
+                "end": self._market_data_time_param(connection, end),
+            })
+            return [
+                (row.symbol, _as_utc_datetime(row.timestamp), float(row.open), float(row.high),
+                 float(row.low), float(row.close), float(row.volume))
+                for row in result.all()
+            ]
+
+    async def get_market_data_months(self, interval: str, before: datetime) -> List[datetime]:
+        """
+        Meses (primer instante de cada uno) anteriores a `before` que pueden tener velas de la
+        temporalidad: las particiones existentes en PostgreSQL o, sin particiones, los meses
+        desde la vela más antigua.
+        """
+        async with self._get_session() as session:
+            connection = await session.connection()
+            if await self._market_data_partitions.is_partitioned(connection):
+                partitions = await self._market_data_partitions.list_month_partitions(connection, interval)
+                return [month for month, _ in partitions if month < before]
+            result = await session.execute(
+                text('SELECT MIN(timestamp) FROM market_data WHERE "interval" = :interval AND timestamp < :before'),
+                {"interval": interval, "before": self._market_data_time_param(connection, before)}
+            )
+            oldest = result.scalar_one_or_none()
+        if oldest is None:
+            return []
+        return [month for month in months_between(_as_utc_datetime(oldest), before) if month < before]
+
+    async def rollup_market_data(self, source_interval: str, target_interval: str, bucket_seconds: int,
+                                 start: datetime, end: datetime) -> int:
+        """
+        Agrega las velas de `source_interval` con timestamp en [start, end) en velas de
+        `target_interval`, alineadas a múltiplos de `bucket_seconds` desde el epoch: apertura de
+        la primera vela, cierre de la última, máximo, mínimo y suma del volumen. Las velas de la
+        temporalidad destino que ya existan (p. ej. descargadas de Binance) no se sobrescriben.
+        Devuelve el número de velas creadas.
+        """
+        async with self._get_session() as session:
+            connection = await session.connection()
+            await self._market_data_partitions.ensure_partitions(
+                connection, target_interval, months_between(start, end - timedelta(microseconds=1))
+            )
+            if connection.dialect.name == "postgresql":
+                result = await session.execute(text("""
+                    INSERT INTO market_data (id, symbol, "interval", timestamp, open, high, low, close, volume)
+                    SELECT gen_random_uuid(), symbol, :target_interval, bucket,
+                           (array_agg(open ORDER BY timestamp))[1], MAX(high), MIN(low),
+                           (array_agg(close ORDER BY timestamp DESC))[1], SUM(volume)
+                    FROM (
+                        SELECT symbol, timestamp, open, high, low, close, volume,
+                               to_timestamp(floor(extract(epoch FROM timestamp) / :bucket_seconds) * :bucket_seconds) AS bucket
+                        FROM market_data
+                        WHERE "interval" = :source_interval AND timestamp >= :start AND timestamp < :end
+                    ) AS candles
+                    GROUP BY symbol, bucket
+                    ON CONFLICT (symbol, "interval", timestamp) DO NOTHING
+                """), {
+                    "source_interval": source_interval, "target_interval": target_interval,
+                    "bucket_seconds": bucket_seconds, "start": start, "end": end,
+                })
+                created = result.rowcount
             else:
-                logger.error(f"Tipo de elemento inesperado en upsert_all: {type(item)}")
-                return
-            
-            logger.debug(f"Preparando para upsert: id={item_data.get('id')}, symbol={item_data.get('symbol')}, timestamp={item_data.get('timestamp')}")
-            data_list.append(item_data)
+                created = await self._rollup_market_data_in_python(
+                    session, connection, source_interval, target_interval, bucket_seconds, start, end
+                )
+            if self._async_session_factory:
+                await session.commit()
+        logger.info(f"rollup_market_data {source_interval}->{target_interval} [{start:%Y-%m-%d}, {end:%Y-%m-%d}): {created} velas creadas.")
+        return created
 
-        if not data_list:
-            return
+    async def _rollup_market_data_in_python(self, session: AsyncSession, connection: Any, source_interval: str,
+                                            target_interval: str, bucket_seconds: int, start: datetime, end: datetime) -> int:
+        result = await session.execute(text(
+            'SELECT symbol, timestamp, open, high, low, close, volume FROM market_data '
+            'WHERE "interval" = :interval AND timestamp >= :start AND timestamp < :end ORDER BY symbol, timestamp'
+        ), {
+            "interval": source_interval,
+            "start": self._market_data_time_param(connection, start),
+            "end": self._market_data_time_param(connection, end),
+        })
+        buckets: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        for row in result.all():
+            epoch = int(_as_utc_datetime(row.timestamp).timestamp())
+            key = (row.symbol, epoch - epoch % bucket_seconds)
+            candle = buckets.get(key)
+            if candle is None:
+                buckets[key] = {"open": float(row.open), "high": float(row.high), "low": float(row.low),
+                                "close": float(row.close), "volume": float(row.volume)}
+            else:
+                candle["high"] = max(candle["high"], float(row.high))
+                candle["low"] = min(candle["low"], float(row.low))
+                candle["close"] = float(row.close)
+                candle["volume"] += float(row.volume)
+        if not buckets:
+            return 0
 
-        first_item = data_list[0]
-        columns = ", ".join(f'"{key}"' for key in first_item.keys())
-        
-        conflict_columns = ", ".join(f'"{key}"' for key in on_conflict)
-        update_placeholders = ", ".join(f'"{col}" = EXCLUDED."{col}"' for col in first_item.keys() if col not in on_conflict)
-        
-        placeholders = ", ".join(f":{key}" for key in first_item.keys())
+        count_query = text('SELECT COUNT(*) FROM market_data WHERE "interval" = :interval AND timestamp >= :start AND timestamp < :end')
+        count_params = {"interval": target_interval, "start": self._market_data_time_param(connection, start),
+                        "end": self._market_data_time_param(connection, end)}
+        before = (await session.execute(count_query, count_params)).scalar_one()
+        await session.execute(text("""
+            INSERT INTO market_data (id, symbol, "interval", timestamp, open, high, low, close, volume)
+            VALUES (:id, :symbol, :interval, :timestamp, :open, :high, :low, :close, :volume)
+            ON CONFLICT (symbol, "interval", timestamp) DO NOTHING
+        """), [
+            {
+                "id": str(uuid4()), "symbol": symbol, "interval": target_interval,
+                "timestamp": datetime.fromtimestamp(bucket, tz=timezone.utc).isoformat(), **candle,
+            }
+            for (symbol, bucket), candle in buckets.items()
+        ])
+        after = (await session.execute(count_query, count_params)).scalar_one()
+        return after - before
 
-        query = f"""
-            INSERT INTO {table_name} ({columns})
-            VALUES ({placeholders})
-            ON CONFLICT ({conflict_columns}) DO UPDATE
-            SET {update_placeholders};
+    async def drop_market_data_month(self, interval: str, month: datetime) -> bool:
         """
-        
-        logger.debug(f"Ejecutando upsert_all para tabla: {table_name} con {len(data_list)} elementos. Query: {query}")
+        Elimina las velas de una temporalidad en un mes completo. Con la tabla particionada se
+        desacopla y elimina la partición del mes (coste constante); si no, se borran las filas.
+        Devuelve True si se eliminó una partición.
+        """
+        month = month_start(month)
         async with self._get_session() as session:
-            await session.execute(text(query), data_list)
+            connection = await session.connection()
+            if await self._market_data_partitions.is_partitioned(connection):
+                dropped = await self._market_data_partitions.drop_month_partition(connection, interval, month)
+            else:
+                result = await session.execute(
+                    text('DELETE FROM market_data WHERE "interval" = :interval AND timestamp >= :start AND timestamp < :end'),
+                    {
+                        "interval": interval,
+                        "start": self._market_data_time_param(connection, month),
+                        "end": self._market_data_time_param(connection, next_month(month)),
+                    }
+                )
+                dropped = False
+                logger.info(f"Eliminadas {result.rowcount} velas {interval} de {month:%Y-%m}.")
             if self._async_session_factory:
                 await session.commit()
+        return dropped
 
     async def get_all(self, table_name: str, condition: Optional[str] = None, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         query = f"SELECT * FROM {table_name}"
@@ -219,69 +545,40 @@ class SupabasePersistenceService(IPersistenceService):
             await session.commit()
 
     async def get_user_configuration(self, user_id: str) -> Optional[UserConfiguration]:
+        """
+        Configuración del usuario. La versión decodificada se guarda en memoria junto con su
+        updated_at: mientras la fila no cambie, solo se consulta updated_at y se devuelve una
+        copia de la configuración sin volver a leer ni validar los subdocumentos.
+        """
+        user_id = str(user_id)
+        cached = self._user_configuration_cache.get(user_id)
         async with self._get_session() as session:
+            if cached is not None:
+                result = await session.execute(
+                    select(UserConfigurationORM.updated_at).where(UserConfigurationORM.user_id == user_id)
+                )
+                version = result.scalar_one_or_none()
+                if version is not None and _as_utc_datetime(version) == _as_utc_datetime(cached[0]):
+                    # Copia: quien la reciba puede modificarla sin alterar la entrada de la caché.
+                    return cached[1].model_copy(deep=True)
             result = await session.execute(
                 select(UserConfigurationORM).where(UserConfigurationORM.user_id == user_id)
             )
             user_config_orm = result.scalars().first()
-            if user_config_orm:
-                notification_preferences_obj = json.loads(cast(str, user_config_orm.notification_preferences)) if user_config_orm.notification_preferences is not None else None
-                paper_trading_assets_obj = json.loads(cast(str, user_config_orm.paper_trading_assets)) if user_config_orm.paper_trading_assets is not None else None
-                watchlists_obj = json.loads(cast(str, user_config_orm.watchlists)) if user_config_orm.watchlists is not None else None
-                favorite_pairs_obj = json.loads(cast(str, user_config_orm.favorite_pairs)) if user_config_orm.favorite_pairs is not None else None
-                risk_profile_obj = RiskProfile(user_config_orm.risk_profile) if user_config_orm.risk_profile is not None else None
-                risk_profile_settings_obj = json.loads(cast(str, user_config_orm.risk_profile_settings)) if user_config_orm.risk_profile_settings is not None else None
-                real_trading_settings_obj = json.loads(cast(str, user_config_orm.real_trading_settings)) if user_config_orm.real_trading_settings is not None else None
-                # Deserializar ai_strategy_configurations como lista de AIStrategyConfiguration objects
-                ai_strategy_configurations_obj = None
-                if user_config_orm.ai_strategy_configurations is not None:
-                    ai_strategy_configs_json = json.loads(cast(str, user_config_orm.ai_strategy_configurations))
-                    if ai_strategy_configs_json:
-                        ai_strategy_configurations_obj = [AIStrategyConfiguration.model_validate(config) for config in ai_strategy_configs_json]
-                
-                # Deserializar ai_analysis_confidence_thresholds como ConfidenceThresholds object
-                ai_analysis_confidence_thresholds_obj = None
-                if user_config_orm.ai_analysis_confidence_thresholds is not None:
-                    confidence_thresholds_json = json.loads(cast(str, user_config_orm.ai_analysis_confidence_thresholds))
-                    if confidence_thresholds_json:
-                        ai_analysis_confidence_thresholds_obj = ConfidenceThresholds.model_validate(confidence_thresholds_json)
-                mcp_server_preferences_obj = json.loads(cast(str, user_config_orm.mcp_server_preferences)) if user_config_orm.mcp_server_preferences is not None else None
-                dashboard_layout_profiles_obj = json.loads(cast(str, user_config_orm.dashboard_layout_profiles)) if user_config_orm.dashboard_layout_profiles is not None else None
-                dashboard_layout_config_obj = json.loads(cast(str, user_config_orm.dashboard_layout_config)) if user_config_orm.dashboard_layout_config is not None else None
-                cloud_sync_preferences_obj = json.loads(cast(str, user_config_orm.cloud_sync_preferences)) if user_config_orm.cloud_sync_preferences is not None else None
-
-                full_user_config_data = {
-                    "id": user_config_orm.id,
-                    "user_id": user_config_orm.user_id,
-                    "telegram_chat_id": user_config_orm.telegram_chat_id,
-                    "notification_preferences": notification_preferences_obj,
-                    "enable_telegram_notifications": user_config_orm.enable_telegram_notifications,
-                    "default_paper_trading_capital": user_config_orm.default_paper_trading_capital,
-                    "paper_trading_active": user_config_orm.paper_trading_active,
-                    "paper_trading_assets": paper_trading_assets_obj,
-                    "watchlists": watchlists_obj,
-                    "favorite_pairs": favorite_pairs_obj,
-                    "risk_profile": risk_profile_obj,
-                    "risk_profile_settings": risk_profile_settings_obj,
-                    "real_trading_settings": real_trading_settings_obj,
-                    "ai_strategy_configurations": ai_strategy_configurations_obj,
-                    "ai_analysis_confidence_thresholds": ai_analysis_confidence_thresholds_obj,
-                    "mcp_server_preferences": mcp_server_preferences_obj,
-                    "selected_theme": user_config_orm.selected_theme,
-                    "dashboard_layout_profiles": dashboard_layout_profiles_obj,
-                    "active_dashboard_layout_profile_id": user_config_orm.active_dashboard_layout_profile_id,
-                    "dashboard_layout_config": dashboard_layout_config_obj,
-                    "cloud_sync_preferences": cloud_sync_preferences_obj,
-                    "created_at": user_config_orm.created_at,
-                    "updated_at": user_config_orm.updated_at
-                }
-                return UserConfiguration.model_validate(full_user_config_data)
-            return None
+            if user_config_orm is None:
+                self._user_configuration_cache.pop(user_id, None)
+                return None
+            user_config = UserConfiguration.model_validate({
+                name: getattr(user_config_orm, name)
+                for name in ("id", "user_id", *USER_CONFIGURATION_SCALAR_FIELDS, *USER_CONFIGURATION_DOCUMENT_FIELDS, "created_at", "updated_at")
+            })
+        self._user_configuration_cache[user_id] = (user_config_orm.updated_at, user_config)
+        return user_config.model_copy(deep=True)
 
     async def upsert_trade(self, trade: Trade) -> None:
         async with self._get_session() as session:
             trade_orm = TradeORM(
-                id=trade.id,
+                id=str(trade.id),
                 user_id=trade.user_id,
                 data=trade.model_dump_json(),
                 position_status=trade.positionStatus,
@@ -290,9 +587,10 @@ class SupabasePersistenceService(IPersistenceService):
                 side=trade.side.value,
                 created_at=trade.created_at,
                 updated_at=trade.updated_at,
-                closed_at=trade.closed_at
+                closed_at=trade.closed_at,
+                **trade_analytics_columns(trade)
             )
-            session.add(trade_orm)
+            trade_orm = await session.merge(trade_orm)
             if self._async_session_factory:
                 await session.commit()
                 await session.refresh(trade_orm)
@@ -305,78 +603,50 @@ class SupabasePersistenceService(IPersistenceService):
             records = result.fetchall()
             return [dict(record._mapping) for record in records]
 
-    async def upsert_user_configuration(self, user_config: UserConfiguration) -> None:
+    async def upsert_user_configuration(self, user_config: UserConfiguration, fields: Optional[Iterable[str]] = None) -> None:
+        """
+        Guarda la configuración del usuario. Con `fields` solo se escriben esas columnas (p. ej.
+        el subdocumento real_trading_settings); si la fila aún no existe se guarda completa.
+        """
+        now = datetime.now(timezone.utc)
         async with self._get_session() as session:
-            result = await session.execute(
-                select(UserConfigurationORM).where(UserConfigurationORM.user_id == user_config.user_id)
-            )
-            existing_config = result.scalars().first()
-
-            if existing_config:
-                existing_config.telegram_chat_id = user_config.telegram_chat_id
-                existing_config.notification_preferences = self._pydantic_to_json_string(user_config.notification_preferences)
-                existing_config.enable_telegram_notifications = user_config.enable_telegram_notifications if user_config.enable_telegram_notifications is not None else False
-                existing_config.default_paper_trading_capital = user_config.default_paper_trading_capital if user_config.default_paper_trading_capital is not None else Decimal("10000.0")
-                existing_config.paper_trading_active = user_config.paper_trading_active if user_config.paper_trading_active is not None else False
-                existing_config.paper_trading_assets = self._pydantic_to_json_string(user_config.paper_trading_assets)
-                existing_config.watchlists = self._pydantic_to_json_string(user_config.watchlists)
-                existing_config.favorite_pairs = self._pydantic_to_json_string(user_config.favorite_pairs)
-                
-                if user_config.risk_profile:
-                    existing_config.risk_profile = user_config.risk_profile.value if isinstance(user_config.risk_profile, RiskProfile) else user_config.risk_profile
-                else:
-                    existing_config.risk_profile = None
-
-                existing_config.risk_profile_settings = self._pydantic_to_json_string(user_config.risk_profile_settings)
-                existing_config.real_trading_settings = self._pydantic_to_json_string(user_config.real_trading_settings)
-                existing_config.ai_strategy_configurations = self._pydantic_to_json_string(user_config.ai_strategy_configurations)
-                existing_config.ai_analysis_confidence_thresholds = self._pydantic_to_json_string(user_config.ai_analysis_confidence_thresholds)
-                existing_config.mcp_server_preferences = self._pydantic_to_json_string(user_config.mcp_server_preferences)
+            written = False
+            if fields is not None:
+                result = await session.execute(
+                    update(UserConfigurationORM)
+                    .where(UserConfigurationORM.user_id == user_config.user_id)
+                    .values(**user_configuration_columns(user_config, fields), updated_at=now)
+                )
+                written = result.rowcount > 0
 
-                if user_config.selected_theme:
-                    existing_config.selected_theme = user_config.selected_theme.value if isinstance(user_config.selected_theme, Theme) else user_config.selected_theme
+            if not written:
+                columns = user_configuration_columns(user_config)
+                result = await session.execute(
+                    select(UserConfigurationORM).where(UserConfigurationORM.user_id == user_config.user_id)
+                )
+                existing_config = result.scalars().first()
+                if existing_config:
+                    for name, value in columns.items():
+                        setattr(existing_config, name, value)
+                    existing_config.updated_at = now
                 else:
-                    existing_config.selected_theme = None
+                    session.add(UserConfigurationORM(
+                        id=user_config.id if user_config.id is not None else str(uuid4()),
+                        user_id=user_config.user_id,
+                        created_at=now,
+                        updated_at=now,
+                        **columns
+                    ))
 
-                existing_config.dashboard_layout_profiles = self._pydantic_to_json_string(user_config.dashboard_layout_profiles)
-                existing_config.active_dashboard_layout_profile_id = user_config.active_dashboard_layout_profile_id
-                existing_config.dashboard_layout_config = self._pydantic_to_json_string(user_config.dashboard_layout_config)
-                existing_config.cloud_sync_preferences = self._pydantic_to_json_string(user_config.cloud_sync_preferences)
-                existing_config.updated_at = datetime.now(timezone.utc)
-            else:
-                new_config_orm = UserConfigurationORM(
-                    id=user_config.id if user_config.id is not None else uuid4(),
-                    user_id=user_config.user_id,
-                    telegram_chat_id=user_config.telegram_chat_id,
-                    notification_preferences=self._pydantic_to_json_string(user_config.notification_preferences),
-                    enable_telegram_notifications=user_config.enable_telegram_notifications,
-                    default_paper_trading_capital=user_config.default_paper_trading_capital,
-                    paper_trading_active=user_config.paper_trading_active,
-                    paper_trading_assets=self._pydantic_to_json_string(user_config.paper_trading_assets),
-                    watchlists=self._pydantic_to_json_string(user_config.watchlists),
-                    favorite_pairs=self._pydantic_to_json_string(user_config.favorite_pairs),
-                    
-                    risk_profile=user_config.risk_profile.value if isinstance(user_config.risk_profile, RiskProfile) else user_config.risk_profile,
-                    
-                    risk_profile_settings=self._pydantic_to_json_string(user_config.risk_profile_settings),
-                    real_trading_settings=self._pydantic_to_json_string(user_config.real_trading_settings),
-                    ai_strategy_configurations=self._pydantic_to_json_string(user_config.ai_strategy_configurations),
-                    ai_analysis_confidence_thresholds=self._pydantic_to_json_string(user_config.ai_analysis_confidence_thresholds),
-                    mcp_server_preferences=self._pydantic_to_json_string(user_config.mcp_server_preferences),
-
-                    selected_theme=user_config.selected_theme.value if isinstance(user_config.selected_theme, Theme) else user_config.selected_theme,
-
-                    dashboard_layout_profiles=self._pydantic_to_json_string(user_config.dashboard_layout_profiles),
-                    active_dashboard_layout_profile_id=user_config.active_dashboard_layout_profile_id,
-                    dashboard_layout_config=self._pydantic_to_json_string(user_config.dashboard_layout_config),
-                    cloud_sync_preferences=self._pydantic_to_json_string(user_config.cloud_sync_preferences),
-                    created_at=datetime.now(timezone.utc),
-                    updated_at=datetime.now(timezone.utc)
-                )
-                session.add(new_config_orm)
-            
             if self._async_session_factory:
                 await session.commit()
+                cache_key = str(user_config.user_id)
+                if fields is not None and written:
+                    # Solo se escribieron algunas columnas: el resto de `user_config` puede no
+                    # coincidir con la fila, así que la próxima lectura la vuelve a decodificar.
+                    self._user_configuration_cache.pop(cache_key, None)
+                else:
+                    self._user_configuration_cache[cache_key] = (now, user_config.model_copy(deep=True))
 
     async def upsert_strategy_config(self, strategy_config: TradingStrategyConfig) -> None:
         async with self._get_session() as session:
@@ -563,6 +833,200 @@ class SupabasePersistenceService(IPersistenceService):
             logger.debug(f"get_closed_trades - Trades recuperados: {len(trades)}")
             return trades
 
+    @staticmethod
+    def _closed_trade_conditions(user_id: str, mode: Optional[str], symbol: Optional[str],
+                                 start_date: Optional[datetime], end_date: Optional[datetime], date_column: Any) -> List[Any]:
+        conditions = [TradeORM.user_id == user_id, TradeORM.position_status == PositionStatus.CLOSED.value]
+        if mode:
+            conditions.append(TradeORM.mode == mode)
+        if symbol:
+            conditions.append(TradeORM.symbol == symbol)
+        if start_date:
+            conditions.append(date_column >= start_date)
+        if end_date:
+            conditions.append(date_column <= end_date)
+        return conditions
+
+    async def get_trade_performance_summary(
+        self,
+        user_id: str,
+        mode: Optional[str] = None,
+        symbol: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        date_field: str = "closed_at",
+    ) -> Dict[str, Any]:
+        """
+        Agrega en la base de datos los trades cerrados sobre las columnas desnormalizadas, sin
+        cargar ni validar los trades en Python. El rango de fechas se aplica a `date_field`.
+        """
+        date_column = TradeORM.created_at if date_field == "created_at" else TradeORM.closed_at
+        conditions = self._closed_trade_conditions(user_id, mode, symbol, start_date, end_date, date_column)
+        summary_query = select(
+            func.count().label("total_trades"),
+            func.count().filter(TradeORM.pnl_usd > 0).label("winning_trades"),
+            func.count().filter(TradeORM.pnl_usd < 0).label("losing_trades"),
+            func.coalesce(func.sum(TradeORM.pnl_usd), 0).label("total_pnl"),
+            func.max(TradeORM.pnl_usd).label("best_trade_pnl"),
+            func.min(TradeORM.pnl_usd).label("worst_trade_pnl"),
+            func.coalesce(func.sum(TradeORM.entry_notional), 0).label("entry_volume"),
+            func.coalesce(func.sum(TradeORM.exit_notional), 0).label("exit_volume"),
+            func.min(TradeORM.created_at).label("first_created_at"),
+            func.max(TradeORM.closed_at).label("last_closed_at"),
+        ).where(*conditions)
+
+        async with self._get_session() as session:
+            summary = dict((await session.execute(summary_query)).one()._mapping)
+            summary["best_trade_symbol"] = None
+            summary["worst_trade_symbol"] = None
+            if summary["best_trade_pnl"] is not None:
+                with_pnl = select(TradeORM.symbol).where(*conditions, TradeORM.pnl_usd.is_not(None)).limit(1)
+                summary["best_trade_symbol"] = (await session.execute(with_pnl.order_by(TradeORM.pnl_usd.desc()))).scalar()
+                summary["worst_trade_symbol"] = (await session.execute(with_pnl.order_by(TradeORM.pnl_usd.asc()))).scalar()
+        return summary
+
+    async def get_strategy_performance_summary(self, user_id: str, mode: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Agrega en la base de datos los trades cerrados por (strategy_id, mode)."""
+        conditions = self._closed_trade_conditions(user_id, mode, None, None, None, TradeORM.closed_at)
+        query = (
+            select(
+                TradeORM.strategy_id,
+                TradeORM.mode,
+                func.count().label("total_operations"),
+                func.count().filter(TradeORM.pnl_usd > 0).label("winning_operations"),
+                func.coalesce(func.sum(TradeORM.pnl_usd), 0).label("total_pnl"),
+            )
+            .where(*conditions, TradeORM.strategy_id.is_not(None))
+            .group_by(TradeORM.strategy_id, TradeORM.mode)
+        )
+        async with self._get_session() as session:
+            result = await session.execute(query)
+            return [dict(row._mapping) for row in result]
+
+    @staticmethod
+    def _trade_filter_conditions(user_id: str, trading_mode: Optional[str], status: Optional[str], symbol: Optional[str],
+                                 start_date: Optional[datetime], end_date: Optional[datetime]) -> List[Any]:
+        conditions = [TradeORM.user_id == user_id]
+        if trading_mode and trading_mode != "both":
+            conditions.append(TradeORM.mode == trading_mode)
+        if status:
+            conditions.append(TradeORM.position_status == status)
+        if symbol:
+            conditions.append(TradeORM.symbol == symbol)
+        if start_date:
+            conditions.append(TradeORM.created_at >= start_date)
+        if end_date:
+            conditions.append(TradeORM.created_at <= end_date)
+        return conditions
+
+    @staticmethod
+    def _trade_row_to_dict(row: Any) -> Dict[str, Any]:
+        """Combina el JSON residual de `data` con las columnas de la fila de trades."""
+        trade_data = json.loads(row.data)
+        trade_data.update({
+            "id": str(row.id),
+            "user_id": str(row.user_id),
+            "positionStatus": row.position_status,
+            "mode": row.mode,
+            "symbol": row.symbol,
+            "created_at": row.created_at,
+            "updated_at": row.updated_at,
+            "closed_at": row.closed_at,
+        })
+        return trade_data
+
+    def _trade_rows_query(self, conditions: List[Any]) -> Any:
+        return (
+            select(
+                TradeORM.id, TradeORM.user_id, TradeORM.mode, TradeORM.symbol, TradeORM.position_status,
+                TradeORM.created_at, TradeORM.updated_at, TradeORM.closed_at, TradeORM.data
+            )
+            .where(*conditions)
+            .order_by(TradeORM.created_at.desc(), TradeORM.id.desc())
+        )
+
+    async def count_trades(
+        self,
+        user_id: str,
+        trading_mode: Optional[str] = None,
+        status: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> Dict[str, int]:
+        """
+        Cuenta los trades del usuario agrupados por modo en una sola consulta. Los filtros coinciden
+        con las columnas de ix_trades_user_mode_status_created_at, por lo que el COUNT se resuelve
+        solo con el índice. Devuelve {modo: número de trades}; los modos sin trades no aparecen.
+        """
+        conditions = self._trade_filter_conditions(user_id, trading_mode, status, None, start_date, end_date)
+        query = (
+            select(TradeORM.mode, func.count().label("count"))
+            .where(*conditions)
+            .group_by(TradeORM.mode)
+        )
+        async with self._get_session() as session:
+            rows = (await session.execute(query)).all()
+        return {row.mode: row.count for row in rows}
+
+    async def get_trades_page(
+        self,
+        user_id: str,
+        trading_mode: Optional[str] = None,
+        status: Optional[str] = None,
+        symbol: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        limit: int = 100,
+        cursor: Optional[Tuple[datetime, str]] = None,
+    ) -> Tuple[List[Trade], Optional[Tuple[datetime, str]]]:
+        """
+        Página de trades ordenada por (created_at, id) descendente con paginación por clave:
+        `cursor` es el (created_at, id) del último trade de la página anterior, de modo que cada
+        página cuesta lo mismo sin importar su profundidad. Devuelve los trades y el cursor de la
+        página siguiente, o None si no hay más.
+        """
+        conditions = self._trade_filter_conditions(user_id, trading_mode, status, symbol, start_date, end_date)
+        if cursor is not None:
+            conditions.append(tuple_(TradeORM.created_at, TradeORM.id) < tuple_(cursor[0], cursor[1]))
+        query = self._trade_rows_query(conditions).limit(limit + 1)
+
+        async with self._get_session() as session:
+            rows = (await session.execute(query)).all()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        trades = []
+        for row in rows:
+            try:
+                trades.append(Trade.model_validate(self._trade_row_to_dict(row)))
+            except Exception as e:
+                logger.error(f"Error procesando trade {row.id} desde la BD: {e}")
+        next_cursor = (rows[-1].created_at, str(rows[-1].id)) if has_more else None
+        return trades, next_cursor
+
+    async def stream_trade_rows(
+        self,
+        user_id: str,
+        trading_mode: Optional[str] = None,
+        status: Optional[str] = None,
+        symbol: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        batch_size: int = 500,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Recorre los trades con un cursor del lado del servidor, leyendo `batch_size` filas cada vez,
+        y produce cada trade como diccionario decodificado sin validarlo como modelo. La memoria
+        usada no depende del número de trades.
+        """
+        conditions = self._trade_filter_conditions(user_id, trading_mode, status, symbol, start_date, end_date)
+        query = self._trade_rows_query(conditions).execution_options(yield_per=batch_size)
+        async with self._get_session() as session:
+            result = await session.stream(query)
+            async for partition in result.partitions():
+                for row in partition:
+                    yield self._trade_row_to_dict(row)
+
     async def get_trades_with_filters(
         self,
         user_id: str,
@@ -1,6 +1,6 @@
 import logging
 import os
-from typing import Optional # Importar Optional
+from typing import Awaitable, Callable, Optional # Importar Optional
 import redis.asyncio as redis
 
 logger = logging.getLogger(__name__)
@@ -69,3 +69,50 @@ class RedisCache:
             await self._redis_client.delete(key)
         except Exception as e:
             logger.error(f"Failed to delete key '{key}' from Redis: {e}")
+
+    async def incr(self, key: str) -> Optional[int]:
+        """Atomically increments an integer key and returns the new value (None on failure)."""
+        if not self._redis_client:
+            logger.warning("Redis client not initialized. Cannot increment key.")
+            return None
+        try:
+            return await self._redis_client.incr(key)
+        except Exception as e:
+            logger.error(f"Failed to increment key '{key}' in Redis: {e}")
+            return None
+
+    async def publish(self, channel: str, message: str) -> int:
+        """Publishes a message on a channel and returns the number of subscribers that received it."""
+        if not self._redis_client:
+            logger.warning("Redis client not initialized. Cannot publish message.")
+            return 0
+        try:
+            return await self._redis_client.publish(channel, message)
+        except Exception as e:
+            logger.error(f"Failed to publish on channel '{channel}' in Redis: {e}")
+            return 0
+
+    async def subscribe(self, channel: str, handler: Callable[[str], Awaitable[None]],
+                        on_subscribed: Optional[Callable[[], Awaitable[None]]] = None) -> None:
+        """
+        Listens on a channel and awaits `handler` for each message until cancelled or the
+        connection is lost. `on_subscribed` runs once the subscription is active, so callers can
+        resynchronise anything they may have missed while not listening. Connection errors are
+        raised so the caller can decide how to reconnect.
+        """
+        if not self._redis_client:
+            raise ConnectionError("Redis client not initialized. Cannot subscribe.")
+        pubsub = self._redis_client.pubsub()
+        try:
+            await pubsub.subscribe(channel)
+            if on_subscribed is not None:
+                await on_subscribed()
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    await handler(message["data"])
+        finally:
+            try:
+                await pubsub.unsubscribe(channel)
+                await pubsub.close()
+            except Exception as e:
+                logger.debug(f"Error closing Redis subscription to '{channel}': {e}")
@@ -0,0 +1,230 @@
+"""
+Migraciones de esquema incrementales e idempotentes.
+
+Base.metadata.create_all solo crea las tablas que no existen. Este módulo añade a las tablas
+ya existentes las columnas e índices nuevos declarados en los modelos ORM y rellena los datos
+derivados de filas antiguas. Se ejecuta desde initialize_database y también como script:
+
+    python -m adapters.schema_migrations [--backfill-trades] [--partition-market-data]
+
+La conversión de una market_data existente en tabla particionada copia todas las velas y
+bloquea la tabla mientras dura, por lo que solo se hace bajo petición explícita.
+"""
+import argparse
+import asyncio
+import json
+import logging
+from typing import List, Set
+
+from sqlalchemy import JSON, Table, bindparam, inspect, select, text, update
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from adapters.market_data_partitions import MARKET_DATA_TABLE, MarketDataPartitionManager, months_between
+from adapters.persistence_service import DEFAULT_MARKET_DATA_INTERVAL, trade_analytics_columns
+from core.domain_models.base import Base
+from core.domain_models.orm_models import MarketDataORM, TradeORM, UserConfigurationORM
+from core.domain_models.trade_models import Trade
+
+logger = logging.getLogger(__name__)
+
+TRADE_BACKFILL_BATCH_SIZE = 500
+# Índice único de market_data anterior a la columna "interval".
+LEGACY_MARKET_DATA_INDEX = "ix_market_data_symbol_timestamp"
+
+
+async def _existing_columns(conn: AsyncConnection, table: Table) -> Set[str]:
+    return await conn.run_sync(lambda sync_conn: {column["name"] for column in inspect(sync_conn).get_columns(table.name)})
+
+
+async def add_missing_columns(conn: AsyncConnection, table: Table) -> List[str]:
+    """Añade con ALTER TABLE las columnas nulables del modelo que aún no existen en la tabla."""
+    existing = await _existing_columns(conn, table)
+    added: List[str] = []
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        if not column.nullable:
+            logger.warning(f"La columna {table.name}.{column.name} no es nulable y no se puede añadir automáticamente.")
+            continue
+        column_type = column.type.compile(dialect=conn.dialect)
+        await conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
+        added.append(column.name)
+    if added:
+        logger.info(f"Columnas añadidas a {table.name}: {', '.join(added)}")
+    return added
+
+
+async def create_missing_indexes(conn: AsyncConnection, table: Table) -> None:
+    def create(sync_conn) -> None:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+    await conn.run_sync(create)
+
+
+async def backfill_trade_analytics_columns(conn: AsyncConnection, batch_size: int = TRADE_BACKFILL_BATCH_SIZE) -> int:
+    """
+    Rellena las columnas desnormalizadas de trades (pnl, estrategia, nocionales...) a partir del
+    JSON de `data` en las filas que aún no las tienen. Recorre la tabla por id en lotes.
+    """
+    trades = TradeORM.__table__
+    update_statement = update(trades).where(trades.c.id == bindparam("trade_id"))
+    last_id = ""
+    filled = 0
+    while True:
+        result = await conn.execute(
+            select(
+                trades.c.id, trades.c.user_id, trades.c.mode, trades.c.symbol, trades.c.position_status,
+                trades.c.created_at, trades.c.updated_at, trades.c.closed_at, trades.c.data
+            )
+            .where(trades.c.entry_notional.is_(None), trades.c.id > last_id)
+            .order_by(trades.c.id)
+            .limit(batch_size)
+        )
+        rows = result.all()
+        if not rows:
+            break
+
+        params = []
+        for row in rows:
+            try:
+                trade = Trade.model_validate({
+                    **json.loads(row.data),
+                    "id": row.id,
+                    "user_id": row.user_id,
+                    "positionStatus": row.position_status,
+                    "mode": row.mode,
+                    "symbol": row.symbol,
+                    "created_at": row.created_at,
+                    "updated_at": row.updated_at,
+                    "closed_at": row.closed_at,
+                })
+            except Exception as e:
+                logger.warning(f"No se pudieron derivar las columnas analíticas del trade {row.id}: {e}")
+                continue
+            params.append({"trade_id": row.id, **trade_analytics_columns(trade)})
+
+        if params:
+            await conn.execute(update_statement, params)
+        filled += len(params)
+        last_id = rows[-1].id
+
+    logger.info(f"Columnas analíticas rellenadas en {filled} trades.")
+    return filled
+
+
+async def migrate_market_data(conn: AsyncConnection) -> None:
+    """
+    Adapta una market_data anterior a la temporalidad: añade la columna "interval" (las velas
+    existentes quedan como 1m) y sustituye el índice único (symbol, timestamp), que impediría
+    guardar varias temporalidades del mismo instante, por (symbol, interval, timestamp).
+    """
+    if "interval" not in await _existing_columns(conn, MarketDataORM.__table__):
+        await conn.execute(text(
+            f'ALTER TABLE {MARKET_DATA_TABLE} ADD COLUMN "interval" VARCHAR(8) NOT NULL DEFAULT \'{DEFAULT_MARKET_DATA_INTERVAL}\''
+        ))
+        logger.info(f"Columna interval añadida a {MARKET_DATA_TABLE}; las velas existentes se consideran {DEFAULT_MARKET_DATA_INTERVAL}.")
+    indexes = await conn.run_sync(lambda sync_conn: {index["name"] for index in inspect(sync_conn).get_indexes(MARKET_DATA_TABLE)})
+    if LEGACY_MARKET_DATA_INDEX in indexes:
+        await conn.execute(text(f"DROP INDEX {LEGACY_MARKET_DATA_INDEX}"))
+
+
+async def partition_market_data(conn: AsyncConnection) -> int:
+    """
+    Convierte una market_data sin particionar de PostgreSQL en la tabla particionada por
+    temporalidad y mes: renombra la tabla actual, crea la particionada con sus particiones,
+    copia las velas y elimina la antigua. Devuelve el número de velas copiadas.
+    """
+    manager = MarketDataPartitionManager()
+    if conn.dialect.name != "postgresql" or await manager.is_partitioned(conn):
+        logger.info(f"{MARKET_DATA_TABLE} no requiere conversión a tabla particionada.")
+        return 0
+
+    await migrate_market_data(conn)
+    legacy_table = f"{MARKET_DATA_TABLE}_unpartitioned"
+    await conn.execute(text(f"ALTER TABLE {MARKET_DATA_TABLE} RENAME TO {legacy_table}"))
+    # Los nombres de índices son globales al esquema: se liberan para los de la tabla nueva.
+    await conn.execute(text(f"ALTER TABLE {legacy_table} DROP CONSTRAINT IF EXISTS {MARKET_DATA_TABLE}_pkey"))
+    for index in MarketDataORM.__table__.indexes:
+        await conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+    await conn.run_sync(MarketDataORM.__table__.create)
+
+    manager.reset()
+    ranges = await conn.execute(text(f'SELECT "interval", MIN(timestamp), MAX(timestamp) FROM {legacy_table} GROUP BY "interval"'))
+    for interval, first, last in ranges.all():
+        await manager.ensure_partitions(conn, interval, months_between(first, last))
+    result = await conn.execute(text(f"""
+        INSERT INTO {MARKET_DATA_TABLE} (id, symbol, "interval", timestamp, open, high, low, close, volume)
+        SELECT id, symbol, "interval", timestamp, open, high, low, close, volume FROM {legacy_table}
+    """))
+    await conn.execute(text(f"DROP TABLE {legacy_table}"))
+    logger.info(f"{MARKET_DATA_TABLE} convertida en tabla particionada ({result.rowcount} velas copiadas).")
+    return result.rowcount
+
+
+async def convert_json_columns(conn: AsyncConnection, table: Table) -> List[str]:
+    """
+    En PostgreSQL convierte a JSONB las columnas JSON del modelo que en la tabla existente aún
+    son texto (su contenido ya es JSON serializado).
+    """
+    if conn.dialect.name != "postgresql":
+        return []
+    existing_types = await conn.run_sync(
+        lambda sync_conn: {column["name"]: column["type"] for column in inspect(sync_conn).get_columns(table.name)}
+    )
+    converted: List[str] = []
+    for column in table.columns:
+        existing_type = existing_types.get(column.name)
+        if not isinstance(column.type, JSON) or existing_type is None or isinstance(existing_type, JSON):
+            continue
+        await conn.execute(text(
+            f'ALTER TABLE {table.name} ALTER COLUMN "{column.name}" TYPE JSONB USING "{column.name}"::jsonb'
+        ))
+        converted.append(column.name)
+    if converted:
+        logger.info(f"Columnas convertidas a JSONB en {table.name}: {', '.join(converted)}")
+    return converted
+
+
+async def migrate_schema(conn: AsyncConnection, backfill_trades: bool = False) -> None:
+    """
+    Aplica las migraciones pendientes. El relleno de trades se ejecuta cuando las columnas
+    analíticas se acaban de añadir o si se pide explícitamente.
+    """
+    existing_tables = await conn.run_sync(lambda sync_conn: set(inspect(sync_conn).get_table_names()))
+    added_trade_columns: List[str] = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        if table is MarketDataORM.__table__:
+            await migrate_market_data(conn)
+        added = await add_missing_columns(conn, table)
+        await create_missing_indexes(conn, table)
+        if table is UserConfigurationORM.__table__:
+            await convert_json_columns(conn, table)
+        if table is TradeORM.__table__:
+            added_trade_columns = added
+    if backfill_trades or "entry_notional" in added_trade_columns:
+        await backfill_trade_analytics_columns(conn)
+
+
+async def _run_cli(args: argparse.Namespace) -> None:
+    import dependencies
+
+    await dependencies.initialize_database()
+    if args.backfill_trades:
+        async with dependencies._db_engine.begin() as conn:
+            await backfill_trade_analytics_columns(conn)
+    if args.partition_market_data:
+        async with dependencies._db_engine.begin() as conn:
+            await partition_market_data(conn)
+    await dependencies._db_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aplica las migraciones de esquema pendientes.")
+    parser.add_argument("--backfill-trades", action="store_true",
+                        help="Rellena de nuevo las columnas analíticas de los trades que no las tengan")
+    parser.add_argument("--partition-market-data", action="store_true",
+                        help="Convierte market_data (PostgreSQL) en tabla particionada por temporalidad y mes")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    asyncio.run(_run_cli(parser.parse_args()))
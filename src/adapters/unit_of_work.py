@@ -0,0 +1,100 @@
+"""
+Unidad de trabajo para agrupar las escrituras de un flujo en una sola transacción.
+
+Las escrituras se registran en memoria mientras el flujo decide (sin mantener una transacción
+abierta durante las llamadas al exchange) y se aplican juntas en `commit()`. Cada escritura se
+identifica por su entidad, de modo que guardar varias veces la misma configuración, trade u
+oportunidad produce una única escritura con el último estado.
+"""
+import inspect
+import logging
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from core.domain_models.opportunity_models import OpportunityStatus
+from core.domain_models.trade_models import Trade
+from core.domain_models.user_configuration_models import UserConfiguration
+
+if TYPE_CHECKING:
+    from adapters.persistence_service import SupabasePersistenceService
+
+logger = logging.getLogger(__name__)
+
+PendingWrite = Callable[["SupabasePersistenceService"], Awaitable[None]]
+
+
+class PersistenceUnitOfWork:
+    """Acumula escrituras del servicio de persistencia y las confirma en una transacción."""
+
+    def __init__(self, persistence_service: "SupabasePersistenceService"):
+        self._persistence_service = persistence_service
+        self._writes: Dict[Tuple[str, str], PendingWrite] = {}
+        self._after_commit: List[Callable[[], Optional[Awaitable[None]]]] = []
+        self._configuration_fields: Dict[Tuple[str, str], Optional[Set[str]]] = {}
+
+    @property
+    def pending_writes(self) -> int:
+        return len(self._writes)
+
+    def _register(self, key: Tuple[str, str], write: PendingWrite) -> None:
+        # Una escritura repetida sustituye a la anterior y pasa al final del orden de aplicación.
+        self._writes.pop(key, None)
+        self._writes[key] = write
+
+    def upsert_user_configuration(self, user_config: UserConfiguration, fields: Optional[Iterable[str]] = None) -> None:
+        """Con `fields` solo se escriben esos campos; si se registra varias veces, se une lo pedido."""
+        key = ("user_configurations", str(user_config.user_id))
+        if fields is not None and key in self._configuration_fields:
+            previous = self._configuration_fields[key]
+            fields = None if previous is None else previous | set(fields)
+        selected = None if fields is None else set(fields)
+        self._configuration_fields[key] = selected
+        if selected is None:
+            self._register(key, lambda service: service.upsert_user_configuration(user_config))
+        else:
+            self._register(key, lambda service: service.upsert_user_configuration(user_config, fields=selected))
+
+    def upsert_trade(self, trade: Trade) -> None:
+        self._register(("trades", str(trade.id)), lambda service: service.upsert_trade(trade))
+
+    def update_opportunity_status(self, opportunity_id: UUID, new_status: OpportunityStatus, status_reason: str) -> None:
+        self._register(
+            ("opportunities", str(opportunity_id)),
+            lambda service: service.update_opportunity_status(
+                opportunity_id=opportunity_id, new_status=new_status, status_reason=status_reason
+            )
+        )
+
+    def upsert(self, table_name: str, data: Dict[str, Any], on_conflict: List[str]) -> None:
+        key = (table_name, "|".join(str(data.get(column)) for column in on_conflict))
+        self._register(key, lambda service: service.upsert(table_name=table_name, data=data, on_conflict=on_conflict))
+
+    def after_commit(self, callback: Callable[[], Optional[Awaitable[None]]]) -> None:
+        """
+        Registra una acción (p. ej. actualizar una caché o avisar a otros workers) que se ejecuta
+        tras confirmar. Si devuelve un awaitable, se espera.
+        """
+        self._after_commit.append(callback)
+
+    async def commit(self) -> None:
+        """Aplica todas las escrituras pendientes en una única transacción y vacía la unidad de trabajo."""
+        writes = list(self._writes.values())
+        callbacks = self._after_commit
+        self._writes = {}
+        self._after_commit = []
+        self._configuration_fields = {}
+        if writes:
+            async with self._persistence_service.transaction() as transactional_service:
+                for write in writes:
+                    await write(transactional_service)
+            logger.debug(f"Unidad de trabajo confirmada con {len(writes)} escrituras.")
+        for callback in callbacks:
+            result = callback()
+            if inspect.isawaitable(result):
+                await result
+
+    def rollback(self) -> None:
+        """Descarta las escrituras pendientes sin tocar la base de datos."""
+        self._writes = {}
+        self._after_commit = []
+        self._configuration_fields = {}
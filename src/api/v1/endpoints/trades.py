@@ -1,17 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+import base64
+import json
 import logging
 from datetime import datetime, date
-from typing import Annotated, Optional, List, Literal, Any
+from typing import Annotated, AsyncIterator, Optional, List, Literal, Any, Tuple
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from shared.data_types import Trade
 from adapters.persistence_service import SupabasePersistenceService
 from app_config import get_app_settings
-from dependencies import get_persistence_service, get_trading_report_service
+from dependencies import get_persistence_service, get_trading_report_service, get_trade_export_service
 from services.trading_report_service import TradingReportService # Importar TradingReportService
+from services.trade_export_service import ExportFormat, TradeExportService
+from core.exceptions import ReportError
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -35,10 +40,36 @@ class TradeHistoryResponse(BaseModel):
     trades: List[Trade]
     total_count: int
     has_more: bool
+    next_cursor: Optional[str] = None
+
+def encode_cursor(cursor: Optional[Tuple[datetime, str]]) -> Optional[str]:
+    """Codifica el (created_at, id) del último trade de una página como token opaco."""
+    if cursor is None:
+        return None
+    created_at, trade_id = cursor
+    payload = json.dumps([created_at.isoformat(), str(trade_id)]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(token: Optional[str]) -> Optional[Tuple[datetime, str]]:
+    """Decodifica un token de `encode_cursor`. Un token inválido produce un 400."""
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        created_at, trade_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), str(trade_id)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor") from e
+
+def _date_range(date_from: Optional[date], date_to: Optional[date]) -> Tuple[Optional[datetime], Optional[datetime]]:
+    start_datetime = datetime.combine(date_from, datetime.min.time()) if date_from else None
+    end_datetime = datetime.combine(date_to, datetime.max.time()) if date_to else None
+    return start_datetime, end_datetime
 
 @router.get("", response_model=List[Trade], status_code=status.HTTP_200_OK)
 async def get_user_trades(
     request: Request,
+    response: Response,
     persistence_service: Annotated[SupabasePersistenceService, Depends(get_persistence_service)],
     trading_mode: Annotated[TradingMode, Query(description="Trading mode filter: 'paper', 'real', or 'both'")] = "both",
     status_filter: Annotated[Optional[str], Query(description="Position status filter: 'open', 'closed', etc.")] = None,
@@ -46,17 +77,37 @@ async def get_user_trades(
     date_from: Annotated[Optional[date], Query(description="Start date filter (YYYY-MM-DD)")] = None,
     date_to: Annotated[Optional[date], Query(description="End date filter (YYYY-MM-DD)")] = None,
     limit: Annotated[int, Query(description="Maximum number of trades to return", ge=1, le=1000)] = 100,
-    offset: Annotated[int, Query(description="Number of trades to skip", ge=0)] = 0
+    offset: Annotated[int, Query(description="Number of trades to skip (legacy pagination, prefer cursor)", ge=0)] = 0,
+    cursor: Annotated[Optional[str], Query(description="Opaque cursor from the X-Next-Cursor header of the previous page")] = None
 ):
     """
     Get trades for the fixed user filtered by trading mode and other criteria.
+
+    Trades are returned newest first. Pages are fetched by key: the X-Next-Cursor response
+    header holds the cursor of the next page and is absent on the last one. A non-zero
+    offset without cursor keeps the previous LIMIT/OFFSET behaviour.
     """
     user_id_str = str(get_app_settings().FIXED_USER_ID) # Convertir UUID a str
+    page_cursor = decode_cursor(cursor)
     try:
         # Convertir date a datetime para la persistencia
-        start_datetime = datetime.combine(date_from, datetime.min.time()) if date_from else None
-        end_datetime = datetime.combine(date_to, datetime.max.time()) if date_to else None
-            
+        start_datetime, end_datetime = _date_range(date_from, date_to)
+
+        if offset == 0 or page_cursor is not None:
+            trades_data, next_cursor = await persistence_service.get_trades_page(
+                user_id=user_id_str,
+                trading_mode=trading_mode,
+                status=status_filter,
+                symbol=symbol_filter,
+                start_date=start_datetime,
+                end_date=end_datetime,
+                limit=limit,
+                cursor=page_cursor
+            )
+            if next_cursor is not None:
+                response.headers["X-Next-Cursor"] = encode_cursor(next_cursor) or ""
+            return trades_data
+
         trades_data = await persistence_service.get_trades_with_filters(
             user_id=user_id_str,
             trading_mode=trading_mode,
@@ -80,6 +131,7 @@ async def get_user_trades(
 @router.get("/open", response_model=List[Trade], status_code=status.HTTP_200_OK)
 async def get_open_trades(
     request: Request,
+    response: Response,
     persistence_service: Annotated[SupabasePersistenceService, Depends(get_persistence_service)],
     trading_mode: Annotated[TradingMode, Query(description="Trading mode filter: 'paper', 'real', or 'both'")] = "both"
 ):
@@ -90,6 +142,7 @@ async def get_open_trades(
         # We need to pass the request object to the redirected call
         return await get_user_trades(
             request=request,
+            response=response,
             persistence_service=persistence_service,
             trading_mode=trading_mode,
             status_filter="open"
@@ -102,6 +155,75 @@ async def get_open_trades(
             detail=f"Failed to retrieve open trades: {str(e)}"
         )
 
+@router.get("/stream", status_code=status.HTTP_200_OK)
+async def stream_user_trades(
+    persistence_service: Annotated[SupabasePersistenceService, Depends(get_persistence_service)],
+    trading_mode: Annotated[TradingMode, Query(description="Trading mode filter: 'paper', 'real', or 'both'")] = "both",
+    status_filter: Annotated[Optional[str], Query(description="Position status filter: 'open', 'closed', etc.")] = None,
+    symbol_filter: Annotated[Optional[str], Query(description="Symbol filter (e.g., 'BTCUSDT')")] = None,
+    date_from: Annotated[Optional[date], Query(description="Start date filter (YYYY-MM-DD)")] = None,
+    date_to: Annotated[Optional[date], Query(description="End date filter (YYYY-MM-DD)")] = None
+) -> StreamingResponse:
+    """
+    Stream every matching trade for the fixed user as NDJSON, newest first.
+
+    Rows are sent as they are read from a server-side cursor, so the response is not
+    buffered in memory.
+    """
+    user_id_str = str(get_app_settings().FIXED_USER_ID)
+    start_datetime, end_datetime = _date_range(date_from, date_to)
+
+    async def ndjson_lines() -> AsyncIterator[str]:
+        async for row in persistence_service.stream_trade_rows(
+            user_id=user_id_str,
+            trading_mode=trading_mode,
+            status=status_filter,
+            symbol=symbol_filter,
+            start_date=start_datetime,
+            end_date=end_datetime
+        ):
+            yield json.dumps(row, default=str) + "\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+@router.get("/export", status_code=status.HTTP_200_OK)
+async def export_user_trades(
+    export_service: Annotated[TradeExportService, Depends(get_trade_export_service)],
+    export_format: Annotated[ExportFormat, Query(alias="format", description="File format: 'csv' or 'parquet'")] = "csv",
+    trading_mode: Annotated[TradingMode, Query(description="Trading mode filter: 'paper', 'real', or 'both'")] = "both",
+    status_filter: Annotated[Optional[str], Query(description="Position status filter: 'open', 'closed', etc.")] = None,
+    symbol_filter: Annotated[Optional[str], Query(description="Symbol filter (e.g., 'BTCUSDT')")] = None,
+    date_from: Annotated[Optional[date], Query(description="Start date filter (YYYY-MM-DD)")] = None,
+    date_to: Annotated[Optional[date], Query(description="End date filter (YYYY-MM-DD)")] = None
+) -> StreamingResponse:
+    """
+    Export every matching trade for the fixed user as a CSV or Parquet file download.
+
+    Trades are flattened into columns and written chunk by chunk from a server-side cursor,
+    so the export runs in constant memory.
+    """
+    user_id_str = str(get_app_settings().FIXED_USER_ID)
+    start_datetime, end_datetime = _date_range(date_from, date_to)
+    try:
+        chunks = export_service.iter_export(
+            export_format,
+            user_id=user_id_str,
+            trading_mode=trading_mode,
+            status=status_filter,
+            symbol=symbol_filter,
+            start_date=start_datetime,
+            end_date=end_datetime
+        )
+    except ReportError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=e.message) from e
+
+    filename = f"trades_{trading_mode}_{datetime.utcnow():%Y%m%d%H%M%S}.{export_format}"
+    return StreamingResponse(
+        chunks,
+        media_type=TradeExportService.media_type(export_format),
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 @router.get("/count", status_code=status.HTTP_200_OK)
 async def get_trades_count(
     request: Request,
@@ -116,31 +238,35 @@ async def get_trades_count(
     """
     user_id = get_app_settings().FIXED_USER_ID
     try:
-        # TODO: Implement count method in persistence service
+        start_datetime, end_datetime = _date_range(date_from, date_to)
+        counts = await persistence_service.count_trades(
+            user_id=str(user_id),
+            trading_mode=trading_mode,
+            status=status_filter,
+            start_date=start_datetime,
+            end_date=end_datetime
+        )
+        filters_applied = {
+            "status": status_filter,
+            "date_from": date_from,
+            "date_to": date_to
+        }
         if trading_mode == "both":
             return {
                 "user_id": user_id,
-                "paper_trades_count": 0,
-                "real_trades_count": 0,
-                "total_count": 0,
-                "filters_applied": {
-                    "status": status_filter,
-                    "date_from": date_from,
-                    "date_to": date_to
-                }
+                "paper_trades_count": counts.get("paper", 0),
+                "real_trades_count": counts.get("real", 0),
+                "total_count": sum(counts.values()),
+                "filters_applied": filters_applied
             }
         else:
             return {
                 "user_id": user_id,
                 "trading_mode": trading_mode,
-                "count": 0,
-                "filters_applied": {
-                    "status": status_filter,
-                    "date_from": date_from,
-                    "date_to": date_to
-                }
+                "count": counts.get(trading_mode, 0),
+                "filters_applied": filters_applied
             }
-            
+
     except Exception as e:
         logger.error(f"Error al contar trades: {e}", exc_info=True)
         raise HTTPException(
@@ -148,6 +274,34 @@ async def get_trades_count(
             detail=f"Failed to count trades: {str(e)}"
         )
 
+async def _closed_trades_page(
+    report_service: TradingReportService,
+    user_id: UUID,
+    mode: str,
+    symbol: Optional[str],
+    start_date: Optional[datetime],
+    end_date: Optional[datetime],
+    limit: int,
+    cursor: Optional[Tuple[datetime, str]]
+) -> TradeHistoryResponse:
+    """Construye la respuesta del historial paginando por (created_at, id) con un único acceso a la BD."""
+    trades, next_cursor = await report_service.get_closed_trades_page(
+        user_id=user_id,
+        mode=mode,
+        symbol=symbol,
+        start_date=start_date,
+        end_date=end_date,
+        limit=limit,
+        cursor=cursor
+    )
+    has_more = next_cursor is not None
+    return TradeHistoryResponse(
+        trades=trades,
+        total_count=len(trades) + (1 if has_more else 0),
+        has_more=has_more,
+        next_cursor=encode_cursor(next_cursor)
+    )
+
 @router.get("/history/paper", response_model=TradeHistoryResponse, tags=["trades"])
 async def get_paper_trading_history(
     request: Request,
@@ -155,14 +309,21 @@ async def get_paper_trading_history(
     start_date: Optional[datetime] = Query(None, description="Fecha de inicio para filtrar"),
     end_date: Optional[datetime] = Query(None, description="Fecha de fin para filtrar"),
     limit: int = Query(100, ge=1, le=500, description="Número máximo de trades a devolver"),
-    offset: int = Query(0, ge=0, description="Número de trades a saltar (para paginación)"),
+    offset: int = Query(0, ge=0, description="Número de trades a saltar (paginación heredada, preferir cursor)"),
+    cursor: Optional[str] = Query(None, description="Cursor opaco `next_cursor` de la página anterior"),
     report_service: TradingReportService = Depends(get_trading_report_service)
 ) -> TradeHistoryResponse:
     """
     Obtiene el historial de operaciones de Paper Trading cerradas para el usuario fijo.
     """
     user_id = get_app_settings().FIXED_USER_ID
+    page_cursor = decode_cursor(cursor)
     try:
+        if offset == 0 or page_cursor is not None:
+            return await _closed_trades_page(
+                report_service, user_id, 'paper', symbol, start_date, end_date, limit, page_cursor
+            )
+
         trades = await report_service.get_closed_trades(
             user_id=user_id,
             mode='paper',
@@ -210,14 +371,21 @@ async def get_real_trading_history(
     start_date: Optional[datetime] = Query(None, description="Fecha de inicio para filtrar"),
     end_date: Optional[datetime] = Query(None, description="Fecha de fin para filtrar"),
     limit: int = Query(100, ge=1, le=500, description="Número máximo de trades a devolver"),
-    offset: int = Query(0, ge=0, description="Número de trades a saltar (para paginación)"),
+    offset: int = Query(0, ge=0, description="Número de trades a saltar (paginación heredada, preferir cursor)"),
+    cursor: Optional[str] = Query(None, description="Cursor opaco `next_cursor` de la página anterior"),
     report_service: TradingReportService = Depends(get_trading_report_service)
 ) -> TradeHistoryResponse:
     """
     Obtiene el historial de operaciones de Trading Real cerradas para el usuario fijo.
     """
     user_id = get_app_settings().FIXED_USER_ID
+    page_cursor = decode_cursor(cursor)
     try:
+        if offset == 0 or page_cursor is not None:
+            return await _closed_trades_page(
+                report_service, user_id, 'real', symbol, start_date, end_date, limit, page_cursor
+            )
+
         trades = await report_service.get_closed_trades(
             user_id=user_id,
             mode='real',
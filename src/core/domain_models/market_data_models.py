@@ -1 +1,5 @@
-from .orm_models import MarketDataORM
\ No newline at end of file
+"""Modelos de datos de mercado. MarketDataORM se define junto al resto de modelos ORM."""
+
+from .orm_models import MarketDataORM
+
+__all__ = ["MarketDataORM"]
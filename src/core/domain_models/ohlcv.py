@@ -0,0 +1,136 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .orm_models import MarketDataORM
+
+# Columnas en el mismo orden que las filas de GET /api/v3/klines (se ignora el campo final "ignore").
+KLINE_COLUMNS = (
+    "open_time", "open", "high", "low", "close", "volume", "close_time",
+    "quote_asset_volume", "number_of_trades", "taker_buy_base_asset_volume", "taker_buy_quote_asset_volume",
+)
+INT_COLUMNS = frozenset({"open_time", "close_time", "number_of_trades"})
+
+
+class OHLCVFrame:
+    """
+    Serie de velas en formato columnar: un array NumPy por campo (int64 para tiempos y número
+    de operaciones, float64 para precios y volúmenes).
+
+    El slicing por rangos devuelve vistas sin copia, de modo que indicadores y backtests pueden
+    trabajar sobre ventanas de la serie sin crear objetos por vela. Las conversiones a los
+    formatos existentes (diccionarios de la API y MarketDataORM) se hacen solo en los bordes.
+    """
+    __slots__ = KLINE_COLUMNS
+
+    def __init__(self, **columns: Any):
+        length: Optional[int] = None
+        for name in KLINE_COLUMNS:
+            dtype = np.int64 if name in INT_COLUMNS else np.float64
+            values = columns.get(name)
+            array = np.zeros(length or 0, dtype=dtype) if values is None else np.asarray(values, dtype=dtype)
+            if length is None:
+                length = len(array)
+            elif len(array) != length:
+                raise ValueError(f"La columna '{name}' tiene {len(array)} elementos; se esperaban {length}.")
+            setattr(self, name, array)
+
+    @classmethod
+    def empty(cls) -> "OHLCVFrame":
+        return cls()
+
+    @classmethod
+    def from_binance_klines(cls, rows: Sequence[Sequence[Any]]) -> "OHLCVFrame":
+        """Construye la serie directamente desde las filas de /api/v3/klines (números como cadenas)."""
+        if not rows:
+            return cls.empty()
+        # Array de objetos que referencia los valores ya decodificados; cada columna se convierte en una pasada.
+        table = np.array([row[:len(KLINE_COLUMNS)] for row in rows], dtype=object)
+        return cls(**{name: table[:, i] for i, name in enumerate(KLINE_COLUMNS)})
+
+    @classmethod
+    def from_dicts(cls, candles: Sequence[Dict[str, Any]]) -> "OHLCVFrame":
+        """Construye la serie desde diccionarios con la forma de kline_to_dict."""
+        if not candles:
+            return cls.empty()
+        return cls(**{name: [candle.get(name, 0) for candle in candles] for name in KLINE_COLUMNS})
+
+    @classmethod
+    def from_records(cls, records: Sequence[Tuple[str, datetime, float, float, float, float, float]], interval_ms: int) -> "OHLCVFrame":
+        """
+        Construye la serie desde tuplas (symbol, timestamp, open, high, low, close, volume) de
+        market_data. close_time se deriva de la temporalidad; los campos que la tabla no guarda
+        (volumen en quote, número de operaciones, volúmenes taker) quedan a cero.
+        """
+        if not records:
+            return cls.empty()
+        open_time = np.array([int(record[1].timestamp() * 1000) for record in records], dtype=np.int64)
+        return cls(
+            open_time=open_time,
+            open=[record[2] for record in records],
+            high=[record[3] for record in records],
+            low=[record[4] for record in records],
+            close=[record[5] for record in records],
+            volume=[record[6] for record in records],
+            close_time=open_time + interval_ms - 1,
+        )
+
+    @classmethod
+    def concat(cls, frames: Iterable["OHLCVFrame"]) -> "OHLCVFrame":
+        frames = [f for f in frames if len(f)]
+        if not frames:
+            return cls.empty()
+        return cls(**{name: np.concatenate([getattr(f, name) for f in frames]) for name in KLINE_COLUMNS})
+
+    def __len__(self) -> int:
+        return len(self.open_time)
+
+    def __getitem__(self, index: Union[slice, np.ndarray]) -> "OHLCVFrame":
+        """Con un slice devuelve vistas de las columnas; con una máscara o índices, una copia."""
+        if isinstance(index, int):
+            raise TypeError("Use to_dicts() o las columnas para acceder a una vela individual.")
+        frame = object.__new__(OHLCVFrame)
+        for name in KLINE_COLUMNS:
+            setattr(frame, name, getattr(self, name)[index])
+        return frame
+
+    def tail(self, count: int) -> "OHLCVFrame":
+        return self[-count:] if count > 0 else self[0:0]
+
+    def between(self, start_open_time: Optional[int] = None, end_open_time: Optional[int] = None) -> "OHLCVFrame":
+        """Vista de las velas con open_time en [start, end], asumiendo la serie ordenada por tiempo."""
+        lo = 0 if start_open_time is None else int(np.searchsorted(self.open_time, start_open_time, side="left"))
+        hi = len(self) if end_open_time is None else int(np.searchsorted(self.open_time, end_open_time, side="right"))
+        return self[lo:hi]
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        return {name: getattr(self, name) for name in KLINE_COLUMNS}
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Convierte a la lista de diccionarios que expone la API de velas."""
+        columns = [getattr(self, name).tolist() for name in KLINE_COLUMNS]
+        return [dict(zip(KLINE_COLUMNS, values, strict=True)) for values in zip(*columns, strict=True)]
+
+    def to_records(self, symbol: str) -> List[Tuple[str, datetime, float, float, float, float, float]]:
+        """Convierte a tuplas (symbol, timestamp, open, high, low, close, volume) para la ingesta masiva."""
+        timestamps = [datetime.fromtimestamp(open_time / 1000, tz=timezone.utc) for open_time in self.open_time.tolist()]
+        return list(zip(
+            [symbol] * len(timestamps), timestamps, self.open.tolist(), self.high.tolist(),
+            self.low.tolist(), self.close.tolist(), self.volume.tolist(), strict=True
+        ))
+
+    def to_orm(self, symbol: str, interval: str = "1m") -> List[MarketDataORM]:
+        """Convierte a filas MarketDataORM para las rutas de persistencia existentes."""
+        return [
+            MarketDataORM(
+                symbol=symbol,
+                interval=interval,
+                timestamp=datetime.fromtimestamp(open_time / 1000, tz=timezone.utc),
+                open=open_, high=high, low=low, close=close, volume=volume
+            )
+            for open_time, open_, high, low, close, volume in zip(
+                self.open_time.tolist(), self.open.tolist(), self.high.tolist(),
+                self.low.tolist(), self.close.tolist(), self.volume.tolist(), strict=True
+            )
+        ]
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, Boolean, Float, DateTime, Text, Numeric, Index
-from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy import Column, String, Boolean, Float, DateTime, Text, Numeric, Index, BigInteger, JSON
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID, JSONB
 from sqlalchemy.types import TypeDecorator, CHAR
 from sqlalchemy.sql import func
 from sqlalchemy.ext.compiler import compiles
@@ -8,7 +8,7 @@ from sqlalchemy.orm import relationship, Mapped, mapped_column
 from uuid import UUID as PythonUUID, uuid4
 from datetime import datetime
 from decimal import Decimal
-from typing import Optional
+from typing import Any, Optional
 import json
 
 from .base import Base
@@ -54,30 +54,34 @@ class GUID(TypeDecorator):
             else:
                 return PythonUUID(str(value))
 
+# Subdocumentos JSON nativos: JSONB en PostgreSQL y texto JSON en el resto de motores.
+# None se guarda como NULL de SQL (no como el valor JSON null).
+JSONDocument = JSON(none_as_null=True).with_variant(JSONB(none_as_null=True), "postgresql")
+
 class UserConfigurationORM(Base):
     __tablename__ = 'user_configurations'
 
     id: Mapped[str] = mapped_column(String, primary_key=True)
     user_id: Mapped[str] = mapped_column(String, unique=True, nullable=False)
     telegram_chat_id: Mapped[Optional[str]] = mapped_column(String, nullable=True)
-    notification_preferences: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    notification_preferences: Mapped[Optional[Any]] = mapped_column(JSONDocument, nullable=True)
     enable_telegram_notifications: Mapped[bool] = mapped_column(Boolean, default=False)
     default_paper_trading_capital: Mapped[Decimal] = mapped_column(Numeric(18, 8), default=10000.0)
     paper_trading_active: Mapped[bool] = mapped_column(Boolean, default=False)
-    paper_trading_assets: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    watchlists: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    favorite_pairs: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    paper_trading_assets: Mapped[Optional[Any]] = mapped_column(JSONDocument, nullable=True)
+    watchlists: Mapped[Optional[Any]] = mapped_column(JSONDocument, nullable=True)
+    favorite_pairs: Mapped[Optional[Any]] = mapped_column(JSONDocument, nullable=True)
     risk_profile: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    risk_profile_settings: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    real_trading_settings: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    ai_strategy_configurations: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    ai_analysis_confidence_thresholds: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    mcp_server_preferences: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    risk_profile_settings: Mapped[Optional[Any]] = mapped_column(JSONDocument, nullable=True)
+    real_trading_settings: Mapped[Optional[Any]] = mapped_column(JSONDocument, nullable=True)
+    ai_strategy_configurations: Mapped[Optional[Any]] = mapped_column(JSONDocument, nullable=True)
+    ai_analysis_confidence_thresholds: Mapped[Optional[Any]] = mapped_column(JSONDocument, nullable=True)
+    mcp_server_preferences: Mapped[Optional[Any]] = mapped_column(JSONDocument, nullable=True)
     selected_theme: Mapped[Optional[str]] = mapped_column(String, nullable=True)
-    dashboard_layout_profiles: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    dashboard_layout_profiles: Mapped[Optional[Any]] = mapped_column(JSONDocument, nullable=True)
     active_dashboard_layout_profile_id: Mapped[Optional[str]] = mapped_column(String, nullable=True)
-    dashboard_layout_config: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    cloud_sync_preferences: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    dashboard_layout_config: Mapped[Optional[Any]] = mapped_column(JSONDocument, nullable=True)
+    cloud_sync_preferences: Mapped[Optional[Any]] = mapped_column(JSONDocument, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=func.now())  # pylint: disable=not-callable
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=func.now(), onupdate=func.now())  # pylint: disable=not-callable
 
@@ -103,6 +107,13 @@ class TradeORM(Base):
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=func.now(), onupdate=func.now())  # pylint: disable=not-callable
     closed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
     data: Mapped[str] = mapped_column(Text, nullable=False)  # Residual JSON data for complex or less queried fields
+    # Denormalized copies of fields in `data`, so analytics can filter and aggregate in SQL
+    pnl_usd: Mapped[Optional[Decimal]] = mapped_column(Numeric(18, 8), nullable=True)
+    pnl_percentage: Mapped[Optional[Decimal]] = mapped_column(Numeric(18, 8), nullable=True)
+    strategy_id: Mapped[Optional[PythonUUID]] = mapped_column(GUID(), nullable=True)
+    opportunity_id: Mapped[Optional[PythonUUID]] = mapped_column(GUID(), nullable=True)
+    entry_notional: Mapped[Optional[Decimal]] = mapped_column(Numeric(18, 8), nullable=True)
+    exit_notional: Mapped[Optional[Decimal]] = mapped_column(Numeric(18, 8), nullable=True)
 
     __table_args__ = (
         Index('ix_trades_user_id', 'user_id'),
@@ -112,6 +123,11 @@ class TradeORM(Base):
         Index('ix_trades_created_at', 'created_at'),
         Index('ix_trades_updated_at', 'updated_at'),
         Index('ix_trades_closed_at', 'closed_at'),
+        Index('ix_trades_side', 'side'),
+        Index('ix_trades_strategy_id', 'strategy_id'),
+        Index('ix_trades_opportunity_id', 'opportunity_id'),
+        # Cubre los recuentos y listados por usuario/modo/estado en rango de fechas.
+        Index('ix_trades_user_mode_status_created_at', 'user_id', 'mode', 'position_status', 'created_at'),
     )
 
     def __repr__(self):
@@ -200,9 +216,12 @@ class StrategyConfigORM(Base):
 class MarketDataORM(Base):
     __tablename__ = 'market_data'
 
+    # En PostgreSQL la tabla se particiona por temporalidad y mes (ver adapters.market_data_partitions);
+    # la clave primaria de una tabla particionada debe incluir las columnas de partición.
     id: Mapped[PythonUUID] = mapped_column(GUID(), primary_key=True, default=uuid4)
     symbol: Mapped[str] = mapped_column(String, nullable=False)
-    timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    interval: Mapped[str] = mapped_column(String(8), primary_key=True, default="1m", server_default="1m")
+    timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True)
     open: Mapped[Decimal] = mapped_column(Numeric(18, 8), nullable=False)
     high: Mapped[Decimal] = mapped_column(Numeric(18, 8), nullable=False)
     low: Mapped[Decimal] = mapped_column(Numeric(18, 8), nullable=False)
@@ -210,7 +229,8 @@ class MarketDataORM(Base):
     volume: Mapped[Decimal] = mapped_column(Numeric(18, 8), nullable=False)
 
     __table_args__ = (
-        Index('ix_market_data_symbol_timestamp', 'symbol', 'timestamp', unique=True),
+        Index('ix_market_data_symbol_interval_timestamp', 'symbol', 'interval', 'timestamp', unique=True),
+        {'postgresql_partition_by': 'LIST ("interval")'},
     )
 
     def __repr__(self):
@@ -237,3 +257,15 @@ class NotificationORM(Base):
 
     def __repr__(self):
         return f"<NotificationORM(id='{self.id}', type='{self.type}', user_id='{self.user_id}')>"
+
+class KlineBackfillCheckpointORM(Base):
+    __tablename__ = 'kline_backfill_checkpoints'
+
+    symbol: Mapped[str] = mapped_column(String, primary_key=True)
+    interval: Mapped[str] = mapped_column(String, primary_key=True)
+    last_open_time: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    rows_written: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=func.now(), onupdate=func.now())  # pylint: disable=not-callable
+
+    def __repr__(self):
+        return f"<KlineBackfillCheckpointORM(symbol='{self.symbol}', interval='{self.interval}', last_open_time={self.last_open_time})>"
@@ -0,0 +1,25 @@
+from abc import ABC, abstractmethod
+
+from core.domain_models.ohlcv import OHLCVFrame
+
+
+class ICandleSource(ABC):
+    """
+    Interface for historical candle sources consumed by feature calculation and backtests.
+    """
+
+    @abstractmethod
+    async def get_candles(self, symbol: str, interval: str, start_time: int, end_time: int) -> OHLCVFrame:
+        """
+        Returns the candles of (symbol, interval) with open_time in [start_time, end_time].
+
+        Args:
+            symbol: Trading pair (e.g. "BTCUSDT").
+            interval: Kline interval (e.g. "1m", "1h").
+            start_time: First open_time in milliseconds since the epoch.
+            end_time: Last open_time in milliseconds since the epoch.
+
+        Returns:
+            An OHLCVFrame ordered by open_time.
+        """
+        pass
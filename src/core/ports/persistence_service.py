@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
 from typing_extensions import LiteralString
 
 
@@ -18,6 +20,14 @@ class IPersistenceService(ABC):
         """Closes the persistence service, e.g., closing connection pools."""
         pass
 
+    @abstractmethod
+    def unit_of_work(self) -> Any:
+        """
+        Creates a unit of work that collects writes (user configuration, trades, opportunity
+        status, generic upserts) and applies them in a single transaction on commit().
+        """
+        pass
+
     @abstractmethod
     async def upsert(
         self, table_name: str, data: Dict[str, Any], on_conflict: List[str]
@@ -33,12 +43,72 @@ class IPersistenceService(ABC):
         pass
 
     @abstractmethod
-    async def upsert_all(self, items: List[Any]) -> None:
+    async def upsert_all(self, items: List[Any], batch_size: Optional[int] = None) -> Dict[str, int]:
         """
         Inserts or updates multiple records in the specified table.
 
         Args:
-            items: A list of Pydantic models to upsert.
+            items: A list of models to upsert.
+            batch_size: Optional override of the number of rows written per batch.
+
+        Returns:
+            A dictionary with the "inserted" and "updated" row counts.
+        """
+        pass
+
+    @abstractmethod
+    async def bulk_upsert_market_data(
+        self, records: Sequence[Tuple[str, datetime, float, float, float, float, float]], batch_size: Optional[int] = None,
+        interval: str = "1m"
+    ) -> Dict[str, int]:
+        """
+        Bulk inserts or updates candles in market_data, keyed on (symbol, interval, timestamp).
+
+        Args:
+            records: Tuples of (symbol, timestamp, open, high, low, close, volume).
+            batch_size: Optional override of the number of rows written per batch.
+            interval: Kline interval shared by all the records (e.g. "1m", "1h").
+
+        Returns:
+            A dictionary with the "inserted" and "updated" row counts.
+        """
+        pass
+
+    @abstractmethod
+    async def get_market_data_range(
+        self, symbol: str, interval: str, start: datetime, end: datetime
+    ) -> List[Tuple[str, datetime, float, float, float, float, float]]:
+        """
+        Returns the stored candles of (symbol, interval) with timestamp in [start, end], ordered by
+        time, as (symbol, timestamp, open, high, low, close, volume) tuples.
+        """
+        pass
+
+    @abstractmethod
+    async def get_market_data_months(self, interval: str, before: datetime) -> List[datetime]:
+        """Returns the first instant of each month before `before` that may hold candles of the interval."""
+        pass
+
+    @abstractmethod
+    async def rollup_market_data(
+        self, source_interval: str, target_interval: str, bucket_seconds: int, start: datetime, end: datetime
+    ) -> int:
+        """
+        Aggregates the source_interval candles in [start, end) into target_interval candles of
+        bucket_seconds, without overwriting existing target candles.
+
+        Returns:
+            The number of candles created.
+        """
+        pass
+
+    @abstractmethod
+    async def drop_market_data_month(self, interval: str, month: datetime) -> bool:
+        """
+        Deletes the candles of an interval for a whole month.
+
+        Returns:
+            True if a partition was dropped, False if the rows were deleted instead.
         """
         pass
 
@@ -128,12 +198,14 @@ class IPersistenceService(ABC):
         pass
 
     @abstractmethod
-    async def upsert_user_configuration(self, user_config_data: Dict[str, Any]) -> None:
+    async def upsert_user_configuration(self, user_config_data: Any, fields: Optional[Iterable[str]] = None) -> None:
         """
         Inserts or updates a user configuration record.
 
         Args:
-            user_config_data: A dictionary containing the user configuration data.
+            user_config_data: The user configuration to store.
+            fields: Optional subset of fields to write (e.g. {"real_trading_settings"}); all
+                fields are written when omitted or when the record does not exist yet.
         """
         pass
 
@@ -153,3 +225,105 @@ class IPersistenceService(ABC):
         Retrieves trades with dynamic filters.
         """
         pass
+
+    @abstractmethod
+    async def count_trades(
+        self,
+        user_id: str,
+        trading_mode: Optional[str] = None,
+        status: Optional[str] = None,
+        start_date: Optional[Any] = None,
+        end_date: Optional[Any] = None,
+    ) -> Dict[str, int]:
+        """
+        Counts the user's trades grouped by mode in a single query.
+
+        Args:
+            trading_mode: "paper", "real", or None/"both" for all modes.
+
+        Returns:
+            A dictionary mapping each mode to its trade count. Modes without trades are omitted.
+        """
+        pass
+
+    @abstractmethod
+    async def get_trades_page(
+        self,
+        user_id: str,
+        trading_mode: Optional[str] = None,
+        status: Optional[str] = None,
+        symbol: Optional[str] = None,
+        start_date: Optional[Any] = None,
+        end_date: Optional[Any] = None,
+        limit: int = 100,
+        cursor: Optional[Tuple[datetime, str]] = None,
+    ) -> Tuple[List[Any], Optional[Tuple[datetime, str]]]:
+        """
+        Retrieves one page of trades ordered by (created_at, id) descending using keyset pagination.
+
+        Args:
+            trading_mode: "paper", "real", or None/"both" for all modes.
+            cursor: The (created_at, id) of the last trade of the previous page.
+
+        Returns:
+            The trades of the page and the cursor of the next page, or None if there are no more.
+        """
+        pass
+
+    @abstractmethod
+    def stream_trade_rows(
+        self,
+        user_id: str,
+        trading_mode: Optional[str] = None,
+        status: Optional[str] = None,
+        symbol: Optional[str] = None,
+        start_date: Optional[Any] = None,
+        end_date: Optional[Any] = None,
+        batch_size: int = 500,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streams trades ordered by (created_at, id) descending from a server-side cursor,
+        yielding each one as a decoded dictionary.
+        """
+        pass
+
+    @abstractmethod
+    async def get_trade_performance_summary(
+        self,
+        user_id: str,
+        mode: Optional[str] = None,
+        symbol: Optional[str] = None,
+        start_date: Optional[Any] = None,
+        end_date: Optional[Any] = None,
+        date_field: str = "closed_at",
+    ) -> Dict[str, Any]:
+        """
+        Aggregates the user's closed trades in the database.
+
+        Args:
+            date_field: Column the date range applies to ("closed_at" or "created_at").
+
+        Returns:
+            A dictionary with total/winning/losing counts, total PnL, best/worst PnL and symbol,
+            entry/exit volume, and the first created_at and last closed_at of the matched trades.
+            See `trade_summary_volume` for the volume traded.
+        """
+        pass
+
+    @abstractmethod
+    async def get_strategy_performance_summary(self, user_id: str, mode: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Aggregates the user's closed trades per (strategy_id, mode) in the database.
+
+        Returns:
+            One dictionary per group with strategy_id, mode, total_operations, winning_operations and total_pnl.
+        """
+        pass
+
+
+def trade_summary_volume(summary: Mapping[str, Any]) -> Decimal:
+    """
+    Volume traded of a `get_trade_performance_summary` result: the notional of every executed
+    order, entries and exits alike.
+    """
+    return Decimal(str(summary["entry_volume"] or 0)) + Decimal(str(summary["exit_volume"] or 0))
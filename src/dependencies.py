@@ -5,7 +5,6 @@ from functools import lru_cache
 from typing import Optional, Callable, Any, cast # Importar Any y cast
 import httpx
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.pool import NullPool
 
 # Importar la Base y los modelos para la creación de tablas
 from core.domain_models.base import Base
@@ -17,6 +16,8 @@ from adapters.binance_adapter import BinanceAdapter
 from adapters.mobula_adapter import MobulaAdapter
 from adapters.persistence_service import SupabasePersistenceService as PersistenceService
 from adapters.redis_cache import RedisCache # Importar RedisCache
+from adapters.schema_migrations import migrate_schema
+from adapters.database_pool import database_metrics, engine_options
 from services.ai_orchestrator_service import AIOrchestrator as AIOrchestratorService
 from services.config_service import ConfigurationService
 from services.credential_service import CredentialService
@@ -28,7 +29,11 @@ from services.portfolio_service import PortfolioService
 from services.strategy_service import StrategyService
 from services.trading_engine_service import TradingEngine as TradingEngineService
 from services.trading_report_service import TradingReportService
+from services.trade_export_service import TradeExportService
+from services.market_data_retention_service import MarketDataRetentionService
 from services.unified_order_execution_service import UnifiedOrderExecutionService
+from services.symbol_filter_registry import SymbolFilterRegistry
+from services.order_book_service import OrderBookService
 
 logger = logging.getLogger(__name__)
 
@@ -52,14 +57,17 @@ async def initialize_database():
 
         try:
             logger.info(f"Initializing database with URL: {database_url}")
+            # NullPool para SQLite; pool dimensionado y con métricas para el resto (ver adapters.database_pool)
             _db_engine = create_async_engine(
                 database_url,
                 echo=False,
-                poolclass=NullPool if "sqlite" in database_url else None # Usar NullPool para SQLite
+                **engine_options(database_url)
             )
+            database_metrics.bind_pool(_db_engine.sync_engine.pool)
             
             async with _db_engine.begin() as conn:
                 await conn.run_sync(Base.metadata.create_all)
+                await migrate_schema(conn)
             
             _session_factory = async_sessionmaker(
                 _db_engine,
@@ -93,11 +101,15 @@ class DependencyContainer:
         self.http_client: Optional[httpx.AsyncClient] = None
         self.ai_orchestrator_service: Optional[AIOrchestratorService] = None
         self.binance_adapter: Optional[BinanceAdapter] = None
+        self.symbol_filter_registry: Optional[SymbolFilterRegistry] = None
+        self.order_book_service: Optional[OrderBookService] = None
         self.credential_service: Optional[CredentialService] = None
         self.mobula_adapter: Optional[MobulaAdapter] = None
         self.notification_service: Optional[NotificationService] = None
         self.performance_service: Optional[PerformanceService] = None
         self.trading_report_service: Optional[TradingReportService] = None
+        self.trade_export_service: Optional[TradeExportService] = None
+        self.market_data_retention_service: Optional[MarketDataRetentionService] = None
         self.market_data_service: Optional[MarketDataService] = None
         self.portfolio_service: Optional[PortfolioService] = None
         self.order_execution_service: Optional[OrderExecutionService] = None
@@ -124,10 +136,18 @@ class DependencyContainer:
         await self.cache.initialize() # Inicializar el cliente Redis
 
         self.binance_adapter = BinanceAdapter()
-        self.paper_order_execution_service = PaperOrderExecutionService()
+        self.symbol_filter_registry = SymbolFilterRegistry(binance_adapter=self.binance_adapter)
+        await self.symbol_filter_registry.start()
+        self.order_book_service = OrderBookService(binance_adapter=self.binance_adapter)
+        self.paper_order_execution_service = PaperOrderExecutionService(
+            symbol_filters=self.symbol_filter_registry,
+            order_book_service=self.order_book_service
+        )
 
         self.order_execution_service = OrderExecutionService(
-            binance_adapter=self.binance_adapter
+            binance_adapter=self.binance_adapter,
+            symbol_filters=self.symbol_filter_registry,
+            order_book_service=self.order_book_service
         )
         
         if _session_factory is None:
@@ -138,6 +158,9 @@ class DependencyContainer:
             binance_adapter=self.binance_adapter
         )
         self.trading_report_service = TradingReportService(persistence_service=self.persistence_service)
+        self.trade_export_service = TradeExportService(persistence_service=self.persistence_service)
+        self.market_data_retention_service = MarketDataRetentionService(persistence_service=self.persistence_service)
+        await self.market_data_retention_service.start()
 
         self.mobula_adapter = MobulaAdapter(
             credential_service=self.credential_service,
@@ -171,8 +194,10 @@ class DependencyContainer:
             persistence_service=self.persistence_service,
             credential_service=self.credential_service,
             portfolio_service=self.portfolio_service,
-            notification_service=self.notification_service
+            notification_service=self.notification_service,
+            cache=self.cache
         )
+        await self.config_service.start()
 
         self.strategy_service = StrategyService(
             persistence_service=self.persistence_service,
@@ -201,6 +226,14 @@ class DependencyContainer:
         logger.info("Shutting down dependency container...")
         if self.http_client:
             await self.http_client.aclose()
+        if self.symbol_filter_registry:
+            await self.symbol_filter_registry.close()
+        if self.market_data_retention_service:
+            await self.market_data_retention_service.close()
+        if self.config_service:
+            await self.config_service.close()
+        if self.order_book_service:
+            await self.order_book_service.close()
         if self.binance_adapter:
             await self.binance_adapter.close()
         if self.cache: # Cerrar el cliente Redis
@@ -317,6 +350,12 @@ async def get_trading_report_service(request: Request) -> TradingReportService:
     return container.trading_report_service
 
 
+async def get_trade_export_service(request: Request) -> TradeExportService:
+    container = await get_container_async(request)
+    assert container.trade_export_service is not None, "TradeExportService not initialized"
+    return container.trade_export_service
+
+
 async def get_performance_service(request: Request) -> PerformanceService:
     container = await get_container_async(request)
     assert container.performance_service is not None, "PerformanceService not initialized"
@@ -1,69 +1,76 @@
 import pandas as pd
-from typing import List, Optional
+from typing import List, Optional, Union
 from decimal import Decimal
 
 from core.domain_models.market_data_models import MarketDataORM
+from core.domain_models.ohlcv import OHLCVFrame
 
-def calculate_sma(data: List[MarketDataORM], window: int) -> List[Optional[Decimal]]:
+MarketDataInput = Union[OHLCVFrame, List[MarketDataORM]]
+
+
+def _close_prices(data: MarketDataInput) -> pd.Series:
+    """
+    Returns the close prices as a Series. An OHLCVFrame column is wrapped without copying.
+    """
+    if isinstance(data, OHLCVFrame):
+        return pd.Series(data.close, copy=False)
+    return pd.Series([float(d.close) for d in data])
+
+def calculate_sma(data: MarketDataInput, window: int) -> List[Optional[Decimal]]:
     """
     Calculates the Simple Moving Average (SMA) for a list of market data points.
     """
     if len(data) < window:
         return []
     
-    prices = [float(d.price) for d in data]
-    series = pd.Series(prices)
+    series = _close_prices(data)
     sma = series.rolling(window=window).mean().tolist()
     return [Decimal(str(val)) if pd.notna(val) else None for val in sma]
 
-def calculate_ema(data: List[MarketDataORM], window: int) -> List[Optional[Decimal]]:
+def calculate_ema(data: MarketDataInput, window: int) -> List[Optional[Decimal]]:
     """
     Calculates the Exponential Moving Average (EMA) for a list of market data points.
     """
     if len(data) < window:
         return []
 
-    prices = [float(d.price) for d in data]
-    series = pd.Series(prices)
+    series = _close_prices(data)
     ema = series.ewm(span=window, adjust=False).mean().tolist()
     return [Decimal(str(val)) if pd.notna(val) else None for val in ema]
 
 
-def calculate_volatility(data: List[MarketDataORM], window: int) -> List[Optional[Decimal]]:
+def calculate_volatility(data: MarketDataInput, window: int) -> List[Optional[Decimal]]:
     """
     Calculates the rolling volatility (standard deviation) of the price.
     """
     if len(data) < window:
         return []
 
-    prices = [float(d.price) for d in data]
-    series = pd.Series(prices)
+    series = _close_prices(data)
     volatility = series.rolling(window=window).std().tolist()
     return [Decimal(str(val)) if pd.notna(val) else None for val in volatility]
 
 
-def calculate_roc(data: List[MarketDataORM], window: int) -> List[Optional[Decimal]]:
+def calculate_roc(data: MarketDataInput, window: int) -> List[Optional[Decimal]]:
     """
     Calculates the Rate of Change (ROC) of the price.
     """
     if len(data) < window:
         return []
 
-    prices = [float(d.price) for d in data]
-    series = pd.Series(prices)
+    series = _close_prices(data)
     roc = series.pct_change(periods=window).tolist()
     return [Decimal(str(val)) if pd.notna(val) else None for val in roc]
 
 
-def calculate_rsi(data: List[MarketDataORM], window: int = 14) -> List[Optional[Decimal]]:
+def calculate_rsi(data: MarketDataInput, window: int = 14) -> List[Optional[Decimal]]:
     """
     Calculates the Relative Strength Index (RSI).
     """
     if len(data) < window:
         return []
 
-    prices = [float(d.price) for d in data]
-    series = pd.Series(prices)
+    series = _close_prices(data)
     delta = series.diff()
     
     gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
@@ -75,7 +82,7 @@ def calculate_rsi(data: List[MarketDataORM], window: int = 14) -> List[Optional[
     return [Decimal(str(val)) if pd.notna(val) else None for val in rsi.tolist()]
 
 
-def calculate_macd(data: List[MarketDataORM], fast_period: int = 12, slow_period: int = 26, signal_period: int = 9) -> pd.DataFrame:
+def calculate_macd(data: MarketDataInput, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9) -> pd.DataFrame:
     """
     Calculates the Moving Average Convergence Divergence (MACD).
     Returns a DataFrame with 'MACD', 'Signal', and 'Histogram' columns.
@@ -83,8 +90,7 @@ def calculate_macd(data: List[MarketDataORM], fast_period: int = 12, slow_period
     if len(data) < slow_period:
         return pd.DataFrame()
 
-    prices = [float(d.price) for d in data]
-    series = pd.Series(prices)
+    series = _close_prices(data)
     
     ema_fast = series.ewm(span=fast_period, adjust=False).mean()
     ema_slow = series.ewm(span=slow_period, adjust=False).mean()
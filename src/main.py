@@ -22,6 +22,7 @@ from api.v1.endpoints import (
 )
 from dotenv import load_dotenv
 from dependencies import DependencyContainer
+from adapters.database_pool import database_metrics
 from core.exceptions import UltiBotError
 
 # Cargar variables de entorno desde .env al inicio
@@ -232,6 +233,11 @@ def create_app() -> FastAPI:
         logger.info(f"Health check completado: {health_status['message']}")
         return JSONResponse(content=health_status, status_code=200)
         
+    @app_instance.get("/metrics/database", tags=["health"])
+    async def database_metrics_endpoint():
+        """Estado del pool de conexiones, esperas al obtener conexión y latencia por método de persistencia."""
+        return database_metrics.snapshot()
+
     return app_instance
 
 # Point of entry for running the application directly
@@ -0,0 +1,109 @@
+"""
+Exportación de market_data al archivo columnar de velas (ver adapters.candle_archive).
+
+Copia las velas guardadas en la base de datos a un fichero Arrow por (símbolo, temporalidad,
+mes). Los meses ya archivados se omiten salvo el mes en curso, que se vuelve a escribir en cada
+ejecución hasta que termina. Se usa como script:
+
+    python -m services.candle_archive_service --root data/candles --symbols BTCUSDT ETHUSDT \\
+        --intervals 1m 1h --start 2021-01-01 [--end 2024-01-01] [--overwrite]
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from adapters.candle_archive import CandleArchive
+from adapters.market_data_partitions import month_start, months_between, next_month
+from core.domain_models.ohlcv import OHLCVFrame
+from core.ports.persistence_service import IPersistenceService
+from services.kline_store import INTERVAL_MS
+
+logger = logging.getLogger(__name__)
+
+
+class ArchiveReport(BaseModel):
+    """Resumen de una exportación al archivo de velas."""
+    files_written: int = 0
+    months_skipped: int = 0
+    rows_written: int = 0
+    rows_by_series: Dict[str, int] = Field(default_factory=dict)
+
+
+class CandleArchiveService:
+    """Exporta market_data al archivo columnar mes a mes, con la memoria acotada a un mes de una serie."""
+
+    def __init__(self, persistence_service: IPersistenceService, archive: CandleArchive):
+        self._persistence_service = persistence_service
+        self.archive = archive
+
+    async def export(self, symbols: List[str], intervals: List[str], start: datetime,
+                     end: Optional[datetime] = None, overwrite: bool = False) -> ArchiveReport:
+        """Archiva los meses entre `start` y `end` (por defecto, ahora) de cada (símbolo, temporalidad)."""
+        for interval in intervals:
+            if interval not in INTERVAL_MS:
+                raise ValueError(f"Temporalidad no soportada para el archivo de velas: '{interval}'")
+        now = datetime.now(timezone.utc)
+        end = end or now
+        current_month = month_start(now)
+        report = ArchiveReport()
+
+        for symbol in symbols:
+            for interval in intervals:
+                archived = set(self.archive.months(symbol, interval))
+                for month in months_between(start, end):
+                    if month in archived and month < current_month and not overwrite:
+                        report.months_skipped += 1
+                        continue
+                    records = await self._persistence_service.get_market_data_range(
+                        symbol, interval, month, next_month(month) - timedelta(microseconds=1)
+                    )
+                    if not records:
+                        continue
+                    self.archive.write_month(symbol, interval, month, OHLCVFrame.from_records(records, INTERVAL_MS[interval]))
+                    report.files_written += 1
+                    report.rows_written += len(records)
+                    series_key = f"{symbol}-{interval}"
+                    report.rows_by_series[series_key] = report.rows_by_series.get(series_key, 0) + len(records)
+                    logger.info(f"Archivo de velas: {symbol} {interval} {month:%Y-%m} ({len(records)} velas).")
+        return report
+
+
+def _parse_date(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
+
+
+async def _run_cli(args: argparse.Namespace) -> None:
+    import dependencies
+    from adapters.persistence_service import SupabasePersistenceService
+
+    await dependencies.initialize_database()
+    persistence_service = SupabasePersistenceService(session_factory=dependencies._session_factory)
+    service = CandleArchiveService(persistence_service, CandleArchive(args.root))
+    try:
+        report = await service.export(
+            symbols=args.symbols,
+            intervals=args.intervals,
+            start=_parse_date(args.start),
+            end=_parse_date(args.end) if args.end else None,
+            overwrite=args.overwrite
+        )
+        logger.info(report.model_dump_json(indent=2))
+    finally:
+        await persistence_service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta market_data a ficheros Arrow por símbolo, temporalidad y mes.")
+    parser.add_argument("--root", required=True, help="Directorio raíz del archivo de velas")
+    parser.add_argument("--symbols", nargs="+", required=True, help="Símbolos a archivar (ej. BTCUSDT ETHUSDT)")
+    parser.add_argument("--intervals", nargs="+", default=["1m"], help="Temporalidades (ej. 1m 1h)")
+    parser.add_argument("--start", required=True, help="Fecha ISO de inicio (ej. 2021-01-01)")
+    parser.add_argument("--end", default=None, help="Fecha ISO de fin (por defecto, ahora)")
+    parser.add_argument("--overwrite", action="store_true", help="Vuelve a escribir los meses ya archivados")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    asyncio.run(_run_cli(parser.parse_args()))
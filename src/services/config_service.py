@@ -1,6 +1,9 @@
 from __future__ import annotations
+import asyncio
+import json
 import logging
-from typing import Optional, Dict, Any, TYPE_CHECKING
+import time
+from typing import Optional, Dict, Any, Iterable, TYPE_CHECKING
 from uuid import UUID, uuid4
 from datetime import datetime, timezone
 from decimal import Decimal # Importar Decimal
@@ -16,6 +19,8 @@ from core.domain_models.user_configuration_models import (
 )
 from shared.data_types import ServiceName
 from adapters.persistence_service import SupabasePersistenceService
+from adapters.unit_of_work import PersistenceUnitOfWork
+from adapters.redis_cache import RedisCache
 from core.exceptions import (
     ConfigurationError,
     BinanceAPIError,
@@ -32,13 +37,24 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+# Versión de la configuración de cada usuario (INCR en cada guardado) y canal por el que los
+# workers se avisan de que su copia en memoria ha quedado obsoleta.
+CONFIG_VERSION_KEY_PREFIX = "config:version:"
+CONFIG_INVALIDATION_CHANNEL = "config:invalidations"
+
+
 class ConfigurationService:
+    # Sin avisos por Redis, cada cuánto se comprueba (solo updated_at) que la configuración en memoria sigue vigente.
+    CONFIG_CACHE_REVALIDATE_SECONDS = 5.0
+    INVALIDATION_RECONNECT_SECONDS = 5.0
+
     def __init__(
         self, 
         persistence_service: SupabasePersistenceService,
         credential_service: "CredentialService", # Inyectar directamente
         portfolio_service: "PortfolioService",   # Inyectar directamente
-        notification_service: "NotificationService" # Inyectar directamente
+        notification_service: "NotificationService", # Inyectar directamente
+        cache: Optional[RedisCache] = None
     ):
         app_settings = get_app_settings()
         self.persistence_service = persistence_service
@@ -46,6 +62,13 @@ class ConfigurationService:
         self.portfolio_service = portfolio_service
         self.notification_service = notification_service
         self._user_configuration: Optional[UserConfiguration] = None
+        self._user_configuration_validated_at = 0.0
+        self._user_configuration_version = 0
+        self._user_configuration_stale = False
+        self._refresh_lock = asyncio.Lock()
+        self._cache = cache
+        self._invalidation_task: Optional[asyncio.Task] = None
+        self._invalidations_subscribed = False
         self._user_id: UUID = app_settings.FIXED_USER_ID
 
     async def _load_config_from_db(self, user_id: Optional[str] = None) -> UserConfiguration:
@@ -72,36 +95,167 @@ class ConfigurationService:
             return self.get_default_configuration()
 
     async def get_user_configuration(self, user_id: Optional[str] = None) -> UserConfiguration:
-        # Si se proporciona un user_id específico, siempre cargar desde la DB para asegurar la frescura
-        if user_id:
-            return await self._load_config_from_db(user_id)
-        
-        # Si no se proporciona user_id, usar la configuración en caché si existe
-        if self._user_configuration:
-            return self._user_configuration
-        
-        # Si no hay user_id y no hay caché, cargar desde la DB usando el user_id por defecto
-        self._user_configuration = await self._load_config_from_db(str(self._user_id))
-        return self._user_configuration
-    
+        """
+        Configuración del usuario. La del usuario de la aplicación se sirve desde memoria (también
+        cuando se pasa su user_id, como hace el motor de trading en cada oportunidad). Se vuelve a
+        leer una sola vez cuando otro worker avisa por Redis de una versión más reciente; sin esos
+        avisos, cada CONFIG_CACHE_REVALIDATE_SECONDS se comprueba contra la BD, que solo vuelve a
+        leer la fila si su updated_at ha cambiado.
+
+        Se devuelve una copia: quien la modifique (p. ej. el motor de trading antes de confirmar
+        su unidad de trabajo) no altera la caché, que solo se sustituye al guardar.
+        """
+        if user_id and str(user_id) != str(self._user_id):
+            return await self._load_config_from_db(str(user_id))
+
+        if self._user_configuration is None or self._user_configuration_stale:
+            async with self._refresh_lock:
+                # Otra lectura concurrente puede haber refrescado mientras se esperaba el lock.
+                if self._user_configuration is None:
+                    version = await self._read_shared_version()
+                    self._user_configuration = await self._load_config_from_db(str(self._user_id))
+                    self._mark_user_configuration_fresh(version)
+                elif self._user_configuration_stale:
+                    await self._revalidate_user_configuration()
+        elif (not self._invalidations_subscribed
+              and time.monotonic() - self._user_configuration_validated_at >= self.CONFIG_CACHE_REVALIDATE_SECONDS):
+            await self._revalidate_user_configuration()
+        return self._user_configuration.model_copy(deep=True)
+
+    async def _revalidate_user_configuration(self) -> None:
+        version = await self._read_shared_version()
+        try:
+            latest = await self.persistence_service.get_user_configuration(user_id=str(self._user_id))
+        except Exception as e:
+            # Si estaba marcada como obsoleta, lo sigue estando y se reintenta en la siguiente lectura.
+            logger.warning(f"No se pudo revalidar la configuración; se mantiene la versión en memoria: {e}")
+            self._user_configuration_validated_at = time.monotonic()
+            return
+        if latest is not None:
+            self._user_configuration = latest
+        self._mark_user_configuration_fresh(version)
+
+    def _mark_user_configuration_fresh(self, version: int) -> None:
+        self._user_configuration_version = max(self._user_configuration_version, version)
+        self._user_configuration_stale = False
+        self._user_configuration_validated_at = time.monotonic()
+
+    def _version_key(self) -> str:
+        return f"{CONFIG_VERSION_KEY_PREFIX}{self._user_id}"
+
+    async def _read_shared_version(self) -> int:
+        if self._cache is None:
+            return 0
+        value = await self._cache.get(self._version_key())
+        try:
+            return int(value) if value is not None else 0
+        except ValueError:
+            return 0
+
+    async def _publish_new_version(self) -> None:
+        """Incrementa la versión compartida y avisa al resto de workers de que su copia está obsoleta."""
+        if self._cache is None:
+            return
+        version = await self._cache.incr(self._version_key())
+        if version is None:
+            return
+        self._user_configuration_version = max(self._user_configuration_version, version)
+        await self._cache.publish(
+            CONFIG_INVALIDATION_CHANNEL, json.dumps({"user_id": str(self._user_id), "version": version})
+        )
+
+    async def _handle_invalidation(self, message: str) -> None:
+        try:
+            payload = json.loads(message)
+            user_id, version = str(payload["user_id"]), int(payload["version"])
+        except (ValueError, KeyError, TypeError):
+            logger.warning(f"Aviso de invalidación de configuración no válido: {message!r}")
+            return
+        # Los avisos de los guardados propios (o ya vistos) no superan la versión local.
+        if user_id == str(self._user_id) and version > self._user_configuration_version:
+            logger.info(f"Configuración modificada en otro worker (versión {version}); se recargará en la próxima lectura.")
+            self._user_configuration_stale = True
+
+    async def _on_invalidations_subscribed(self) -> None:
+        # Los avisos emitidos mientras no se escuchaba se han perdido: se comprueba la versión compartida.
+        self._invalidations_subscribed = True
+        if await self._read_shared_version() > self._user_configuration_version:
+            self._user_configuration_stale = True
+
+    async def start(self) -> None:
+        """Empieza a escuchar en Redis los avisos de invalidación de otros workers."""
+        if self._cache is None:
+            return
+        if self._invalidation_task is None or self._invalidation_task.done():
+            self._invalidation_task = asyncio.create_task(self._listen_for_invalidations())
+
+    async def _listen_for_invalidations(self) -> None:
+        assert self._cache is not None
+        while True:
+            try:
+                await self._cache.subscribe(
+                    CONFIG_INVALIDATION_CHANNEL, self._handle_invalidation, on_subscribed=self._on_invalidations_subscribed
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Suscripción a invalidaciones de configuración interrumpida: {e}")
+            # Mientras no se escucha, se vuelve a la revalidación periódica contra la BD.
+            self._invalidations_subscribed = False
+            await asyncio.sleep(self.INVALIDATION_RECONNECT_SECONDS)
+
+    async def close(self) -> None:
+        if self._invalidation_task is not None:
+            self._invalidation_task.cancel()
+            try:
+                await self._invalidation_task
+            except asyncio.CancelledError:
+                pass
+            self._invalidation_task = None
+        self._invalidations_subscribed = False
+
     def get_cached_user_configuration(self) -> Optional[UserConfiguration]:
-        return self._user_configuration
+        return self._user_configuration.model_copy(deep=True) if self._user_configuration is not None else None
 
     async def reload_user_configuration(self, user_id: Optional[str] = None) -> UserConfiguration:
+        version = await self._read_shared_version()
         self._user_configuration = await self._load_config_from_db(user_id)
-        return self._user_configuration
+        self._mark_user_configuration_fresh(version)
+        return self._user_configuration.model_copy(deep=True)
 
-    async def save_user_configuration(self, config: UserConfiguration):
+    async def save_user_configuration(self, config: UserConfiguration, unit_of_work: Optional[PersistenceUnitOfWork] = None,
+                                      fields: Optional[Iterable[str]] = None):
+        """
+        Guarda la configuración del usuario. Con `fields` solo se escriben esos campos (p. ej.
+        {"real_trading_settings"}). Con `unit_of_work`, la escritura se registra en ella y la
+        caché se actualiza cuando la unidad de trabajo se confirma. Tras guardar, se incrementa
+        la versión compartida y se avisa al resto de workers.
+        """
         if str(config.user_id) != str(self._user_id):
             raise ConfigurationError("Intentando guardar una configuración para un ID de usuario incorrecto.")
-        
+
+        if unit_of_work is not None:
+            # Se guarda lo que se escribe ahora; si la unidad de trabajo no se confirma, la caché no cambia.
+            written = config.model_copy(deep=True)
+
+            async def update_cache() -> None:
+                self._user_configuration = written
+                await self._publish_new_version()
+            unit_of_work.upsert_user_configuration(config, fields=fields)
+            unit_of_work.after_commit(update_cache)
+            return
+
         try:
-            await self.persistence_service.upsert_user_configuration(config)
+            if fields is None:
+                await self.persistence_service.upsert_user_configuration(config)
+            else:
+                await self.persistence_service.upsert_user_configuration(config, fields=set(fields))
             logger.info("Configuración guardada exitosamente.")
-            self._user_configuration = config
+            self._user_configuration = config.model_copy(deep=True)
         except Exception as e:
             logger.error(f"Error al guardar la configuración: {e}", exc_info=True)
             raise ConfigurationError("No se pudo guardar la configuración.") from e
+        await self._publish_new_version()
 
     def get_default_configuration(self) -> UserConfiguration:
         now = datetime.now(timezone.utc)
@@ -199,7 +353,7 @@ class ConfigurationService:
             raise e
 
         real_settings.real_trading_mode_active = True
-        await self.save_user_configuration(config)
+        await self.save_user_configuration(config, fields={"real_trading_settings"})
         logger.info("Modo de operativa real limitada activado exitosamente.")
         if self.notification_service:
             await self.notification_service.send_real_trading_mode_activated_notification(config)
@@ -210,7 +364,7 @@ class ConfigurationService:
         assert real_settings is not None
         if real_settings.real_trading_mode_active:
             real_settings.real_trading_mode_active = False
-            await self.save_user_configuration(config)
+            await self.save_user_configuration(config, fields={"real_trading_settings"})
             logger.info("Modo de operativa real limitada desactivado.")
         else:
             logger.info("El modo de operativa real limitada ya estaba inactivo.")
@@ -225,7 +379,7 @@ class ConfigurationService:
 
         if current_trades_count < REAL_TRADE_LIMIT_CONFIGURABLE_O_FIJO:
             real_settings.real_trades_executed_count = current_trades_count + 1
-            await self.save_user_configuration(config)
+            await self.save_user_configuration(config, fields={"real_trading_settings"})
             logger.info(f"Contador de operaciones reales incrementado. Nuevo conteo: {real_settings.real_trades_executed_count}")
         else:
             logger.warning(f"Se intentó incrementar el contador de operaciones reales, pero ya se alcanzó el límite de {REAL_TRADE_LIMIT_CONFIGURABLE_O_FIJO}.")
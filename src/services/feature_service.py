@@ -1,7 +1,9 @@
 import pandas as pd
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Union
 
 from core.domain_models.market_data_models import MarketDataORM
+from core.domain_models.ohlcv import OHLCVFrame
+from core.ports.candle_source import ICandleSource
 from features import technical_indicators
 
 class FeatureService:
@@ -9,15 +11,26 @@ class FeatureService:
     Service responsible for calculating and providing features for market data.
     """
 
-    def __init__(self):
+    def __init__(self, candle_source: Optional[ICandleSource] = None):
         # In the future, this could hold configuration for which features to calculate
-        pass
+        self.candle_source = candle_source
 
-    def calculate_all_features(self, market_data: List[MarketDataORM]) -> Dict[str, Any]:
+    async def calculate_features_for_range(self, symbol: str, interval: str, start_time: int, end_time: int) -> Dict[str, Any]:
+        """
+        Loads the candles of (symbol, interval) between start_time and end_time (ms) from the
+        configured candle source (database via KlineStore, or the memory-mapped CandleArchive)
+        and calculates all features on them.
+        """
+        if self.candle_source is None:
+            raise ValueError("FeatureService has no candle source configured.")
+        return self.calculate_all_features(await self.candle_source.get_candles(symbol, interval, start_time, end_time))
+
+    def calculate_all_features(self, market_data: Union[OHLCVFrame, List[MarketDataORM]]) -> Dict[str, Any]:
         """
         Calculates all available technical indicators for the given market data.
+        Accepts an OHLCVFrame (preferred, no per-candle objects) or a list of MarketDataORM rows.
         """
-        if not market_data:
+        if not len(market_data):
             return {}
 
         features = {
@@ -0,0 +1,230 @@
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from adapters.binance_adapter import BinanceAdapter
+from adapters.binance_rate_limiter import RequestPriority
+from core.domain_models.ohlcv import OHLCVFrame
+from core.ports.persistence_service import IPersistenceService
+from services.kline_store import INTERVAL_MS, MAX_KLINES_PER_REQUEST
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_TABLE = "kline_backfill_checkpoints"
+
+
+class BackfillReport(BaseModel):
+    """Resumen de una ejecución de backfill."""
+    series: int = 0
+    batches: int = 0
+    rows_written: int = 0
+    rows_inserted: int = 0
+    rows_updated: int = 0
+    elapsed_seconds: float = 0.0
+    rows_per_second: float = 0.0
+    rows_by_series: Dict[str, int] = Field(default_factory=dict)
+
+
+class KlineBackfillService:
+    """
+    Backfill histórico de velas reanudable.
+
+    Pagina en el tiempo con GET /api/v3/klines (1000 velas por página) para varios
+    (símbolo, temporalidad) en paralelo, siempre con prioridad baja frente al presupuesto de
+    peso de Binance. Cada página se entrega a un único escritor a través de una cola acotada:
+    se persiste como un lote y después se guarda el checkpoint de la serie, de modo que tras
+    una caída el trabajo se reanuda desde la última página escrita sin acumular listas en memoria.
+    """
+    DEFAULT_MAX_CONCURRENT_SERIES = 4
+    DEFAULT_QUEUE_SIZE = 8
+    PROGRESS_LOG_INTERVAL_SECONDS = 10.0
+
+    def __init__(self,
+                 binance_adapter: BinanceAdapter,
+                 persistence_service: IPersistenceService,
+                 max_concurrent_series: int = DEFAULT_MAX_CONCURRENT_SERIES,
+                 queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.binance_adapter = binance_adapter
+        self._persistence_service = persistence_service
+        self.max_concurrent_series = max_concurrent_series
+        self.queue_size = queue_size
+
+    async def get_checkpoint(self, symbol: str, interval: str) -> Optional[Dict[str, Any]]:
+        return await self._persistence_service.get_one(
+            CHECKPOINT_TABLE,
+            "symbol = :symbol AND interval = :interval",
+            {"symbol": symbol, "interval": interval}
+        )
+
+    async def _save_checkpoint(self, symbol: str, interval: str, last_open_time: int, rows_written: int) -> None:
+        await self._persistence_service.upsert(
+            CHECKPOINT_TABLE,
+            {
+                "symbol": symbol,
+                "interval": interval,
+                "last_open_time": last_open_time,
+                "rows_written": rows_written,
+                "updated_at": datetime.now(timezone.utc),
+            },
+            ["symbol", "interval"]
+        )
+
+    async def backfill(self, symbols: List[str], intervals: List[str], start_time: int,
+                       end_time: Optional[int] = None) -> BackfillReport:
+        """
+        Descarga y persiste todas las velas cerradas entre `start_time` y `end_time` (ms)
+        para cada combinación de símbolos y temporalidades.
+        """
+        for interval in intervals:
+            if interval not in INTERVAL_MS:
+                raise ValueError(f"Temporalidad no soportada para backfill: {interval}")
+        end_time = end_time if end_time is not None else int(time.time() * 1000)
+        series = [(self.binance_adapter.normalize_symbol(s), i) for s in symbols for i in intervals]
+
+        report = BackfillReport(series=len(series))
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        started_at = time.monotonic()
+        writer = asyncio.create_task(self._writer(queue, report, started_at))
+        semaphore = asyncio.Semaphore(self.max_concurrent_series)
+
+        async def run_series(symbol: str, interval: str) -> None:
+            async with semaphore:
+                await self._produce_series(queue, symbol, interval, start_time, end_time)
+
+        producers = asyncio.gather(*(run_series(symbol, interval) for symbol, interval in series))
+
+        def stop_producers_if_writer_failed(task: asyncio.Task) -> None:
+            # Si el escritor falla, los productores quedarían bloqueados en la cola llena.
+            if not task.cancelled() and task.exception() is not None:
+                producers.cancel()
+
+        writer.add_done_callback(stop_producers_if_writer_failed)
+        try:
+            try:
+                await producers
+            except asyncio.CancelledError as e:
+                if writer.done() and not writer.cancelled() and writer.exception() is not None:
+                    raise writer.exception() from e
+                raise
+            # El escritor puede fallar con la cola llena: no se espera al centinela si ya ha terminado.
+            sentinel = asyncio.create_task(queue.put(None))
+            await asyncio.wait({sentinel, writer}, return_when=asyncio.FIRST_COMPLETED)
+            sentinel.cancel()
+            await writer
+        except BaseException:
+            producers.cancel()
+            writer.cancel()
+            raise
+
+        report.elapsed_seconds = time.monotonic() - started_at
+        report.rows_per_second = report.rows_written / report.elapsed_seconds if report.elapsed_seconds > 0 else 0.0
+        logger.info(
+            f"Backfill completado: {report.rows_written} velas en {report.elapsed_seconds:.1f}s "
+            f"({report.rows_per_second:.0f} filas/s) para {report.series} series."
+        )
+        return report
+
+    async def _produce_series(self, queue: asyncio.Queue, symbol: str, interval: str,
+                              start_time: int, end_time: int) -> None:
+        interval_ms = INTERVAL_MS[interval]
+        checkpoint = await self.get_checkpoint(symbol, interval)
+        cursor = start_time
+        rows_written = 0
+        if checkpoint:
+            cursor = max(cursor, int(checkpoint["last_open_time"]) + interval_ms)
+            rows_written = int(checkpoint.get("rows_written") or 0)
+            logger.info(f"Reanudando backfill de {symbol}-{interval} desde {cursor}.")
+
+        while cursor <= end_time:
+            frame = await self.binance_adapter.get_klines_frame(
+                symbol=symbol,
+                interval=interval,
+                start_time=cursor,
+                end_time=end_time,
+                limit=MAX_KLINES_PER_REQUEST,
+                priority=RequestPriority.LOW
+            )
+            now_ms = int(time.time() * 1000)
+            # Las velas vienen ordenadas: las cerradas son un prefijo, así que el recorte es una vista.
+            closed_count = int((frame.close_time < now_ms).sum())
+            if not closed_count:
+                break
+            closed = frame[:closed_count]
+            rows_written += closed_count
+            await queue.put((symbol, interval, closed, rows_written))
+            cursor = int(closed.open_time[-1]) + interval_ms
+            if len(frame) < MAX_KLINES_PER_REQUEST or closed_count < len(frame):
+                break
+
+    async def _writer(self, queue: asyncio.Queue, report: BackfillReport, started_at: float) -> None:
+        last_log = time.monotonic()
+        while True:
+            item: Optional[Tuple[str, str, OHLCVFrame, int]] = await queue.get()
+            if item is None:
+                return
+            symbol, interval, klines, rows_written = item
+            counts = await self._persistence_service.bulk_upsert_market_data(klines.to_records(symbol), interval=interval)
+            await self._save_checkpoint(symbol, interval, int(klines.open_time[-1]), rows_written)
+
+            report.batches += 1
+            report.rows_written += len(klines)
+            report.rows_inserted += counts["inserted"]
+            report.rows_updated += counts["updated"]
+            series_key = f"{symbol}-{interval}"
+            report.rows_by_series[series_key] = report.rows_by_series.get(series_key, 0) + len(klines)
+
+            now = time.monotonic()
+            if now - last_log >= self.PROGRESS_LOG_INTERVAL_SECONDS:
+                elapsed = now - started_at
+                logger.info(f"Backfill: {report.rows_written} velas escritas ({report.rows_written / elapsed:.0f} filas/s).")
+                last_log = now
+
+
+def _parse_date_to_ms(value: str) -> int:
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+
+async def _run_cli(args: argparse.Namespace) -> None:
+    import dependencies
+    from adapters.persistence_service import SupabasePersistenceService
+
+    await dependencies.initialize_database()
+    persistence_service = SupabasePersistenceService(
+        session_factory=dependencies._session_factory,
+        bulk_batch_size=args.batch_size or SupabasePersistenceService.DEFAULT_BULK_BATCH_SIZE
+    )
+    binance_adapter = BinanceAdapter()
+    service = KlineBackfillService(binance_adapter, persistence_service, max_concurrent_series=args.concurrency)
+    try:
+        report = await service.backfill(
+            symbols=args.symbols,
+            intervals=args.intervals,
+            start_time=_parse_date_to_ms(args.start),
+            end_time=_parse_date_to_ms(args.end) if args.end else None
+        )
+        logger.info(report.model_dump_json(indent=2))
+    finally:
+        await binance_adapter.close()
+        await persistence_service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill reanudable de velas históricas de Binance en market_data.")
+    parser.add_argument("--symbols", nargs="+", required=True, help="Símbolos a descargar (ej. BTCUSDT ETHUSDT)")
+    parser.add_argument("--intervals", nargs="+", default=["1m"], help="Temporalidades (ej. 1m 5m)")
+    parser.add_argument("--start", required=True, help="Fecha ISO de inicio (ej. 2021-01-01)")
+    parser.add_argument("--end", default=None, help="Fecha ISO de fin (por defecto, ahora)")
+    parser.add_argument("--concurrency", type=int, default=KlineBackfillService.DEFAULT_MAX_CONCURRENT_SERIES,
+                        help="Número de series descargadas en paralelo")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help="Filas por lote de escritura en market_data (por defecto, el del servicio de persistencia)")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    asyncio.run(_run_cli(parser.parse_args()))
@@ -0,0 +1,391 @@
+import asyncio
+import bisect
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+from adapters.binance_adapter import BinanceAdapter
+from adapters.binance_rate_limiter import RequestPriority
+from core.domain_models.ohlcv import OHLCVFrame
+from core.ports.candle_source import ICandleSource
+from core.ports.persistence_service import IPersistenceService
+
+logger = logging.getLogger(__name__)
+
+# Duración de cada temporalidad de Binance en milisegundos. "1M" (mes) no tiene duración fija
+# y se sirve sin caché.
+INTERVAL_MS: Dict[str, int] = {
+    "1s": 1_000,
+    "1m": 60_000,
+    "3m": 3 * 60_000,
+    "5m": 5 * 60_000,
+    "15m": 15 * 60_000,
+    "30m": 30 * 60_000,
+    "1h": 3_600_000,
+    "2h": 2 * 3_600_000,
+    "4h": 4 * 3_600_000,
+    "6h": 6 * 3_600_000,
+    "8h": 8 * 3_600_000,
+    "12h": 12 * 3_600_000,
+    "1d": 86_400_000,
+    "3d": 3 * 86_400_000,
+    "1w": 7 * 86_400_000,
+}
+# Las velas semanales abren el lunes; el epoch Unix cae en jueves.
+INTERVAL_OFFSET_MS: Dict[str, int] = {"1w": 4 * 86_400_000}
+
+MAX_KLINES_PER_REQUEST = 1000
+
+
+def kline_to_dict(kline: List[Any]) -> Dict[str, Any]:
+    """Convierte una fila de kline de la API REST de Binance al diccionario expuesto por la API."""
+    return {
+        "open_time": kline[0],
+        "open": float(kline[1]),
+        "high": float(kline[2]),
+        "low": float(kline[3]),
+        "close": float(kline[4]),
+        "volume": float(kline[5]),
+        "close_time": kline[6],
+        "quote_asset_volume": float(kline[7]),
+        "number_of_trades": kline[8],
+        "taker_buy_base_asset_volume": float(kline[9]),
+        "taker_buy_quote_asset_volume": float(kline[10])
+    }
+
+
+def kline_event_to_dict(kline: Dict[str, Any]) -> Dict[str, Any]:
+    """Convierte el objeto "k" de un evento <symbol>@kline_<interval> al mismo diccionario que kline_to_dict."""
+    return {
+        "open_time": kline["t"],
+        "open": float(kline["o"]),
+        "high": float(kline["h"]),
+        "low": float(kline["l"]),
+        "close": float(kline["c"]),
+        "volume": float(kline["v"]),
+        "close_time": kline["T"],
+        "quote_asset_volume": float(kline["q"]),
+        "number_of_trades": kline["n"],
+        "taker_buy_base_asset_volume": float(kline["V"]),
+        "taker_buy_quote_asset_volume": float(kline["Q"])
+    }
+
+
+class KlineSeries:
+    """
+    Buffer circular de velas de un (símbolo, temporalidad), indexado por open_time.
+
+    Distingue las velas finales (obtenidas después de su cierre) de las que estaban en
+    formación cuando se obtuvieron; estas últimas solo se consideran válidas durante un TTL.
+    """
+
+    def __init__(self, interval_ms: int, offset_ms: int, capacity: int):
+        self.interval_ms = interval_ms
+        self.offset_ms = offset_ms
+        self.capacity = capacity
+        self._candles: Dict[int, Dict[str, Any]] = {}
+        self._open_times: List[int] = []
+        self._final: Set[int] = set()
+        self._fetched_at: Dict[int, float] = {}
+        self._absent: Set[int] = set()  # open_time cerrados sin vela en Binance (mantenimiento, antes del listado)
+        self.lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._open_times)
+
+    def align(self, timestamp_ms: int) -> int:
+        """Devuelve el open_time de la vela que contiene `timestamp_ms`."""
+        return (timestamp_ms - self.offset_ms) // self.interval_ms * self.interval_ms + self.offset_ms
+
+    def is_final(self, open_time: int) -> bool:
+        return open_time in self._final
+
+    def is_fresh(self, open_time: int, max_age_seconds: float) -> bool:
+        if open_time in self._final or open_time in self._absent:
+            return True
+        fetched_at = self._fetched_at.get(open_time)
+        return fetched_at is not None and time.monotonic() - fetched_at <= max_age_seconds
+
+    def upsert(self, candle: Dict[str, Any], now_ms: int, final: Optional[bool] = None) -> bool:
+        """
+        Inserta o reemplaza una vela. Devuelve True si la vela pasa a ser final en esta
+        operación (es decir, debe persistirse). `final` permite indicarlo explícitamente
+        (flag "x" de los eventos kline); si es None se deduce de close_time.
+        """
+        open_time = candle["open_time"]
+        if open_time not in self._candles:
+            if not self._open_times or open_time > self._open_times[-1]:
+                self._open_times.append(open_time)
+            else:
+                bisect.insort(self._open_times, open_time)
+        self._candles[open_time] = candle
+        became_final = False
+        if final is None:
+            final = candle["close_time"] < now_ms
+        if final:
+            became_final = open_time not in self._final
+            self._final.add(open_time)
+            self._fetched_at.pop(open_time, None)
+        else:
+            self._fetched_at[open_time] = time.monotonic()
+        self._absent.discard(open_time)
+        self._evict()
+        return became_final
+
+    def mark_absent(self, open_time: int) -> None:
+        if open_time not in self._candles:
+            self._absent.add(open_time)
+
+    def _evict(self) -> None:
+        overflow = len(self._open_times) - self.capacity
+        if overflow <= 0:
+            return
+        for open_time in self._open_times[:overflow]:
+            self._candles.pop(open_time, None)
+            self._final.discard(open_time)
+            self._fetched_at.pop(open_time, None)
+        del self._open_times[:overflow]
+        oldest = self._open_times[0] if self._open_times else 0
+        self._absent = {t for t in self._absent if t >= oldest}
+
+    def range(self, first_open_time: int, last_open_time: int) -> List[Dict[str, Any]]:
+        lo = bisect.bisect_left(self._open_times, first_open_time)
+        hi = bisect.bisect_right(self._open_times, last_open_time)
+        return [self._candles[t] for t in self._open_times[lo:hi]]
+
+    def tail(self, limit: int) -> List[Dict[str, Any]]:
+        return [self._candles[t] for t in self._open_times[-limit:]] if limit > 0 else []
+
+
+class KlineStore(ICandleSource):
+    """
+    Almacén read-through de velas por (símbolo, temporalidad).
+
+    Mantiene un buffer en memoria por serie, calcula qué tramos de la ventana pedida faltan
+    (o tienen la vela en formación caducada), completa las velas cerradas que ya estén en la
+    tabla market_data, descarga de Binance solo lo que siga faltando y persiste únicamente las
+    velas cerradas que no se habían guardado antes.
+    """
+    DEFAULT_CAPACITY = 5000
+    FORMING_CANDLE_TTL_SECONDS = 5.0
+
+    def __init__(self,
+                 binance_adapter: BinanceAdapter,
+                 persistence_service: IPersistenceService,
+                 capacity: int = DEFAULT_CAPACITY,
+                 forming_candle_ttl_seconds: float = FORMING_CANDLE_TTL_SECONDS):
+        self.binance_adapter = binance_adapter
+        self._persistence_service = persistence_service
+        self.capacity = capacity
+        self.forming_candle_ttl_seconds = forming_candle_ttl_seconds
+        self._series: Dict[Tuple[str, str], KlineSeries] = {}
+
+    def get_series(self, symbol: str, interval: str) -> Optional[KlineSeries]:
+        """Devuelve (creándola si hace falta) la serie de un símbolo ya normalizado, o None si la temporalidad no se cachea."""
+        interval_ms = INTERVAL_MS.get(interval)
+        if interval_ms is None:
+            return None
+        key = (symbol, interval)
+        series = self._series.get(key)
+        if series is None:
+            series = KlineSeries(interval_ms, INTERVAL_OFFSET_MS.get(interval, 0), self.capacity)
+            self._series[key] = series
+        return series
+
+    async def get_klines(self, symbol: str, interval: str, limit: int = 200,
+                         start_time: Optional[int] = None, end_time: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Devuelve las velas de la ventana pedida con la misma semántica que GET /api/v3/klines,
+        sirviendo desde memoria o desde market_data todo lo disponible y descargando solo los
+        tramos que faltan. Las velas leídas de market_data no traen los campos que la tabla no
+        guarda (volumen en quote, número de operaciones, volúmenes taker), que quedan a cero.
+        """
+        symbol = self.binance_adapter.normalize_symbol(symbol)
+        limit = max(1, min(limit, MAX_KLINES_PER_REQUEST))
+        series = self.get_series(symbol, interval)
+        if series is None:
+            return await self._fetch_uncached(symbol, interval, limit, start_time, end_time)
+
+        now_ms = int(time.time() * 1000)
+        first, last = self._target_window(series, now_ms, limit, start_time, end_time)
+        if last < first:
+            return []
+
+        async with series.lock:
+            missing_ranges = self._missing_ranges(series, first, last)
+            if missing_ranges and await self._load_stored(series, symbol, interval, missing_ranges, now_ms):
+                missing_ranges = self._missing_ranges(series, first, last)
+            new_final_candles: List[Dict[str, Any]] = []
+            for range_start, range_end in missing_ranges:
+                new_final_candles.extend(await self._fetch_range(series, symbol, interval, range_start, range_end))
+            candles = [dict(c) for c in series.range(first, last)]
+
+        if new_final_candles:
+            await self.persist(symbol, interval, new_final_candles)
+        if missing_ranges:
+            logger.debug(f"KlineStore {symbol}-{interval}: {len(missing_ranges)} tramos descargados, {len(candles)} velas servidas.")
+        return candles[-limit:] if start_time is None else candles[:limit]
+
+    async def get_klines_frame(self, symbol: str, interval: str, limit: int = 200,
+                               start_time: Optional[int] = None, end_time: Optional[int] = None) -> OHLCVFrame:
+        """Igual que get_klines, pero devuelve la ventana como un OHLCVFrame columnar."""
+        return OHLCVFrame.from_dicts(await self.get_klines(symbol, interval, limit=limit, start_time=start_time, end_time=end_time))
+
+    @staticmethod
+    def _target_window(series: KlineSeries, now_ms: int, limit: int,
+                       start_time: Optional[int], end_time: Optional[int]) -> Tuple[int, int]:
+        current_open = series.align(now_ms)
+        upper = current_open if end_time is None else min(series.align(end_time), current_open)
+        if start_time is not None:
+            first = series.align(start_time)
+            if first < start_time:
+                first += series.interval_ms
+            return first, min(first + (limit - 1) * series.interval_ms, upper)
+        return upper - (limit - 1) * series.interval_ms, upper
+
+    def _missing_ranges(self, series: KlineSeries, first: int, last: int) -> List[Tuple[int, int]]:
+        """Agrupa en tramos contiguos los open_time que faltan o no están frescos."""
+        ranges: List[Tuple[int, int]] = []
+        range_start: Optional[int] = None
+        open_time = first
+        while open_time <= last:
+            if series.is_fresh(open_time, self.forming_candle_ttl_seconds):
+                if range_start is not None:
+                    ranges.append((range_start, open_time - series.interval_ms))
+                    range_start = None
+            elif range_start is None:
+                range_start = open_time
+            open_time += series.interval_ms
+        if range_start is not None:
+            ranges.append((range_start, last))
+        return ranges
+
+    def apply_stream_kline(self, symbol: str, interval: str, kline: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """
+        Aplica un evento de kline del WebSocket: la vela en formación se reemplaza en su sitio
+        y las cerradas quedan como finales. Devuelve la vela y si acaba de cerrarse.
+        """
+        candle = kline_event_to_dict(kline)
+        closed = bool(kline.get("x"))
+        series = self.get_series(symbol, interval)
+        if series is None:
+            return candle, closed
+        return candle, series.upsert(candle, int(time.time() * 1000), final=closed)
+
+    def get_cached_klines(self, symbol: str, interval: str, limit: int = 200) -> List[Dict[str, Any]]:
+        """Devuelve las últimas `limit` velas en memoria (incluida la que está en formación) sin llamar a Binance."""
+        series = self._series.get((self.binance_adapter.normalize_symbol(symbol), interval))
+        if series is None:
+            return []
+        return [dict(c) for c in series.tail(limit)]
+
+    async def _load_stored(self, series: KlineSeries, symbol: str, interval: str,
+                           missing_ranges: List[Tuple[int, int]], now_ms: int) -> int:
+        """
+        Completa la serie con las velas cerradas de los tramos que faltan que ya están en
+        market_data (p. ej. tras un reinicio o una expulsión del buffer). Devuelve cuántas se cargaron.
+        """
+        start = missing_ranges[0][0]
+        end = min(missing_ranges[-1][1], series.align(now_ms) - series.interval_ms)
+        if end < start:
+            return 0
+        try:
+            records = await self._persistence_service.get_market_data_range(
+                symbol, interval,
+                datetime.fromtimestamp(start / 1000, tz=timezone.utc),
+                datetime.fromtimestamp(end / 1000, tz=timezone.utc),
+            )
+        except Exception as e:
+            logger.warning(f"KlineStore {symbol}-{interval}: no se pudieron leer las velas guardadas, se descargarán: {e}")
+            return 0
+        loaded = 0
+        for candle in OHLCVFrame.from_records(records, series.interval_ms).to_dicts():
+            if not series.is_final(candle["open_time"]):
+                # Ya están guardadas: no se vuelven a persistir.
+                series.upsert(candle, now_ms, final=True)
+                loaded += 1
+        return loaded
+
+    async def _fetch_range(self, series: KlineSeries, symbol: str, interval: str,
+                           range_start: int, range_end: int) -> List[Dict[str, Any]]:
+        new_final_candles: List[Dict[str, Any]] = []
+        chunk_start = range_start
+        while chunk_start <= range_end:
+            chunk_count = min((range_end - chunk_start) // series.interval_ms + 1, MAX_KLINES_PER_REQUEST)
+            chunk_end = chunk_start + (chunk_count - 1) * series.interval_ms
+            klines = await self.binance_adapter.get_klines(
+                symbol=symbol,
+                interval=interval,
+                start_time=chunk_start,
+                end_time=chunk_end + series.interval_ms - 1,
+                limit=chunk_count,
+                priority=RequestPriority.NORMAL
+            )
+            now_ms = int(time.time() * 1000)
+            for kline in klines:
+                candle = kline_to_dict(kline)
+                if series.upsert(candle, now_ms):
+                    new_final_candles.append(candle)
+            if len(klines) < chunk_count:
+                returned = {kline[0] for kline in klines}
+                for open_time in range(chunk_start, chunk_end + 1, series.interval_ms):
+                    if open_time not in returned and open_time + series.interval_ms <= now_ms:
+                        series.mark_absent(open_time)
+            chunk_start = chunk_end + series.interval_ms
+        return new_final_candles
+
+    async def _fetch_uncached(self, symbol: str, interval: str, limit: int,
+                              start_time: Optional[int], end_time: Optional[int]) -> List[Dict[str, Any]]:
+        frame = await self.binance_adapter.get_klines_frame(
+            symbol=symbol,
+            interval=interval,
+            start_time=start_time,
+            end_time=end_time,
+            limit=limit,
+            priority=RequestPriority.NORMAL
+        )
+        # La vela en formación no se guarda: persist solo recibe velas cerradas.
+        await self.persist(symbol, interval, frame[frame.close_time < int(time.time() * 1000)])
+        return frame.to_dicts()
+
+    async def persist(self, symbol: str, interval: str, candles: Union[List[Dict[str, Any]], OHLCVFrame]) -> None:
+        """Guarda velas cerradas en la tabla market_data con su temporalidad."""
+        if not len(candles):
+            return
+        if isinstance(candles, OHLCVFrame):
+            records = candles.to_records(symbol)
+        else:
+            records = [
+                (
+                    symbol,
+                    datetime.fromtimestamp(candle["open_time"] / 1000, tz=timezone.utc),
+                    candle["open"],
+                    candle["high"],
+                    candle["low"],
+                    candle["close"],
+                    candle["volume"]
+                )
+                for candle in candles
+            ]
+        await self._persistence_service.bulk_upsert_market_data(records, interval=interval)
+
+    async def get_stored_klines_frame(self, symbol: str, interval: str, start_time: int, end_time: int) -> OHLCVFrame:
+        """
+        Lee de market_data (sin llamar a Binance) las velas guardadas con open_time en
+        [start_time, end_time], p. ej. para backtests y gráficos de rangos largos. En PostgreSQL
+        la consulta solo recorre las particiones de esa temporalidad y esos meses.
+        """
+        interval_ms = INTERVAL_MS.get(interval)
+        if interval_ms is None:
+            raise ValueError(f"Temporalidad no soportada para lecturas de market_data: '{interval}'")
+        records = await self._persistence_service.get_market_data_range(
+            self.binance_adapter.normalize_symbol(symbol),
+            interval,
+            datetime.fromtimestamp(start_time / 1000, tz=timezone.utc),
+            datetime.fromtimestamp(end_time / 1000, tz=timezone.utc),
+        )
+        return OHLCVFrame.from_records(records, interval_ms)
+
+    async def get_candles(self, symbol: str, interval: str, start_time: int, end_time: int) -> OHLCVFrame:
+        return await self.get_stored_klines_frame(symbol, interval, start_time, end_time)
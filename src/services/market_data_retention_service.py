@@ -0,0 +1,173 @@
+"""
+Retención y agregación de velas en market_data.
+
+Cada política indica una temporalidad fina, la temporalidad a la que se agrega y cuántos días
+se conserva la fina. Pasado ese horizonte, cada mes completo de velas finas se agrega en velas
+de la temporalidad destino y después se elimina (DETACH + DROP de su partición en PostgreSQL).
+Agregar y eliminar son pasos idempotentes: si el proceso se interrumpe entre ambos, la
+siguiente ejecución repite la agregación sin duplicar velas y completa la eliminación.
+
+La retención es opcional: sin MARKET_DATA_RETENTION_POLICIES ("fina:destino:días" separadas por
+comas) no hay políticas y el job no elimina nada. Con políticas configuradas se ejecuta
+periódicamente desde el contenedor de dependencias o a mano:
+
+    python -m services.market_data_retention_service [--now 2024-06-01]
+"""
+import argparse
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence
+
+from pydantic import BaseModel, Field
+
+from adapters.market_data_partitions import month_start, next_month
+from core.ports.persistence_service import IPersistenceService
+from services.kline_store import INTERVAL_MS, INTERVAL_OFFSET_MS
+
+logger = logging.getLogger(__name__)
+
+DAY_MS = 86_400_000
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """Conserva `source_interval` durante `retain_days` días y después lo agrega en `target_interval`."""
+    source_interval: str
+    target_interval: str
+    retain_days: int
+
+    def validate(self) -> None:
+        for interval in (self.source_interval, self.target_interval):
+            if interval not in INTERVAL_MS or interval in INTERVAL_OFFSET_MS:
+                raise ValueError(f"Temporalidad no soportada en la política de retención: '{interval}'")
+        source_ms, target_ms = INTERVAL_MS[self.source_interval], INTERVAL_MS[self.target_interval]
+        if target_ms <= source_ms or target_ms % source_ms:
+            raise ValueError(f"{self.target_interval} no es un múltiplo mayor de {self.source_interval}.")
+        # Con cubos que dividen el día, ninguna vela agregada cruza el límite entre dos meses.
+        if DAY_MS % target_ms:
+            raise ValueError(f"La temporalidad destino {self.target_interval} debe dividir el día.")
+        if self.retain_days < 1:
+            raise ValueError("retain_days debe ser al menos 1.")
+
+    @classmethod
+    def parse_list(cls, value: str) -> List["RetentionPolicy"]:
+        """Interpreta "1m:1h:90,5m:1h:180"."""
+        policies = []
+        for item in value.split(","):
+            if not item.strip():
+                continue
+            source, target, days = item.strip().split(":")
+            policies.append(cls(source, target, int(days)))
+        return policies
+
+
+class RetentionReport(BaseModel):
+    """Resumen de una ejecución del job de retención."""
+    months_processed: int = 0
+    candles_created: int = 0
+    partitions_dropped: int = 0
+    months_by_interval: Dict[str, List[str]] = Field(default_factory=dict)
+
+
+class MarketDataRetentionService:
+    """Job periódico que agrega y elimina las velas finas que han superado su horizonte de retención."""
+    DEFAULT_RUN_INTERVAL_SECONDS = 6 * 3600
+
+    def __init__(self,
+                 persistence_service: IPersistenceService,
+                 policies: Optional[Sequence[RetentionPolicy]] = None,
+                 run_interval_seconds: float = DEFAULT_RUN_INTERVAL_SECONDS):
+        if policies is None:
+            configured = os.environ.get("MARKET_DATA_RETENTION_POLICIES")
+            # Sin configuración explícita no se elimina ninguna vela: el histórico fino se conserva.
+            policies = RetentionPolicy.parse_list(configured) if configured else []
+        for policy in policies:
+            policy.validate()
+        self._persistence_service = persistence_service
+        self.policies = list(policies)
+        self.run_interval_seconds = run_interval_seconds
+        self._run_task: Optional[asyncio.Task] = None
+
+    async def run_once(self, now: Optional[datetime] = None) -> RetentionReport:
+        """Procesa, para cada política, los meses completos anteriores al horizonte de retención."""
+        now = now or datetime.now(timezone.utc)
+        report = RetentionReport()
+        for policy in self.policies:
+            horizon = month_start(now - timedelta(days=policy.retain_days))
+            bucket_seconds = INTERVAL_MS[policy.target_interval] // 1000
+            months = await self._persistence_service.get_market_data_months(policy.source_interval, before=horizon)
+            for month in months:
+                report.candles_created += await self._persistence_service.rollup_market_data(
+                    policy.source_interval, policy.target_interval, bucket_seconds, month, next_month(month)
+                )
+                if await self._persistence_service.drop_market_data_month(policy.source_interval, month):
+                    report.partitions_dropped += 1
+                report.months_processed += 1
+                report.months_by_interval.setdefault(policy.source_interval, []).append(f"{month:%Y-%m}")
+        if report.months_processed:
+            logger.info(
+                f"Retención de market_data: {report.months_processed} meses procesados, "
+                f"{report.candles_created} velas agregadas, {report.partitions_dropped} particiones eliminadas."
+            )
+        return report
+
+    async def start(self) -> None:
+        """Arranca la ejecución periódica del job en segundo plano si hay políticas configuradas."""
+        if not self.policies:
+            logger.info("Retención de market_data desactivada: MARKET_DATA_RETENTION_POLICIES no está configurado.")
+            return
+        for policy in self.policies:
+            logger.info(
+                f"Retención de market_data: las velas {policy.source_interval} de más de {policy.retain_days} días "
+                f"se agregarán en {policy.target_interval} y se eliminarán."
+            )
+        if self._run_task is None or self._run_task.done():
+            self._run_task = asyncio.create_task(self._run_loop())
+
+    async def _run_loop(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error en el job de retención de market_data: {e}", exc_info=True)
+            await asyncio.sleep(self.run_interval_seconds)
+
+    async def close(self) -> None:
+        if self._run_task is not None:
+            self._run_task.cancel()
+            try:
+                await self._run_task
+            except asyncio.CancelledError:
+                pass
+            self._run_task = None
+
+
+async def _run_cli(args: argparse.Namespace) -> None:
+    import dependencies
+    from adapters.persistence_service import SupabasePersistenceService
+
+    await dependencies.initialize_database()
+    persistence_service = SupabasePersistenceService(session_factory=dependencies._session_factory)
+    policies = RetentionPolicy.parse_list(args.policies) if args.policies else None
+    service = MarketDataRetentionService(persistence_service, policies=policies)
+    now = datetime.fromisoformat(args.now) if args.now else None
+    if now is not None and now.tzinfo is None:
+        now = now.replace(tzinfo=timezone.utc)
+    try:
+        report = await service.run_once(now)
+        logger.info(report.model_dump_json(indent=2))
+    finally:
+        await persistence_service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agrega y elimina las velas de market_data fuera del horizonte de retención.")
+    parser.add_argument("--policies", default=None, help='Políticas "fina:destino:días" separadas por comas (ej. 1m:1h:90)')
+    parser.add_argument("--now", default=None, help="Fecha ISO de referencia (por defecto, ahora)")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    asyncio.run(_run_cli(parser.parse_args()))
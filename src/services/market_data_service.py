@@ -1,16 +1,17 @@
 import logging
 import logging
-from typing import List, Optional, Dict, Set, Callable, Any
+from typing import List, Optional, Dict, Set, Callable, Any, Tuple
 from uuid import UUID
 from fastapi import Depends
 
 from shared.data_types import AssetBalance, ServiceName, BinanceConnectionStatus
-from core.domain_models.market_data_models import MarketDataORM
 from adapters.binance_adapter import BinanceAdapter
+from services.kline_store import KlineStore
+from core.domain_models.ohlcv import OHLCVFrame
 from services.credential_service import CredentialService
 from core.ports.persistence_service import IPersistenceService
 from core.exceptions import BinanceAPIError, CredentialError, UltiBotError, ExternalAPIError, MarketDataError, MarketDataValidationError
-from datetime import datetime, timezone
+from datetime import datetime
 import asyncio
 
 logger = logging.getLogger(__name__)
@@ -19,6 +20,9 @@ class MarketDataService:
     """
     Servicio para obtener datos de mercado, incluyendo balances de exchanges y streams en tiempo real.
     """
+    MAX_CONCURRENT_TICKER_REQUESTS = 8
+    ALL_TICKERS_THRESHOLD = 100 # Por encima de este número de símbolos se pide el listado completo
+
     def __init__(self, 
                  credential_service: CredentialService, 
                  binance_adapter: BinanceAdapter,
@@ -27,7 +31,10 @@ class MarketDataService:
         self.credential_service = credential_service
         self.binance_adapter = binance_adapter
         self._persistence_service = persistence_service
-        self._active_websocket_tasks: Dict[str, asyncio.Task] = {}
+        self.kline_store = KlineStore(binance_adapter, persistence_service)
+        self._active_stream_subscriptions: Dict[str, Callable] = {}
+        self._kline_stream_subscriptions: Dict[Tuple[str, str], Callable] = {}
+        self._candle_closed_listeners: Dict[Tuple[str, str], List[Callable]] = {}
         self._closed = False
         self._invalid_symbols_cache: Set[str] = set()
         self._cache_expiration = {}
@@ -129,6 +136,10 @@ class MarketDataService:
         """
         Obtiene datos de mercado (precio actual, cambio 24h, volumen 24h) para una lista de símbolos
         usando la API REST de Binance.
+
+        Todos los símbolos se resuelven con una única llamada multi-símbolo (o con el listado completo
+        de tickers si la lista es muy grande). Solo los símbolos que no se obtienen en lote se consultan
+        individualmente, con concurrencia acotada.
         """
         if self._closed:
             logger.warning("MarketDataService está cerrado. No se pueden obtener datos de mercado REST.")
@@ -140,44 +151,121 @@ class MarketDataService:
             if symbol in self._invalid_symbols_cache:
                 self._invalid_symbols_cache.remove(symbol)
                 del self._cache_expiration[symbol]
-                
-        market_data = {}
+
+        results: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        pending: Dict[str, List[str]] = {}  # símbolo normalizado -> símbolos originales, en orden
         for original_symbol in symbols:
+            if original_symbol in self._invalid_symbols_cache:
+                logger.debug(f"Símbolo inválido (en caché): {original_symbol}. Saltando solicitud a Binance API.")
+                results[original_symbol] = (original_symbol, {"error": "Símbolo inválido (caché)"})
+                continue
             try:
-                if original_symbol in self._invalid_symbols_cache:
-                    logger.debug(f"Símbolo inválido (en caché): {original_symbol}. Saltando solicitud a Binance API.")
-                    market_data[original_symbol] = {"error": "Símbolo inválido (caché)"}
-                    continue
-                
                 binance_formatted_symbol = self.binance_adapter.normalize_symbol(original_symbol)
-                
-                ticker_data = await self.binance_adapter.get_ticker_24hr(binance_formatted_symbol)
-                market_data[binance_formatted_symbol] = { # Cambiado de original_symbol a binance_formatted_symbol
-                    "lastPrice": float(ticker_data.get("lastPrice", 0)),
-                    "priceChangePercent": float(ticker_data.get("priceChangePercent", 0)),
-                    "quoteVolume": float(ticker_data.get("quoteVolume", 0))
-                }
-                logger.info(f"Datos REST de {original_symbol} (consultado como {binance_formatted_symbol}) obtenidos.")
             except ValueError as ve:
                 logger.error(f"Símbolo inválido recibido: {original_symbol} - {ve}")
-                market_data[original_symbol] = {"error": f"Símbolo inválido: {ve}"}
-                self._invalid_symbols_cache.add(original_symbol)
-                self._cache_expiration[original_symbol] = current_time + 86400
-            except BinanceAPIError as e:
-                error_msg = str(e)
-                if "Invalid symbol" in error_msg:
-                    logger.warning(f"Símbolo inválido detectado: {original_symbol}. Agregando a caché.")
-                    self._invalid_symbols_cache.add(original_symbol)
-                    current_time = datetime.now().timestamp()
-                    self._cache_expiration[original_symbol] = current_time + 86400
-                else:
-                    logger.error(f"Error al obtener datos REST de {original_symbol}: {e}")
-                market_data[original_symbol] = {"error": error_msg}
-            except Exception as e:
-                logger.critical(f"Error inesperado al obtener datos REST de {original_symbol}: {e}", exc_info=True)
-                market_data[original_symbol] = {"error": "Error inesperado"}
+                results[original_symbol] = (original_symbol, {"error": f"Símbolo inválido: {ve}"})
+                self._mark_symbol_invalid(original_symbol)
+                continue
+            # "BTC/USDT" y "BTCUSDT" se consultan una sola vez y el resultado se asigna a ambos.
+            pending.setdefault(binance_formatted_symbol, []).append(original_symbol)
+
+        batch_tickers = await self._fetch_tickers_batch(list(pending)) if pending else {}
+
+        fallback_symbols = []
+        for binance_formatted_symbol, original_symbols in pending.items():
+            ticker_data = batch_tickers.get(binance_formatted_symbol)
+            if ticker_data is None:
+                fallback_symbols.append(binance_formatted_symbol)
+                continue
+            formatted = self._format_ticker_data(ticker_data)
+            for original_symbol in original_symbols:
+                results[original_symbol] = (binance_formatted_symbol, formatted)
+
+        if fallback_symbols:
+            logger.info(f"Consultando individualmente {len(fallback_symbols)} símbolos no resueltos en lote.")
+            semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_TICKER_REQUESTS)
+            fallback_results = await asyncio.gather(*(
+                self._fetch_single_ticker(pending[s][0], s, semaphore) for s in fallback_symbols
+            ))
+            for binance_formatted_symbol, (key, value) in zip(fallback_symbols, fallback_results, strict=True):
+                first_symbol, *other_symbols = pending[binance_formatted_symbol]
+                results[first_symbol] = (key, value)
+                for original_symbol in other_symbols:
+                    if "error" not in value:
+                        results[original_symbol] = (key, value)
+                        continue
+                    # Los errores se publican bajo el símbolo pedido, como en _fetch_single_ticker.
+                    results[original_symbol] = (original_symbol, value)
+                    if first_symbol in self._invalid_symbols_cache:
+                        self._mark_symbol_invalid(original_symbol)
+
+        market_data = {}
+        for original_symbol in symbols:
+            if original_symbol in results:
+                key, value = results[original_symbol]
+                market_data[key] = value
+        logger.info(f"Datos REST obtenidos para {len(pending)} símbolos ({len(fallback_symbols)} consultados individualmente).")
         return market_data
 
+    def _mark_symbol_invalid(self, symbol: str) -> None:
+        """Registra un símbolo en la caché de símbolos inválidos durante 24 horas."""
+        self._invalid_symbols_cache.add(symbol)
+        self._cache_expiration[symbol] = datetime.now().timestamp() + 86400
+
+    @staticmethod
+    def _format_ticker_data(ticker_data: Dict[str, Any]) -> Dict[str, float]:
+        return {
+            "lastPrice": float(ticker_data.get("lastPrice", 0)),
+            "priceChangePercent": float(ticker_data.get("priceChangePercent", 0)),
+            "quoteVolume": float(ticker_data.get("quoteVolume", 0))
+        }
+
+    async def _fetch_tickers_batch(self, binance_symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Obtiene los tickers 24hr de varios símbolos con una sola solicitud.
+        Los símbolos repetidos se consultan una vez, conservando el orden. Devuelve un diccionario
+        vacío si la solicitud en lote falla; los símbolos se resolverán entonces individualmente.
+        """
+        binance_symbols = list(dict.fromkeys(binance_symbols))
+        try:
+            if len(binance_symbols) > self.ALL_TICKERS_THRESHOLD:
+                tickers = await self.binance_adapter.get_all_tickers_24hr()
+            else:
+                tickers = await self.binance_adapter.get_tickers_24hr(binance_symbols)
+        except BinanceAPIError as e:
+            logger.warning(f"Fallo en la solicitud de tickers en lote, se consultará por símbolo: {e}")
+            return {}
+        except Exception as e:
+            logger.error(f"Error inesperado en la solicitud de tickers en lote: {e}", exc_info=True)
+            return {}
+        return {ticker.get("symbol"): ticker for ticker in tickers or [] if isinstance(ticker, dict)}
+
+    async def _fetch_single_ticker(self, original_symbol: str, binance_formatted_symbol: str, semaphore: asyncio.Semaphore) -> Tuple[str, Dict[str, Any]]:
+        """
+        Obtiene el ticker 24hr de un único símbolo. Devuelve la clave bajo la que debe publicarse
+        el resultado y los datos (o el diccionario de error).
+        """
+        try:
+            async with semaphore:
+                ticker_data = await self.binance_adapter.get_ticker_24hr(binance_formatted_symbol)
+            logger.info(f"Datos REST de {original_symbol} (consultado como {binance_formatted_symbol}) obtenidos.")
+            return binance_formatted_symbol, self._format_ticker_data(ticker_data)
+        except ValueError as ve:
+            logger.error(f"Símbolo inválido recibido: {original_symbol} - {ve}")
+            self._mark_symbol_invalid(original_symbol)
+            return original_symbol, {"error": f"Símbolo inválido: {ve}"}
+        except BinanceAPIError as e:
+            error_msg = str(e)
+            if "Invalid symbol" in error_msg:
+                logger.warning(f"Símbolo inválido detectado: {original_symbol}. Agregando a caché.")
+                self._mark_symbol_invalid(original_symbol)
+            else:
+                logger.error(f"Error al obtener datos REST de {original_symbol}: {e}")
+            return original_symbol, {"error": error_msg}
+        except Exception as e:
+            logger.critical(f"Error inesperado al obtener datos REST de {original_symbol}: {e}", exc_info=True)
+            return original_symbol, {"error": "Error inesperado"}
+
     async def get_ticker_24hr(self, symbol: str) -> Dict[str, Any]:
         """
         Obtiene estadísticas de cambio de precio de 24 horas para un símbolo específico.
@@ -228,15 +316,16 @@ class MarketDataService:
     async def subscribe_to_market_data_websocket(self, symbol: str, callback: Callable):
         """
         Suscribe a un stream de ticker de 24 horas para un símbolo específico vía WebSocket.
+        Los streams se multiplexan sobre las conexiones combinadas del BinanceAdapter.
         """
-        if symbol in self._active_websocket_tasks:
+        if symbol in self._active_stream_subscriptions:
             logger.warning(f"Ya suscrito al stream de WebSocket para {symbol}. Ignorando solicitud.")
             return
 
         logger.info(f"Suscribiéndose al stream de WebSocket para {symbol}.")
         try:
-            task = asyncio.create_task(self.binance_adapter.subscribe_to_ticker_stream(symbol, callback))
-            self._active_websocket_tasks[symbol] = task
+            await self.binance_adapter.subscribe_to_ticker_stream(symbol, callback)
+            self._active_stream_subscriptions[symbol] = callback
         except ExternalAPIError as e:
             logger.error(f"Error al suscribirse al WebSocket para {symbol}: {e}")
             raise UltiBotError(f"No se pudo suscribir al stream de WebSocket para {symbol}: {e}")
@@ -248,69 +337,111 @@ class MarketDataService:
         """
         Cancela la suscripción a un stream de WebSocket para un símbolo específico.
         """
-        if symbol in self._active_websocket_tasks:
-            task = self._active_websocket_tasks.pop(symbol)
-            task.cancel()
+        if symbol in self._active_stream_subscriptions:
+            callback = self._active_stream_subscriptions.pop(symbol)
             try:
-                await task
+                await self.binance_adapter.unsubscribe_from_ticker_stream(symbol, callback)
                 logger.info(f"Suscripción a WebSocket para {symbol} cancelada exitosamente.")
-            except asyncio.CancelledError:
-                logger.info(f"Tarea de WebSocket para {symbol} cancelada.")
             except Exception as e:
-                logger.error(f"Error al cancelar la tarea de WebSocket para {symbol}: {e}")
+                logger.error(f"Error al cancelar la suscripción de WebSocket para {symbol}: {e}")
         else:
             logger.warning(f"No hay una suscripción activa a WebSocket para {symbol}.")
 
+    async def subscribe_to_kline_stream(self, symbol: str, interval: str, on_candle_closed: Optional[Callable] = None):
+        """
+        Suscribe al stream <symbol>@kline_<interval> y mantiene la serie en memoria del KlineStore:
+        la vela en formación se actualiza en su sitio y las cerradas se persisten y se notifican
+        a los oyentes `on_candle_closed(symbol, interval, candle)`.
+        """
+        symbol = self.binance_adapter.normalize_symbol(symbol)
+        key = (symbol, interval)
+        if on_candle_closed is not None:
+            listeners = self._candle_closed_listeners.setdefault(key, [])
+            if on_candle_closed not in listeners:
+                listeners.append(on_candle_closed)
+        if key in self._kline_stream_subscriptions:
+            return
+
+        async def handle_kline_event(data: Dict[str, Any]) -> None:
+            await self._on_kline_event(symbol, interval, data)
+
+        logger.info(f"Suscribiéndose al stream de velas {symbol}-{interval}.")
+        try:
+            await self.binance_adapter.subscribe_to_kline_stream(symbol, interval, handle_kline_event)
+            self._kline_stream_subscriptions[key] = handle_kline_event
+        except ExternalAPIError as e:
+            logger.error(f"Error al suscribirse al stream de velas {symbol}-{interval}: {e}")
+            raise UltiBotError(f"No se pudo suscribir al stream de velas {symbol}-{interval}: {e}") from e
+        except Exception as e:
+            logger.critical(f"Error inesperado al suscribirse al stream de velas {symbol}-{interval}: {e}", exc_info=True)
+            raise UltiBotError(f"Error inesperado al suscribirse al stream de velas {symbol}-{interval}: {e}") from e
+
+    async def unsubscribe_from_kline_stream(self, symbol: str, interval: str, on_candle_closed: Optional[Callable] = None):
+        """
+        Elimina el oyente indicado; cuando no quedan oyentes (o no se indica ninguno) se cancela
+        la suscripción al stream. Las velas ya recibidas permanecen en el KlineStore.
+        """
+        symbol = self.binance_adapter.normalize_symbol(symbol)
+        key = (symbol, interval)
+        listeners = self._candle_closed_listeners.get(key, [])
+        if on_candle_closed is not None:
+            if on_candle_closed in listeners:
+                listeners.remove(on_candle_closed)
+            if listeners:
+                return
+        self._candle_closed_listeners.pop(key, None)
+
+        handler = self._kline_stream_subscriptions.pop(key, None)
+        if handler is None:
+            logger.warning(f"No hay una suscripción activa al stream de velas {symbol}-{interval}.")
+            return
+        try:
+            await self.binance_adapter.unsubscribe_from_kline_stream(symbol, interval, handler)
+            logger.info(f"Suscripción al stream de velas {symbol}-{interval} cancelada exitosamente.")
+        except Exception as e:
+            logger.error(f"Error al cancelar la suscripción al stream de velas {symbol}-{interval}: {e}")
+
+    async def _on_kline_event(self, symbol: str, interval: str, data: Dict[str, Any]) -> None:
+        kline = data.get("k")
+        if not kline:
+            return
+        candle, closed = self.kline_store.apply_stream_kline(symbol, interval, kline)
+        if not closed:
+            return
+        try:
+            await self.kline_store.persist(symbol, interval, [candle])
+        except Exception as e:
+            logger.error(f"Error al persistir la vela cerrada {symbol}-{interval} {candle['open_time']}: {e}")
+        for listener in list(self._candle_closed_listeners.get((symbol, interval), ())):
+            try:
+                await listener(symbol, interval, dict(candle))
+            except Exception as e:
+                logger.error(f"Error en el oyente de cierre de vela {symbol}-{interval}: {e}", exc_info=True)
+
+    def get_live_candles(self, symbol: str, interval: str, limit: int = 200) -> List[Dict[str, Any]]:
+        """
+        Devuelve las últimas velas en memoria, incluida la que está en formación, sin llamar a
+        Binance. Con una suscripción activa a subscribe_to_kline_stream la serie está al día.
+        """
+        return self.kline_store.get_cached_klines(symbol, interval, limit)
+
     async def get_candlestick_data(self, symbol: str, interval: str, limit: int = 200, start_time: Optional[int] = None, end_time: Optional[int] = None) -> List[Dict[str, Any]]:
         """
-        Obtiene datos históricos de velas (OHLCV) y los persiste en la base de datos.
+        Obtiene datos históricos de velas (OHLCV). Las velas se sirven desde el KlineStore;
+        solo los tramos que faltan se piden a Binance y solo las velas cerradas nuevas se persisten.
         """
         if self._closed:
             logger.warning(f"MarketDataService está cerrado. No se pueden obtener datos de velas para {symbol}-{interval}.")
             return []
         try:
-            klines_data = await self.binance_adapter.get_klines(
+            processed_data = await self.kline_store.get_klines(
                 symbol=symbol,
                 interval=interval,
+                limit=limit,
                 start_time=start_time,
-                end_time=end_time,
-                limit=limit
+                end_time=end_time
             )
 
-            market_data_to_save = []
-            processed_data = []
-            for kline in klines_data:
-                kline_dict = {
-                    "open_time": kline[0],
-                    "open": float(kline[1]),
-                    "high": float(kline[2]),
-                    "low": float(kline[3]),
-                    "close": float(kline[4]),
-                    "volume": float(kline[5]),
-                    "close_time": kline[6],
-                    "quote_asset_volume": float(kline[7]),
-                    "number_of_trades": kline[8],
-                    "taker_buy_base_asset_volume": float(kline[9]),
-                    "taker_buy_quote_asset_volume": float(kline[10])
-                }
-                processed_data.append(kline_dict)
-
-                close_price = float(kline[4])
-                
-                market_data_to_save.append(MarketDataORM(
-                    symbol=symbol,
-                    timestamp=datetime.fromtimestamp(kline[0] / 1000, tz=timezone.utc),
-                    open=float(kline[1]),
-                    high=float(kline[2]),
-                    low=float(kline[3]),
-                    close=close_price,
-                    volume=float(kline[5])
-                ))
-
-            if market_data_to_save:
-                await self._persistence_service.upsert_all(market_data_to_save)
-                logger.info(f"{len(market_data_to_save)} registros de velas para {symbol}-{interval} guardados en la base de datos.")
-
             logger.info(f"Datos de velas para {symbol}-{interval} obtenidos y procesados.")
             return processed_data
         except ValueError as e:
@@ -328,9 +459,13 @@ class MarketDataService:
             logger.critical(f"Error inesperado al obtener datos de velas para {symbol}-{interval}: {e}", exc_info=True)
             raise UltiBotError(f"Error inesperado al obtener datos de velas de Binance para {symbol}-{interval}: {e}")
 
+    async def get_candlestick_frame(self, symbol: str, interval: str, limit: int = 200, start_time: Optional[int] = None, end_time: Optional[int] = None) -> OHLCVFrame:
+        """Igual que get_candlestick_data, pero devuelve las velas como un OHLCVFrame columnar para indicadores y backtests."""
+        return OHLCVFrame.from_dicts(await self.get_candlestick_data(symbol, interval, limit=limit, start_time=start_time, end_time=end_time))
+
     async def close(self):
         """
-        Cierra el cliente HTTP y cancela todas las tareas WebSocket activas.
+        Cierra el cliente HTTP y cancela todas las suscripciones WebSocket activas.
         """
         if self._closed:
             return
@@ -338,15 +473,10 @@ class MarketDataService:
         self._closed = True
         logger.info("MarketDataService: Iniciando cierre...")
 
-        for symbol, task in list(self._active_websocket_tasks.items()):
-            task.cancel()
-            try:
-                await task
-            except asyncio.CancelledError:
-                logger.info(f"MarketDataService: Tarea de WebSocket para {symbol} cancelada durante el cierre.")
-            except Exception as e:
-                logger.error(f"MarketDataService: Error al cancelar la tarea de WebSocket para {symbol} durante el cierre: {e}")
-        self._active_websocket_tasks.clear()
+        for symbol in list(self._active_stream_subscriptions.keys()):
+            await self.unsubscribe_from_market_data_websocket(symbol)
+        for symbol, interval in list(self._kline_stream_subscriptions.keys()):
+            await self.unsubscribe_from_kline_stream(symbol, interval)
         
         await self.binance_adapter.close()
         logger.info("MarketDataService: Cierre completado.")
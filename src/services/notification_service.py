@@ -7,6 +7,7 @@ from typing import Optional, Dict, Any, List
 from shared.data_types import ServiceName, Notification, Trade, Opportunity, UserConfiguration
 from adapters.telegram_adapter import TelegramAdapter
 from core.ports.persistence_service import IPersistenceService
+from adapters.unit_of_work import PersistenceUnitOfWork
 from services.credential_service import CredentialService
 from core.exceptions import CredentialError, NotificationError, TelegramNotificationError, ExternalAPIError
 from app_config import get_app_settings
@@ -43,10 +44,17 @@ class NotificationService:
         self._telegram_adapter = TelegramAdapter(bot_token=bot_token)
         return self._telegram_adapter
 
-    async def save_notification(self, notification: Notification) -> Notification:
+    async def save_notification(self, notification: Notification, unit_of_work: Optional[PersistenceUnitOfWork] = None) -> Notification:
         try:
             # Aseguramos que la notificación tenga el user_id correcto
             notification.userId = self._user_id
+            if unit_of_work is not None:
+                unit_of_work.upsert(
+                    table_name="notifications",
+                    data=notification.model_dump(mode='json', by_alias=True, exclude_none=True),
+                    on_conflict=["id"]
+                )
+                return notification
             saved_notification_data = await self._persistence_service.upsert(
                 table_name="notifications", 
                 data=notification.model_dump(mode='json', by_alias=True, exclude_none=True), 
@@ -157,7 +165,8 @@ class NotificationService:
         message: str,
         event_type: str,
         opportunity_id: Optional[UUID] = None,
-        dataPayload: Optional[Dict[str, Any]] = None
+        dataPayload: Optional[Dict[str, Any]] = None,
+        unit_of_work: Optional[PersistenceUnitOfWork] = None
     ) -> bool:
         sent_to_at_least_one_channel = False
         effective_payload = dataPayload or {}
@@ -181,7 +190,7 @@ class NotificationService:
                 title=title, message=message, dataPayload=effective_payload
             )
             try:
-                await self.save_notification(ui_notification)
+                await self.save_notification(ui_notification, unit_of_work=unit_of_work)
                 logger.info(f"Notificación UI para evento '{event_type}' (OID: {opportunity_id}) guardada.")
                 sent_to_at_least_one_channel = True
             except NotificationError as e:
@@ -210,7 +219,7 @@ class NotificationService:
                     userId=self._user_id, eventType=event_type, channel="telegram",
                     title=title, message=message, dataPayload=effective_payload
                 )
-                await self.save_notification(telegram_notification)
+                await self.save_notification(telegram_notification, unit_of_work=unit_of_work)
 
                 full_message = f"<b>{title}</b>\n\n{message}"
                 if opportunity_id:
@@ -404,7 +413,7 @@ class NotificationService:
         except Exception as e:
             logger.error(f"Error al procesar notificación de fallo de activación de modo real: {e}", exc_info=True)
 
-    async def send_real_trade_status_notification(self, user_config: UserConfiguration, message: str, status_level: str = "INFO", symbol: Optional[str] = None, trade_id: Optional[UUID] = None):
+    async def send_real_trade_status_notification(self, user_config: UserConfiguration, message: str, status_level: str = "INFO", symbol: Optional[str] = None, trade_id: Optional[UUID] = None, unit_of_work: Optional[PersistenceUnitOfWork] = None):
         title_prefix = ""
         if status_level == "INFO":
             title_prefix = "ℹ️ Estado de Orden Real"
@@ -428,7 +437,8 @@ class NotificationService:
                 title=title,
                 message=message,
                 event_type=f"REAL_TRADE_STATUS_{status_level.upper()}",
-                dataPayload=data_payload
+                dataPayload=data_payload,
+                unit_of_work=unit_of_work
             )
             logger.info(f"Notificación de estado de orden real ({status_level}) procesada para envío.")
         except Exception as e:
@@ -0,0 +1,302 @@
+import asyncio
+import bisect
+import logging
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from adapters.binance_adapter import BinanceAdapter
+from adapters.binance_codec import decode_price_levels
+from adapters.binance_rate_limiter import RequestPriority
+
+logger = logging.getLogger(__name__)
+
+PriceLevel = Tuple[float, float]
+
+
+class FillEstimate(BaseModel):
+    """Estimación de ejecución de una orden de mercado contra el libro local."""
+    symbol: str
+    side: str
+    requested_quantity: float
+    filled_quantity: float
+    average_price: float
+    reference_price: float  # Mejor precio del lado contrario antes de la orden
+    slippage_bps: float
+    fully_filled: bool
+
+
+class _BookSide:
+    """
+    Un lado del libro: precio -> cantidad más una lista ordenada de precios, de modo que el
+    mejor nivel es O(1) y la inserción o borrado de un nivel es una búsqueda binaria.
+    Las ofertas de compra se guardan con la clave negada para que ambos lados se recorran
+    en orden ascendente desde el mejor precio.
+    """
+
+    def __init__(self, descending: bool):
+        self._sign = -1.0 if descending else 1.0
+        self._keys: List[float] = []
+        self._quantities: Dict[float, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def clear(self) -> None:
+        self._keys.clear()
+        self._quantities.clear()
+
+    def set(self, price: float, quantity: float) -> None:
+        key = price * self._sign
+        if quantity <= 0.0:
+            if self._quantities.pop(key, None) is not None:
+                del self._keys[bisect.bisect_left(self._keys, key)]
+            return
+        if key not in self._quantities:
+            bisect.insort(self._keys, key)
+        self._quantities[key] = quantity
+
+    def best(self) -> Optional[PriceLevel]:
+        if not self._keys:
+            return None
+        key = self._keys[0]
+        return key * self._sign, self._quantities[key]
+
+    def levels(self, limit: Optional[int] = None) -> List[PriceLevel]:
+        keys = self._keys if limit is None else self._keys[:limit]
+        return [(key * self._sign, self._quantities[key]) for key in keys]
+
+    def cumulative_quantity(self, limit_price: float) -> float:
+        """Cantidad total disponible a precios iguales o mejores que `limit_price`."""
+        end = bisect.bisect_right(self._keys, limit_price * self._sign)
+        return sum(self._quantities[key] for key in self._keys[:end])
+
+    def walk(self, quantity: float) -> Tuple[float, float]:
+        """Recorre los niveles desde el mejor precio. Devuelve (cantidad cubierta, coste total)."""
+        remaining = quantity
+        cost = 0.0
+        for key in self._keys:
+            level_quantity = self._quantities[key]
+            take = level_quantity if level_quantity < remaining else remaining
+            cost += take * key * self._sign
+            remaining -= take
+            if remaining <= 0.0:
+                break
+        return quantity - remaining, cost
+
+
+class LocalOrderBook:
+    """
+    Libro de órdenes local de un símbolo, construido a partir de una instantánea REST y
+    mantenido con los eventos diferenciales de <symbol>@depth según el procedimiento de Binance.
+    """
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.bids = _BookSide(descending=True)
+        self.asks = _BookSide(descending=False)
+        self.last_update_id = 0
+        self._awaiting_first_event = True
+
+    def apply_snapshot(self, snapshot: Dict[str, Any]) -> None:
+        self.bids.clear()
+        self.asks.clear()
+        for price, quantity in decode_price_levels(snapshot.get("bids", ())):
+            self.bids.set(price, quantity)
+        for price, quantity in decode_price_levels(snapshot.get("asks", ())):
+            self.asks.set(price, quantity)
+        self.last_update_id = int(snapshot["lastUpdateId"])
+        self._awaiting_first_event = True
+
+    def apply_diff(self, event: Dict[str, Any]) -> bool:
+        """
+        Aplica un evento depthUpdate. Devuelve False si hay un hueco en la secuencia de
+        update ids y el libro debe resincronizarse con una nueva instantánea.
+        """
+        first_update_id = event["U"]
+        final_update_id = event["u"]
+        if final_update_id <= self.last_update_id:
+            return True  # Ya incluido en la instantánea
+        if self._awaiting_first_event:
+            if first_update_id > self.last_update_id + 1:
+                return False
+            self._awaiting_first_event = False
+        elif first_update_id != self.last_update_id + 1:
+            return False
+
+        for price, quantity in decode_price_levels(event.get("b", ())):
+            self.bids.set(price, quantity)
+        for price, quantity in decode_price_levels(event.get("a", ())):
+            self.asks.set(price, quantity)
+        self.last_update_id = final_update_id
+        return True
+
+    def best_bid(self) -> Optional[PriceLevel]:
+        return self.bids.best()
+
+    def best_ask(self) -> Optional[PriceLevel]:
+        return self.asks.best()
+
+    def mid_price(self) -> Optional[float]:
+        bid, ask = self.bids.best(), self.asks.best()
+        if bid is None or ask is None:
+            return None
+        return (bid[0] + ask[0]) / 2
+
+    def spread(self) -> Optional[float]:
+        bid, ask = self.bids.best(), self.asks.best()
+        if bid is None or ask is None:
+            return None
+        return ask[0] - bid[0]
+
+    def cumulative_depth(self, side: str, limit_price: float) -> float:
+        """Cantidad acumulada en el lado BID/ASK hasta `limit_price` (inclusive)."""
+        return (self.bids if side.upper() == "BID" else self.asks).cumulative_quantity(limit_price)
+
+    def estimate_fill(self, side: str, quantity: float) -> Optional[FillEstimate]:
+        """Precio medio ponderado por volumen de una orden de mercado de `quantity` unidades."""
+        book_side = self.asks if side.upper() == "BUY" else self.bids
+        best = book_side.best()
+        if best is None or quantity <= 0:
+            return None
+        filled, cost = book_side.walk(quantity)
+        average_price = cost / filled
+        slippage = (average_price - best[0]) / best[0] if side.upper() == "BUY" else (best[0] - average_price) / best[0]
+        return FillEstimate(
+            symbol=self.symbol,
+            side=side.upper(),
+            requested_quantity=quantity,
+            filled_quantity=filled,
+            average_price=average_price,
+            reference_price=best[0],
+            slippage_bps=slippage * 10_000,
+            fully_filled=filled >= quantity,
+        )
+
+
+class _BookSynchronizer:
+    """Estado de sincronización de un libro: eventos en búfer mientras se obtiene la instantánea."""
+
+    def __init__(self, symbol: str):
+        self.book = LocalOrderBook(symbol)
+        self.synced = False
+        self.buffer: List[Dict[str, Any]] = []
+        self.resync_task: Optional[asyncio.Task] = None
+        self.callback: Optional[Any] = None
+
+
+class OrderBookService:
+    """
+    Mantiene libros de órdenes locales por símbolo (instantánea REST + stream @depth@100ms)
+    con detección de huecos de secuencia y resincronización automática. Las consultas de
+    mejor precio, profundidad acumulada y precio medio de ejecución no tocan la red.
+    """
+    SNAPSHOT_LIMIT = 1000
+    MAX_BUFFERED_EVENTS = 1000
+    RESYNC_RETRY_DELAY_SECONDS = 1.0
+
+    def __init__(self, binance_adapter: BinanceAdapter, snapshot_limit: int = SNAPSHOT_LIMIT):
+        self.binance_adapter = binance_adapter
+        self.snapshot_limit = snapshot_limit
+        self._books: Dict[str, _BookSynchronizer] = {}
+
+    def get_book(self, symbol: str) -> Optional[LocalOrderBook]:
+        """Devuelve el libro sincronizado del símbolo, o None si no se sigue o se está resincronizando."""
+        state = self._books.get(self.binance_adapter.normalize_symbol(symbol))
+        if state is None or not state.synced:
+            return None
+        return state.book
+
+    def is_tracking(self, symbol: str) -> bool:
+        return self.binance_adapter.normalize_symbol(symbol) in self._books
+
+    async def track(self, symbol: str) -> None:
+        """Empieza a mantener el libro de `symbol`. La sincronización inicial ocurre en segundo plano."""
+        symbol = self.binance_adapter.normalize_symbol(symbol)
+        if symbol in self._books:
+            return
+        state = _BookSynchronizer(symbol)
+        self._books[symbol] = state
+
+        async def handle_depth_event(data: Dict[str, Any]) -> None:
+            self._on_depth_event(state, data)
+
+        state.callback = handle_depth_event
+        try:
+            await self.binance_adapter.subscribe_to_depth_stream(symbol, handle_depth_event)
+        except Exception:
+            self._books.pop(symbol, None)
+            raise
+        self._schedule_resync(state)
+
+    async def untrack(self, symbol: str) -> None:
+        symbol = self.binance_adapter.normalize_symbol(symbol)
+        state = self._books.pop(symbol, None)
+        if state is None:
+            return
+        await self._stop(state)
+
+    async def _stop(self, state: _BookSynchronizer) -> None:
+        if state.resync_task is not None:
+            state.resync_task.cancel()
+            try:
+                await state.resync_task
+            except asyncio.CancelledError:
+                pass
+        try:
+            await self.binance_adapter.unsubscribe_from_depth_stream(state.book.symbol, state.callback)
+        except Exception as e:
+            logger.error(f"Error al cancelar el stream de profundidad de {state.book.symbol}: {e}")
+
+    def estimate_fill(self, symbol: str, side: str, quantity: Decimal) -> Optional[FillEstimate]:
+        """Estimación VWAP de una orden de mercado, o None si el libro no está sincronizado."""
+        book = self.get_book(symbol)
+        if book is None:
+            return None
+        return book.estimate_fill(side, float(quantity))
+
+    def _on_depth_event(self, state: _BookSynchronizer, event: Dict[str, Any]) -> None:
+        if not state.synced:
+            if len(state.buffer) >= self.MAX_BUFFERED_EVENTS:
+                state.buffer.pop(0)
+            state.buffer.append(event)
+            return
+        if not state.book.apply_diff(event):
+            logger.warning(
+                f"Hueco en el stream de profundidad de {state.book.symbol} "
+                f"(esperado U={state.book.last_update_id + 1}, recibido U={event.get('U')}). Resincronizando."
+            )
+            state.synced = False
+            state.buffer = [event]
+            self._schedule_resync(state)
+
+    def _schedule_resync(self, state: _BookSynchronizer) -> None:
+        if state.resync_task is None or state.resync_task.done():
+            state.resync_task = asyncio.create_task(self._resync(state))
+
+    async def _resync(self, state: _BookSynchronizer) -> None:
+        symbol = state.book.symbol
+        while self._books.get(symbol) is state:
+            try:
+                snapshot = await self.binance_adapter.get_order_book(symbol, limit=self.snapshot_limit, priority=RequestPriority.NORMAL)
+            except Exception as e:
+                logger.error(f"Error al obtener la instantánea del libro de {symbol}: {e}")
+                await asyncio.sleep(self.RESYNC_RETRY_DELAY_SECONDS)
+                continue
+
+            state.book.apply_snapshot(snapshot)
+            buffered, state.buffer = state.buffer, []
+            if all(state.book.apply_diff(event) for event in buffered):
+                state.synced = True
+                logger.info(f"Libro de órdenes de {symbol} sincronizado en lastUpdateId={state.book.last_update_id}.")
+                return
+            # La instantánea es anterior al primer evento en búfer: se pide otra.
+            logger.info(f"Instantánea del libro de {symbol} desfasada respecto al stream. Reintentando.")
+            await asyncio.sleep(self.RESYNC_RETRY_DELAY_SECONDS)
+
+    async def close(self) -> None:
+        states = list(self._books.values())
+        self._books.clear()
+        for state in states:
+            await self._stop(state)
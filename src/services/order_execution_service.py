@@ -7,15 +7,35 @@ from decimal import Decimal
 from shared.data_types import TradeOrderDetails, UserConfiguration, OrderCategory 
 from adapters.binance_adapter import BinanceAdapter
 from core.exceptions import OrderExecutionError, ExternalAPIError
+from services.symbol_filter_registry import SymbolFilterRegistry
+from services.order_book_service import OrderBookService, FillEstimate
 
 logger = logging.getLogger(__name__)
 
+async def _estimate_market_fill(order_book_service: Optional[OrderBookService], symbol: str, side: str, quantity: Decimal) -> Optional[FillEstimate]:
+    """
+    Estima la ejecución de una orden de mercado con el libro local. La primera orden de un
+    símbolo empieza a seguir su libro, de modo que las siguientes ya disponen de estimación.
+    """
+    if order_book_service is None:
+        return None
+    if not order_book_service.is_tracking(symbol):
+        try:
+            await order_book_service.track(symbol)
+        except Exception as e:
+            logger.warning(f"No se pudo iniciar el libro de órdenes local de {symbol}: {e}")
+        return None
+    return order_book_service.estimate_fill(symbol, side, quantity)
+
 class OrderExecutionService:
     """
     Servicio para ejecutar órdenes de trading reales a través de la API de Binance.
     """
-    def __init__(self, binance_adapter: BinanceAdapter):
+    def __init__(self, binance_adapter: BinanceAdapter, symbol_filters: Optional[SymbolFilterRegistry] = None,
+                 order_book_service: Optional[OrderBookService] = None):
         self.binance_adapter = binance_adapter
+        self.symbol_filters = symbol_filters
+        self.order_book_service = order_book_service
 
     async def execute_market_order(
         self,
@@ -31,6 +51,20 @@ class OrderExecutionService:
         Ejecuta una orden de mercado real en Binance.
         """
         logger.info(f"Ejecutando orden de mercado REAL para {symbol} {side} {quantity} para usuario {user_id}")
+        fill_estimate = await _estimate_market_fill(self.order_book_service, symbol, side, quantity)
+        if self.symbol_filters is not None:
+            # Sin precio de referencia no se comprobaría el nocional mínimo de la orden de mercado.
+            reference_price = (Decimal(str(fill_estimate.reference_price)) if fill_estimate is not None
+                               else await self._last_price(symbol))
+            adjusted_quantity = self.symbol_filters.prepare_order(symbol, quantity, is_market=True, reference_price=reference_price)["quantity"]
+            if fill_estimate is not None and adjusted_quantity != quantity:
+                fill_estimate = self.order_book_service.estimate_fill(symbol, side, adjusted_quantity)
+            quantity = adjusted_quantity
+        if fill_estimate is not None:
+            logger.info(
+                f"Estimación de ejecución para {symbol} {side} {quantity}: precio medio {fill_estimate.average_price} "
+                f"(deslizamiento {fill_estimate.slippage_bps:.1f} bps, cubierto {fill_estimate.filled_quantity}/{fill_estimate.requested_quantity})."
+            )
         try:
             # Aquí iría la lógica real para interactuar con Binance
             # Por ahora, es un placeholder. Necesitaríamos un endpoint de Binance para crear órdenes.
@@ -102,6 +136,15 @@ class OrderExecutionService:
             logger.error(f"Error inesperado al ejecutar orden real: {e}", exc_info=True)
             raise OrderExecutionError(f"Error inesperado al ejecutar orden real: {e}") from e
 
+    async def _last_price(self, symbol: str) -> Optional[Decimal]:
+        """Último precio del ticker, como referencia cuando aún no hay libro local del símbolo."""
+        try:
+            ticker = await self.binance_adapter.get_ticker_24hr(symbol)
+            return Decimal(str(ticker["lastPrice"]))
+        except Exception as e:
+            logger.warning(f"No se pudo obtener el último precio de {symbol} para validar el nocional mínimo: {e}")
+            return None
+
     async def create_oco_order(
         self,
         user_id: UUID,
@@ -119,6 +162,10 @@ class OrderExecutionService:
         Consiste en una orden LIMIT (entrada) y un par de órdenes STOP_LOSS/TAKE_PROFIT.
         """
         logger.info(f"Creando orden OCO REAL para {symbol} {side} {quantity} a {price} (Stop: {stop_price}, Limit: {limit_price}) para usuario {user_id}")
+        if self.symbol_filters is not None:
+            adjusted = self.symbol_filters.prepare_order(symbol, quantity, price=price, stop_price=stop_price)
+            quantity, price, stop_price = adjusted["quantity"], adjusted["price"], adjusted["stop_price"]
+            limit_price = self.symbol_filters.prepare_order(symbol, quantity, price=limit_price)["price"]
         try:
             # Simulación de respuesta de Binance para una orden OCO
             # En un escenario real, Binance devolvería un orderListId y detalles de las órdenes individuales
@@ -215,6 +262,9 @@ class OrderExecutionService:
         Ejecuta una orden LIMIT real en Binance.
         """
         logger.info(f"Ejecutando orden LIMIT REAL para {symbol} {side} {quantity} a {price} para usuario {user_id}")
+        if self.symbol_filters is not None:
+            adjusted = self.symbol_filters.prepare_order(symbol, quantity, price=price)
+            quantity, price = adjusted["quantity"], adjusted["price"]
         try:
             # Simulación de respuesta de Binance para una orden LIMIT
             simulated_response = {
@@ -281,6 +331,9 @@ class OrderExecutionService:
         Ejecuta una orden STOP_LOSS_LIMIT real en Binance.
         """
         logger.info(f"Ejecutando orden STOP_LOSS_LIMIT REAL para {symbol} {side} {quantity} a {price} (Stop: {stop_price}) para usuario {user_id}")
+        if self.symbol_filters is not None:
+            adjusted = self.symbol_filters.prepare_order(symbol, quantity, price=price, stop_price=stop_price)
+            quantity, price, stop_price = adjusted["quantity"], adjusted["price"], adjusted["stop_price"]
         try:
             # Simulación de respuesta de Binance para una orden STOP_LOSS_LIMIT
             simulated_response = {
@@ -337,7 +390,10 @@ class PaperOrderExecutionService:
     Servicio para simular la ejecución de órdenes de trading en modo Paper Trading.
     Mantiene un balance virtual en memoria (o podría persistirse en UserConfiguration).
     """
-    def __init__(self, initial_capital: Decimal = Decimal("10000.0")):
+    def __init__(self, initial_capital: Decimal = Decimal("10000.0"), symbol_filters: Optional[SymbolFilterRegistry] = None,
+                 order_book_service: Optional[OrderBookService] = None):
+        self.symbol_filters = symbol_filters
+        self.order_book_service = order_book_service
         self.virtual_balances: Dict[str, Decimal] = {"USDT": initial_capital}
         self.virtual_trades: List[TradeOrderDetails] = []
         logger.info(f"Paper Trading Service inicializado con capital virtual: {initial_capital} USDT")
@@ -360,6 +416,18 @@ class PaperOrderExecutionService:
         simulated_price = Decimal("30000.0") # Precio fijo para BTC/USDT, por ejemplo
         if "ETH" in symbol:
             simulated_price = Decimal("2000.0") # Precio fijo para ETH/USDT
+        # Con el libro local sincronizado, el precio de ejecución es el VWAP de los niveles consumidos.
+        fill_estimate = await _estimate_market_fill(self.order_book_service, symbol, side, quantity)
+        if fill_estimate is not None:
+            simulated_price = Decimal(str(fill_estimate.reference_price))
+        if self.symbol_filters is not None:
+            adjusted_quantity = self.symbol_filters.prepare_order(symbol, quantity, is_market=True, reference_price=simulated_price)["quantity"]
+            if fill_estimate is not None and adjusted_quantity != quantity:
+                fill_estimate = self.order_book_service.estimate_fill(symbol, side, adjusted_quantity)
+            quantity = adjusted_quantity
+        if fill_estimate is not None and fill_estimate.fully_filled:
+            simulated_price = Decimal(str(fill_estimate.average_price))
+            logger.info(f"Precio de ejecución PAPER desde el libro local: {simulated_price} (deslizamiento {fill_estimate.slippage_bps:.1f} bps).")
         
         cost_or_revenue = quantity * simulated_price
         
@@ -424,6 +492,10 @@ class PaperOrderExecutionService:
         Simula la creación de una orden OCO (One-Cancels-the-Other) en modo Paper Trading.
         """
         logger.info(f"Simulando orden OCO PAPER para {symbol} {side} {quantity} a {price} (Stop: {stop_price}, Limit: {limit_price}) para usuario {user_id}")
+        if self.symbol_filters is not None:
+            adjusted = self.symbol_filters.prepare_order(symbol, quantity, price=price, stop_price=stop_price)
+            quantity, price, stop_price = adjusted["quantity"], adjusted["price"], adjusted["stop_price"]
+            limit_price = self.symbol_filters.prepare_order(symbol, quantity, price=limit_price)["price"]
 
         # Simular precio actual (ej. de un servicio de datos de mercado)
         simulated_price = Decimal("30000.0")
@@ -492,6 +564,9 @@ class PaperOrderExecutionService:
         Simula la ejecución de una orden LIMIT.
         """
         logger.info(f"Simulando orden LIMIT PAPER para {symbol} {side} {quantity} a {price} para usuario {user_id}")
+        if self.symbol_filters is not None:
+            adjusted = self.symbol_filters.prepare_order(symbol, quantity, price=price)
+            quantity, price = adjusted["quantity"], adjusted["price"]
 
         base_asset = symbol.replace("USDT", "")
         quote_asset = "USDT"
@@ -552,6 +627,9 @@ class PaperOrderExecutionService:
         Simula la ejecución de una orden STOP_LOSS_LIMIT.
         """
         logger.info(f"Simulando orden STOP_LOSS_LIMIT PAPER para {symbol} {side} {quantity} a {price} (Stop: {stop_price}) para usuario {user_id}")
+        if self.symbol_filters is not None:
+            adjusted = self.symbol_filters.prepare_order(symbol, quantity, price=price, stop_price=stop_price)
+            quantity, price, stop_price = adjusted["quantity"], adjusted["price"], adjusted["stop_price"]
 
         base_asset = symbol.replace("USDT", "")
         quote_asset = "USDT"
@@ -0,0 +1,141 @@
+"""
+In-memory index of the active strategies that apply to each symbol.
+
+For every (user, mode) the index is compiled from the strategies' allowed/excluded symbol lists
+and ApplicabilityRules into:
+
+    by_symbol  symbol -> applicable strategies, for every symbol named in some list
+    default    strategies applicable to any symbol not named in a list
+
+so matching an opportunity to its strategies is a single dict lookup. When a strategy is
+created, updated, activated, deactivated or deleted only the modes it was or becomes active in
+are recompiled, from the strategies already in memory.
+
+The dynamic filters of ApplicabilityRules (volatility, market cap, watchlists, categories) depend
+on market data at evaluation time and are not part of the compiled index.
+"""
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from core.domain_models.trading_strategy_models import TradingStrategyConfig
+
+logger = logging.getLogger(__name__)
+
+STRATEGY_MODES = ("paper", "real")
+
+
+def is_active_in_mode(strategy: TradingStrategyConfig, mode: str) -> bool:
+    return bool(strategy.is_active_paper_mode if mode == "paper" else strategy.is_active_real_mode)
+
+
+def strategy_applies_to_symbol(strategy: TradingStrategyConfig, symbol: Optional[str]) -> bool:
+    """
+    Whether a strategy applies to a symbol according to its configuration. `symbol=None` stands
+    for any symbol that none of the strategy's lists name.
+    """
+    include_all_spot = bool(strategy.applicability_rules and strategy.applicability_rules.include_all_spot)
+    # If allowed_symbols is not empty (and the strategy does not cover all spot pairs), the symbol must be in the list.
+    if strategy.allowed_symbols and not include_all_spot and (symbol is None or symbol not in strategy.allowed_symbols):
+        return False
+    # If excluded_symbols is not empty, the symbol must not be in the list.
+    if strategy.excluded_symbols and symbol is not None and symbol in strategy.excluded_symbols:
+        return False
+    return True
+
+
+class CompiledApplicability:
+    """Applicability tables of the active strategies of one (user, mode)."""
+    __slots__ = ("active", "by_symbol", "default")
+
+    def __init__(self, strategies: Iterable[TradingStrategyConfig]):
+        self.active: List[TradingStrategyConfig] = list(strategies)
+        listed = set()
+        for strategy in self.active:
+            listed.update(strategy.allowed_symbols or ())
+            listed.update(strategy.excluded_symbols or ())
+        self.default: List[TradingStrategyConfig] = [s for s in self.active if strategy_applies_to_symbol(s, None)]
+        self.by_symbol: Dict[str, List[TradingStrategyConfig]] = {
+            symbol: [s for s in self.active if strategy_applies_to_symbol(s, symbol)] for symbol in listed
+        }
+
+    def lookup(self, symbol: str) -> List[TradingStrategyConfig]:
+        return self.by_symbol.get(symbol, self.default)
+
+
+class StrategyApplicabilityIndex:
+    """Strategies per user, with compiled applicability tables per (user, mode)."""
+
+    def __init__(self) -> None:
+        self._strategies: Dict[str, Dict[str, TradingStrategyConfig]] = {}
+        self._compiled: Dict[Tuple[str, str], CompiledApplicability] = {}
+        self._loaded_at: Dict[str, float] = {}
+
+    def is_loaded(self, user_id: str, max_age_seconds: Optional[float] = None) -> bool:
+        loaded_at = self._loaded_at.get(str(user_id))
+        if loaded_at is None:
+            return False
+        return max_age_seconds is None or time.monotonic() - loaded_at < max_age_seconds
+
+    def load(self, user_id: str, strategies: Iterable[TradingStrategyConfig]) -> None:
+        """Replaces all the strategies of a user and compiles both modes."""
+        user_id = str(user_id)
+        self._strategies[user_id] = {str(s.id): s for s in strategies}
+        self._loaded_at[user_id] = time.monotonic()
+        for mode in STRATEGY_MODES:
+            self._compile(user_id, mode)
+
+    def upsert(self, strategy: TradingStrategyConfig) -> None:
+        """Adds or replaces a strategy of an already loaded user, recompiling only the modes it affects."""
+        user_id = str(strategy.user_id)
+        strategies = self._strategies.get(user_id)
+        if strategies is None:
+            return
+        previous = strategies.get(str(strategy.id))
+        strategies[str(strategy.id)] = strategy
+        self._recompile_affected(user_id, previous, strategy)
+
+    def remove(self, user_id: str, strategy_id: str) -> None:
+        user_id = str(user_id)
+        strategies = self._strategies.get(user_id)
+        if strategies is None:
+            return
+        previous = strategies.pop(str(strategy_id), None)
+        if previous is not None:
+            self._recompile_affected(user_id, previous, None)
+
+    def invalidate(self, user_id: Optional[str] = None) -> None:
+        """Forgets a user (or everyone) so the next lookup reloads from persistence."""
+        if user_id is None:
+            self._strategies.clear()
+            self._compiled.clear()
+            self._loaded_at.clear()
+            return
+        user_id = str(user_id)
+        self._strategies.pop(user_id, None)
+        self._loaded_at.pop(user_id, None)
+        for mode in STRATEGY_MODES:
+            self._compiled.pop((user_id, mode), None)
+
+    def lookup(self, user_id: str, mode: str, symbol: str) -> List[TradingStrategyConfig]:
+        compiled = self._compiled.get((str(user_id), mode))
+        return compiled.lookup(symbol) if compiled is not None else []
+
+    def active(self, user_id: str, mode: str) -> List[TradingStrategyConfig]:
+        compiled = self._compiled.get((str(user_id), mode))
+        return compiled.active if compiled is not None else []
+
+    def _recompile_affected(self, user_id: str, previous: Optional[TradingStrategyConfig],
+                            current: Optional[TradingStrategyConfig]) -> None:
+        for mode in STRATEGY_MODES:
+            if any(s is not None and is_active_in_mode(s, mode) for s in (previous, current)):
+                self._compile(user_id, mode)
+
+    def _compile(self, user_id: str, mode: str) -> None:
+        strategies = self._strategies.get(user_id, {}).values()
+        compiled = CompiledApplicability(s for s in strategies if is_active_in_mode(s, mode))
+        self._compiled[(user_id, mode)] = compiled
+        logger.debug(
+            f"Compiled strategy applicability for user {user_id} in {mode} mode: "
+            f"{len(compiled.active)} active, {len(compiled.by_symbol)} listed symbols."
+        )
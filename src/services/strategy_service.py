@@ -25,11 +25,15 @@ from core.domain_models.user_configuration_models import (
     AIStrategyConfiguration,
 )
 from services.config_service import ConfigurationService
+from services.strategy_applicability_index import StrategyApplicabilityIndex, strategy_applies_to_symbol
 
 logger = logging.getLogger(__name__)
 
 
 class StrategyService:
+    # Strategies written by other workers reach this worker's applicability index after at most this long.
+    APPLICABILITY_INDEX_MAX_AGE_SECONDS = 60.0
+
     def __init__(
         self,
         persistence_service: SupabasePersistenceService,
@@ -37,6 +41,7 @@ class StrategyService:
     ):
         self.persistence_service = persistence_service
         self.configuration_service = configuration_service
+        self._applicability_index = StrategyApplicabilityIndex()
 
     async def _validate_ai_profile(self, user_id: str, ai_profile_id: str) -> bool:
         user_config = await self.configuration_service.get_user_configuration(user_id)
@@ -82,6 +87,7 @@ class StrategyService:
 
             # Pasar el objeto TradingStrategyConfig directamente al servicio de persistencia
             await self.persistence_service.upsert_strategy_config(strategy_config)
+            self._applicability_index.upsert(strategy_config)
             
             logger.info(f"Created strategy configuration {strategy_id} for user {user_id}")
             return strategy_config
@@ -137,6 +143,7 @@ class StrategyService:
 
             # Pasar el objeto TradingStrategyConfig directamente al servicio de persistencia
             await self.persistence_service.upsert_strategy_config(strategy_config)
+            self._applicability_index.upsert(strategy_config)
             
             logger.info(f"Updated strategy configuration {strategy_id} for user {user_id}")
             return strategy_config
@@ -153,6 +160,7 @@ class StrategyService:
         try:
             deleted = await self.persistence_service.delete_strategy_config(uuid.UUID(strategy_id), uuid.UUID(user_id))
             if deleted:
+                self._applicability_index.remove(user_id, strategy_id)
                 logger.info(f"Deleted strategy configuration {strategy_id} for user {user_id}")
             return deleted
         except Exception as e:
@@ -210,6 +218,26 @@ class StrategyService:
                 active_strategies.append(strategy)
         return active_strategies
 
+    async def _ensure_applicability_index(self, user_id: str) -> None:
+        if not self._applicability_index.is_loaded(user_id, self.APPLICABILITY_INDEX_MAX_AGE_SECONDS):
+            self._applicability_index.load(user_id, await self.list_strategy_configs(user_id))
+
+    async def get_applicable_strategies(self, user_id: str, mode: str, symbol: str) -> List[TradingStrategyConfig]:
+        """
+        Active strategies of the user in `mode` that apply to `symbol`, served from the compiled
+        applicability index (loaded from persistence on first use).
+        """
+        if mode not in ["paper", "real"]:
+            raise HTTPException(status_code=400, detail="Mode must be 'paper' or 'real'")
+        await self._ensure_applicability_index(user_id)
+        return self._applicability_index.lookup(user_id, mode, symbol)
+
+    async def has_active_strategies(self, user_id: str, mode: str) -> bool:
+        if mode not in ["paper", "real"]:
+            raise HTTPException(status_code=400, detail="Mode must be 'paper' or 'real'")
+        await self._ensure_applicability_index(user_id)
+        return bool(self._applicability_index.active(user_id, mode))
+
     # La función _strategy_config_to_db_format ya no es necesaria aquí
     # porque persistence_service.upsert_strategy_config ahora acepta TradingStrategyConfig directamente.
 
@@ -297,13 +325,4 @@ class StrategyService:
         strategy = await self.get_strategy_config(strategy_id, user_id)
         if not strategy:
             return False
-
-        # If allowed_symbols is not empty, the symbol must be in the list.
-        if strategy.allowed_symbols and symbol not in strategy.allowed_symbols:
-            return False
-
-        # If excluded_symbols is not empty, the symbol must not be in the list.
-        if strategy.excluded_symbols and symbol in strategy.excluded_symbols:
-            return False
-
-        return True
+        return strategy_applies_to_symbol(strategy, symbol)
@@ -0,0 +1,219 @@
+import asyncio
+import logging
+import time
+from decimal import Decimal, ROUND_DOWN, ROUND_HALF_UP
+from typing import Any, Dict, Optional
+
+from adapters.binance_adapter import BinanceAdapter
+from core.exceptions import OrderExecutionError
+
+logger = logging.getLogger(__name__)
+
+_ZERO = Decimal("0")
+
+
+def _quantum(step: Decimal) -> Optional[Decimal]:
+    """Cuanto con el número de decimales del paso (sin notación exponencial para pasos enteros)."""
+    if step <= 0:
+        return None
+    return Decimal(1).scaleb(min(step.normalize().as_tuple().exponent, 0))
+
+
+def _to_decimal(value: Any) -> Decimal:
+    try:
+        return Decimal(str(value)) if value is not None else _ZERO
+    except ArithmeticError:
+        return _ZERO
+
+
+class SymbolFilters:
+    """
+    Filtros de un símbolo (LOT_SIZE, MARKET_LOT_SIZE, PRICE_FILTER y MIN_NOTIONAL/NOTIONAL)
+    con los pasos y cuantos de redondeo precalculados al cargar exchangeInfo.
+    """
+    __slots__ = (
+        "symbol", "base_asset", "quote_asset", "status",
+        "step_size", "min_qty", "max_qty", "market_step_size", "market_min_qty", "market_max_qty",
+        "tick_size", "min_price", "max_price", "min_notional", "apply_min_notional_to_market",
+        "_qty_quantum", "_market_qty_quantum", "_price_quantum",
+    )
+
+    def __init__(self, symbol_info: Dict[str, Any]):
+        self.symbol: str = symbol_info["symbol"]
+        self.base_asset: str = symbol_info.get("baseAsset", "")
+        self.quote_asset: str = symbol_info.get("quoteAsset", "")
+        self.status: str = symbol_info.get("status", "TRADING")
+
+        filters = {f.get("filterType"): f for f in symbol_info.get("filters", [])}
+        lot_size = filters.get("LOT_SIZE", {})
+        market_lot_size = filters.get("MARKET_LOT_SIZE", {})
+        price_filter = filters.get("PRICE_FILTER", {})
+        notional = filters.get("NOTIONAL") or filters.get("MIN_NOTIONAL") or {}
+
+        self.step_size = _to_decimal(lot_size.get("stepSize"))
+        self.min_qty = _to_decimal(lot_size.get("minQty"))
+        self.max_qty = _to_decimal(lot_size.get("maxQty"))
+        # Binance publica MARKET_LOT_SIZE con stepSize 0 cuando se aplica LOT_SIZE también a mercado.
+        market_step = _to_decimal(market_lot_size.get("stepSize"))
+        self.market_step_size = market_step if market_step > 0 else self.step_size
+        self.market_min_qty = max(_to_decimal(market_lot_size.get("minQty")), self.min_qty)
+        market_max = _to_decimal(market_lot_size.get("maxQty"))
+        self.market_max_qty = market_max if market_max > 0 else self.max_qty
+        self.tick_size = _to_decimal(price_filter.get("tickSize"))
+        self.min_price = _to_decimal(price_filter.get("minPrice"))
+        self.max_price = _to_decimal(price_filter.get("maxPrice"))
+        self.min_notional = _to_decimal(notional.get("minNotional"))
+        self.apply_min_notional_to_market = bool(notional.get("applyMinToMarket", notional.get("applyToMarket", True)))
+
+        self._qty_quantum = _quantum(self.step_size)
+        self._market_qty_quantum = _quantum(self.market_step_size)
+        self._price_quantum = _quantum(self.tick_size)
+
+    @staticmethod
+    def _round_to_step(value: Decimal, step: Decimal, quantum: Optional[Decimal], rounding: str) -> Decimal:
+        if quantum is None:
+            return value
+        return ((value / step).to_integral_value(rounding=rounding) * step).quantize(quantum)
+
+    def quantize_quantity(self, quantity: Decimal, is_market: bool = False) -> Decimal:
+        """Trunca la cantidad al múltiplo de stepSize inmediatamente inferior."""
+        if is_market:
+            return self._round_to_step(quantity, self.market_step_size, self._market_qty_quantum, ROUND_DOWN)
+        return self._round_to_step(quantity, self.step_size, self._qty_quantum, ROUND_DOWN)
+
+    def quantize_price(self, price: Decimal, rounding: str = ROUND_HALF_UP) -> Decimal:
+        """Redondea el precio a un múltiplo de tickSize (por defecto al más cercano)."""
+        return self._round_to_step(price, self.tick_size, self._price_quantum, rounding)
+
+    def check(self, quantity: Decimal, price: Optional[Decimal] = None, is_market: bool = False) -> Optional[str]:
+        """Devuelve la descripción del primer filtro que incumple la orden, o None si es válida."""
+        min_qty = self.market_min_qty if is_market else self.min_qty
+        max_qty = self.market_max_qty if is_market else self.max_qty
+        if quantity <= _ZERO or quantity < min_qty:
+            return f"LOT_SIZE: la cantidad {quantity} es inferior al mínimo {min_qty}"
+        if max_qty > 0 and quantity > max_qty:
+            return f"LOT_SIZE: la cantidad {quantity} supera el máximo {max_qty}"
+        if price is not None:
+            if not is_market:
+                if self.min_price > 0 and price < self.min_price:
+                    return f"PRICE_FILTER: el precio {price} es inferior al mínimo {self.min_price}"
+                if self.max_price > 0 and price > self.max_price:
+                    return f"PRICE_FILTER: el precio {price} supera el máximo {self.max_price}"
+            if self.min_notional > 0 and (not is_market or self.apply_min_notional_to_market):
+                notional = quantity * price
+                if notional < self.min_notional:
+                    return f"MIN_NOTIONAL: el nocional {notional} es inferior al mínimo {self.min_notional}"
+        return None
+
+
+class SymbolFilterRegistry:
+    """
+    Registro en memoria de los filtros de todos los símbolos de Binance.
+
+    Se carga con una única llamada a GET /api/v3/exchangeInfo al arrancar y se refresca
+    periódicamente en segundo plano; las búsquedas por símbolo son O(1) y no tocan la red,
+    de modo que las rutas de órdenes (reales y paper) pueden ajustar y validar cantidades
+    y precios antes de enviar nada.
+    """
+    DEFAULT_REFRESH_INTERVAL_SECONDS = 3600.0
+
+    def __init__(self, binance_adapter: BinanceAdapter, refresh_interval_seconds: float = DEFAULT_REFRESH_INTERVAL_SECONDS):
+        self.binance_adapter = binance_adapter
+        self.refresh_interval_seconds = refresh_interval_seconds
+        self._filters: Dict[str, SymbolFilters] = {}
+        self._loaded_at: Optional[float] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def __len__(self) -> int:
+        return len(self._filters)
+
+    async def load(self) -> int:
+        """Descarga exchangeInfo completo y reemplaza el registro. Devuelve el número de símbolos."""
+        exchange_info = await self.binance_adapter.get_exchange_info()
+        filters: Dict[str, SymbolFilters] = {}
+        for symbol_info in exchange_info.get("symbols", []):
+            try:
+                filters[symbol_info["symbol"]] = SymbolFilters(symbol_info)
+            except (KeyError, TypeError) as e:
+                logger.warning(f"Filtros de símbolo ignorados por formato inesperado: {e}")
+        self._filters = filters
+        self._loaded_at = time.monotonic()
+        logger.info(f"Registro de filtros de símbolos cargado con {len(filters)} símbolos.")
+        return len(filters)
+
+    async def start(self) -> None:
+        """Carga el registro (sin fallar si Binance no responde) y arranca el refresco periódico."""
+        try:
+            await self.load()
+        except Exception as e:
+            logger.warning(f"No se pudo cargar exchangeInfo al arrancar; las órdenes no se validarán localmente hasta el próximo refresco: {e}")
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval_seconds)
+            try:
+                await self.load()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Error al refrescar el registro de filtros de símbolos: {e}")
+
+    async def close(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    def get(self, symbol: str) -> Optional[SymbolFilters]:
+        return self._filters.get(symbol.replace("/", "").upper())
+
+    def prepare_order(self, symbol: str, quantity: Decimal, price: Optional[Decimal] = None,
+                      stop_price: Optional[Decimal] = None, is_market: bool = False,
+                      reference_price: Optional[Decimal] = None) -> Dict[str, Optional[Decimal]]:
+        """
+        Ajusta cantidad y precios a los pasos del símbolo y valida los filtros.
+
+        `reference_price` se usa para comprobar el nocional mínimo de órdenes de mercado.
+        Si el símbolo no está en el registro (p. ej. exchangeInfo aún no cargado) los valores
+        se devuelven sin modificar. Lanza OrderExecutionError si la orden sería rechazada.
+        """
+        filters = self.get(symbol)
+        if filters is None:
+            return {"quantity": quantity, "price": price, "stop_price": stop_price}
+        if filters.status != "TRADING":
+            raise OrderExecutionError(
+                f"El símbolo {filters.symbol} no admite órdenes (estado {filters.status}).",
+                code="SYMBOL_NOT_TRADING",
+                details={"symbol": filters.symbol, "status": filters.status}
+            )
+
+        adjusted_quantity = filters.quantize_quantity(quantity, is_market=is_market)
+        adjusted_price = filters.quantize_price(price) if price is not None else None
+        adjusted_stop_price = filters.quantize_price(stop_price) if stop_price is not None else None
+
+        check_price = adjusted_price if not is_market else reference_price
+        violation = filters.check(adjusted_quantity, check_price, is_market=is_market)
+        if violation is None and adjusted_stop_price is not None and not is_market:
+            violation = filters.check(adjusted_quantity, adjusted_stop_price)
+        if violation is not None:
+            raise OrderExecutionError(
+                f"Orden para {filters.symbol} rechazada por los filtros del exchange: {violation}",
+                code="ORDER_FILTER_VIOLATION",
+                details={
+                    "symbol": filters.symbol,
+                    "quantity": str(adjusted_quantity),
+                    "price": str(check_price) if check_price is not None else None,
+                }
+            )
+        if adjusted_quantity != quantity:
+            logger.debug(f"Cantidad de {filters.symbol} ajustada de {quantity} a {adjusted_quantity} (stepSize {filters.step_size}).")
+        return {"quantity": adjusted_quantity, "price": adjusted_price, "stop_price": adjusted_stop_price}
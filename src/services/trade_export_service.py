@@ -0,0 +1,355 @@
+"""
+Exportación masiva de trades a CSV o Parquet.
+
+Los trades se leen con el cursor del lado del servidor de `stream_trade_rows`, se aplanan a un
+esquema de columnas fijo y se codifican por bloques de `chunk_size` filas, de modo que la
+memoria usada no depende del número de trades exportados. Se usa desde GET /trades/export y
+también como script:
+
+    python -m services.trade_export_service --output trades.parquet [--mode real] [--start 2024-01-01]
+
+Parquet requiere pyarrow; si no está instalado solo está disponible CSV.
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import logging
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional, Tuple
+
+from core.exceptions import ReportError
+from core.ports.persistence_service import IPersistenceService
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    PARQUET_AVAILABLE = True
+except ImportError:  # pragma: no cover - depende del entorno
+    pa = None
+    pq = None
+    PARQUET_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+ExportFormat = Literal["csv", "parquet"]
+
+# (columna, tipo) del fichero exportado. Los campos de entryOrder se aplanan con el prefijo
+# "entryOrder."; las órdenes de salida se resumen en cantidad total y precio medio ponderado.
+TRADE_EXPORT_COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("id", "string"),
+    ("user_id", "string"),
+    ("mode", "string"),
+    ("symbol", "string"),
+    ("side", "string"),
+    ("positionStatus", "string"),
+    ("strategyId", "string"),
+    ("opportunityId", "string"),
+    ("aiAnalysisConfidence", "decimal"),
+    ("pnl_usd", "decimal"),
+    ("pnl_percentage", "decimal"),
+    ("closingReason", "string"),
+    ("takeProfitPrice", "decimal"),
+    ("trailingStopActivationPrice", "decimal"),
+    ("trailingStopCallbackRate", "decimal"),
+    ("currentStopPrice_tsl", "decimal"),
+    ("ocoOrderListId", "string"),
+    ("created_at", "timestamp"),
+    ("opened_at", "timestamp"),
+    ("updated_at", "timestamp"),
+    ("closed_at", "timestamp"),
+    ("entryOrder.orderId_exchange", "string"),
+    ("entryOrder.type", "string"),
+    ("entryOrder.status", "string"),
+    ("entryOrder.requestedQuantity", "decimal"),
+    ("entryOrder.executedQuantity", "decimal"),
+    ("entryOrder.executedPrice", "decimal"),
+    ("entryOrder.cumulativeQuoteQty", "decimal"),
+    ("entryOrder.commission", "decimal"),
+    ("entryOrder.commissionAsset", "string"),
+    ("entryOrder.timestamp", "timestamp"),
+    ("exitOrders.count", "int"),
+    ("exitOrders.executedQuantity", "decimal"),
+    ("exitOrders.avgExecutedPrice", "decimal"),
+    ("exitOrders.lastTimestamp", "timestamp"),
+)
+TRADE_EXPORT_FIELDS: Tuple[str, ...] = tuple(name for name, _ in TRADE_EXPORT_COLUMNS)
+
+ENTRY_ORDER_FIELDS = tuple(
+    name.split(".", 1)[1] for name in TRADE_EXPORT_FIELDS if name.startswith("entryOrder.")
+)
+
+
+def _to_decimal(value: Any) -> Optional[Decimal]:
+    if value is None or value == "":
+        return None
+    try:
+        return Decimal(str(value))
+    except InvalidOperation:
+        return None
+
+
+def _to_datetime(value: Any) -> Optional[datetime]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _to_string(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+_CONVERTERS = {"string": _to_string, "decimal": _to_decimal, "timestamp": _to_datetime, "int": lambda value: value}
+
+
+def flatten_trade_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Aplana un trade decodificado (como los de `stream_trade_rows`) a las columnas de
+    TRADE_EXPORT_COLUMNS, con Decimal para importes y datetime con zona horaria para fechas.
+    """
+    flat: Dict[str, Any] = {name: row.get(name) for name in TRADE_EXPORT_FIELDS if "." not in name}
+
+    entry_order = row.get("entryOrder") or {}
+    for field in ENTRY_ORDER_FIELDS:
+        flat[f"entryOrder.{field}"] = entry_order.get(field)
+
+    exit_orders = row.get("exitOrders") or []
+    exit_quantity = Decimal(0)
+    exit_value = Decimal(0)
+    last_timestamp: Optional[datetime] = None
+    for order in exit_orders:
+        quantity = _to_decimal(order.get("executedQuantity")) or Decimal(0)
+        price = _to_decimal(order.get("executedPrice")) or Decimal(0)
+        exit_quantity += quantity
+        exit_value += quantity * price
+        timestamp = _to_datetime(order.get("timestamp"))
+        if timestamp and (last_timestamp is None or timestamp > last_timestamp):
+            last_timestamp = timestamp
+    flat["exitOrders.count"] = len(exit_orders)
+    flat["exitOrders.executedQuantity"] = exit_quantity if exit_orders else None
+    flat["exitOrders.avgExecutedPrice"] = exit_value / exit_quantity if exit_quantity else None
+    flat["exitOrders.lastTimestamp"] = last_timestamp
+
+    return {name: _CONVERTERS[kind](flat[name]) for name, kind in TRADE_EXPORT_COLUMNS}
+
+
+class _CsvEncoder:
+    """Codifica bloques de filas aplanadas como CSV con cabecera."""
+
+    def __init__(self) -> None:
+        self._header_written = False
+
+    def encode(self, rows: List[Dict[str, Any]]) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if not self._header_written:
+            writer.writerow(TRADE_EXPORT_FIELDS)
+            self._header_written = True
+        for row in rows:
+            writer.writerow(
+                value.isoformat() if isinstance(value, datetime) else ("" if value is None else value)
+                for value in row.values()
+            )
+        return buffer.getvalue().encode("utf-8")
+
+    def finish(self) -> bytes:
+        return b"" if self._header_written else self.encode([])
+
+
+class _ChunkSink(io.RawIOBase):
+    """Destino de escritura de pyarrow que acumula los bytes producidos hasta que se drenan."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buffer.extend(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+class _ParquetEncoder:
+    """Codifica cada bloque de filas como un row group de un único fichero Parquet."""
+
+    _ARROW_TYPES = {
+        "string": lambda: pa.string(),
+        "decimal": lambda: pa.float64(),
+        "timestamp": lambda: pa.timestamp("us", tz="UTC"),
+        "int": lambda: pa.int64(),
+    }
+
+    def __init__(self) -> None:
+        if not PARQUET_AVAILABLE:
+            raise ReportError("La exportación a Parquet requiere pyarrow.", code="PARQUET_UNAVAILABLE")
+        self._schema = pa.schema([(name, self._ARROW_TYPES[kind]()) for name, kind in TRADE_EXPORT_COLUMNS])
+        self._sink = _ChunkSink()
+        self._writer = pq.ParquetWriter(self._sink, self._schema, compression="snappy")
+
+    def encode(self, rows: List[Dict[str, Any]]) -> bytes:
+        columns = []
+        for name, kind in TRADE_EXPORT_COLUMNS:
+            values = [row[name] for row in rows]
+            if kind == "decimal":
+                values = [float(value) if value is not None else None for value in values]
+            columns.append(values)
+        self._writer.write_batch(pa.RecordBatch.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, self._schema, strict=True)],
+            schema=self._schema
+        ))
+        return self._sink.drain()
+
+    def finish(self) -> bytes:
+        self._writer.close()
+        return self._sink.drain()
+
+
+class TradeExportService:
+    """
+    Exporta trades a CSV o Parquet en memoria constante a partir de un cursor del lado del servidor.
+    """
+    DEFAULT_CHUNK_SIZE = 1000
+
+    def __init__(self, persistence_service: IPersistenceService, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.persistence_service = persistence_service
+        self.chunk_size = chunk_size
+
+    @staticmethod
+    def media_type(export_format: ExportFormat) -> str:
+        return "text/csv" if export_format == "csv" else "application/vnd.apache.parquet"
+
+    @staticmethod
+    def _make_encoder(export_format: ExportFormat):
+        if export_format == "csv":
+            return _CsvEncoder()
+        if export_format == "parquet":
+            return _ParquetEncoder()
+        raise ReportError(f"Formato de exportación no soportado: {export_format}", code="INVALID_EXPORT_FORMAT")
+
+    async def _row_batches(self, user_id: str, **filters: Any) -> AsyncIterator[List[Dict[str, Any]]]:
+        batch: List[Dict[str, Any]] = []
+        async for row in self.persistence_service.stream_trade_rows(user_id=user_id, batch_size=self.chunk_size, **filters):
+            batch.append(flatten_trade_row(row))
+            if len(batch) >= self.chunk_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def iter_export(
+        self,
+        export_format: ExportFormat,
+        user_id: str,
+        trading_mode: Optional[str] = None,
+        status: Optional[str] = None,
+        symbol: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Produce el fichero exportado por fragmentos de bytes, uno por bloque de `chunk_size` trades.
+        El encoder se crea antes de leer la primera fila para que un formato no disponible falle
+        antes de empezar a transmitir.
+        """
+        encoder = self._make_encoder(export_format)
+        return self._encode_batches(
+            encoder, user_id, trading_mode=trading_mode, status=status, symbol=symbol,
+            start_date=start_date, end_date=end_date
+        )
+
+    async def _encode_batches(self, encoder, user_id: str, **filters: Any) -> AsyncIterator[bytes]:
+        async for batch in self._row_batches(user_id, **filters):
+            yield encoder.encode(batch)
+        yield encoder.finish()
+
+    async def export_to_file(
+        self,
+        path: str,
+        export_format: ExportFormat,
+        user_id: str,
+        **filters: Any,
+    ) -> int:
+        """Escribe la exportación en `path` y devuelve el número de trades exportados."""
+        encoder = self._make_encoder(export_format)
+        exported = 0
+        with open(path, "wb") as output:
+            async for batch in self._row_batches(user_id, **filters):
+                output.write(encoder.encode(batch))
+                exported += len(batch)
+            output.write(encoder.finish())
+        logger.info(f"Exportados {exported} trades a {path} ({export_format}).")
+        return exported
+
+
+def _parse_date(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+async def _run_cli(args: argparse.Namespace) -> None:
+    import dependencies
+    from adapters.persistence_service import SupabasePersistenceService
+    from app_config import get_app_settings
+
+    await dependencies.initialize_database()
+    persistence_service = SupabasePersistenceService(session_factory=dependencies._session_factory)
+    service = TradeExportService(persistence_service, chunk_size=args.chunk_size)
+    export_format = args.format or ("parquet" if args.output.endswith(".parquet") else "csv")
+    try:
+        await service.export_to_file(
+            args.output,
+            export_format,
+            user_id=str(args.user_id or get_app_settings().FIXED_USER_ID),
+            trading_mode=args.mode,
+            status=args.status,
+            symbol=args.symbol,
+            start_date=_parse_date(args.start),
+            end_date=_parse_date(args.end)
+        )
+    finally:
+        await persistence_service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exporta el historial de trades a CSV o Parquet.")
+    parser.add_argument("--output", required=True, help="Fichero de salida (.csv o .parquet)")
+    parser.add_argument("--format", choices=["csv", "parquet"], default=None,
+                        help="Formato de salida (por defecto, según la extensión de --output)")
+    parser.add_argument("--user-id", default=None, help="Usuario a exportar (por defecto, FIXED_USER_ID)")
+    parser.add_argument("--mode", choices=["paper", "real", "both"], default="both", help="Modo de trading")
+    parser.add_argument("--status", default=None, help="Estado de la posición (ej. closed)")
+    parser.add_argument("--symbol", default=None, help="Par de trading (ej. BTCUSDT)")
+    parser.add_argument("--start", default=None, help="Fecha ISO de inicio sobre created_at")
+    parser.add_argument("--end", default=None, help="Fecha ISO de fin sobre created_at")
+    parser.add_argument("--chunk-size", type=int, default=TradeExportService.DEFAULT_CHUNK_SIZE,
+                        help="Trades leídos y escritos por bloque")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    asyncio.run(_run_cli(parser.parse_args()))
@@ -66,6 +66,7 @@ if TYPE_CHECKING:
     from services.config_service import ConfigurationService
     from services.notification_service import NotificationService
     from adapters.persistence_service import SupabasePersistenceService
+    from adapters.unit_of_work import PersistenceUnitOfWork
     from services.portfolio_service import PortfolioService
 
 logger = logging.getLogger(__name__)
@@ -129,6 +130,18 @@ class TradingEngine:
         self.ai_orchestrator = ai_orchestrator or AIOrchestrator(market_data_service=market_data_service)
 
     async def execute_trade_from_confirmed_opportunity(self, opportunity: Opportunity) -> Optional[Trade]:
+        """
+        Executes a user-confirmed opportunity. Every write of the decision (user configuration,
+        trade, opportunity status and notifications) is collected in a unit of work and committed
+        in a single transaction once the decision finishes, whether it succeeds or fails.
+        """
+        unit_of_work = self.persistence_service.unit_of_work()
+        try:
+            return await self._execute_trade_from_confirmed_opportunity(opportunity, unit_of_work)
+        finally:
+            await unit_of_work.commit()
+
+    async def _execute_trade_from_confirmed_opportunity(self, opportunity: Opportunity, unit_of_work: "PersistenceUnitOfWork") -> Optional[Trade]:
         logger.info(f"Executing trade directly from confirmed opportunity {opportunity.id}")
 
         user_config = await self.configuration_service.get_user_configuration(str(opportunity.user_id))
@@ -143,12 +156,12 @@ class TradingEngine:
                 logger.info(f"Daily capital reset triggered for user {opportunity.user_id}. Resetting daily_capital_risked_usd.")
                 user_config.real_trading_settings.daily_capital_risked_usd = Decimal("0.0") # Asegurar tipo Decimal
                 user_config.real_trading_settings.last_daily_reset = datetime.now(timezone.utc)
-                await self.configuration_service.save_user_configuration(user_config)
+                await self.configuration_service.save_user_configuration(user_config, unit_of_work=unit_of_work, fields={"real_trading_settings"})
                 logger.info(f"User configuration saved after daily capital reset for user {opportunity.user_id}.")
         elif user_config.real_trading_settings and user_config.real_trading_settings.last_daily_reset is None:
             # Si es la primera vez que se usa, inicializar last_daily_reset
             user_config.real_trading_settings.last_daily_reset = datetime.now(timezone.utc)
-            await self.configuration_service.save_user_configuration(user_config)
+            await self.configuration_service.save_user_configuration(user_config, unit_of_work=unit_of_work, fields={"real_trading_settings"})
             logger.info(f"User configuration saved after initializing last_daily_reset for user {opportunity.user_id}.")
         elif user_config.real_trading_settings is None: # Asegurar que real_trading_settings no sea None
             user_config.real_trading_settings = RealTradingSettings(
@@ -162,7 +175,7 @@ class TradingEngine:
                 daily_capital_risked_usd=Decimal("0.0"),
                 last_daily_reset=datetime.now(timezone.utc)
             )
-            await self.configuration_service.save_user_configuration(user_config)
+            await self.configuration_service.save_user_configuration(user_config, unit_of_work=unit_of_work, fields={"real_trading_settings"})
             logger.info(f"User configuration saved after initializing real_trading_settings for user {opportunity.user_id}.")
 
         # --- Lógica de Validación de Capital ---
@@ -189,7 +202,7 @@ class TradingEngine:
         if (current_daily_risked + potential_risk_usd) > daily_risk_limit_usd:
             error_msg = f"Límite de riesgo de capital diario excedido. Límite: {daily_risk_limit_usd}, Arriesgado: {current_daily_risked}, Nuevo Trade: {potential_risk_usd}"
             logger.error(error_msg)
-            await self._update_opportunity_status(opportunity, OpportunityStatus.ERROR_IN_PROCESSING, "daily_capital_limit_exceeded", error_msg)
+            await self._update_opportunity_status(opportunity, OpportunityStatus.ERROR_IN_PROCESSING, "daily_capital_limit_exceeded", error_msg, unit_of_work=unit_of_work)
             raise OrderExecutionError(error_msg)
         # --- Fin de la Lógica de Validación de Capital ---
         
@@ -236,7 +249,8 @@ class TradingEngine:
                 opportunity,
                 OpportunityStatus.ERROR_IN_PROCESSING,
                 "trade_creation_failed",
-                "Failed to create trade object after user confirmation."
+                "Failed to create trade object after user confirmation.",
+                unit_of_work=unit_of_work
             )
             return None
 
@@ -279,7 +293,8 @@ class TradingEngine:
                 message=f"Trade {trade.symbol} ({trade.side}) ejecutado exitosamente. Cantidad: {executed_qty}, Precio: {executed_price}",
                 status_level="INFO",
                 symbol=trade.symbol,
-                trade_id=UUID(str(trade.id)) # Convertir a UUID explícitamente
+                trade_id=UUID(str(trade.id)), # Convertir a UUID explícitamente
+                unit_of_work=unit_of_work
             )
 
             # Create OCO order for TSL/TP if applicable
@@ -322,9 +337,7 @@ class TradingEngine:
                         f"Position opened, but OCO creation failed: {str(oco_e)}"
                     )
 
-            await self.persistence_service.upsert_trade(
-                trade
-            )  # Persist trade with updated status and OCO ID
+            unit_of_work.upsert_trade(trade)  # Persist trade with updated status and OCO ID
 
             # Actualizar daily_capital_risked_usd después del trade
             if user_config.real_trading_settings:
@@ -348,33 +361,36 @@ class TradingEngine:
                 if user_config.real_trading_settings.real_trades_executed_count is None:
                     user_config.real_trading_settings.real_trades_executed_count = 0
                 user_config.real_trading_settings.real_trades_executed_count += 1 # Incrementar el contador de trades ejecutados
-                await self.configuration_service.save_user_configuration(user_config)
+                await self.configuration_service.save_user_configuration(user_config, unit_of_work=unit_of_work, fields={"real_trading_settings"})
                 logger.info(f"Updated daily_capital_risked_usd for user {opportunity.user_id} to {user_config.real_trading_settings.daily_capital_risked_usd}.")
 
             await self._update_opportunity_status(
                 opportunity,
                 OpportunityStatus.CONVERTED_TO_TRADE_REAL,
                 "trade_executed_by_confirmation",
-                f"Trade {trade.id} executed based on user confirmation."
+                f"Trade {trade.id} executed based on user confirmation.",
+                unit_of_work=unit_of_work
             )
             return trade
         except Exception as e:
             logger.error(f"Failed to execute trade for opportunity {opportunity.id}: {e}", exc_info=True)
             trade.positionStatus = PositionStatus.ERROR
             trade.closingReason = str(e)
-            await self.persistence_service.upsert_trade(trade) # The side is set in create_trade_from_decision
+            unit_of_work.upsert_trade(trade) # The side is set in create_trade_from_decision
             await self.notification_service.send_real_trade_status_notification(
                 user_config=user_config,
                 message=f"Error al ejecutar trade para {opportunity.symbol}: {e}",
                 status_level="ERROR",
                 symbol=opportunity.symbol,
-                trade_id=UUID(str(trade.id)) # Convertir a UUID explícitamente
+                trade_id=UUID(str(trade.id)), # Convertir a UUID explícitamente
+                unit_of_work=unit_of_work
             )
             await self._update_opportunity_status(
                 opportunity,
                 OpportunityStatus.ERROR_IN_PROCESSING,
                 "trade_execution_failed",
-                f"Failed to execute trade: {e}"
+                f"Failed to execute trade: {e}",
+                unit_of_work=unit_of_work
             )
             return trade
 
@@ -535,12 +551,19 @@ class TradingEngine:
             timeInForce=None,
         )
 
-    async def _update_opportunity_status(self, opportunity: Opportunity, status: OpportunityStatus, reason_code: str, reason_text: str) -> None:
+    async def _update_opportunity_status(self, opportunity: Opportunity, status: OpportunityStatus, reason_code: str, reason_text: str, unit_of_work: Optional["PersistenceUnitOfWork"] = None) -> None:
         opportunity.status = status
         opportunity.status_reason_code = reason_code
         opportunity.status_reason_text = reason_text
         opportunity.updated_at = datetime.now(timezone.utc)
         logger.info(f"Updated opportunity {opportunity.id} status to {status.value}: {reason_text}")
+        if unit_of_work is not None:
+            unit_of_work.update_opportunity_status(
+                opportunity_id=UUID(opportunity.id),
+                new_status=status,
+                status_reason=reason_text
+            )
+            return
         try:
             await self.persistence_service.update_opportunity_status(
                 opportunity_id=UUID(opportunity.id), 
@@ -591,24 +614,19 @@ class TradingEngine:
             return []
 
         mode = "paper" if user_config.paper_trading_active else "real"
-        active_strategies = await self.strategy_service.get_active_strategies(user_id_str, mode)
-        
-        if not active_strategies:
-            logger.warning(f"No active strategies found for user {user_id_str} in {mode} mode.")
-            await self._update_opportunity_status(
-                opportunity,
-                OpportunityStatus.REJECTED_BY_SYSTEM,
-                "no_active_strategies",
-                f"No active {mode} strategies found for user."
-            )
-            return []
-
-        applicable_strategies = []
-        for s in active_strategies:
-            if await self.strategy_service.is_strategy_applicable_to_symbol(str(s.id), user_id_str, opportunity.symbol):
-                applicable_strategies.append(s)
+        # One lookup in the strategy service's compiled applicability index; no per-strategy queries.
+        applicable_strategies = await self.strategy_service.get_applicable_strategies(user_id_str, mode, opportunity.symbol)
 
         if not applicable_strategies:
+            if not await self.strategy_service.has_active_strategies(user_id_str, mode):
+                logger.warning(f"No active strategies found for user {user_id_str} in {mode} mode.")
+                await self._update_opportunity_status(
+                    opportunity,
+                    OpportunityStatus.REJECTED_BY_SYSTEM,
+                    "no_active_strategies",
+                    f"No active {mode} strategies found for user."
+                )
+                return []
             logger.warning(f"No active and applicable strategies found for opportunity {opportunity.id} with symbol {opportunity.symbol}.")
             await self._update_opportunity_status(
                 opportunity,
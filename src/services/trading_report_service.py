@@ -8,6 +8,7 @@ from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
 from shared.data_types import Trade, PerformanceMetrics
 from adapters.persistence_service import SupabasePersistenceService
 from core.exceptions import UltiBotError, ReportError
+from core.ports.persistence_service import trade_summary_volume
 
 logger = logging.getLogger(__name__)
 
@@ -62,6 +63,40 @@ class TradingReportService:
             logger.error(f"Error al obtener trades cerrados para usuario {user_id}: {e}", exc_info=True)
             raise ReportError(f"Error al obtener historial de trades: {str(e)}")
     
+    async def get_closed_trades_page(
+        self,
+        user_id: UUID,
+        mode: str = 'paper',
+        symbol: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        limit: int = 100,
+        cursor: Optional[Tuple[datetime, str]] = None
+    ) -> Tuple[List[Trade], Optional[Tuple[datetime, str]]]:
+        """
+        Obtiene una página de trades cerrados, del más reciente al más antiguo, paginando por clave.
+
+        Args:
+            cursor: (created_at, id) del último trade de la página anterior (opcional)
+
+        Returns:
+            Tupla con los trades de la página y el cursor de la página siguiente (None si no hay más)
+        """
+        try:
+            return await self.persistence_service.get_trades_page(
+                user_id=str(user_id),
+                trading_mode=mode,
+                status='closed',
+                symbol=symbol,
+                start_date=start_date,
+                end_date=end_date,
+                limit=limit,
+                cursor=cursor
+            )
+        except Exception as e:
+            logger.error(f"Error al obtener página de trades cerrados para usuario {user_id}: {e}", exc_info=True)
+            raise ReportError(f"Error al obtener historial de trades: {str(e)}") from e
+
     async def calculate_performance_metrics(
         self, 
         user_id: UUID, 
@@ -84,95 +119,59 @@ class TradingReportService:
             Objeto PerformanceMetrics con las métricas calculadas
         """
         try:
-            # Obtener todos los trades cerrados para los filtros (sin límite para cálculos precisos)
-            trades = await self.get_closed_trades(
-                user_id, mode, symbol, start_date, end_date, limit=1000, offset=0
+            # Las métricas se agregan en la base de datos sobre todos los trades que cumplen los filtros.
+            summary = await self.persistence_service.get_trade_performance_summary(
+                user_id=str(user_id),
+                mode=mode,
+                symbol=symbol,
+                start_date=start_date,
+                end_date=end_date,
+                date_field="closed_at"
             )
-            
-            # Si no hay trades, devolver métricas con valores por defecto
-            if not trades:
+
+            total_trades = summary["total_trades"]
+            if not total_trades:
                 return PerformanceMetrics(
                     total_trades=0,
                     winning_trades=0,
                     losing_trades=0,
-                    win_rate=Decimal("0.0"), # CAMBIO: float a Decimal
-                    total_pnl=Decimal("0.0"), # CAMBIO: float a Decimal
-                    avg_pnl_per_trade=Decimal("0.0"), # CAMBIO: float a Decimal
-                    best_trade_pnl=Decimal("0.0"), # CAMBIO: float a Decimal
-                    worst_trade_pnl=Decimal("0.0"), # CAMBIO: float a Decimal
+                    win_rate=Decimal("0.0"),
+                    total_pnl=Decimal("0.0"),
+                    avg_pnl_per_trade=Decimal("0.0"),
+                    best_trade_pnl=Decimal("0.0"),
+                    worst_trade_pnl=Decimal("0.0"),
                     best_trade_symbol=None,
                     worst_trade_symbol=None,
                     period_start=start_date,
                     period_end=end_date,
-                    total_volume_traded=Decimal("0.0") # CAMBIO: float a Decimal
+                    total_volume_traded=Decimal("0.0")
                 )
-                
-            # Calcular métricas
-            total_trades = len(trades)
-            winning_trades = sum(1 for trade in trades if trade.pnl_usd is not None and trade.pnl_usd > Decimal("0.0")) # CAMBIO: float a Decimal
-            losing_trades = sum(1 for trade in trades if trade.pnl_usd is not None and trade.pnl_usd < Decimal("0.0")) # CAMBIO: float a Decimal
-            
+
+            winning_trades = summary["winning_trades"]
+            losing_trades = summary["losing_trades"]
+            total_pnl = Decimal(str(summary["total_pnl"]))
+
             # Win rate (excluye trades con PnL = 0)
-            non_zero_trades = sum(1 for trade in trades if trade.pnl_usd is not None and trade.pnl_usd != Decimal("0.0")) # CAMBIO: float a Decimal
-            win_rate = (Decimal(winning_trades) / Decimal(non_zero_trades)) * Decimal("100.0") if non_zero_trades > 0 else Decimal("0.0") # CAMBIO: float a Decimal
-            
-            # PnL total
-            total_pnl = Decimal("0.0")
-            if trades:
-                total_pnl = sum(trade.pnl_usd for trade in trades if trade.pnl_usd is not None)
-            
-            # PnL promedio por operación
-            avg_pnl_per_trade = total_pnl / Decimal(total_trades) if total_trades > 0 else Decimal("0.0")
-            
-            # Mejor y peor trade
-            trades_with_pnl = [(trade.pnl_usd, trade.symbol) for trade in trades if trade.pnl_usd is not None]
-            
-            best_trade_pnl = Decimal("0.0")
-            worst_trade_pnl = Decimal("0.0")
-            best_trade_symbol = None
-            worst_trade_symbol = None
-            
-            if trades_with_pnl:
-                best_trade = max(trades_with_pnl, key=lambda x: x[0])
-                worst_trade = min(trades_with_pnl, key=lambda x: x[0])
-                
-                best_trade_pnl = best_trade[0]
-                worst_trade_pnl = worst_trade[0]
-                best_trade_symbol = best_trade[1]
-                worst_trade_symbol = worst_trade[1]
-            
-            # Calcular volumen total operado (suma de todas las operaciones)
-            total_volume_traded = Decimal("0.0")
-            if trades:
-                total_volume_traded = sum(
-                    trade.entryOrder.executedQuantity * trade.entryOrder.executedPrice 
-                    for trade in trades 
-                    if trade.entryOrder and trade.entryOrder.executedQuantity and trade.entryOrder.executedPrice
-                )
-            
-            # Determinar fechas de inicio y fin del periodo si no se proporcionaron
-            if not start_date and trades:
-                start_date = min(trade.opened_at for trade in trades if trade.opened_at)
-            if not end_date and trades:
-                end_date = max(trade.closed_at for trade in trades if trade.closed_at)
-            
-            # Crear y devolver el objeto de métricas
+            non_zero_trades = winning_trades + losing_trades
+            win_rate = (Decimal(winning_trades) / Decimal(non_zero_trades)) * Decimal("100.0") if non_zero_trades > 0 else Decimal("0.0")
+
             return PerformanceMetrics(
                 total_trades=total_trades,
                 winning_trades=winning_trades,
                 losing_trades=losing_trades,
                 win_rate=win_rate,
-                total_pnl=Decimal(total_pnl), # Asegurar que sea Decimal
-                avg_pnl_per_trade=avg_pnl_per_trade,
-                best_trade_pnl=best_trade_pnl,
-                worst_trade_pnl=worst_trade_pnl,
-                best_trade_symbol=best_trade_symbol,
-                worst_trade_symbol=worst_trade_symbol,
-                period_start=start_date,
-                period_end=end_date,
-                total_volume_traded=Decimal(total_volume_traded) # Asegurar que sea Decimal
+                total_pnl=total_pnl,
+                avg_pnl_per_trade=total_pnl / Decimal(total_trades),
+                best_trade_pnl=Decimal(str(summary["best_trade_pnl"] or 0)),
+                worst_trade_pnl=Decimal(str(summary["worst_trade_pnl"] or 0)),
+                best_trade_symbol=summary["best_trade_symbol"],
+                worst_trade_symbol=summary["worst_trade_symbol"],
+                # Si no se indicó el periodo, se usa el rango de los trades encontrados.
+                period_start=start_date or summary["first_created_at"],
+                period_end=end_date or summary["last_closed_at"],
+                total_volume_traded=trade_summary_volume(summary)
             )
-            
+
         except Exception as e:
             logger.error(f"Error al calcular métricas de rendimiento para usuario {user_id}: {e}", exc_info=True)
             raise ReportError(f"Error al calcular métricas de rendimiento: {str(e)}")
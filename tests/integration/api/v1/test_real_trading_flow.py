@@ -12,6 +12,7 @@ from core.domain_models.opportunity_models import Opportunity, OpportunityStatus
 from core.domain_models.user_configuration_models import UserConfiguration, RiskProfileSettings, RealTradingSettings
 from shared.data_types import APICredential, PortfolioSnapshot, PortfolioSummary, ServiceName
 from core.domain_models.trading_strategy_models import TradingStrategyConfig
+from adapters.unit_of_work import PersistenceUnitOfWork
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +38,8 @@ async def test_complete_real_trading_flow_with_capital_management():
     mock_portfolio_service = AsyncMock(spec=PortfolioService)
     mock_persistence_service = AsyncMock(spec=SupabasePersistenceService)
     mock_persistence_service.upsert_trade = AsyncMock() # Add the correct method to the mock
+    mock_persistence_service.unit_of_work.side_effect = lambda: PersistenceUnitOfWork(mock_persistence_service)
+    mock_persistence_service.transaction.return_value.__aenter__.return_value = mock_persistence_service
     mock_notification_service = AsyncMock(spec=NotificationService)
     mock_strategy_service = AsyncMock()
     mock_unified_order_execution_service = AsyncMock(spec=UnifiedOrderExecutionService)
@@ -246,6 +249,8 @@ async def test_capital_management_daily_reset():
     mock_portfolio_service = AsyncMock(spec=PortfolioService)
     mock_persistence_service = AsyncMock(spec=SupabasePersistenceService)
     mock_persistence_service.upsert_trade = AsyncMock() # Add the correct method to the mock
+    mock_persistence_service.unit_of_work.side_effect = lambda: PersistenceUnitOfWork(mock_persistence_service)
+    mock_persistence_service.transaction.return_value.__aenter__.return_value = mock_persistence_service
     mock_notification_service = AsyncMock(spec=NotificationService)
     mock_strategy_service = AsyncMock()
     mock_unified_order_execution_service = AsyncMock(spec=UnifiedOrderExecutionService)
@@ -361,7 +366,7 @@ async def test_capital_management_daily_reset():
 
     # Mock side effect for saving config
     saved_configs_copies = []
-    async def save_config_side_effect(config_to_save):
+    async def save_config_side_effect(config_to_save, unit_of_work=None, fields=None):
         saved_configs_copies.append(copy.deepcopy(config_to_save))
     mock_config_service.save_user_configuration.side_effect = save_config_side_effect
 
@@ -338,12 +338,9 @@ class TestCompleteOpportunityProcessingFlow:
         mode = "paper"
         
         # FIX: Mock the direct dependencies of TradingEngine
-        trading_engine_fixture.strategy_service.get_active_strategies = AsyncMock(
+        trading_engine_fixture.strategy_service.get_applicable_strategies = AsyncMock(
             return_value=[scalping_strategy_btc]
         )
-        trading_engine_fixture.strategy_service.is_strategy_applicable_to_symbol = AsyncMock(
-            return_value=True
-        )
         trading_engine_fixture.configuration_service.get_user_configuration = AsyncMock(
             return_value=user_configuration
         )
@@ -417,16 +414,13 @@ class TestCompleteOpportunityProcessingFlow:
             day_trading_strategy_multi,
         ]
         # FIX: Mock the direct dependencies of TradingEngine
-        trading_engine_fixture.strategy_service.get_active_strategies = AsyncMock(
+        trading_engine_fixture.strategy_service.get_applicable_strategies = AsyncMock(
             return_value=[scalping_strategy_btc, day_trading_strategy_multi]
         )
         trading_engine_fixture.configuration_service.get_user_configuration = AsyncMock(
             return_value=user_configuration
         )
         
-        # Mock the new method call within the loop
-        trading_engine_fixture.strategy_service.is_strategy_applicable_to_symbol = AsyncMock(return_value=True)
-        
         # Mock AI analysis for day trading strategy
         from core.domain_models.opportunity_models import AIAnalysis, RecommendedTradeParams
         ai_analysis_result = AIAnalysis(
@@ -550,7 +544,7 @@ class TestCompleteOpportunityProcessingFlow:
         user_configuration.paper_trading_active = False
         
         # FIX: Mock the direct dependencies of TradingEngine
-        trading_engine_fixture.strategy_service.get_active_strategies = AsyncMock(
+        trading_engine_fixture.strategy_service.get_applicable_strategies = AsyncMock(
             return_value=[day_trading_strategy_multi]
         )
         trading_engine_fixture.configuration_service.get_user_configuration = AsyncMock(
@@ -569,9 +563,6 @@ class TestCompleteOpportunityProcessingFlow:
         # AÑADIR ESTE MOCK para forzar el fallo cuando la IA no es suficiente
         trading_engine_fixture.strategy_service.strategy_can_operate_autonomously = AsyncMock(return_value=False)
 
-        # Mock strategy applicability
-        trading_engine_fixture.strategy_service.is_strategy_applicable_to_symbol = AsyncMock(return_value=True)
-
         # FIX: Mock the internal evaluation to return None, simulating rejection due to low confidence.
         with patch.object(trading_engine_fixture, '_evaluate_strategy_for_opportunity', return_value=None) as mock_evaluate, \
              patch.object(trading_engine_fixture, '_update_opportunity_status') as mock_update_status:
@@ -624,7 +615,7 @@ class TestCompleteOpportunityProcessingFlow:
 
         # FIX: Mock the direct dependencies of TradingEngine
         scalping_strategy_btc.is_active_real_mode = True # Ensure it's active for real mode test
-        trading_engine_fixture.strategy_service.get_active_strategies = AsyncMock(
+        trading_engine_fixture.strategy_service.get_applicable_strategies = AsyncMock(
             return_value=[scalping_strategy_btc]
         )
         trading_engine_fixture.configuration_service.get_user_configuration = AsyncMock(
@@ -691,16 +682,13 @@ class TestCompleteOpportunityProcessingFlow:
         mode = "paper"
         
         # FIX: Mock the direct dependencies of TradingEngine
-        trading_engine_fixture.strategy_service.get_active_strategies = AsyncMock(
+        trading_engine_fixture.strategy_service.get_applicable_strategies = AsyncMock(
             return_value=[scalping_strategy_btc, day_trading_strategy_multi]
         )
         trading_engine_fixture.configuration_service.get_user_configuration = AsyncMock(
             return_value=user_configuration
         )
         
-        # Mock strategy applicability for both
-        trading_engine_fixture.strategy_service.is_strategy_applicable_to_symbol = AsyncMock(return_value=True)
-
         # Mock the evaluation: AI strategy fails (returns None), scalping succeeds
         successful_decision = TradingDecision(
             decision="execute_trade",
@@ -175,8 +175,7 @@ async def test_ai_workflow_high_confidence_generates_decision(
     config_service = trading_engine_fixture.configuration_service
 
     # Correctly mock the service calls made by process_opportunity
-    strategy_service.get_active_strategies.return_value = [scalping_strategy_with_ai]
-    strategy_service.is_strategy_applicable_to_symbol.return_value = True
+    strategy_service.get_applicable_strategies.return_value = [scalping_strategy_with_ai]
     strategy_service.strategy_can_operate_autonomously.return_value = False
     
     mock_user_config.ai_strategy_configurations = [ai_config_scalping]
@@ -242,8 +241,7 @@ async def test_ai_workflow_low_confidence_rejects_opportunity(
     order_execution_service = trading_engine_fixture.unified_order_execution_service
     config_service = trading_engine_fixture.configuration_service
 
-    strategy_service.get_active_strategies.return_value = [scalping_strategy_with_ai]
-    strategy_service.is_strategy_applicable_to_symbol.return_value = True
+    strategy_service.get_applicable_strategies.return_value = [scalping_strategy_with_ai]
     strategy_service.strategy_can_operate_autonomously.return_value = False
     
     mock_user_config.ai_strategy_configurations = [ai_config_scalping]
@@ -296,8 +294,7 @@ async def test_autonomous_strategy_generates_decision_without_ai(
     order_execution_service = trading_engine_fixture.unified_order_execution_service
     config_service = trading_engine_fixture.configuration_service
 
-    strategy_service.get_active_strategies.return_value = [autonomous_scalping_strategy]
-    strategy_service.is_strategy_applicable_to_symbol.return_value = True
+    strategy_service.get_applicable_strategies.return_value = [autonomous_scalping_strategy]
     strategy_service.strategy_can_operate_autonomously.return_value = True
     config_service.get_user_configuration.return_value = mock_user_config
     
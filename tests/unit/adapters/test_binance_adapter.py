@@ -4,6 +4,7 @@ from unittest.mock import AsyncMock, patch, MagicMock
 import pytest_asyncio # Importar pytest_asyncio
 
 from src.adapters.binance_adapter import BinanceAdapter, BinanceAPIError
+from src.adapters.binance_rate_limiter import RequestPriority
 from src.shared.data_types import AssetBalance
 
 @pytest_asyncio.fixture # Usar pytest_asyncio.fixture
@@ -123,6 +124,7 @@ async def test_make_request_get_success(MockAsyncClient):
     mock_response = MagicMock(spec=httpx.Response)
     mock_response.status_code = 200
     mock_response.json.return_value = {"data": "success"}
+    mock_response.headers = httpx.Headers({"X-MBX-USED-WEIGHT-1M": "42"})
     
     # Configurar el mock del cliente para que su método get devuelva el mock_response
     mock_client_instance = MockAsyncClient.return_value
@@ -137,6 +139,7 @@ async def test_make_request_get_success(MockAsyncClient):
 
     assert result == {"data": "success"}
     mock_client_instance.get.assert_called_once_with(endpoint, params={}, headers={"X-MBX-APIKEY": api_key})
+    assert adapter.rate_limiter.last_headers["x-mbx-used-weight-1m"] == 42
 
 
 @pytest.mark.asyncio
@@ -153,6 +156,7 @@ async def test_make_request_retry_on_5xx_then_success(MockAsyncClient):
     mock_success_response = MagicMock(spec=httpx.Response)
     mock_success_response.status_code = 200
     mock_success_response.json.return_value = {"data": "success_after_retry"}
+    mock_success_response.headers = httpx.Headers({"X-MBX-USED-WEIGHT-1M": "2"})
 
     mock_client_instance = MockAsyncClient.return_value
     mock_client_instance.get = AsyncMock(side_effect=[
@@ -218,3 +222,89 @@ async def test_make_request_client_error_no_retry(MockAsyncClient):
         assert excinfo.value.status_code == 400
         assert mock_client_instance.get.call_count == 1 # Solo un intento
         mock_sleep.assert_not_called() # No se debe llamar a sleep
+
+@pytest.mark.asyncio
+async def test_get_tickers_24hr_sends_symbols_as_json_array(binance_adapter: BinanceAdapter):
+    """Prueba que get_tickers_24hr agrupa todos los símbolos en una sola solicitud."""
+    mock_response_data = [{"symbol": "BTCUSDT"}, {"symbol": "ETHUSDT"}]
+    binance_adapter._make_request = AsyncMock(return_value=mock_response_data)
+
+    result = await binance_adapter.get_tickers_24hr(["BTC/USDT", "ethusdt", "BTCUSDT"])
+
+    assert result == mock_response_data
+    binance_adapter._make_request.assert_called_once_with(
+        "GET", "/api/v3/ticker/24hr", "", "", params={"symbols": '["BTCUSDT","ETHUSDT"]'}, signed=False,
+        priority=RequestPriority.LOW
+    )
+
+@pytest.mark.asyncio
+@patch('src.adapters.binance_adapter.httpx.AsyncClient')
+async def test_make_request_rate_limited_blocks_further_requests(MockAsyncClient):
+    """Prueba que un 429 registra el bloqueo en el rate limiter y no se reintenta."""
+    adapter = BinanceAdapter()
+
+    mock_error_response = MagicMock(spec=httpx.Response)
+    mock_error_response.status_code = 429
+    mock_error_response.text = '{"msg":"Too many requests","code":-1003}'
+    mock_error_response.json.return_value = {"msg": "Too many requests", "code": -1003}
+    mock_error_response.headers = {"Retry-After": "30"}
+
+    mock_client_instance = MockAsyncClient.return_value
+    mock_client_instance.get = AsyncMock(
+        side_effect=httpx.HTTPStatusError("Rate limited", request=MagicMock(), response=mock_error_response)
+    )
+    mock_client_instance.aclose = AsyncMock()
+    adapter.rate_limiter.register_rate_limit_response = MagicMock(return_value=30.0)
+
+    with pytest.raises(BinanceAPIError) as excinfo:
+        await adapter._make_request("GET", "/api/v3/klines", "", "", params={"symbol": "BTCUSDT"})
+
+    assert excinfo.value.status_code == 429
+    assert mock_client_instance.get.call_count == 1
+    adapter.rate_limiter.register_rate_limit_response.assert_called_once_with(429, {"Retry-After": "30"})
+
+@pytest.mark.asyncio
+@patch('src.adapters.binance_adapter.httpx.AsyncClient')
+async def test_make_request_coalesces_identical_concurrent_gets(MockAsyncClient):
+    """Prueba que GETs no firmados idénticos y concurrentes comparten una sola solicitud."""
+    import asyncio
+    adapter = BinanceAdapter()
+
+    mock_response = MagicMock(spec=httpx.Response)
+    mock_response.status_code = 200
+    mock_response.json.return_value = {"symbol": "BTCUSDT", "lastPrice": "50000.0"}
+    mock_response.headers = httpx.Headers({"X-MBX-USED-WEIGHT-1M": "2"})
+
+    async def slow_get(*args, **kwargs):
+        await asyncio.sleep(0.01)
+        return mock_response
+
+    mock_client_instance = MockAsyncClient.return_value
+    mock_client_instance.get = AsyncMock(side_effect=slow_get)
+    mock_client_instance.aclose = AsyncMock()
+
+    results = await asyncio.gather(*(
+        adapter._make_request("GET", "/api/v3/ticker/24hr", "", "", params={"symbol": "BTCUSDT"})
+        for _ in range(5)
+    ))
+
+    assert all(r == {"symbol": "BTCUSDT", "lastPrice": "50000.0"} for r in results)
+    assert mock_client_instance.get.call_count == 1
+
+    # Dentro del TTL la respuesta se reutiliza sin nueva solicitud.
+    await adapter._make_request("GET", "/api/v3/ticker/24hr", "", "", params={"symbol": "BTCUSDT"})
+    assert mock_client_instance.get.call_count == 1
+
+@pytest.mark.asyncio
+async def test_depth_stream_never_blocks_the_shared_socket_reader(binance_adapter):
+    """Prueba que los diffs de profundidad descartan el más antiguo en lugar de bloquear al publicador."""
+    from src.adapters.market_data_bus import OverflowPolicy
+
+    binance_adapter.stream_manager.subscribe = AsyncMock()
+    callback = AsyncMock()
+    await binance_adapter.subscribe_to_depth_stream("BTC/USDT", callback)
+
+    binance_adapter.stream_manager.subscribe.assert_awaited_once()
+    args, kwargs = binance_adapter.stream_manager.subscribe.call_args
+    assert args == ("btcusdt@depth@100ms", callback)
+    assert kwargs["policy"].value == OverflowPolicy.DROP_OLDEST.value
@@ -0,0 +1,27 @@
+from src.adapters.binance_codec import (
+    decode_depth_update, decode_kline, decode_kline_event, decode_ticker_24hr, json_loads
+)
+
+def test_json_loads_accepts_bytes_and_str():
+    assert json_loads(b'{"lastUpdateId": 1, "bids": [["1.0", "2.0"]]}') == {"lastUpdateId": 1, "bids": [["1.0", "2.0"]]}
+    assert json_loads('[1, 2]') == [1, 2]
+
+def test_decode_ticker_from_rest_and_stream_shapes():
+    rest = decode_ticker_24hr({"symbol": "BTCUSDT", "lastPrice": "50000.5", "priceChangePercent": "1.5", "quoteVolume": "1000"})
+    stream = decode_ticker_24hr({"e": "24hrTicker", "s": "BTCUSDT", "c": "50000.5", "P": "1.5", "q": "1000"})
+    assert rest == stream
+    assert rest.last_price == 50000.5
+
+def test_decode_kline_rest_row_and_stream_event_match():
+    row = [1700000000000, "1.0", "2.0", "0.5", "1.5", "10.0", 1700000059999, "15.0", 7, "5.0", "7.5", "0"]
+    event = {"t": 1700000000000, "T": 1700000059999, "o": "1.0", "h": "2.0", "l": "0.5", "c": "1.5",
+             "v": "10.0", "q": "15.0", "n": 7, "V": "5.0", "Q": "7.5", "x": True}
+    assert decode_kline(row) == decode_kline_event(event)
+    assert decode_kline(row).close == 1.5
+
+def test_decode_depth_update():
+    update = decode_depth_update({"e": "depthUpdate", "s": "BTCUSDT", "U": 10, "u": 12,
+                                  "b": [["99.5", "0"]], "a": [["100.5", "3.25"]]})
+    assert (update.first_update_id, update.final_update_id) == (10, 12)
+    assert update.bids == [(99.5, 0.0)]
+    assert update.asks == [(100.5, 3.25)]
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from src.adapters.binance_rate_limiter import BinanceRateLimiter, RequestPriority
+
+def test_get_request_weight_for_ticker_variants():
+    """Prueba que el peso del endpoint de tickers depende del número de símbolos."""
+    limiter = BinanceRateLimiter()
+    assert limiter.get_request_weight("GET", "/api/v3/ticker/24hr", {"symbol": "BTCUSDT"}) == 2
+    assert limiter.get_request_weight("GET", "/api/v3/ticker/24hr", {"symbols": '["BTCUSDT","ETHUSDT"]'}) == 2
+    assert limiter.get_request_weight("GET", "/api/v3/ticker/24hr", {}) == 80
+    assert limiter.get_request_weight("GET", "/api/v3/exchangeInfo", {}) == 20
+
+def test_update_from_headers_tracks_used_weight_and_order_count():
+    """Prueba que las cabeceras X-MBX-* actualizan los contadores locales."""
+    limiter = BinanceRateLimiter()
+    limiter.update_from_headers({"X-MBX-USED-WEIGHT-1M": "1200", "X-MBX-ORDER-COUNT-10S": "3", "Content-Type": "application/json"})
+
+    assert limiter.used_weight == 1200
+    assert limiter.order_count_10s == 3
+    assert limiter.last_headers == {"x-mbx-used-weight-1m": 1200, "x-mbx-order-count-10s": 3}
+
+@pytest.mark.asyncio
+async def test_low_priority_waits_when_budget_exhausted_but_orders_pass():
+    """Prueba que las solicitudes de baja prioridad esperan y las órdenes pasan primero."""
+    limiter = BinanceRateLimiter(weight_limit_per_minute=100)
+    limiter.update_from_headers({"x-mbx-used-weight-1m": "80"})
+
+    with patch("src.adapters.binance_rate_limiter.asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+        await limiter.acquire(1, RequestPriority.HIGH, is_order=True)
+        mock_sleep.assert_not_called()
+
+        limiter._roll_windows = lambda: None
+        mock_sleep.side_effect = lambda _: setattr(limiter, "_used_weight", 0)
+        await limiter.acquire(2, RequestPriority.LOW)
+        mock_sleep.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_waiting_callers_are_released_in_turn_against_remaining_budget():
+    """Prueba que las solicitudes en espera pasan en orden FIFO sin despertar todas a la vez."""
+    limiter = BinanceRateLimiter(weight_limit_per_minute=100)
+    limiter.update_from_headers({"x-mbx-used-weight-1m": "80"})
+    limiter._roll_windows = lambda: None
+    real_sleep = asyncio.sleep
+    released = []
+
+    async def next_window(_):
+        limiter._used_weight = 0
+        await real_sleep(0)
+
+    async def request(index):
+        await limiter.acquire(30, RequestPriority.LOW)
+        released.append(index)
+
+    with patch("src.adapters.binance_rate_limiter.asyncio.sleep", side_effect=next_window) as mock_sleep:
+        await asyncio.gather(*(request(i) for i in range(3)))
+
+    # Las dos primeras caben en la ventana reabierta (60/70); solo la tercera espera otra ventana.
+    assert released == [0, 1, 2]
+    assert mock_sleep.await_count == 2
+    assert limiter._used_weight == 30
+
+def test_register_rate_limit_response_uses_retry_after():
+    """Prueba que una respuesta 429 bloquea las solicitudes durante Retry-After."""
+    limiter = BinanceRateLimiter()
+    assert limiter.register_rate_limit_response(429, {"Retry-After": "7"}) == 7.0
@@ -0,0 +1,51 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from src.adapters.binance_stream_manager import BinanceStreamManager, _CombinedStreamConnection
+
+@pytest.mark.asyncio
+@patch.object(_CombinedStreamConnection, "start")
+async def test_streams_are_packed_into_pooled_connections(mock_start):
+    """Prueba que los streams comparten conexiones hasta el máximo por conexión."""
+    manager = BinanceStreamManager(max_streams_per_connection=2)
+    callback = AsyncMock()
+
+    for symbol in ["btcusdt", "ethusdt", "bnbusdt", "xrpusdt", "adausdt"]:
+        await manager.subscribe(f"{symbol}@ticker", callback)
+
+    assert manager.connection_count == 3
+    assert len(manager.active_streams) == 5
+    await manager.close()
+
+@pytest.mark.asyncio
+@patch.object(_CombinedStreamConnection, "start")
+async def test_dispatch_routes_frames_to_stream_subscribers(mock_start):
+    """Prueba que cada frame combinado se entrega solo a los suscriptores de su stream."""
+    manager = BinanceStreamManager()
+    btc_callback = AsyncMock()
+    eth_callback = AsyncMock()
+    await manager.subscribe("BTCUSDT@ticker", btc_callback)
+    await manager.subscribe("ethusdt@ticker", eth_callback)
+
+    connection = manager._stream_connections["btcusdt@ticker"]
+    await connection._handle_message('{"stream":"btcusdt@ticker","data":{"s":"BTCUSDT","c":"50000.0"}}')
+    await asyncio.sleep(0.01)
+
+    btc_callback.assert_awaited_once_with({"s": "BTCUSDT", "c": "50000.0"})
+    eth_callback.assert_not_called()
+    await manager.close()
+
+@pytest.mark.asyncio
+@patch.object(_CombinedStreamConnection, "start")
+async def test_unsubscribing_last_stream_closes_connection(mock_start):
+    """Prueba que una conexión sin streams se cierra y sale del pool."""
+    manager = BinanceStreamManager()
+    callback = AsyncMock()
+    await manager.subscribe("btcusdt@ticker", callback)
+    assert manager.connection_count == 1
+
+    await manager.unsubscribe("btcusdt@ticker", callback)
+
+    assert manager.connection_count == 0
+    assert manager.active_streams == []
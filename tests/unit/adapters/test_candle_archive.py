@@ -0,0 +1,41 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from src.adapters.candle_archive import CandleArchive
+from src.core.domain_models.ohlcv import OHLCVFrame
+
+HOUR_MS = 3_600_000
+JAN_31 = int(datetime(2024, 1, 31, tzinfo=timezone.utc).timestamp() * 1000)
+
+def make_frame(count: int) -> OHLCVFrame:
+    open_time = JAN_31 + np.arange(count, dtype=np.int64) * HOUR_MS
+    return OHLCVFrame(open_time=open_time, close=np.arange(count, dtype=np.float64), close_time=open_time + HOUR_MS - 1)
+
+def test_frames_are_split_by_month_and_read_back(tmp_path):
+    """Prueba que la serie se reparte en un fichero por mes y se lee igual que se escribió."""
+    archive = CandleArchive(tmp_path)
+    frame = make_frame(48)
+
+    paths = archive.write_frame("BTCUSDT", "1h", frame)
+
+    assert [path.name for path in paths] == ["2024-01.arrow", "2024-02.arrow"]
+    assert paths[0].parent.name == "1h"
+    assert archive.months("BTCUSDT", "1h") == [datetime(2024, 1, 1, tzinfo=timezone.utc), datetime(2024, 2, 1, tzinfo=timezone.utc)]
+    restored = archive.read("BTCUSDT", "1h", JAN_31, JAN_31 + 47 * HOUR_MS)
+    assert restored.to_dicts() == frame.to_dicts()
+    assert [len(month) for month in archive.iter_frames("BTCUSDT", "1h", JAN_31, JAN_31 + 47 * HOUR_MS)] == [24, 24]
+
+def test_single_month_reads_are_memory_mapped_views(tmp_path):
+    """Prueba que la lectura de un mes devuelve vistas de solo lectura sobre el fichero mapeado."""
+    archive = CandleArchive(tmp_path)
+    archive.write_frame("BTCUSDT", "1h", make_frame(10))
+
+    window = archive.read("BTCUSDT", "1h", JAN_31 + 2 * HOUR_MS, JAN_31 + 5 * HOUR_MS)
+
+    assert window.close.tolist() == [2.0, 3.0, 4.0, 5.0]
+    assert not window.close.flags.writeable
+    assert not window.close.flags.owndata
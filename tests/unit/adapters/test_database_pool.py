@@ -0,0 +1,73 @@
+import pytest
+
+from src.adapters.database_pool import (
+    DatabaseMetrics,
+    DatabasePoolSettings,
+    MeteredAsyncAdaptedQueuePool,
+    database_metrics,
+    engine_options,
+    instrument_persistence_methods,
+)
+
+def test_engine_options_per_backend():
+    """Prueba las opciones del engine para SQLite, PostgreSQL directo y detrás de pgbouncer."""
+    assert "pool_size" not in engine_options("sqlite+aiosqlite:///:memory:", DatabasePoolSettings())
+
+    options = engine_options("postgresql+asyncpg://u:p@db/app", DatabasePoolSettings(pool_size=5, pool_recycle=600))
+    assert options["poolclass"] is MeteredAsyncAdaptedQueuePool
+    assert options["pool_size"] == 5
+    assert options["pool_recycle"] == 600
+    assert options["pool_pre_ping"] is True
+    assert options["connect_args"]["statement_cache_size"] == 100
+
+    pgbouncer = engine_options("postgresql+asyncpg://u:p@db/app", DatabasePoolSettings(pgbouncer=True))
+    assert pgbouncer["connect_args"]["statement_cache_size"] == 0
+    assert pgbouncer["connect_args"]["prepared_statement_cache_size"] == 0
+    name_func = pgbouncer["connect_args"]["prepared_statement_name_func"]
+    assert name_func() != name_func()
+
+def test_settings_from_env(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "20")
+    monkeypatch.setenv("DB_PGBOUNCER", "true")
+    settings = DatabasePoolSettings.from_env()
+    assert settings.pool_size == 20
+    assert settings.pgbouncer is True
+    assert settings.max_overflow == DatabasePoolSettings.max_overflow
+
+def test_checkout_wait_counts_slow_and_timeouts():
+    metrics = DatabaseMetrics(wait_warning_seconds=0.1)
+    metrics.record_checkout_wait(0.01, pool=None)
+    metrics.record_checkout_wait(0.5, pool=None)
+    metrics.record_checkout_wait(30.0, pool=None, timed_out=True)
+
+    snapshot = metrics.snapshot()["checkout_wait"]
+    assert snapshot["calls"] == 3
+    assert snapshot["slow"] == 1
+    assert snapshot["timeouts"] == 1
+
+@pytest.mark.asyncio
+async def test_instrumented_methods_record_latency():
+    @instrument_persistence_methods
+    class FakeService:
+        async def get_rows(self):
+            return [1]
+
+        async def fail(self):
+            raise ValueError("boom")
+
+        async def stream_rows(self):
+            yield 1
+            yield 2
+
+    database_metrics.reset()
+    service = FakeService()
+    assert await service.get_rows() == [1]
+    assert [row async for row in service.stream_rows()] == [1, 2]
+    with pytest.raises(ValueError):
+        await service.fail()
+
+    queries = database_metrics.snapshot()["queries"]
+    assert queries["get_rows"]["calls"] == 1
+    assert queries["stream_rows"]["calls"] == 1
+    assert queries["fail"]["errors"] == 1
+    database_metrics.reset()
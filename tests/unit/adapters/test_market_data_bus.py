@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+
+from src.adapters.market_data_bus import MarketDataBus, OverflowPolicy
+
+@pytest.mark.asyncio
+async def test_conflate_keeps_latest_value_per_key():
+    """Prueba que un suscriptor lento recibe solo el último mensaje de cada clave."""
+    bus = MarketDataBus()
+    release = asyncio.Event()
+    received = []
+
+    async def slow_consumer(message):
+        await release.wait()
+        received.append(message)
+
+    subscription = bus.subscribe("btcusdt@ticker", slow_consumer, policy=OverflowPolicy.CONFLATE)
+    await bus.publish("btcusdt@ticker", {"c": 1})
+    await asyncio.sleep(0.01)  # El consumidor toma el primer mensaje y queda bloqueado
+    for price in range(2, 6):
+        await bus.publish("btcusdt@ticker", {"c": price})
+
+    assert subscription.queue_size == 1
+    assert subscription.conflated == 3
+    release.set()
+    await asyncio.sleep(0.01)
+    assert received == [{"c": 1}, {"c": 5}]
+    await bus.close()
+
+@pytest.mark.asyncio
+async def test_drop_oldest_bounds_queue_and_slow_subscriber_does_not_delay_others():
+    """Prueba que un suscriptor lento descarta mensajes sin retrasar a los demás."""
+    bus = MarketDataBus()
+    release = asyncio.Event()
+    fast_received = []
+
+    async def slow_consumer(message):
+        await release.wait()
+
+    async def fast_consumer(message):
+        fast_received.append(message)
+
+    slow = bus.subscribe("ethusdt@trade", slow_consumer, policy=OverflowPolicy.DROP_OLDEST, maxsize=2)
+    bus.subscribe("ethusdt@trade", fast_consumer, policy=OverflowPolicy.BLOCK, maxsize=100)
+
+    await bus.publish("ethusdt@trade", 0)
+    await asyncio.sleep(0.01)
+    for i in range(1, 6):
+        await bus.publish("ethusdt@trade", i)
+    await asyncio.sleep(0.01)
+
+    assert fast_received == [0, 1, 2, 3, 4, 5]
+    assert slow.queue_size == 2
+    assert slow.dropped == 3
+    metrics = {m["name"]: m for m in bus.get_metrics()}
+    assert metrics[slow.name]["oldest_pending_age_ms"] > 0
+    await bus.close()
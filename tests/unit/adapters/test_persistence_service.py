@@ -2,7 +2,7 @@ import pytest
 from unittest.mock import AsyncMock
 from uuid import UUID, uuid4
 from datetime import datetime, timezone
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 import asyncpg
 
 from src.adapters.persistence_service import SupabasePersistenceService
@@ -126,3 +126,282 @@ async def test_save_credential(mock_persistence_service: AsyncMock, fixed_user_i
 
     mock_persistence_service.save_credential.assert_called_once_with(mock_credential)
     assert saved_credential == mock_credential
+
+@pytest.mark.asyncio
+async def test_bulk_upsert_market_data_counts_inserts_and_updates():
+    """
+    Verifica la ingesta masiva en SQLite: un INSERT multi-fila por lote, última vela duplicada gana
+    y recuento de filas insertadas y actualizadas.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from src.core.domain_models.orm_models import MarketDataORM
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(MarketDataORM.__table__.create)
+    service = SupabasePersistenceService(engine=engine, bulk_batch_size=2)
+
+    def record(minute: int, close: float):
+        return ("BTCUSDT", datetime(2024, 1, 1, 0, minute, tzinfo=timezone.utc), 1.0, 2.0, 0.5, close, 10.0)
+
+    first = await service.bulk_upsert_market_data([record(0, 1.0), record(1, 1.0), record(2, 1.0), record(2, 1.5)])
+    assert first == {"inserted": 3, "updated": 0}
+
+    second = await service.bulk_upsert_market_data([record(2, 3.0), record(3, 3.0)])
+    assert second == {"inserted": 1, "updated": 1}
+
+    rows = await service.fetch_all("SELECT close FROM market_data ORDER BY timestamp")
+    assert [float(row["close"]) for row in rows] == [1.0, 1.0, 3.0, 3.0]
+    await service.close()
+
+@pytest.mark.asyncio
+async def test_trade_performance_aggregates_run_in_sql():
+    """
+    Verifica los agregados de rendimiento sobre las columnas desnormalizadas de trades.
+    """
+    from decimal import Decimal
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from src.core.domain_models.orm_models import TradeORM
+    from src.core.domain_models.trade_models import Trade, TradeOrderDetails, TradeMode, TradeSide, PositionStatus, OrderCategory
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(TradeORM.__table__.create)
+    service = SupabasePersistenceService(engine=engine)
+    user_id = uuid4()
+    strategy_id = uuid4()
+
+    def make_trade(symbol: str, pnl: str, mode: TradeMode = TradeMode.PAPER, status: PositionStatus = PositionStatus.CLOSED) -> Trade:
+        entry = TradeOrderDetails(orderCategory=OrderCategory.ENTRY, type="market", status="filled",
+                                  requestedQuantity=Decimal("1"), executedQuantity=Decimal("1"), executedPrice=Decimal("100"))
+        return Trade(id=str(uuid4()), user_id=user_id, mode=mode, symbol=symbol, side=TradeSide.BUY, entryOrder=entry,
+                     positionStatus=status, strategyId=strategy_id, pnl_usd=Decimal(pnl),
+                     closed_at=datetime.now(timezone.utc))
+
+    for trade in [make_trade("BTCUSDT", "30"), make_trade("ETHUSDT", "-10"), make_trade("ADAUSDT", "0"),
+                  make_trade("BTCUSDT", "99", mode=TradeMode.REAL), make_trade("BTCUSDT", "50", status=PositionStatus.OPEN)]:
+        await service.upsert_trade(trade)
+
+    summary = await service.get_trade_performance_summary(user_id=str(user_id), mode="paper")
+    assert summary["total_trades"] == 3
+    assert summary["winning_trades"] == 1
+    assert summary["losing_trades"] == 1
+    assert float(summary["total_pnl"]) == 20.0
+    assert summary["best_trade_symbol"] == "BTCUSDT"
+    assert summary["worst_trade_symbol"] == "ETHUSDT"
+    assert float(summary["entry_volume"]) == 300.0
+
+    groups = await service.get_strategy_performance_summary(user_id=str(user_id))
+    by_mode = {row["mode"]: row for row in groups}
+    assert by_mode["paper"]["total_operations"] == 3
+    assert by_mode["paper"]["winning_operations"] == 1
+    assert float(by_mode["real"]["total_pnl"]) == 99.0
+    await service.close()
+
+@pytest.mark.asyncio
+async def test_strategy_performance_summary_filters_mode_breakeven_and_null_strategy():
+    """
+    Verifica el agregado por estrategia en SQLite: filtro por modo, trades sin ganancia que no
+    cuentan como ganadores y trades sin strategy_id u operaciones abiertas que no se agrupan.
+    """
+    from decimal import Decimal
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from src.core.domain_models.orm_models import TradeORM
+    from src.core.domain_models.trade_models import Trade, TradeOrderDetails, TradeMode, TradeSide, PositionStatus, OrderCategory
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(TradeORM.__table__.create)
+    service = SupabasePersistenceService(engine=engine)
+    user_id = uuid4()
+    strategy_id = uuid4()
+
+    def make_trade(pnl: str, mode: TradeMode = TradeMode.PAPER, strategy: Optional[UUID] = strategy_id,
+                   status: PositionStatus = PositionStatus.CLOSED) -> Trade:
+        entry = TradeOrderDetails(orderCategory=OrderCategory.ENTRY, type="market", status="filled",
+                                  requestedQuantity=Decimal("1"), executedQuantity=Decimal("1"), executedPrice=Decimal("100"))
+        return Trade(id=str(uuid4()), user_id=user_id, mode=mode, symbol="BTCUSDT", side=TradeSide.BUY, entryOrder=entry,
+                     positionStatus=status, strategyId=strategy, pnl_usd=Decimal(pnl),
+                     closed_at=datetime.now(timezone.utc))
+
+    for trade in [make_trade("0"), make_trade("0"), make_trade("50", mode=TradeMode.REAL),
+                  make_trade("5", strategy=None), make_trade("7", status=PositionStatus.OPEN)]:
+        await service.upsert_trade(trade)
+
+    real = await service.get_strategy_performance_summary(user_id=str(user_id), mode="real")
+    assert [(row["mode"], row["total_operations"], float(row["total_pnl"])) for row in real] == [("real", 1, 50.0)]
+
+    paper = await service.get_strategy_performance_summary(user_id=str(user_id), mode="paper")
+    assert len(paper) == 1
+    assert str(paper[0]["strategy_id"]) == str(strategy_id)
+    assert paper[0]["total_operations"] == 2
+    assert paper[0]["winning_operations"] == 0
+    assert float(paper[0]["total_pnl"]) == 0.0
+
+    assert await service.get_strategy_performance_summary(user_id=str(uuid4())) == []
+    await service.close()
+
+@pytest.mark.asyncio
+async def test_trades_keyset_pagination_and_stream():
+    """
+    Verifica la paginación por (created_at, id) con marcas de tiempo repetidas y que el
+    streaming devuelve los mismos trades en el mismo orden.
+    """
+    from decimal import Decimal
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from src.core.domain_models.orm_models import TradeORM
+    from src.core.domain_models.trade_models import Trade, TradeOrderDetails, TradeMode, TradeSide, PositionStatus, OrderCategory
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(TradeORM.__table__.create)
+    service = SupabasePersistenceService(engine=engine)
+    user_id = uuid4()
+
+    entry = TradeOrderDetails(orderCategory=OrderCategory.ENTRY, type="market", status="filled",
+                              requestedQuantity=Decimal("1"), executedQuantity=Decimal("1"), executedPrice=Decimal("100"))
+    for i in range(7):
+        # Dos trades por marca de tiempo para forzar el desempate por id.
+        created_at = datetime(2024, 1, 1, i // 2, tzinfo=timezone.utc)
+        mode = TradeMode.REAL if i == 6 else TradeMode.PAPER
+        await service.upsert_trade(Trade(id=str(uuid4()), user_id=user_id, mode=mode, symbol="BTCUSDT", side=TradeSide.BUY,
+                                         entryOrder=entry, positionStatus=PositionStatus.CLOSED, created_at=created_at))
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        trades, cursor = await service.get_trades_page(user_id=str(user_id), trading_mode="paper", limit=4, cursor=cursor)
+        seen.extend(trades)
+        pages += 1
+        if cursor is None:
+            break
+
+    assert pages == 2
+    assert len(seen) == 6
+    assert len({str(trade.id) for trade in seen}) == 6
+    keys = [(trade.created_at.replace(tzinfo=None), str(trade.id)) for trade in seen]
+    assert keys == sorted(keys, reverse=True)
+
+    streamed = [row async for row in service.stream_trade_rows(user_id=str(user_id), trading_mode="both", batch_size=3)]
+    assert len(streamed) == 7
+    assert [row["id"] for row in streamed if row["mode"] == "paper"] == [str(trade.id) for trade in seen]
+    await service.close()
+
+@pytest.mark.asyncio
+async def test_count_trades_groups_by_mode():
+    """Verifica el recuento agrupado por modo con filtros de estado y fechas."""
+    from decimal import Decimal
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from src.core.domain_models.orm_models import TradeORM
+    from src.core.domain_models.trade_models import Trade, TradeOrderDetails, TradeMode, TradeSide, PositionStatus, OrderCategory
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(TradeORM.__table__.create)
+    service = SupabasePersistenceService(engine=engine)
+    user_id = uuid4()
+
+    entry = TradeOrderDetails(orderCategory=OrderCategory.ENTRY, type="market", status="filled",
+                              requestedQuantity=Decimal("1"), executedQuantity=Decimal("1"), executedPrice=Decimal("100"))
+    for mode, status, day in [(TradeMode.PAPER, PositionStatus.CLOSED, 1), (TradeMode.PAPER, PositionStatus.OPEN, 2),
+                              (TradeMode.REAL, PositionStatus.CLOSED, 3), (TradeMode.PAPER, PositionStatus.CLOSED, 20)]:
+        await service.upsert_trade(Trade(id=str(uuid4()), user_id=user_id, mode=mode, symbol="BTCUSDT", side=TradeSide.BUY,
+                                         entryOrder=entry, positionStatus=status,
+                                         created_at=datetime(2024, 1, day, tzinfo=timezone.utc)))
+
+    assert await service.count_trades(user_id=str(user_id)) == {"paper": 3, "real": 1}
+    assert await service.count_trades(user_id=str(user_id), trading_mode="paper", status="closed") == {"paper": 2}
+    assert await service.count_trades(
+        user_id=str(user_id), status="closed", start_date=datetime(2024, 1, 1), end_date=datetime(2024, 1, 10)
+    ) == {"paper": 1, "real": 1}
+    await service.close()
+
+@pytest.mark.asyncio
+async def test_market_data_intervals_rollup_and_month_drop():
+    """
+    Verifica en SQLite que las temporalidades del mismo instante no colisionan, que el rollup
+    agrega las velas finas de un mes sin pisar las existentes y que la retención borra el mes.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from src.core.domain_models.orm_models import MarketDataORM
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(MarketDataORM.__table__.create)
+    service = SupabasePersistenceService(engine=engine)
+
+    def record(hour: int, minute: int, open_: float, close: float):
+        return ("BTCUSDT", datetime(2024, 1, 1, hour, minute, tzinfo=timezone.utc), open_, close + 1, open_ - 1, close, 2.0)
+
+    await service.bulk_upsert_market_data([record(0, 0, 10.0, 11.0), record(0, 1, 11.0, 12.0), record(1, 0, 20.0, 21.0)], interval="1m")
+    await service.bulk_upsert_market_data([record(1, 0, 99.0, 99.0)], interval="1h")
+
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    end = datetime(2024, 2, 1, tzinfo=timezone.utc)
+    assert await service.get_market_data_months("1m", before=end) == [start]
+    assert await service.rollup_market_data("1m", "1h", 3600, start, end) == 1
+
+    hourly = await service.get_market_data_range("BTCUSDT", "1h", start, end)
+    assert [(candle[1].hour, candle[2], candle[5], candle[6]) for candle in hourly] == [(0, 10.0, 12.0, 4.0), (1, 99.0, 99.0, 2.0)]
+
+    assert await service.drop_market_data_month("1m", start) is False
+    assert await service.get_market_data_range("BTCUSDT", "1m", start, end) == []
+    assert len(await service.get_market_data_range("BTCUSDT", "1h", start, end)) == 2
+    await service.close()
+
+@pytest.mark.asyncio
+async def test_user_configuration_version_cache_and_partial_update(fixed_user_id: UUID):
+    """
+    Verifica en SQLite que la configuración decodificada se reutiliza mientras updated_at no
+    cambia y que una escritura parcial solo modifica las columnas pedidas.
+    """
+    from decimal import Decimal
+    from sqlalchemy.ext.asyncio import create_async_engine
+    # Los modelos se importan como los valida el servicio (`core.`), no como `src.core.`.
+    from core.domain_models.orm_models import UserConfigurationORM
+    from core.domain_models.user_configuration_models import (
+        RealTradingSettings, RiskProfile, Theme, UserConfiguration,
+    )
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(UserConfigurationORM.__table__.create)
+    writer = SupabasePersistenceService(engine=engine)
+    reader = SupabasePersistenceService(engine=engine)
+
+    user_config = UserConfiguration(
+        id=str(uuid4()),
+        user_id=str(fixed_user_id),
+        paper_trading_active=True,
+        favorite_pairs=["BTCUSDT"],
+        risk_profile=RiskProfile.MODERATE,
+        selected_theme=Theme.DARK,
+        real_trading_settings=RealTradingSettings(real_trading_mode_active=False, real_trades_executed_count=0,
+                                                  daily_capital_risked_usd=Decimal("0.0"))
+    )
+    await writer.upsert_user_configuration(user_config)
+    cached = await writer.get_user_configuration(str(fixed_user_id))
+    assert cached == user_config and cached is not user_config
+
+    loaded = await reader.get_user_configuration(str(fixed_user_id))
+    assert loaded.favorite_pairs == ["BTCUSDT"]
+    # Un acierto de caché devuelve una copia: modificarla no altera la entrada guardada.
+    loaded.favorite_pairs.append("SOLUSDT")
+    assert (await reader.get_user_configuration(str(fixed_user_id))).favorite_pairs == ["BTCUSDT"]
+
+    changed = user_config.model_copy(deep=True, update={"favorite_pairs": ["ETHUSDT"]})
+    changed.real_trading_settings.real_trades_executed_count = 1
+    await writer.upsert_user_configuration(changed, fields={"real_trading_settings"})
+
+    # Tras la escritura parcial el escritor no guarda `changed`: su favorite_pairs no se escribió.
+    assert str(fixed_user_id) not in writer._user_configuration_cache
+    assert (await writer.get_user_configuration(str(fixed_user_id))).favorite_pairs == ["BTCUSDT"]
+
+    reloaded = await reader.get_user_configuration(str(fixed_user_id))
+    assert reloaded.real_trading_settings.real_trades_executed_count == 1
+    assert reloaded.favorite_pairs == ["BTCUSDT"]
+    assert reloaded.selected_theme == Theme.DARK
+
+    with pytest.raises(ValueError):
+        await writer.upsert_user_configuration(changed, fields={"id"})
+    await writer.close()
+    await reader.close()
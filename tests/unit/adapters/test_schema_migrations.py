@@ -0,0 +1,64 @@
+import pytest
+from datetime import datetime, timezone
+from decimal import Decimal
+from uuid import uuid4
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.adapters.schema_migrations import migrate_schema
+from src.core.domain_models.trade_models import OrderCategory, PositionStatus, Trade, TradeMode, TradeOrderDetails, TradeSide
+
+def make_order(category: OrderCategory, price: str) -> TradeOrderDetails:
+    return TradeOrderDetails(
+        orderCategory=category,
+        type="market",
+        status="filled",
+        requestedQuantity=Decimal("0.5"),
+        executedQuantity=Decimal("0.5"),
+        executedPrice=Decimal(price),
+    )
+
+@pytest.mark.asyncio
+async def test_migration_adds_trade_columns_and_backfills_rows():
+    """Prueba que una tabla trades antigua recibe las columnas analíticas rellenadas desde el JSON."""
+    strategy_id = uuid4()
+    trade = Trade(
+        user_id=uuid4(),
+        mode=TradeMode.PAPER,
+        symbol="BTCUSDT",
+        side=TradeSide.BUY,
+        entryOrder=make_order(OrderCategory.ENTRY, "100"),
+        exitOrders=[make_order(OrderCategory.EXIT, "110")],
+        positionStatus=PositionStatus.CLOSED,
+        strategyId=strategy_id,
+        pnl_usd=Decimal("5"),
+        pnl_percentage=Decimal("10"),
+    )
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.execute(text(
+            "CREATE TABLE trades (id VARCHAR PRIMARY KEY, user_id TEXT NOT NULL, mode VARCHAR NOT NULL, "
+            "symbol VARCHAR NOT NULL, side VARCHAR NOT NULL, position_status VARCHAR NOT NULL, "
+            "created_at DATETIME, updated_at DATETIME, closed_at DATETIME, data TEXT NOT NULL)"
+        ))
+        await conn.execute(
+            text("INSERT INTO trades (id, user_id, mode, symbol, side, position_status, created_at, updated_at, data) "
+                 "VALUES (:id, :user_id, 'paper', 'BTCUSDT', 'BUY', 'closed', :now, :now, :data)"),
+            {"id": str(trade.id), "user_id": str(trade.user_id), "now": datetime.now(timezone.utc), "data": trade.model_dump_json()}
+        )
+
+        await migrate_schema(conn)
+
+        row = (await conn.execute(text(
+            "SELECT pnl_usd, strategy_id, entry_notional, exit_notional FROM trades"
+        ))).one()
+        indexes = (await conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'"))).scalars().all()
+    await engine.dispose()
+
+    assert Decimal(str(row.pnl_usd)) == Decimal("5")
+    assert row.strategy_id == str(strategy_id)
+    assert Decimal(str(row.entry_notional)) == Decimal("50")
+    assert Decimal(str(row.exit_notional)) == Decimal("55")
+    assert "ix_trades_strategy_id" in indexes
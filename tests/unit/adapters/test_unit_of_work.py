@@ -0,0 +1,65 @@
+import pytest
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.adapters.persistence_service import SupabasePersistenceService
+from src.adapters.unit_of_work import PersistenceUnitOfWork
+from src.core.domain_models.opportunity_models import OpportunityStatus
+from src.core.domain_models.orm_models import TradeORM
+from src.core.domain_models.trade_models import OrderCategory, PositionStatus, Trade, TradeMode, TradeOrderDetails, TradeSide
+
+def make_trade() -> Trade:
+    entry = TradeOrderDetails(orderCategory=OrderCategory.ENTRY, type="market", status="filled",
+                              requestedQuantity=Decimal("1"), executedQuantity=Decimal("1"), executedPrice=Decimal("100"))
+    return Trade(id=str(uuid4()), user_id=uuid4(), mode=TradeMode.REAL, symbol="BTCUSDT", side=TradeSide.BUY,
+                 entryOrder=entry, positionStatus=PositionStatus.OPEN)
+
+@pytest.mark.asyncio
+async def test_commit_applies_deduplicated_writes_in_one_transaction():
+    """Prueba que las escrituras repetidas se colapsan y se aplican dentro de una sola transacción."""
+    transactional_service = AsyncMock()
+    persistence_service = MagicMock()
+    persistence_service.transaction.return_value.__aenter__.return_value = transactional_service
+    unit_of_work = PersistenceUnitOfWork(persistence_service)
+    trade = make_trade()
+    opportunity_id = uuid4()
+    committed = []
+
+    unit_of_work.upsert_trade(trade)
+    unit_of_work.update_opportunity_status(opportunity_id, OpportunityStatus.UNDER_AI_ANALYSIS, "analizando")
+    unit_of_work.update_opportunity_status(opportunity_id, OpportunityStatus.CONVERTED_TO_TRADE_REAL, "ejecutado")
+    unit_of_work.upsert_trade(trade)
+    unit_of_work.after_commit(lambda: committed.append(True))
+    assert unit_of_work.pending_writes == 2
+
+    await unit_of_work.commit()
+
+    persistence_service.transaction.assert_called_once()
+    transactional_service.upsert_trade.assert_awaited_once_with(trade)
+    transactional_service.update_opportunity_status.assert_awaited_once_with(
+        opportunity_id=opportunity_id, new_status=OpportunityStatus.CONVERTED_TO_TRADE_REAL, status_reason="ejecutado"
+    )
+    assert committed == [True]
+    assert unit_of_work.pending_writes == 0
+
+@pytest.mark.asyncio
+async def test_unit_of_work_persists_last_trade_state():
+    """Prueba con SQLite que el trade se guarda una vez con su último estado."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(TradeORM.__table__.create)
+    service = SupabasePersistenceService(engine=engine)
+    trade = make_trade()
+
+    unit_of_work = service.unit_of_work()
+    unit_of_work.upsert_trade(trade)
+    trade.positionStatus = PositionStatus.ERROR
+    unit_of_work.upsert_trade(trade)
+    await unit_of_work.commit()
+
+    rows = await service.fetch_all("SELECT id, position_status FROM trades")
+    assert rows == [{"id": str(trade.id), "position_status": "error"}]
+    await service.close()
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from src.core.domain_models.ohlcv import OHLCVFrame
+from src.services.kline_store import kline_to_dict
+
+MINUTE_MS = 60_000
+
+def make_kline(open_time: int, close: str = "1.5"):
+    return [open_time, "1.0", "2.0", "0.5", close, "10.0", open_time + MINUTE_MS - 1, "15.0", 7, "5.0", "7.5", "0"]
+
+def test_from_binance_klines_builds_typed_columns():
+    rows = [make_kline(i * MINUTE_MS, close=str(i)) for i in range(5)]
+    frame = OHLCVFrame.from_binance_klines(rows)
+
+    assert len(frame) == 5
+    assert frame.open_time.dtype == np.int64
+    assert frame.number_of_trades.dtype == np.int64
+    assert frame.close.dtype == np.float64
+    assert frame.close.tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+    # Mismo formato que la conversión por filas existente.
+    assert frame.to_dicts() == [kline_to_dict(row) for row in rows]
+
+def test_slicing_returns_views():
+    frame = OHLCVFrame.from_binance_klines([make_kline(i * MINUTE_MS) for i in range(10)])
+    window = frame.between(2 * MINUTE_MS, 5 * MINUTE_MS)
+
+    assert window.open_time.tolist() == [2 * MINUTE_MS, 3 * MINUTE_MS, 4 * MINUTE_MS, 5 * MINUTE_MS]
+    assert np.shares_memory(window.close, frame.close)
+    assert len(frame.tail(3)) == 3
+    assert len(frame.tail(0)) == 0
+
+def test_round_trip_and_edges():
+    frame = OHLCVFrame.from_binance_klines([make_kline(i * MINUTE_MS) for i in range(3)])
+    assert OHLCVFrame.from_dicts(frame.to_dicts()).to_dicts() == frame.to_dicts()
+    assert len(OHLCVFrame.concat([frame, OHLCVFrame.empty(), frame[1:]])) == 5
+
+    rows = frame.to_orm("BTCUSDT")
+    assert len(rows) == 3
+    assert rows[1].symbol == "BTCUSDT"
+    assert rows[1].close == 1.5
+
+    with pytest.raises(ValueError):
+        OHLCVFrame(open_time=[1, 2], close=[1.0])
@@ -0,0 +1,39 @@
+"""
+Pruebas unitarias para CandleArchiveService.
+"""
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from src.adapters.candle_archive import CandleArchive
+from src.services.candle_archive_service import CandleArchiveService
+
+
+def make_records(month: datetime, count: int):
+    return [("BTCUSDT", month + timedelta(hours=i), 1.0, 2.0, 0.5, float(i), 10.0) for i in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_export_writes_one_file_per_month_and_skips_archived_months(tmp_path):
+    january = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    persistence = AsyncMock()
+    persistence.get_market_data_range.side_effect = lambda symbol, interval, start, end: (
+        make_records(start, 3) if start == january else []
+    )
+    service = CandleArchiveService(persistence, CandleArchive(tmp_path))
+
+    first = await service.export(["BTCUSDT"], ["1h"], start=january, end=datetime(2024, 2, 15, tzinfo=timezone.utc))
+    second = await service.export(["BTCUSDT"], ["1h"], start=january, end=datetime(2024, 2, 15, tzinfo=timezone.utc))
+
+    assert first.files_written == 1
+    assert first.rows_by_series == {"BTCUSDT-1h": 3}
+    assert second.files_written == 0
+    assert second.months_skipped == 1
+    january_ms = int(january.timestamp() * 1000)
+    frame = service.archive.read("BTCUSDT", "1h", january_ms, january_ms + 2 * 3_600_000)
+    assert frame.close.tolist() == [0.0, 1.0, 2.0]
+    assert frame.close_time[0] == frame.open_time[0] + 3_600_000 - 1
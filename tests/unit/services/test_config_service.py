@@ -4,8 +4,11 @@ from uuid import UUID, uuid4
 from decimal import Decimal
 from datetime import datetime, timezone
 
+import json
+
 from src.adapters.persistence_service import SupabasePersistenceService
-from src.services.config_service import ConfigurationService
+from src.adapters.redis_cache import RedisCache
+from src.services.config_service import CONFIG_INVALIDATION_CHANNEL, ConfigurationService
 from src.core.domain_models.user_configuration_models import (
     UserConfiguration,
     RealTradingSettings,
@@ -215,3 +218,140 @@ class TestConfigService:
         cached_config = config_service.get_cached_user_configuration()
         assert cached_config is not None
         assert cached_config.paper_trading_active is False
+
+    @pytest.mark.asyncio
+    async def test_get_user_configuration_with_own_user_id_uses_cache(
+        self,
+        config_service: ConfigurationService,
+        sample_user_id: UUID,
+        default_user_config: UserConfiguration,
+    ):
+        """
+        Verify that passing the application's own user_id (as the trading engine does) is served
+        from memory, and that other user_ids still go to persistence.
+        """
+        config_service.persistence_service.get_user_configuration = AsyncMock(return_value=default_user_config)
+        await config_service.get_user_configuration()
+        config = await config_service.get_user_configuration(str(sample_user_id))
+        config_service.persistence_service.get_user_configuration.assert_called_once()
+        assert config == default_user_config
+
+        other_user_id = str(uuid4())
+        await config_service.get_user_configuration(other_user_id)
+        config_service.persistence_service.get_user_configuration.assert_called_with(user_id=other_user_id)
+
+    @pytest.mark.asyncio
+    async def test_get_user_configuration_returns_copies_and_caches_only_committed_saves(
+        self,
+        config_service: ConfigurationService,
+        default_user_config: UserConfiguration,
+    ):
+        """
+        Verify that callers get their own copy of the cached configuration, and that a save
+        registered in a unit of work only replaces the cache once the unit of work commits.
+        """
+        config_service._user_configuration = default_user_config
+        config_service._user_configuration_validated_at = float("inf")
+        config = await config_service.get_user_configuration()
+        assert config == default_user_config and config is not default_user_config
+
+        config.paper_trading_active = not default_user_config.paper_trading_active
+        unit_of_work = MagicMock()
+        await config_service.save_user_configuration(config, unit_of_work=unit_of_work)
+        assert (await config_service.get_user_configuration()) == default_user_config
+
+        update_cache = unit_of_work.after_commit.call_args.args[0]
+        await update_cache()
+        assert (await config_service.get_user_configuration()).paper_trading_active == config.paper_trading_active
+
+    @pytest.mark.asyncio
+    async def test_get_user_configuration_revalidates_and_keeps_cache_on_error(
+        self,
+        config_service: ConfigurationService,
+        default_user_config: UserConfiguration,
+    ):
+        """
+        Verify that an expired cache entry is revalidated against persistence, and that a failing
+        revalidation keeps serving the in-memory configuration.
+        """
+        config_service.CONFIG_CACHE_REVALIDATE_SECONDS = 0
+        config_service._user_configuration = default_user_config
+        updated_config = default_user_config.model_copy(update={"paper_trading_active": False})
+        config_service.persistence_service.get_user_configuration = AsyncMock(return_value=updated_config)
+        assert await config_service.get_user_configuration() == updated_config
+
+        config_service.persistence_service.get_user_configuration = AsyncMock(side_effect=RuntimeError("db down"))
+        assert await config_service.get_user_configuration() == updated_config
+
+    @pytest.mark.asyncio
+    async def test_deactivate_real_trading_mode_saves_only_real_trading_settings(
+        self,
+        config_service: ConfigurationService,
+        default_user_config: UserConfiguration,
+    ):
+        """
+        Verify that toggling real trading writes only the real_trading_settings document.
+        """
+        assert default_user_config.real_trading_settings is not None
+        default_user_config.real_trading_settings.real_trading_mode_active = True
+        config_service._user_configuration = default_user_config
+        config_service._user_configuration_validated_at = float("inf")
+        config_service.persistence_service.upsert_user_configuration = AsyncMock()
+        await config_service.deactivate_real_trading_mode()
+        config_service.persistence_service.upsert_user_configuration.assert_called_once()
+        saved_config = config_service.persistence_service.upsert_user_configuration.call_args.args[0]
+        assert config_service.persistence_service.upsert_user_configuration.call_args.kwargs == {"fields": {"real_trading_settings"}}
+        assert saved_config.real_trading_settings.real_trading_mode_active is False
+        # La configuración se modifica sobre una copia; la caché se sustituye al guardar.
+        assert config_service.get_cached_user_configuration().real_trading_settings.real_trading_mode_active is False
+
+    @pytest.mark.asyncio
+    async def test_save_user_configuration_publishes_new_version(
+        self,
+        config_service: ConfigurationService,
+        sample_user_id: UUID,
+        default_user_config: UserConfiguration,
+    ):
+        """
+        Verify that a save bumps the shared version and notifies the other workers, and that the
+        worker ignores the notification of its own save.
+        """
+        cache = AsyncMock(spec=RedisCache)
+        cache.incr.return_value = 7
+        config_service._cache = cache
+        config_service.persistence_service.upsert_user_configuration = AsyncMock()
+        await config_service.save_user_configuration(default_user_config)
+
+        cache.incr.assert_awaited_once_with(f"config:version:{sample_user_id}")
+        channel, message = cache.publish.await_args.args
+        assert channel == CONFIG_INVALIDATION_CHANNEL
+        assert json.loads(message) == {"user_id": str(sample_user_id), "version": 7}
+
+        await config_service._handle_invalidation(message)
+        assert config_service._user_configuration_stale is False
+
+    @pytest.mark.asyncio
+    async def test_invalidation_from_other_worker_refreshes_once(
+        self,
+        config_service: ConfigurationService,
+        sample_user_id: UUID,
+        default_user_config: UserConfiguration,
+    ):
+        """
+        Verify that a newer version announced by another worker makes the next read refresh the
+        configuration from persistence, and later reads are served from memory again.
+        """
+        cache = AsyncMock(spec=RedisCache)
+        cache.get.return_value = "3"
+        config_service._cache = cache
+        config_service._invalidations_subscribed = True
+        config_service._user_configuration = default_user_config
+        config_service._user_configuration_version = 2
+        updated_config = default_user_config.model_copy(update={"paper_trading_active": False})
+        config_service.persistence_service.get_user_configuration = AsyncMock(return_value=updated_config)
+
+        await config_service._handle_invalidation(json.dumps({"user_id": str(sample_user_id), "version": 3}))
+        assert await config_service.get_user_configuration() == updated_config
+        assert await config_service.get_user_configuration() == updated_config
+        config_service.persistence_service.get_user_configuration.assert_called_once()
+        assert config_service._user_configuration_version == 3
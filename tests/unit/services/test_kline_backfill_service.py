@@ -0,0 +1,70 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from src.adapters.binance_adapter import BinanceAdapter
+from src.adapters.persistence_service import SupabasePersistenceService
+from src.core.domain_models.ohlcv import OHLCVFrame
+from src.services.kline_backfill_service import KlineBackfillService
+
+MINUTE_MS = 60_000
+START = 1_600_000_000_000 - (1_600_000_000_000 % MINUTE_MS)
+
+def make_kline(open_time: int):
+    return [open_time, "1.0", "2.0", "0.5", "1.5", "10.0", open_time + MINUTE_MS - 1, "15.0", 7, "5.0", "7.5"]
+
+@pytest.fixture
+def mock_binance_adapter():
+    adapter = AsyncMock(spec=BinanceAdapter)
+    adapter.normalize_symbol = MagicMock(side_effect=BinanceAdapter.normalize_symbol)
+
+    async def get_klines(symbol, interval, start_time=None, end_time=None, limit=500, priority=None):
+        count = min(limit, (end_time - start_time) // MINUTE_MS + 1)
+        return [make_kline(start_time + i * MINUTE_MS) for i in range(count)]
+    adapter.get_klines = AsyncMock(side_effect=get_klines)
+
+    async def get_klines_frame(**kwargs):
+        return OHLCVFrame.from_binance_klines(await adapter.get_klines(**kwargs))
+    adapter.get_klines_frame = AsyncMock(side_effect=get_klines_frame)
+    return adapter
+
+@pytest.fixture
+def mock_persistence_service():
+    service = AsyncMock(spec=SupabasePersistenceService)
+    service.get_one.return_value = None
+    service.bulk_upsert_market_data.return_value = {"inserted": 1000, "updated": 0}
+    return service
+
+@pytest.mark.asyncio
+async def test_backfill_pages_through_time_and_checkpoints(mock_binance_adapter, mock_persistence_service):
+    """Prueba que el backfill pagina de 1000 en 1000 y guarda un checkpoint por página."""
+    service = KlineBackfillService(mock_binance_adapter, mock_persistence_service)
+    end_time = START + 2499 * MINUTE_MS
+
+    report = await service.backfill(["BTCUSDT"], ["1m"], start_time=START, end_time=end_time)
+
+    assert report.rows_written == 2500
+    assert report.batches == 3
+    assert mock_persistence_service.bulk_upsert_market_data.await_count == 3
+    last_checkpoint = mock_persistence_service.upsert.await_args.args[1]
+    assert last_checkpoint["last_open_time"] == end_time
+    assert last_checkpoint["rows_written"] == 2500
+
+@pytest.mark.asyncio
+async def test_backfill_resumes_from_checkpoint(mock_binance_adapter, mock_persistence_service):
+    """Prueba que el backfill continúa tras la última vela guardada en el checkpoint."""
+    mock_persistence_service.get_one.return_value = {"last_open_time": START + 999 * MINUTE_MS, "rows_written": 1000}
+    service = KlineBackfillService(mock_binance_adapter, mock_persistence_service)
+
+    report = await service.backfill(["BTCUSDT"], ["1m"], start_time=START, end_time=START + 1499 * MINUTE_MS)
+
+    assert report.rows_written == 500
+    assert mock_binance_adapter.get_klines.await_args_list[0].kwargs["start_time"] == START + 1000 * MINUTE_MS
+
+@pytest.mark.asyncio
+async def test_backfill_propagates_writer_failure(mock_binance_adapter, mock_persistence_service):
+    """Prueba que un fallo del escritor se propaga sin dejar a los productores bloqueados en la cola llena."""
+    mock_persistence_service.bulk_upsert_market_data.side_effect = RuntimeError("disk full")
+    service = KlineBackfillService(mock_binance_adapter, mock_persistence_service, queue_size=1)
+
+    with pytest.raises(RuntimeError, match="disk full"):
+        await service.backfill(["BTCUSDT", "ETHUSDT"], ["1m"], start_time=START, end_time=START + 4999 * MINUTE_MS)
@@ -0,0 +1,100 @@
+import time
+from datetime import datetime, timezone
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from src.adapters.binance_adapter import BinanceAdapter
+from src.adapters.persistence_service import SupabasePersistenceService
+from src.services.kline_store import KlineStore
+
+HOUR_MS = 3_600_000
+
+def make_kline(open_time: int, interval_ms: int = HOUR_MS):
+    return [open_time, "1.0", "2.0", "0.5", "1.5", "10.0", open_time + interval_ms - 1, "15.0", 7, "5.0", "7.5"]
+
+@pytest.fixture
+def mock_binance_adapter():
+    adapter = AsyncMock(spec=BinanceAdapter)
+    adapter.normalize_symbol = MagicMock(side_effect=BinanceAdapter.normalize_symbol)
+
+    async def get_klines(symbol, interval, start_time=None, end_time=None, limit=500, priority=None):
+        first = start_time
+        return [make_kline(first + i * HOUR_MS) for i in range(limit) if first + i * HOUR_MS <= end_time]
+    adapter.get_klines = AsyncMock(side_effect=get_klines)
+    return adapter
+
+@pytest.fixture
+def kline_store(mock_binance_adapter):
+    persistence = AsyncMock(spec=SupabasePersistenceService)
+    persistence.get_market_data_range.return_value = []
+    return KlineStore(mock_binance_adapter, persistence)
+
+@pytest.mark.asyncio
+async def test_repeated_window_is_served_from_memory(kline_store: KlineStore, mock_binance_adapter):
+    """Prueba que la misma ventana pedida dos veces solo va a Binance la primera vez."""
+    first = await kline_store.get_klines("BTC/USDT", "1h", limit=200)
+    second = await kline_store.get_klines("BTCUSDT", "1h", limit=200)
+
+    assert len(first) == 200
+    assert second == first
+    assert mock_binance_adapter.get_klines.await_count == 1
+
+@pytest.mark.asyncio
+async def test_only_missing_range_is_fetched(kline_store: KlineStore, mock_binance_adapter):
+    """Prueba que al ampliar la ventana solo se descargan las velas que faltan."""
+    await kline_store.get_klines("BTCUSDT", "1h", limit=100)
+    await kline_store.get_klines("BTCUSDT", "1h", limit=150)
+
+    assert mock_binance_adapter.get_klines.await_count == 2
+    assert mock_binance_adapter.get_klines.await_args.kwargs["limit"] == 50
+
+@pytest.mark.asyncio
+async def test_only_new_closed_candles_are_persisted(kline_store: KlineStore):
+    """Prueba que las velas cerradas se persisten una sola vez y la vela en formación no."""
+    await kline_store.get_klines("BTCUSDT", "1h", limit=10)
+
+    persistence = kline_store._persistence_service
+    persisted = persistence.bulk_upsert_market_data.await_args.args[0]
+    assert len(persisted) == 9
+
+    kline_store.forming_candle_ttl_seconds = 0
+    time.sleep(0.001)
+    await kline_store.get_klines("BTCUSDT", "1h", limit=10)
+    assert persistence.bulk_upsert_market_data.await_count == 1
+
+@pytest.mark.asyncio
+async def test_stored_closed_candles_are_read_before_fetching(kline_store: KlineStore, mock_binance_adapter):
+    """Prueba que las velas cerradas ya guardadas en market_data no se vuelven a descargar."""
+    current_open = int(time.time() * 1000) // HOUR_MS * HOUR_MS
+    first = current_open - 9 * HOUR_MS
+    persistence = kline_store._persistence_service
+    persistence.get_market_data_range.return_value = [
+        ("BTCUSDT", datetime.fromtimestamp((first + i * HOUR_MS) / 1000, tz=timezone.utc), 1.0, 2.0, 0.5, 1.5, 10.0)
+        for i in range(9)
+    ]
+
+    candles = await kline_store.get_klines("BTCUSDT", "1h", limit=10)
+
+    assert [c["open_time"] for c in candles] == [first + i * HOUR_MS for i in range(10)]
+    persistence.get_market_data_range.assert_awaited_once()
+    # Solo se descarga la vela en formación, que tampoco se persiste.
+    assert mock_binance_adapter.get_klines.await_count == 1
+    assert mock_binance_adapter.get_klines.await_args.kwargs["start_time"] == current_open
+    persistence.bulk_upsert_market_data.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_uncached_interval_does_not_persist_forming_candle(kline_store: KlineStore, mock_binance_adapter):
+    """Prueba que en las temporalidades sin caché la vela en formación no se guarda."""
+    # El almacén distingue los frames con isinstance: se importa como lo hace el servicio.
+    from core.domain_models.ohlcv import OHLCVFrame
+
+    now_ms = int(time.time() * 1000)
+    closed, forming = make_kline(now_ms - 2 * HOUR_MS), make_kline(now_ms - HOUR_MS // 2)
+    mock_binance_adapter.get_klines_frame = AsyncMock(return_value=OHLCVFrame.from_binance_klines([closed, forming]))
+
+    candles = await kline_store.get_klines("BTCUSDT", "1M", limit=2)
+
+    assert len(candles) == 2
+    persisted = kline_store._persistence_service.bulk_upsert_market_data.await_args.args[0]
+    assert [record[1] for record in persisted] == [datetime.fromtimestamp(closed[0] / 1000, tz=timezone.utc)]
@@ -0,0 +1,60 @@
+"""
+Pruebas unitarias para MarketDataRetentionService.
+"""
+
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.services.market_data_retention_service import MarketDataRetentionService, RetentionPolicy
+
+
+def test_policies_are_parsed_and_validated():
+    assert RetentionPolicy.parse_list("1m:1h:90, 5m:1d:180") == [RetentionPolicy("1m", "1h", 90), RetentionPolicy("5m", "1d", 180)]
+
+    with pytest.raises(ValueError):
+        RetentionPolicy("1h", "1m", 30).validate()
+    with pytest.raises(ValueError):
+        RetentionPolicy("1d", "1w", 30).validate()
+    with pytest.raises(ValueError):
+        RetentionPolicy("1h", "3d", 30).validate()
+
+
+@pytest.mark.asyncio
+async def test_run_once_rolls_up_and_drops_expired_months():
+    persistence = AsyncMock()
+    persistence.get_market_data_months.return_value = [
+        datetime(2024, 1, 1, tzinfo=timezone.utc), datetime(2024, 2, 1, tzinfo=timezone.utc)
+    ]
+    persistence.rollup_market_data.return_value = 744
+    persistence.drop_market_data_month.return_value = True
+    service = MarketDataRetentionService(persistence, policies=[RetentionPolicy("1m", "1h", 90)])
+
+    report = await service.run_once(now=datetime(2024, 6, 15, tzinfo=timezone.utc))
+
+    # 90 días antes del 15 de junio cae en marzo: solo se procesan los meses completos anteriores.
+    persistence.get_market_data_months.assert_awaited_once_with("1m", before=datetime(2024, 3, 1, tzinfo=timezone.utc))
+    persistence.rollup_market_data.assert_any_await(
+        "1m", "1h", 3600, datetime(2024, 1, 1, tzinfo=timezone.utc), datetime(2024, 2, 1, tzinfo=timezone.utc)
+    )
+    assert persistence.drop_market_data_month.await_count == 2
+    assert report.months_processed == 2
+    assert report.candles_created == 1488
+    assert report.partitions_dropped == 2
+    assert report.months_by_interval == {"1m": ["2024-01", "2024-02"]}
+
+
+@pytest.mark.asyncio
+async def test_retention_is_disabled_without_configured_policies(monkeypatch):
+    monkeypatch.delenv("MARKET_DATA_RETENTION_POLICIES", raising=False)
+    persistence = AsyncMock()
+    service = MarketDataRetentionService(persistence)
+
+    await service.start()
+    report = await service.run_once()
+
+    assert service.policies == []
+    assert service._run_task is None
+    persistence.drop_market_data_month.assert_not_called()
+    assert report.months_processed == 0
@@ -160,3 +160,100 @@ async def test_get_binance_spot_balances_api_error(market_data_service: MarketDa
     with pytest.raises(UltiBotError) as excinfo: # MarketDataService envuelve BinanceAPIError en UltiBotError
         await market_data_service.get_binance_spot_balances()
     assert "No se pudieron obtener los balances de Binance: Failed to fetch balances" in str(excinfo.value)
+
+@pytest.mark.asyncio
+async def test_get_market_data_rest_uses_single_batch_request(market_data_service: MarketDataService, mock_binance_adapter):
+    mock_binance_adapter.normalize_symbol = MagicMock(side_effect=BinanceAdapter.normalize_symbol)
+    mock_binance_adapter.get_tickers_24hr = AsyncMock(return_value=[
+        {"symbol": "BTCUSDT", "lastPrice": "50000.0", "priceChangePercent": "1.5", "quoteVolume": "1000"},
+        {"symbol": "ETHUSDT", "lastPrice": "4000.0", "priceChangePercent": "-0.5", "quoteVolume": "500"},
+    ])
+    mock_binance_adapter.get_ticker_24hr = AsyncMock()
+
+    market_data = await market_data_service.get_market_data_rest(["BTC/USDT", "ETHUSDT"])
+
+    assert market_data == {
+        "BTCUSDT": {"lastPrice": 50000.0, "priceChangePercent": 1.5, "quoteVolume": 1000.0},
+        "ETHUSDT": {"lastPrice": 4000.0, "priceChangePercent": -0.5, "quoteVolume": 500.0},
+    }
+    mock_binance_adapter.get_tickers_24hr.assert_awaited_once_with(["BTCUSDT", "ETHUSDT"])
+    mock_binance_adapter.get_ticker_24hr.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_get_market_data_rest_requests_each_normalized_symbol_once(market_data_service: MarketDataService, mock_binance_adapter):
+    mock_binance_adapter.normalize_symbol = MagicMock(side_effect=BinanceAdapter.normalize_symbol)
+    mock_binance_adapter.get_tickers_24hr = AsyncMock(side_effect=BinanceAPIError("Invalid symbol.", status_code=400))
+    mock_binance_adapter.get_ticker_24hr = AsyncMock(side_effect=BinanceAPIError("Invalid symbol.", status_code=400))
+
+    market_data = await market_data_service.get_market_data_rest(["foo/usdt", "ETHUSDT", "FOOUSDT", "ETH/USDT"])
+
+    mock_binance_adapter.get_tickers_24hr.assert_awaited_once_with(["FOOUSDT", "ETHUSDT"])
+    assert mock_binance_adapter.get_ticker_24hr.await_count == 2
+    # Cada símbolo pedido recibe su resultado aunque se haya consultado una sola vez.
+    assert market_data == {
+        "foo/usdt": {"error": "Invalid symbol."}, "FOOUSDT": {"error": "Invalid symbol."},
+        "ETHUSDT": {"error": "Invalid symbol."}, "ETH/USDT": {"error": "Invalid symbol."},
+    }
+    assert {"foo/usdt", "FOOUSDT"} <= market_data_service._invalid_symbols_cache
+
+    mock_binance_adapter.get_tickers_24hr.side_effect = None
+    mock_binance_adapter.get_tickers_24hr.return_value = [
+        {"symbol": "ETHUSDT", "lastPrice": "4000.0", "priceChangePercent": "0", "quoteVolume": "10"}
+    ]
+    market_data_service._invalid_symbols_cache.clear()
+    market_data = await market_data_service.get_market_data_rest(["ETH/USDT", "ETHUSDT"])
+    assert market_data == {"ETHUSDT": {"lastPrice": 4000.0, "priceChangePercent": 0.0, "quoteVolume": 10.0}}
+    mock_binance_adapter.get_tickers_24hr.assert_awaited_with(["ETHUSDT"])
+
+@pytest.mark.asyncio
+async def test_get_market_data_rest_falls_back_per_symbol_when_batch_fails(market_data_service: MarketDataService, mock_binance_adapter):
+    mock_binance_adapter.normalize_symbol = MagicMock(side_effect=BinanceAdapter.normalize_symbol)
+    mock_binance_adapter.get_tickers_24hr = AsyncMock(side_effect=BinanceAPIError("Invalid symbol.", status_code=400))
+
+    async def single_ticker(symbol):
+        if symbol == "FOOUSDT":
+            raise BinanceAPIError("Invalid symbol.", status_code=400)
+        return {"symbol": symbol, "lastPrice": "1.0", "priceChangePercent": "0", "quoteVolume": "10"}
+    mock_binance_adapter.get_ticker_24hr = AsyncMock(side_effect=single_ticker)
+
+    market_data = await market_data_service.get_market_data_rest(["BTCUSDT", "FOOUSDT"])
+
+    assert market_data["BTCUSDT"]["lastPrice"] == 1.0
+    assert market_data["FOOUSDT"] == {"error": "Invalid symbol."}
+    assert "FOOUSDT" in market_data_service._invalid_symbols_cache
+
+    mock_binance_adapter.get_tickers_24hr.reset_mock()
+    mock_binance_adapter.get_tickers_24hr.side_effect = None
+    mock_binance_adapter.get_tickers_24hr.return_value = [
+        {"symbol": "BTCUSDT", "lastPrice": "2.0", "priceChangePercent": "0", "quoteVolume": "10"}
+    ]
+    market_data = await market_data_service.get_market_data_rest(["BTCUSDT", "FOOUSDT"])
+
+    assert market_data["FOOUSDT"] == {"error": "Símbolo inválido (caché)"}
+    mock_binance_adapter.get_tickers_24hr.assert_awaited_once_with(["BTCUSDT"])
+
+@pytest.mark.asyncio
+async def test_kline_stream_updates_forming_candle_and_emits_close(market_data_service: MarketDataService, mock_binance_adapter, mock_persistence_service):
+    mock_binance_adapter.normalize_symbol = MagicMock(side_effect=BinanceAdapter.normalize_symbol)
+    mock_binance_adapter.subscribe_to_kline_stream = AsyncMock()
+    on_closed = AsyncMock()
+
+    await market_data_service.subscribe_to_kline_stream("BTC/USDT", "1m", on_candle_closed=on_closed)
+    symbol, interval, handler = mock_binance_adapter.subscribe_to_kline_stream.await_args.args
+    assert (symbol, interval) == ("BTCUSDT", "1m")
+
+    def event(close, closed):
+        return {"e": "kline", "s": "BTCUSDT", "k": {
+            "t": 60_000, "T": 119_999, "o": "100", "h": "105", "l": "99", "c": close, "v": "3",
+            "q": "300", "n": 5, "V": "1", "Q": "100", "x": closed}}
+
+    await handler(event("101", False))
+    await handler(event("102", False))
+    live = market_data_service.get_live_candles("BTCUSDT", "1m")
+    assert len(live) == 1 and live[0]["close"] == 102.0
+    on_closed.assert_not_awaited()
+
+    await handler(event("103", True))
+    on_closed.assert_awaited_once()
+    assert on_closed.await_args.args[2]["close"] == 103.0
+    mock_persistence_service.bulk_upsert_market_data.assert_awaited_once()
@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+
+from src.adapters.binance_adapter import BinanceAdapter
+from src.services.order_book_service import LocalOrderBook, OrderBookService
+
+SNAPSHOT = {
+    "lastUpdateId": 100,
+    "bids": [["99.0", "1.0"], ["98.0", "2.0"], ["97.0", "5.0"]],
+    "asks": [["101.0", "1.0"], ["102.0", "2.0"], ["103.0", "5.0"]],
+}
+
+def depth_event(first_id, last_id, bids=(), asks=()):
+    return {"e": "depthUpdate", "s": "BTCUSDT", "U": first_id, "u": last_id, "b": list(bids), "a": list(asks)}
+
+def test_local_book_queries_and_diffs():
+    book = LocalOrderBook("BTCUSDT")
+    book.apply_snapshot(SNAPSHOT)
+    assert book.best_bid() == (99.0, 1.0)
+    assert book.best_ask() == (101.0, 1.0)
+    assert book.mid_price() == 100.0
+    assert book.cumulative_depth("ASK", 102.0) == 3.0
+
+    # Eventos ya incluidos en la instantánea se ignoran; el primero debe solapar lastUpdateId + 1.
+    assert book.apply_diff(depth_event(90, 100, asks=[["101.0", "9.0"]]))
+    assert book.best_ask() == (101.0, 1.0)
+    assert book.apply_diff(depth_event(95, 105, bids=[["99.5", "3.0"]], asks=[["101.0", "0"]]))
+    assert book.best_bid() == (99.5, 3.0)
+    assert book.best_ask() == (102.0, 2.0)
+
+    # Hueco de secuencia.
+    assert not book.apply_diff(depth_event(107, 110))
+
+def test_estimate_fill_walks_levels():
+    book = LocalOrderBook("BTCUSDT")
+    book.apply_snapshot(SNAPSHOT)
+    estimate = book.estimate_fill("BUY", 2.0)
+    assert estimate.average_price == pytest.approx((101.0 + 102.0) / 2)
+    assert estimate.fully_filled
+    assert estimate.slippage_bps == pytest.approx((101.5 - 101.0) / 101.0 * 10_000)
+
+    partial = book.estimate_fill("SELL", 10.0)
+    assert partial.filled_quantity == 8.0
+    assert not partial.fully_filled
+
+@pytest.mark.asyncio
+async def test_service_buffers_events_and_resyncs_on_gap():
+    adapter = AsyncMock(spec=BinanceAdapter)
+    adapter.normalize_symbol = MagicMock(side_effect=BinanceAdapter.normalize_symbol)
+    snapshot_ready = asyncio.Event()
+
+    async def get_order_book(symbol, limit=1000, priority=None):
+        await snapshot_ready.wait()
+        return SNAPSHOT
+    adapter.get_order_book = AsyncMock(side_effect=get_order_book)
+
+    service = OrderBookService(adapter)
+    await service.track("BTC/USDT")
+    handler = adapter.subscribe_to_depth_stream.await_args.args[1]
+
+    await handler(depth_event(99, 101, asks=[["101.0", "4.0"]]))
+    assert service.get_book("BTCUSDT") is None
+    snapshot_ready.set()
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    book = service.get_book("BTCUSDT")
+    assert book is not None
+    assert book.best_ask() == (101.0, 4.0)
+    assert service.estimate_fill("BTCUSDT", "BUY", Decimal("1")).average_price == 101.0
+
+    await handler(depth_event(105, 106))
+    assert service.get_book("BTCUSDT") is None
+    await service.close()
@@ -835,3 +835,30 @@ class TestStrategyService:
         
         is_applicable = await strategy_service.is_strategy_applicable_to_symbol(sample_strategy_id, sample_user_id, "ANY/SYMBOL")
         assert is_applicable is True
+
+    @pytest.mark.asyncio
+    async def test_get_applicable_strategies_uses_compiled_index(self, strategy_service, mock_persistence_service, sample_user_id, sample_scalping_config):
+        btc_only = sample_scalping_config.model_copy(update={"id": str(uuid4()), "is_active_paper_mode": True, "allowed_symbols": ["BTC/USDT"]})
+        all_but_xrp = sample_scalping_config.model_copy(update={"id": str(uuid4()), "is_active_paper_mode": True, "allowed_symbols": None, "excluded_symbols": ["XRP/USDT"]})
+        real_only = sample_scalping_config.model_copy(update={"id": str(uuid4()), "is_active_real_mode": True, "allowed_symbols": None})
+        mock_persistence_service.list_strategy_configs_by_user.return_value = [btc_only, all_but_xrp, real_only]
+
+        assert await strategy_service.get_applicable_strategies(sample_user_id, "paper", "BTC/USDT") == [btc_only, all_but_xrp]
+        assert await strategy_service.get_applicable_strategies(sample_user_id, "paper", "XRP/USDT") == []
+        assert await strategy_service.get_applicable_strategies(sample_user_id, "paper", "ADA/USDT") == [all_but_xrp]
+        assert await strategy_service.get_applicable_strategies(sample_user_id, "real", "XRP/USDT") == [real_only]
+        assert await strategy_service.has_active_strategies(sample_user_id, "paper") is True
+        mock_persistence_service.list_strategy_configs_by_user.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_applicability_index_updated_on_deactivate(self, strategy_service, mock_persistence_service, sample_user_id, sample_strategy_id, sample_scalping_config):
+        active = sample_scalping_config.model_copy(update={"is_active_paper_mode": True})
+        mock_persistence_service.list_strategy_configs_by_user.return_value = [active]
+        assert await strategy_service.get_applicable_strategies(sample_user_id, "paper", "BTC/USDT") == [active]
+
+        mock_persistence_service.get_strategy_config_by_id.return_value = active.model_copy()
+        await strategy_service.deactivate_strategy(sample_strategy_id, sample_user_id, "paper")
+
+        assert await strategy_service.get_applicable_strategies(sample_user_id, "paper", "BTC/USDT") == []
+        assert await strategy_service.has_active_strategies(sample_user_id, "paper") is False
+        mock_persistence_service.list_strategy_configs_by_user.assert_called_once()
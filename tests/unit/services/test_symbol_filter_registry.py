@@ -0,0 +1,95 @@
+import pytest
+from decimal import Decimal
+from unittest.mock import AsyncMock
+from uuid import uuid4
+
+from src.adapters.binance_adapter import BinanceAdapter
+# El registro lanza la excepción importada como `core.exceptions`, no como `src.core.exceptions`.
+from core.exceptions import OrderExecutionError
+from src.services.order_execution_service import OrderExecutionService, PaperOrderExecutionService
+from src.services.symbol_filter_registry import SymbolFilterRegistry
+
+EXCHANGE_INFO = {
+    "symbols": [
+        {
+            "symbol": "BTCUSDT",
+            "status": "TRADING",
+            "baseAsset": "BTC",
+            "quoteAsset": "USDT",
+            "filters": [
+                {"filterType": "PRICE_FILTER", "minPrice": "0.01000000", "maxPrice": "1000000.00000000", "tickSize": "0.01000000"},
+                {"filterType": "LOT_SIZE", "minQty": "0.00001000", "maxQty": "9000.00000000", "stepSize": "0.00001000"},
+                {"filterType": "NOTIONAL", "minNotional": "5.00000000", "applyMinToMarket": True},
+                {"filterType": "MARKET_LOT_SIZE", "minQty": "0.00000000", "maxQty": "100.00000000", "stepSize": "0.00000000"},
+            ],
+        },
+        {
+            "symbol": "SHIBUSDT",
+            "status": "TRADING",
+            "baseAsset": "SHIB",
+            "quoteAsset": "USDT",
+            "filters": [
+                {"filterType": "PRICE_FILTER", "minPrice": "0.00000001", "maxPrice": "1.00000000", "tickSize": "0.00000001"},
+                {"filterType": "LOT_SIZE", "minQty": "100.00", "maxQty": "90000000000.00", "stepSize": "100.00"},
+                {"filterType": "MIN_NOTIONAL", "minNotional": "5.00000000", "applyToMarket": True},
+            ],
+        },
+    ]
+}
+
+@pytest.fixture
+async def registry():
+    adapter = AsyncMock(spec=BinanceAdapter)
+    adapter.get_exchange_info.return_value = EXCHANGE_INFO
+    registry = SymbolFilterRegistry(binance_adapter=adapter)
+    await registry.load()
+    return registry
+
+@pytest.mark.asyncio
+async def test_quantize_helpers_use_exchange_steps(registry):
+    btc = registry.get("BTC/USDT")
+    assert btc is not None
+    assert btc.quantize_quantity(Decimal("0.123456789")) == Decimal("0.12345")
+    assert btc.quantize_price(Decimal("30000.126")) == Decimal("30000.13")
+    # MARKET_LOT_SIZE con stepSize 0 reutiliza el de LOT_SIZE.
+    assert btc.quantize_quantity(Decimal("0.123456789"), is_market=True) == Decimal("0.12345")
+
+    shib = registry.get("SHIBUSDT")
+    assert str(shib.quantize_quantity(Decimal("12345.6"))) == "12300"
+
+@pytest.mark.asyncio
+async def test_prepare_order_rejects_below_min_notional(registry):
+    prepared = registry.prepare_order("BTCUSDT", Decimal("0.0012345"), price=Decimal("30000.004"))
+    assert prepared["quantity"] == Decimal("0.00123")
+    assert prepared["price"] == Decimal("30000.00")
+
+    with pytest.raises(OrderExecutionError) as exc_info:
+        registry.prepare_order("BTCUSDT", Decimal("0.0001"), price=Decimal("30000"))
+    assert exc_info.value.code == "ORDER_FILTER_VIOLATION"
+
+    # Símbolos desconocidos se devuelven sin modificar.
+    assert registry.prepare_order("FOOUSDT", Decimal("1.23456789"))["quantity"] == Decimal("1.23456789")
+
+@pytest.mark.asyncio
+async def test_paper_market_order_uses_symbol_filters(registry):
+    service = PaperOrderExecutionService(symbol_filters=registry)
+    order = await service.execute_market_order(user_id=uuid4(), symbol="BTCUSDT", side="BUY", quantity=Decimal("0.0123456"))
+    assert order.executedQuantity == Decimal("0.01234")
+
+    with pytest.raises(OrderExecutionError):
+        await service.execute_market_order(user_id=uuid4(), symbol="BTCUSDT", side="BUY", quantity=Decimal("0.0001"))
+
+@pytest.mark.asyncio
+async def test_real_market_order_checks_min_notional_against_last_price(registry):
+    adapter = AsyncMock(spec=BinanceAdapter)
+    adapter.get_ticker_24hr.return_value = {"symbol": "BTCUSDT", "lastPrice": "30000.00"}
+    service = OrderExecutionService(binance_adapter=adapter, symbol_filters=registry)
+
+    with pytest.raises(OrderExecutionError) as exc_info:
+        await service.execute_market_order(user_id=uuid4(), symbol="BTCUSDT", side="BUY", quantity=Decimal("0.0001"),
+                                           api_key="key", api_secret="secret")
+    assert exc_info.value.code == "ORDER_FILTER_VIOLATION"
+
+    order = await service.execute_market_order(user_id=uuid4(), symbol="BTCUSDT", side="BUY", quantity=Decimal("0.0123456"),
+                                               api_key="key", api_secret="secret")
+    assert order.executedQuantity == Decimal("0.01234")
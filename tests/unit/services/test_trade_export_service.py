@@ -0,0 +1,84 @@
+"""
+Pruebas unitarias para TradeExportService.
+"""
+
+import csv
+import io
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from src.services.trade_export_service import TRADE_EXPORT_FIELDS, TradeExportService, flatten_trade_row
+
+
+def make_row(index: int):
+    return {
+        "id": f"trade-{index}",
+        "user_id": "user",
+        "mode": "paper",
+        "symbol": "BTCUSDT",
+        "side": "buy",
+        "positionStatus": "closed",
+        "pnl_usd": "12.50",
+        "created_at": datetime(2024, 1, 1, index),
+        "closed_at": None,
+        "entryOrder": {"type": "market", "executedQuantity": "2", "executedPrice": "100", "timestamp": "2024-01-01T00:00:00"},
+        "exitOrders": [
+            {"executedQuantity": "1", "executedPrice": "110", "timestamp": "2024-01-02T00:00:00"},
+            {"executedQuantity": "1", "executedPrice": "120", "timestamp": "2024-01-03T00:00:00"},
+        ],
+    }
+
+
+class FakePersistenceService:
+    def __init__(self, rows):
+        self.rows = rows
+        self.batch_sizes = []
+
+    async def stream_trade_rows(self, user_id, batch_size=500, **filters):
+        self.batch_sizes.append(batch_size)
+        for row in self.rows:
+            yield row
+
+
+def test_flatten_trade_row_summarises_orders():
+    flat = flatten_trade_row(make_row(0))
+
+    assert list(flat) == list(TRADE_EXPORT_FIELDS)
+    assert flat["pnl_usd"] == Decimal("12.50")
+    assert flat["entryOrder.executedPrice"] == Decimal("100")
+    assert flat["exitOrders.count"] == 2
+    assert flat["exitOrders.avgExecutedPrice"] == Decimal("115")
+    assert flat["exitOrders.lastTimestamp"].day == 3
+    assert flat["created_at"].tzinfo is not None
+
+
+@pytest.mark.asyncio
+async def test_csv_export_is_streamed_in_chunks():
+    persistence = FakePersistenceService([make_row(i) for i in range(5)])
+    service = TradeExportService(persistence, chunk_size=2)
+
+    chunks = [chunk async for chunk in service.iter_export("csv", user_id="user")]
+
+    # Tres bloques de filas (2 + 2 + 1) y el cierre del fichero.
+    assert len(chunks) == 4
+    assert persistence.batch_sizes == [2]
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+    assert [row["id"] for row in rows] == [f"trade-{i}" for i in range(5)]
+    assert rows[0]["exitOrders.avgExecutedPrice"] == "115"
+
+
+@pytest.mark.asyncio
+async def test_parquet_export_writes_one_row_group_per_chunk(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    service = TradeExportService(FakePersistenceService([make_row(i) for i in range(5)]), chunk_size=2)
+    path = tmp_path / "trades.parquet"
+
+    exported = await service.export_to_file(str(path), "parquet", user_id="user")
+
+    parquet_file = pq.ParquetFile(path)
+    assert exported == 5
+    assert parquet_file.metadata.num_rows == 5
+    assert parquet_file.metadata.num_row_groups == 3
+    assert parquet_file.read().column("pnl_usd").to_pylist()[0] == 12.5
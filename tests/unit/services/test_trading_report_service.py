@@ -116,34 +116,52 @@ async def test_get_closed_trades_success(
     assert result[0].symbol == "BTCUSDT"
 
 
+def make_summary(**overrides):
+    summary = {
+        "total_trades": 0, "winning_trades": 0, "losing_trades": 0, "total_pnl": Decimal("0"),
+        "best_trade_pnl": None, "worst_trade_pnl": None, "best_trade_symbol": None, "worst_trade_symbol": None,
+        "entry_volume": Decimal("0"), "exit_volume": Decimal("0"), "first_created_at": None, "last_closed_at": None,
+    }
+    summary.update(overrides)
+    return summary
+
+
 @pytest.mark.asyncio
 async def test_calculate_performance_metrics_success(
     trading_report_service: TradingReportService, 
-    mock_persistence_service: AsyncMock, 
-    sample_trade_data: list[Trade]
+    mock_persistence_service: AsyncMock
 ):
-    """Prueba cálculo de métricas de rendimiento exitoso."""
+    """Prueba cálculo de métricas de rendimiento exitoso a partir del agregado SQL."""
     # Arrange
-    mock_persistence_service.get_closed_trades.return_value = sample_trade_data
-    user_id = sample_trade_data[0].user_id
+    closed_at = datetime.utcnow()
+    mock_persistence_service.get_trade_performance_summary.return_value = make_summary(
+        total_trades=3, winning_trades=2, losing_trades=1, total_pnl=Decimal("125.0"),
+        best_trade_pnl=Decimal("150.0"), worst_trade_pnl=Decimal("-50.0"),
+        best_trade_symbol="BTCUSDT", worst_trade_symbol="ETHUSDT",
+        entry_volume=Decimal("300"), exit_volume=Decimal("425"), last_closed_at=closed_at,
+    )
+    user_id = uuid4()
 
     # Act
     result = await trading_report_service.calculate_performance_metrics(user_id, mode="paper")
 
     # Assert
-    # La llamada a `calculate_performance_metrics` invoca internamente a `get_closed_trades`,
-    # que a su vez llama a `persistence_service.get_closed_trades`.
-    # Verificamos la llamada al método del mock de persistencia.
-    # Notar que `limit` y `offset` no se pasan al servicio de persistencia.
-    mock_persistence_service.get_closed_trades.assert_called_once_with(
-        user_id=str(user_id), mode='paper', symbol=None, start_date=None, end_date=None
+    # Las métricas no cargan trades: se piden agregadas al servicio de persistencia.
+    mock_persistence_service.get_trade_performance_summary.assert_called_once_with(
+        user_id=str(user_id), mode='paper', symbol=None, start_date=None, end_date=None, date_field="closed_at"
     )
+    mock_persistence_service.get_closed_trades.assert_not_called()
     assert isinstance(result, PerformanceMetrics)
     assert result.total_trades == 3
     assert result.winning_trades == 2
     assert result.losing_trades == 1
     assert result.win_rate == pytest.approx(Decimal("66.67"), rel=Decimal("1e-2"))
     assert result.total_pnl == Decimal("125.0")
+    assert result.best_trade_symbol == "BTCUSDT"
+    assert result.worst_trade_pnl == Decimal("-50.0")
+    # El volumen operado suma entradas y salidas, igual que en PerformanceService.
+    assert result.total_volume_traded == Decimal("725")
+    assert result.period_end == closed_at
 
 
 @pytest.mark.asyncio
@@ -153,18 +171,15 @@ async def test_calculate_performance_metrics_no_trades(
 ):
     """Prueba cálculo de métricas cuando no hay trades."""
     # Arrange
-    mock_persistence_service.get_closed_trades.return_value = []
+    mock_persistence_service.get_trade_performance_summary.return_value = make_summary()
     user_id = uuid4()
 
     # Act
     result = await trading_report_service.calculate_performance_metrics(user_id, mode="paper")
 
     # Assert
-    # La llamada a `calculate_performance_metrics` invoca internamente a `get_closed_trades`,
-    # que a su vez llama a `persistence_service.get_closed_trades`.
-    # Verificamos la llamada al método del mock de persistencia.
-    mock_persistence_service.get_closed_trades.assert_called_once_with(
-        user_id=str(user_id), mode='paper', symbol=None, start_date=None, end_date=None
+    mock_persistence_service.get_trade_performance_summary.assert_called_once_with(
+        user_id=str(user_id), mode='paper', symbol=None, start_date=None, end_date=None, date_field="closed_at"
     )
     assert result.total_trades == 0
     assert result.total_pnl == Decimal("0.0")
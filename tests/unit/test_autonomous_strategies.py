@@ -116,6 +116,11 @@ def mock_strategy_service_no_ai():
         ]
     service.get_active_strategies.side_effect = mock_get_active_strategies
 
+    async def mock_get_applicable_strategies(user_id: str, mode: str, symbol: str):
+        return await service.get_active_strategies(user_id, mode)
+    service.get_applicable_strategies.side_effect = mock_get_applicable_strategies
+    service.has_active_strategies.return_value = True
+
     service.is_strategy_applicable_to_symbol.return_value = True
 
     async def mock_strategy_can_operate_autonomously(strategy_id: str, user_id: str):
@@ -159,8 +159,7 @@ async def test_process_opportunity_with_scalping_strategy_generates_buy_decision
 
     # Mockear las llamadas a los servicios dependientes
     mock_services["configuration_service"].get_user_configuration.return_value = mock_user_config
-    mock_services["strategy_service"].get_active_strategies.return_value = [scalping_strategy]
-    mock_services["strategy_service"].is_strategy_applicable_to_symbol.return_value = True
+    mock_services["strategy_service"].get_applicable_strategies.return_value = [scalping_strategy]
 
     # Mockear la respuesta del AI Orchestrator para simular una señal de compra
     ai_result = AIAnalysisResult(
@@ -188,5 +187,5 @@ async def test_process_opportunity_with_scalping_strategy_generates_buy_decision
 
     # Verificar que los mocks fueron llamados
     mock_services["configuration_service"].get_user_configuration.assert_called_once_with(str(mock_user_id))
-    mock_services["strategy_service"].get_active_strategies.assert_called_once_with(str(mock_user_id), "paper")
+    mock_services["strategy_service"].get_applicable_strategies.assert_called_once_with(str(mock_user_id), "paper", mock_opportunity.symbol)
     trading_engine.ai_orchestrator.analyze_opportunity_with_strategy_context_async.assert_called_once()